@@ -0,0 +1,51 @@
+"""add ai_call_usage table for per-call token and latency accounting
+
+Revision ID: add_ai_call_usage
+Revises: add_conv_block_keyset_index
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "add_ai_call_usage"
+down_revision: Union[str, Sequence[str], None] = "add_conv_block_keyset_index"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_call_usage",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("call_type", sa.String(length=64), nullable=False),
+        sa.Column("provider", sa.String(length=64), nullable=False),
+        sa.Column("model", sa.String(length=128), nullable=False),
+        sa.Column("success", sa.Boolean(), nullable=False),
+        sa.Column("error_type", sa.String(length=128), nullable=True),
+        sa.Column("input_tokens", sa.Integer(), nullable=True),
+        sa.Column("output_tokens", sa.Integer(), nullable=True),
+        sa.Column("cached_tokens", sa.Integer(), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=False),
+        sa.Column("ttfb_ms", sa.Integer(), nullable=True),
+        sa.Column("retries", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("fallback_hops", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # 按天、按模型汇总：WHERE created_at >= ? GROUP BY date(created_at), model
+    op.create_index(
+        "idx_ai_call_usage_created_model",
+        "ai_call_usage",
+        ["created_at", "model"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_ai_call_usage_created_model", table_name="ai_call_usage")
+    op.drop_table("ai_call_usage")
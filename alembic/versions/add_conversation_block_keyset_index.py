@@ -0,0 +1,32 @@
+"""add composite index for keyset pagination of conversation blocks
+
+Revision ID: add_conv_block_keyset_index
+Revises: add_forum_thread_directory
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+revision: str = "add_conv_block_keyset_index"
+down_revision: Union[str, Sequence[str], None] = "add_forum_thread_directory"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 管理面板按用户分页浏览对话块：WHERE discord_id = ? ORDER BY start_time DESC, id DESC
+    op.execute(
+        text("""
+        CREATE INDEX IF NOT EXISTS idx_conv_discord_start_time
+        ON conversation.conversation_blocks (discord_id, start_time, id)
+        """)
+    )
+
+
+def downgrade() -> None:
+    op.execute(text("DROP INDEX IF EXISTS conversation.idx_conv_discord_start_time"))
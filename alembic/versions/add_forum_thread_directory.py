@@ -0,0 +1,59 @@
+"""add forum thread directory tables
+
+Revision ID: add_forum_thread_directory
+Revises: add_content_filter_keywords
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+revision: str = "add_forum_thread_directory"
+down_revision: Union[str, Sequence[str], None] = "add_content_filter_keywords"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(text("CREATE SCHEMA IF NOT EXISTS forum"))
+
+    op.execute(
+        text("""
+        CREATE TABLE forum.thread_directory (
+            thread_id BIGINT NOT NULL,
+            channel_id BIGINT NOT NULL,
+            guild_id BIGINT NOT NULL,
+            thread_name TEXT NOT NULL,
+            archived BOOLEAN NOT NULL DEFAULT false,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            archive_timestamp TIMESTAMP WITHOUT TIME ZONE,
+            last_seen_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now(),
+            PRIMARY KEY (thread_id)
+        )
+    """)
+    )
+    op.execute(
+        text(
+            "CREATE INDEX idx_thread_directory_channel ON forum.thread_directory (channel_id)"
+        )
+    )
+
+    op.execute(
+        text("""
+        CREATE TABLE forum.thread_directory_sync (
+            channel_id BIGINT NOT NULL,
+            full_synced_at TIMESTAMP WITHOUT TIME ZONE,
+            incremental_synced_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (channel_id)
+        )
+    """)
+    )
+
+
+def downgrade() -> None:
+    op.execute(text("DROP TABLE IF EXISTS forum.thread_directory_sync"))
+    op.execute(text("DROP TABLE IF EXISTS forum.thread_directory"))
@@ -0,0 +1,52 @@
+"""add binary-quantized and truncated HNSW expression indexes for embeddings
+
+Revision ID: add_quantized_embedding_indexes
+Revises: add_ai_call_usage
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+revision: str = "add_quantized_embedding_indexes"
+down_revision: Union[str, Sequence[str], None] = "add_ai_call_usage"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 src/chat/services/embedding_storage.py 中的 VECTOR_TABLES 保持一致
+VECTOR_TABLES = [
+    ("forum", "forum_threads", "forum"),
+    ("tutorials", "knowledge_chunks", "tut"),
+    ("general_knowledge", "knowledge_chunks", "gk"),
+    ("community", "member_chunks", "cm"),
+    ("conversation", "conversation_blocks", "conv"),
+]
+EMBEDDING_COLUMNS = ["bge_embedding", "qwen_embedding"]
+# 与 EMBEDDING_STORAGE_CONFIG["TRUNCATE_DIM"] 一致
+TRUNCATE_DIM = 256
+
+
+def _index_names():
+    for schema, _, prefix in VECTOR_TABLES:
+        for column in EMBEDDING_COLUMNS:
+            yield f"{schema}.idx_{prefix}_{column}_bq_hnsw"
+            yield f"{schema}.idx_{prefix}_{column}_t{TRUNCATE_DIM}_hnsw"
+
+
+def upgrade() -> None:
+    # 量化索引不在迁移中建立：只有当前存储模式（EMBEDDING_STORAGE_MODE）与各表检索列
+    # 需要索引，而检索列记录在全局设置中，迁移无法得知。
+    # EmbeddingLifecycleManager 启动时按 embedding_storage.hnsw_index() 以
+    # CREATE INDEX CONCURRENTLY 补建所需的索引，并删除其他模式 / 不再检索的列上的索引。
+    pass
+
+
+def downgrade() -> None:
+    # 删除运行期间可能建立的量化索引（需要 pgvector >= 0.7.0 的表达式）
+    with op.get_context().autocommit_block():
+        for name in _index_names():
+            op.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
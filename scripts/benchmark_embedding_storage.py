@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+向量存储模式基准：在现有的向量表上对比 full / binary / truncated 三种第一阶段检索的
+召回率与延迟，并列出各索引的大小。
+
+从表中随机抽取若干行的向量作为查询（排除自身），以关闭索引扫描的精确检索结果为基准，
+计算每种模式 top_k 的召回率（recall@k）和查询耗时 p50 / p95。
+
+量化模式需要对应的表达式索引；线上只保留当前存储模式的索引，
+加 --create-indexes 可先为被测的表与列创建全部模式的索引（CREATE INDEX CONCURRENTLY），
+测完后下次启动时 EmbeddingLifecycleManager 会删除当前模式用不到的索引。
+
+用法（在项目根目录）:
+    python -m scripts.benchmark_embedding_storage [--table forum.forum_threads]
+        [--column qwen_embedding] [--samples 50] [--top-k 10] [--create-indexes]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Sequence
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat.services.embedding_storage import (  # noqa: E402
+    EMBEDDING_COLUMNS,
+    STORAGE_MODES,
+    VECTOR_TABLES,
+    build_semantic_search_sql,
+    exact_distance_expr,
+    hnsw_index,
+    prepare_vector_search,
+)
+from src.database.database import AsyncSessionLocal, engine  # noqa: E402
+
+
+def recall_at_k(truth: Sequence[int], found: Sequence[int]) -> float:
+    if not truth:
+        return 1.0
+    return len(set(truth) & set(found)) / len(truth)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(q * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def sample_queries(session, table: str, column: str, samples: int):
+    result = await session.execute(
+        text(
+            f"SELECT id, {column} AS vector FROM {table} "
+            f"WHERE {column} IS NOT NULL ORDER BY random() LIMIT :samples"
+        ),
+        {"samples": samples},
+    )
+    return [(row.id, row.vector) for row in result]
+
+
+async def exact_top_k(session, table, column, query_id, vector, top_k) -> List[int]:
+    # 关闭索引扫描得到精确结果；SET LOCAL 在事务结束时失效
+    await session.execute(text("SET LOCAL enable_indexscan = off"))
+    distance = exact_distance_expr(column)
+    result = await session.execute(
+        text(
+            f"SELECT id FROM {table} WHERE {column} IS NOT NULL AND id <> :self_id "
+            f"ORDER BY {distance} LIMIT :top_k"
+        ),
+        {"query_vector": vector, "self_id": query_id, "top_k": top_k},
+    )
+    ids = [row.id for row in result]
+    await session.commit()
+    return ids
+
+
+async def ann_top_k(session, table, column, query_id, vector, top_k, mode):
+    sql = build_semantic_search_sql(
+        columns="id",
+        from_clause=table,
+        column=column,
+        where="id <> :self_id",
+        mode=mode,
+    )
+    started = time.perf_counter()
+    params = await prepare_vector_search(session, top_k, mode=mode)
+    result = await session.execute(
+        text(sql),
+        {"query_vector": vector, "self_id": query_id, "top_k_vector": top_k, **params},
+    )
+    ids = [row.id for row in result]
+    elapsed = time.perf_counter() - started
+    await session.commit()
+    return ids, elapsed
+
+
+async def index_sizes(session, table: str, column: str) -> Dict[str, int]:
+    schema, relname = table.split(".")
+    result = await session.execute(
+        text(
+            "SELECT indexrelname, pg_relation_size(indexrelid) AS size "
+            "FROM pg_stat_user_indexes "
+            "WHERE schemaname = :schema AND relname = :relname "
+            "AND indexrelname LIKE :pattern ORDER BY indexrelname"
+        ),
+        {"schema": schema, "relname": relname, "pattern": f"%{column}%"},
+    )
+    return {row.indexrelname: row.size for row in result}
+
+
+async def create_indexes(table: str, column: str) -> None:
+    # CONCURRENTLY 不能在事务中执行
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for mode in STORAGE_MODES:
+            name, ddl = hnsw_index(table, column, mode, concurrently=True)
+            started = time.perf_counter()
+            await conn.execute(text(ddl))
+            print(f"索引 {name} 就绪，耗时 {time.perf_counter() - started:.1f} s")
+
+
+async def benchmark(table: str, column: str, samples: int, top_k: int) -> None:
+    async with AsyncSessionLocal() as session:
+        queries = await sample_queries(session, table, column, samples)
+        if not queries:
+            print(f"{table}.{column}: 没有向量数据，跳过")
+            return
+
+        truths = {}
+        for query_id, vector in queries:
+            truths[query_id] = await exact_top_k(
+                session, table, column, query_id, vector, top_k
+            )
+
+        print(f"\n{table}.{column}  ({len(queries)} 个查询, top_k={top_k})")
+        for mode in STORAGE_MODES:
+            recalls = []
+            latencies = []
+            try:
+                for query_id, vector in queries:
+                    ids, elapsed = await ann_top_k(
+                        session, table, column, query_id, vector, top_k, mode
+                    )
+                    recalls.append(recall_at_k(truths[query_id], ids))
+                    latencies.append(elapsed * 1000)
+            except Exception as e:
+                await session.rollback()
+                print(f"  {mode:<10} 失败: {e}")
+                continue
+            print(
+                f"  {mode:<10} recall@{top_k} {statistics.mean(recalls):6.3f}   "
+                f"p50 {percentile(latencies, 0.5):7.2f} ms   "
+                f"p95 {percentile(latencies, 0.95):7.2f} ms"
+            )
+
+        for name, size in (await index_sizes(session, table, column)).items():
+            print(f"  {name:<40} {size / 1024 / 1024:8.2f} MB")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", choices=[t for t, _ in VECTOR_TABLES])
+    parser.add_argument("--column", choices=EMBEDDING_COLUMNS)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--create-indexes", action="store_true")
+    args = parser.parse_args()
+
+    tables = [args.table] if args.table else [t for t, _ in VECTOR_TABLES]
+    columns = [args.column] if args.column else list(EMBEDDING_COLUMNS)
+    for table in tables:
+        for column in columns:
+            if args.create_indexes:
+                await create_indexes(table, column)
+            await benchmark(table, column, args.samples, args.top_k)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
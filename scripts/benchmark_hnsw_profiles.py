@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+HNSW 检索参数基准：在现有的向量表上对比不同 hnsw.ef_search 与迭代扫描设置的
+召回率与延迟，用于确定 VECTOR_SEARCH_PROFILES 中各搜索场景的取值。
+
+从表中随机抽取若干行的向量作为查询（排除自身），以关闭索引扫描的精确检索结果为基准，
+对每组设置计算 recall@k、平均返回行数与查询耗时 p50 / p95。
+对话块表按抽样行的 discord_id 过滤（与对话记忆搜索一致），可以看到不开迭代扫描时
+过滤后返回的行数远少于 top_k 的情况。
+
+修改 M / EF_CONSTRUCTION 后可以加 --rebuild-index 按当前配置重建该列的全精度索引再测。
+
+用法（在项目根目录）:
+    python -m scripts.benchmark_hnsw_profiles [--table conversation.conversation_blocks]
+        [--column qwen_embedding] [--samples 50] [--top-k 10]
+        [--ef-search 40 80 160 320] [--iterative off strict_order relaxed_order]
+        [--mode full] [--rebuild-index]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.benchmark_embedding_storage import (  # noqa: E402
+    percentile,
+    recall_at_k,
+)
+from src.chat.config.chat_config import VECTOR_SEARCH_PROFILES  # noqa: E402
+from src.chat.services.embedding_storage import (  # noqa: E402
+    EMBEDDING_COLUMNS,
+    ITERATIVE_SCAN_MODES,
+    STORAGE_MODES,
+    TABLE_PROFILES,
+    VECTOR_TABLES,
+    apply_hnsw_settings,
+    build_semantic_search_sql,
+    exact_distance_expr,
+    get_search_profile,
+    hnsw_index,
+    rescore_candidates,
+)
+from src.database.database import AsyncSessionLocal  # noqa: E402
+
+# 检索时带过滤条件的表：表 -> 过滤列（与线上查询一致）
+FILTER_COLUMNS = {"conversation.conversation_blocks": "discord_id"}
+
+
+async def sample_queries(session, table: str, column: str, samples: int):
+    filter_column = FILTER_COLUMNS.get(table)
+    filter_select = f", {filter_column} AS filter_value" if filter_column else ""
+    result = await session.execute(
+        text(
+            f"SELECT id, {column} AS vector{filter_select} FROM {table} "
+            f"WHERE {column} IS NOT NULL ORDER BY random() LIMIT :samples"
+        ),
+        {"samples": samples},
+    )
+    return [
+        (row.id, row.vector, getattr(row, "filter_value", None)) for row in result
+    ]
+
+
+def _where(table: str) -> str:
+    filter_column = FILTER_COLUMNS.get(table)
+    where = "id <> :self_id"
+    if filter_column:
+        where += f" AND {filter_column} = :filter_value"
+    return where
+
+
+async def exact_top_k(session, table, column, query, top_k) -> List[int]:
+    query_id, vector, filter_value = query
+    # 关闭索引扫描得到精确结果；SET LOCAL 在事务结束时失效
+    await session.execute(text("SET LOCAL enable_indexscan = off"))
+    result = await session.execute(
+        text(
+            f"SELECT id FROM {table} WHERE {column} IS NOT NULL AND {_where(table)} "
+            f"ORDER BY {exact_distance_expr(column)} LIMIT :top_k"
+        ),
+        {
+            "query_vector": vector,
+            "self_id": query_id,
+            "filter_value": filter_value,
+            "top_k": top_k,
+        },
+    )
+    ids = [row.id for row in result]
+    await session.commit()
+    return ids
+
+
+async def ann_top_k(session, table, column, query, top_k, mode, ef_search, iterative):
+    query_id, vector, filter_value = query
+    sql = build_semantic_search_sql(
+        columns="id", from_clause=table, column=column, where=_where(table), mode=mode
+    )
+    rows = top_k if mode == "full" else rescore_candidates(top_k)
+    settings = {"hnsw.ef_search": str(max(ef_search, rows))}
+    if iterative != "off":
+        settings["hnsw.iterative_scan"] = iterative
+        settings["hnsw.max_scan_tuples"] = str(
+            get_search_profile(TABLE_PROFILES.get(table))["MAX_SCAN_TUPLES"]
+        )
+
+    started = time.perf_counter()
+    await apply_hnsw_settings(session, settings)
+    result = await session.execute(
+        text(sql),
+        {
+            "query_vector": vector,
+            "self_id": query_id,
+            "filter_value": filter_value,
+            "top_k_vector": top_k,
+            "ann_candidates": rows,
+        },
+    )
+    ids = [row.id for row in result]
+    elapsed = time.perf_counter() - started
+    await session.commit()
+    return ids, elapsed
+
+
+async def rebuild_index(table: str, column: str) -> None:
+    name, ddl = hnsw_index(table, column, "full")
+    print(f"重建 {name}: {ddl}")
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as session:
+        await session.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        await session.execute(text(ddl))
+        await session.commit()
+        size = await session.execute(
+            text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": name}
+        )
+        print(
+            f"  耗时 {time.perf_counter() - started:.1f} s，"
+            f"大小 {size.scalar() / 1024 / 1024:.2f} MB"
+        )
+
+
+async def benchmark(
+    table: str,
+    column: str,
+    samples: int,
+    top_k: int,
+    mode: str,
+    ef_values: List[int],
+    iterative_modes: List[str],
+) -> None:
+    async with AsyncSessionLocal() as session:
+        queries = await sample_queries(session, table, column, samples)
+        if not queries:
+            print(f"{table}.{column}: 没有向量数据，跳过")
+            return
+
+        truths = [await exact_top_k(session, table, column, q, top_k) for q in queries]
+        profile = TABLE_PROFILES.get(table)
+        current = get_search_profile(profile)
+        print(
+            f"\n{table}.{column}  ({len(queries)} 个查询, top_k={top_k}, mode={mode}, "
+            f"当前配置 [{profile}]: ef_search={current['EF_SEARCH']}, "
+            f"iterative_scan={current['ITERATIVE_SCAN']})"
+        )
+        print(
+            f"  精确检索平均返回 {statistics.mean(len(t) for t in truths):.1f} 行"
+        )
+
+        for iterative in iterative_modes:
+            for ef_search in ef_values:
+                recalls = []
+                returned = []
+                latencies = []
+                try:
+                    for query, truth in zip(queries, truths):
+                        ids, elapsed = await ann_top_k(
+                            session,
+                            table,
+                            column,
+                            query,
+                            top_k,
+                            mode,
+                            ef_search,
+                            iterative,
+                        )
+                        recalls.append(recall_at_k(truth, ids))
+                        returned.append(len(ids))
+                        latencies.append(elapsed * 1000)
+                except Exception as e:
+                    await session.rollback()
+                    print(f"  {iterative:<14} ef={ef_search:<5} 失败: {e}")
+                    continue
+                print(
+                    f"  {iterative:<14} ef={ef_search:<5} "
+                    f"recall@{top_k} {statistics.mean(recalls):6.3f}   "
+                    f"返回 {statistics.mean(returned):5.1f} 行   "
+                    f"p50 {percentile(latencies, 0.5):7.2f} ms   "
+                    f"p95 {percentile(latencies, 0.95):7.2f} ms"
+                )
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--table", choices=[t for t, _ in VECTOR_TABLES])
+    parser.add_argument("--column", choices=EMBEDDING_COLUMNS)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument(
+        "--ef-search", type=int, nargs="+", default=[20, 40, 80, 160, 320]
+    )
+    parser.add_argument(
+        "--iterative",
+        nargs="+",
+        choices=ITERATIVE_SCAN_MODES,
+        default=["off", "strict_order"],
+    )
+    parser.add_argument("--mode", choices=STORAGE_MODES, default="full")
+    parser.add_argument("--rebuild-index", action="store_true")
+    args = parser.parse_args(argv)
+
+    tables = [args.table] if args.table else [t for t, _ in VECTOR_TABLES]
+    columns = [args.column] if args.column else list(EMBEDDING_COLUMNS)
+    print(f"VECTOR_SEARCH_PROFILES: {VECTOR_SEARCH_PROFILES}")
+    for table in tables:
+        for column in columns:
+            if args.rebuild_index:
+                await rebuild_index(table, column)
+            await benchmark(
+                table,
+                column,
+                args.samples,
+                args.top_k,
+                args.mode,
+                args.ef_search,
+                args.iterative,
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
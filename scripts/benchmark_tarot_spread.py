@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+塔罗牌阵出图微基准：对比旧实现（每次读取原图 + 缩放 + 旋转 + PNG 默认压缩）
+与预渲染图集（纯粘贴 + 快速编码）以及命中 LRU 缓存时的每秒出图数。
+
+用法（在项目根目录）:
+    python -m scripts.benchmark_tarot_spread [--readings 20] [--cards 3]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.chat.config.chat_config import TAROT_CONFIG  # noqa: E402
+from src.chat.features.tarot.services.tarot_service import TarotService  # noqa: E402
+
+
+def legacy_spread(cards) -> bytes:
+    """优化前的出图流程（保留用于对比）"""
+    card_width, card_height = 275, 475
+    padding = 25
+    num_cards = len(cards)
+    background = Image.new(
+        "RGB",
+        (card_width * num_cards + padding * (num_cards + 1), card_height + padding * 2),
+        color="#1E1E1E",
+    )
+    for i, card in enumerate(cards):
+        card_path = os.path.join(TAROT_CONFIG["CARDS_PATH"], card["image_file"])
+        card_img = Image.open(card_path).convert("RGBA")
+        card_img = card_img.resize((card_width, card_height), Image.Resampling.LANCZOS)
+        if card["orientation"] == "reversed":
+            card_img = card_img.rotate(180)
+        background.paste(
+            card_img, (i * card_width + (i + 1) * padding, padding), card_img
+        )
+    buf = io.BytesIO()
+    background.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def run(label: str, func, spreads) -> float:
+    started = time.perf_counter()
+    total_bytes = 0
+    for cards in spreads:
+        total_bytes += len(func(cards))
+    elapsed = time.perf_counter() - started
+    rate = len(spreads) / elapsed
+    print(
+        f"{label:<28} {rate:8.2f} readings/s   "
+        f"{elapsed / len(spreads) * 1000:8.1f} ms/reading   "
+        f"{total_bytes / len(spreads) / 1024:8.0f} KB/image"
+    )
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readings", type=int, default=20)
+    parser.add_argument("--cards", type=int, default=3)
+    args = parser.parse_args()
+
+    service = TarotService()
+    random.seed(0)
+    spreads = [service.draw_cards(args.cards) for _ in range(args.readings)]
+
+    before = run("before (legacy)", legacy_spread, spreads)
+
+    started = time.perf_counter()
+    service.build_atlas()
+    print(f"atlas build (one-off)        {time.perf_counter() - started:8.2f} s")
+
+    TAROT_CONFIG["SPREAD_CACHE_SIZE"] = 0
+    after = {}
+    for image_format in ("PNG", "WEBP"):
+        TAROT_CONFIG["SPREAD_IMAGE_FORMAT"] = image_format
+        after[image_format] = run(
+            f"after (atlas, {image_format})", service._generate_spread_image_sync, spreads
+        )
+
+    TAROT_CONFIG["SPREAD_IMAGE_FORMAT"] = "PNG"
+    TAROT_CONFIG["SPREAD_CACHE_SIZE"] = len(spreads)
+    for cards in spreads:
+        service._generate_spread_image_sync(cards)
+    cached = run("after (LRU hit)", service._generate_spread_image_sync, spreads)
+
+    print(
+        f"\nspeedup: PNG x{after['PNG'] / before:.1f}, "
+        f"WEBP x{after['WEBP'] / before:.1f}, cache hit x{cached / before:.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+向量参数编码基准：对比旧的 str(list) 文本传参与 vector_codec 的二进制传参。
+
+离线部分（不需要数据库）对随机生成的 1024 维 embedding 测量每次查询的客户端编码耗时
+与参数大小：
+- text:   str(list)（旧的查询路径）/ "[" + ",".join(str(x) ...) + "]"（旧的写入路径）
+- binary: to_halfvec(list).to_binary()（asyncpg 编解码器实际发送的字节）
+
+加 --db 时在数据库上对同一批向量执行 SELECT CAST($1 AS halfvec) <=> CAST($1 AS halfvec)，
+分别用未注册编解码器（文本，服务端解析）和注册了编解码器（二进制）的 asyncpg 连接，
+比较往返耗时 p50 / p95。
+
+用法（在项目根目录）:
+    python -m scripts.benchmark_vector_codec [--vectors 2000] [--dim 1024] [--db]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.benchmark_embedding_storage import percentile  # noqa: E402
+from src.database.vector_codec import (  # noqa: E402
+    register_vector_codecs,
+    to_halfvec,
+)
+
+
+def random_embeddings(count: int, dim: int) -> List[List[float]]:
+    rng = random.Random(42)
+    # Ollama 返回的是 JSON 解析出的 Python float，十进制位数与这里相当
+    return [[rng.uniform(-0.1, 0.1) for _ in range(dim)] for _ in range(count)]
+
+
+def measure(label: str, encode: Callable, vectors: List[List[float]]) -> None:
+    started = time.perf_counter()
+    payloads = [encode(vector) for vector in vectors]
+    elapsed = time.perf_counter() - started
+    size = statistics.mean(len(payload) for payload in payloads)
+    print(
+        f"  {label:<28} {elapsed / len(vectors) * 1e6:8.1f} µs/向量   "
+        f"{size / 1024:7.2f} KB/向量"
+    )
+
+
+def offline(vectors: List[List[float]]) -> None:
+    print(f"客户端编码（{len(vectors)} 个 {len(vectors[0])} 维向量）:")
+    measure("text  str(list)", lambda v: str(v).encode(), vectors)
+    measure(
+        "text  join(str(x))",
+        lambda v: ("[" + ",".join(str(x) for x in v) + "]").encode(),
+        vectors,
+    )
+    measure(
+        "binary to_halfvec().to_binary", lambda v: to_halfvec(v).to_binary(), vectors
+    )
+
+
+async def _round_trips(conn, vectors, to_param) -> List[float]:
+    statement = await conn.prepare(
+        "SELECT CAST($1 AS halfvec) <=> CAST($1 AS halfvec)"
+    )
+    latencies = []
+    for vector in vectors:
+        started = time.perf_counter()
+        await statement.fetchval(to_param(vector))
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def database(vectors: List[List[float]]) -> None:
+    import asyncpg
+
+    from src.database.database import DATABASE_URL
+
+    dsn = DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+    print(f"\n数据库往返（{len(vectors)} 次查询）:")
+
+    text_conn = await asyncpg.connect(dsn)
+    binary_conn = await asyncpg.connect(dsn)
+    try:
+        await register_vector_codecs(binary_conn)
+        for label, conn, to_param in (
+            ("text   str(list)", text_conn, str),
+            ("binary to_halfvec", binary_conn, to_halfvec),
+        ):
+            latencies = await _round_trips(conn, vectors, to_param)
+            print(
+                f"  {label:<20} p50 {percentile(latencies, 0.5):7.3f} ms   "
+                f"p95 {percentile(latencies, 0.95):7.3f} ms"
+            )
+    finally:
+        await text_conn.close()
+        await binary_conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--db", action="store_true")
+    args = parser.parse_args()
+
+    vectors = random_embeddings(args.vectors, args.dim)
+    offline(vectors)
+    if args.db:
+        asyncio.run(database(vectors))
+
+
+if __name__ == "__main__":
+    main()
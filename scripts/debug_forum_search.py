@@ -23,6 +23,7 @@ from sqlalchemy import text
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.database.database import AsyncSessionLocal
+from src.database.vector_codec import to_halfvec
 from src.chat.config.chat_config import (
     FORUM_RAG_CONFIG,
     FORUM_RAG_MAX_DISTANCE,
@@ -248,7 +249,7 @@ class ForumSearchDebugger:
             )
 
             params = {
-                "query_vector": str(query_embedding),
+                "query_vector": to_halfvec(query_embedding),
                 "query_text": query,
                 "top_k_vector": self.config["top_k_vector"],
                 "top_k_fts": self.config["top_k_fts"],
@@ -439,7 +440,7 @@ class ForumSearchDebugger:
             )
 
             params: Dict[str, Any] = {
-                "query_vector": str(query_embedding),
+                "query_vector": to_halfvec(query_embedding),
                 "max_distance": self.config["max_distance"],
             }
             conditions = []
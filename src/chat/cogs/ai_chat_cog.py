@@ -10,6 +10,7 @@ import asyncio
 # 导入新的 Service
 from src.chat.services.chat_service import chat_service, ChatResult
 from src.chat.services.message_processor import message_processor
+from src.chat.services.admission_controller import admission_controller
 from src.chat.features.tools.functions.summarize_channel import text_to_summary_image
 
 
@@ -59,48 +60,36 @@ class AIChatCog(commands.Cog):
         if message.author.bot:
             return
 
-        # --- 核心前置检查 ---
-        # 在处理任何逻辑之前，首先检查消息是否应该被 message_processor 忽略
-        # 这会处理置顶帖和禁用频道的情况
-        processed_data = await message_processor.process_message(message, self.bot)
-        if processed_data is None:
-            # 如果返回 None，说明消息来自一个应被忽略的源（如置顶帖），直接退出
+        # 禁止私信回复，只响应服务器中的 @ 消息
+        if message.guild is None:
             return
 
-        # 检查消息是否符合处理条件：只响应服务器中被@的消息，不响应私信
-        is_dm = message.guild is None
+        # --- 文本快速路径 ---
+        # 绝大多数消息没有 @ 机器人，只需要做内容过滤：这里只处理文本，
+        # 不下载表情 / 贴纸 / 附件，也不查询数据库
+        user_content = message_processor.extract_text_content(message, self.bot)
+        keywords = await get_all_keywords()
+        is_flagged, matched = check_content(user_content, keywords)
         is_mentioned = self.bot.user in message.mentions
 
-        # 禁止私信回复，只响应服务器中的 @ 消息
-        if is_dm or not is_mentioned:
-            if not is_dm:
-                # 检查用户输入是否触发文爱检测（即使不是@mention也检测）
-                keywords = await get_all_keywords()
-                is_flagged, matched = check_content(
-                    processed_data["user_content"], keywords
-                )
-                if is_flagged:
-                    asyncio.create_task(
-                        send_developer_alert(
-                            self.bot, message,
-                            processed_data["user_content"], matched, "用户输入"
-                        )
-                    )
+        # 被忽略的频道（禁言频道、置顶帖子、禁用频道）既不回复也不做内容告警；
+        # 频道禁言需要查库，因此只在确实需要时检查
+        if (is_flagged or is_mentioned) and await message_processor.is_ignored_channel(
+            message
+        ):
             return
 
-        # 检查用户输入是否触发文爱检测（@mention消息）
-        keywords = await get_all_keywords()
-        is_flagged, matched = check_content(
-            processed_data["user_content"], keywords
-        )
+        # 检查用户输入是否触发文爱检测（即使不是@mention也检测）
         if is_flagged:
             asyncio.create_task(
                 send_developer_alert(
-                    self.bot, message,
-                    processed_data["user_content"], matched, "用户输入"
+                    self.bot, message, user_content, matched, "用户输入"
                 )
             )
 
+        if not is_mentioned:
+            return
+
         # 检查是否在帖子中，以及帖子创建者是否禁用了回复
         if isinstance(message.channel, discord.Thread):
             # 检查帖子的创建者
@@ -122,20 +111,59 @@ class AIChatCog(commands.Cog):
         if not await chat_service.should_process_message(message):
             return
 
-        # 显示"正在输入"状态，直到AI响应生成完毕
-        chat_result: ChatResult | None = None
-        async with message.channel.typing():
-            # 注意：这里我们将已经处理过的数据传递下去
-            chat_result = await self.handle_chat_message(message, processed_data)
-            # 回复延迟：限制刷屏速度（typing 会持续显示，UX 自然）
-            if chat_result and chat_result.content:
-                reply_delay = await chat_settings_service.get_reply_delay()
-                if reply_delay > 0:
-                    await asyncio.sleep(reply_delay)
+        # --- 准入控制 ---
+        # 全局 / 频道并发上限与排队；被丢弃的请求不会下载任何媒体
+        admission = None
+        if admission_controller.enabled:
+            admission = await admission_controller.acquire(
+                message.channel.id,
+                message.author.id,
+                is_thread=isinstance(message.channel, discord.Thread),
+                message=message,
+            )
+            if not admission.admitted:
+                # 合并到排队中的请求时由其一并回复；
+                # 发起请求被丢弃时，合并进来的消息也一起提示
+                if admission.reason != "coalesced":
+                    for shed_message in (message, *admission.batch):
+                        await self._mark_shed(shed_message)
+                return
+
+        try:
+            # --- 完整路径 ---
+            # 消息确定交给 AI 后，才下载附件、表情、贴纸等图片
+            processed_data = await message_processor.extract_message_data(
+                message, self.bot
+            )
+            if admission is not None and admission.batch:
+                await self._merge_coalesced(processed_data, admission.batch)
+
+            # 显示"正在输入"状态，直到AI响应生成完毕
+            chat_result: ChatResult | None = None
+            async with message.channel.typing():
+                # 注意：这里我们将已经处理过的数据传递下去
+                chat_result = await self.handle_chat_message(message, processed_data)
+                # 生成完毕即归还名额，回复延迟期间不占用频道 / 用户队列
+                if admission is not None:
+                    admission.release()
+                # 回复延迟：限制刷屏速度（typing 会持续显示，UX 自然）
+                if chat_result and chat_result.content:
+                    reply_delay = await chat_settings_service.get_reply_delay()
+                    if reply_delay > 0:
+                        await asyncio.sleep(reply_delay)
+        finally:
+            if admission is not None:
+                admission.release()
 
         # 在退出 typing 状态后发送回复
         if chat_result and chat_result.content:
             response_text = chat_result.content
+            if admission is not None and admission.batch:
+                # 合并回复时提及被合并的用户
+                mentions = " ".join(
+                    dict.fromkeys(m.author.mention for m in admission.batch)
+                )
+                response_text = f"{mentions}\n{response_text}"
 
             # 检查AI输出是否触发文爱检测
             keywords = await get_all_keywords()
@@ -209,6 +237,36 @@ class AIChatCog(commands.Cog):
             except Exception as e:
                 log.error(f"发送回复时发生未知错误: {e}", exc_info=True)
 
+    async def _mark_shed(self, message: discord.Message) -> None:
+        """请求被准入控制丢弃时，给原消息加一个反应提示用户稍后再试。"""
+        reaction = chat_config.ADMISSION_CONTROL_CONFIG["SHED_REACTION"]
+        if not reaction:
+            return
+        try:
+            await message.add_reaction(reaction)
+        except discord.HTTPException as e:
+            log.debug(f"添加丢弃提示反应失败: {e}")
+
+    async def _merge_coalesced(
+        self, processed_data: dict, batch: list[discord.Message]
+    ) -> None:
+        """把排队期间合并进来的其他消息追加到本次请求的内容中。"""
+        for follower in batch:
+            try:
+                follower_data = await message_processor.extract_message_data(
+                    follower, self.bot
+                )
+            except Exception as e:
+                log.warning(f"处理合并消息 {follower.id} 失败，已跳过: {e}")
+                continue
+            processed_data["user_content"] += (
+                f"\n[{follower.author.display_name}]: "
+                f"{follower_data['user_content']}"
+            )
+            processed_data["image_data_list"].extend(
+                follower_data["image_data_list"]
+            )
+
     async def handle_chat_message(
         self, message: discord.Message, processed_data: dict
     ) -> ChatResult | None:
@@ -9,6 +9,7 @@ from src.chat.config import chat_config
 from src.chat.features.chat_settings.services.chat_settings_service import (
     chat_settings_service,
 )
+from src.chat.services.thread_metadata_cache import thread_metadata_cache
 
 log = logging.getLogger(__name__)
 
@@ -58,7 +59,13 @@ class ThreadEventHandlerCog(commands.Cog):
         )
         await asyncio.sleep(delay)
         try:
-            first_message = await anext(thread.history(limit=1, oldest_first=True))
+            metadata = await thread_metadata_cache.get(thread, allow_first_message=True)
+            first_message = metadata.starter_message
+            if first_message is None:
+                log.warning(
+                    f"[CoinCog Dispatch] 等待后仍然无法为帖子 {thread.id} 找到起始消息。"
+                )
+                return
             coin_cog = self.bot.get_cog("CoinCog")
             if coin_cog:
                 # 类型断言：我们知道这个Cog有handle_new_thread_reward方法
@@ -74,10 +81,6 @@ class ThreadEventHandlerCog(commands.Cog):
                     )
             else:
                 log.warning("[CoinCog Dispatch] 找不到 CoinCog 实例，任务取消。")
-        except (discord.NotFound, StopAsyncIteration):
-            log.warning(
-                f"[CoinCog Dispatch] 等待后仍然无法为帖子 {thread.id} 找到起始消息。"
-            )
         except Exception as e:
             log.error(
                 f"[CoinCog Dispatch] 处理帖子 {thread.id} 奖励时发生未知错误: {e}",
@@ -149,6 +152,25 @@ class ThreadEventHandlerCog(commands.Cog):
         asyncio.create_task(self._dispatch_to_coin_cog(thread))
         asyncio.create_task(self._dispatch_to_thread_commentor(thread))
 
+    # --- 帖子元数据缓存失效 ---
+    # 首楼与帖子共用同一个 ID，编辑 / 删除首楼时按消息 ID 失效即可
+
+    @commands.Cog.listener()
+    async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
+        thread_metadata_cache.invalidate(after.id)
+
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent):
+        thread_metadata_cache.invalidate(payload.thread_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        thread_metadata_cache.invalidate(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        thread_metadata_cache.invalidate(payload.message_id)
+
 
 async def setup(bot: commands.Bot):
     """将此Cog添加到机器人中。"""
@@ -6,7 +6,7 @@
 
 import os
 from typing import Literal
-from src.config import _parse_ids, BOT_NAME, CURRENCY_NAME
+from src.config import _parse_ids, BOT_NAME, CURRENCY_NAME, DATA_DIR
 
 # --- Chat 功能总开关 ---
 CHAT_ENABLED = os.getenv("CHAT_ENABLED", "False").lower() == "true"
@@ -19,6 +19,61 @@ CHAT_ENABLED = os.getenv("CHAT_ENABLED", "False").lower() == "true"
 VectorMode = Literal["none", "api", "local"]
 VECTOR_MODE: VectorMode = os.getenv("VECTOR_MODE", "local").lower()  # type: ignore
 
+# --- 向量检索存储模式 ---
+# 第一阶段 ANN 检索使用的向量形式（见 src/chat/services/embedding_storage.py）:
+# - "full": 全精度 HALFVEC HNSW 索引（默认）
+# - "binary": 二值量化表达式索引，取回候选后用全精度距离重排
+# - "truncated": Matryoshka 截断表达式索引，取回候选后用全精度距离重排
+EMBEDDING_STORAGE_CONFIG = {
+    "MODE": os.getenv("EMBEDDING_STORAGE_MODE", "full").lower(),
+    # 截断维度；索引名包含维度，修改后重启时按新维度建索引（旧维度的索引需手动删除）
+    "TRUNCATE_DIM": 256,
+    "RESCORE_MULTIPLIER": 4,  # 量化模式下第一阶段取回 top_k × 倍数 个候选
+    "MIN_RESCORE_CANDIDATES": 40,  # 候选数下限
+}
+
+# --- HNSW 检索参数（按搜索场景）---
+# 各混合搜索在向量检索前以 SET LOCAL 设置这些参数（只在当前事务内生效）:
+# - EF_SEARCH: 检索时的候选队列长度，越大召回越高、越慢；实际值不小于本次需要返回的行数
+# - ITERATIVE_SCAN: "off" / "strict_order" / "relaxed_order"（pgvector >= 0.8.0）。
+#   带过滤条件的查询（如按用户过滤的对话记忆）在 HNSW 返回的行被过滤掉后继续扫描，
+#   避免结果远少于 top_k。全精度模式下 relaxed_order 会按 strict_order 处理（外层没有再排序）
+# - MAX_SCAN_TUPLES: 迭代扫描最多访问的元组数
+# - M / EF_CONSTRUCTION: 建索引参数，用于 embedding 生命周期重建索引和基准脚本的 --rebuild-index；
+#   修改后需要重建索引才生效
+# 取值请用 scripts/benchmark_hnsw_profiles.py 在实际数据上对比召回率与延迟后确定
+VECTOR_SEARCH_PROFILES = {
+    "default": {
+        "EF_SEARCH": 40,
+        "ITERATIVE_SCAN": "off",
+        "MAX_SCAN_TUPLES": 20000,
+        "M": 16,
+        "EF_CONSTRUCTION": 64,
+    },
+    "forum": {"EF_SEARCH": 64},
+    "tutorial": {"EF_SEARCH": 40},
+    "knowledge": {"EF_SEARCH": 64},
+    # 对话块按 discord_id 过滤，单个用户的块在全表中占比很小
+    "conversation": {"EF_SEARCH": 40, "ITERATIVE_SCAN": "strict_order"},
+}
+
+# --- Embedding 生命周期（见 src/chat/services/embedding_lifecycle.py）---
+# 写入只生成当前模型的向量；切换模型后由后台任务分批回填新列，完成后检索再切换过去
+EMBEDDING_LIFECYCLE_CONFIG = {
+    "ENABLED": True,
+    "BATCH_SIZE": 32,  # 每批回填的行数
+    "BATCH_INTERVAL_SECONDS": 2.0,  # 批次之间的间隔，避免占满 Ollama
+    "IDLE_CHECK_INTERVAL_SECONDS": 300,  # 无回填时检查模型设置的间隔
+    # 扫描轮数上限：达到后即使仍有行嵌入失败也切换检索，这些行保持 NULL 并在进度中报告
+    "MAX_PASSES": 3,
+    # 单行批次整批失败时（无法区分嵌入服务故障与该行本身无法嵌入）原地重试的次数上限，
+    # 超过后跳过该行，留给下一轮扫描；多行批次整批失败一律视为服务故障、不推进游标
+    "MAX_BATCH_RETRIES": 5,
+    "DROP_INACTIVE_INDEXES": True,  # 回填完成后删除旧模型列上的 HNSW 索引
+    # 回填完成后清空旧模型列（释放存储，但之后切回该模型需要完整回填）
+    "CLEAR_INACTIVE_COLUMN": False,
+}
+
 # --- 交互禁用配置 ---
 # 在这些频道ID中，所有交互（包括 @mention 和 /命令）都将被完全禁用。
 # 示例: DISABLED_INTERACTION_CHANNEL_IDS = [123456789012345678, 987654321098765432]
@@ -135,6 +190,11 @@ GPT_IMAGE_CONFIG = {
 TAROT_CONFIG = {
     "CARDS_PATH": "src/chat/features/tarot/cards/",  # 存放78张塔罗牌图片的目录路径
     "CARD_FILE_EXTENSION": ".jpg",  # 图片文件的扩展名
+    "CARD_SIZE": (275, 475),  # 牌阵中单张牌的尺寸，启动时按此尺寸预渲染图集
+    "SPREAD_IMAGE_FORMAT": "PNG",  # 牌阵图片编码格式: "PNG" 或 "WEBP"
+    "PNG_COMPRESS_LEVEL": 1,  # PNG 压缩等级 (0-9)，越低编码越快、文件越大
+    "WEBP_QUALITY": 90,
+    "SPREAD_CACHE_SIZE": 64,  # 最近生成的牌阵图片 LRU 缓存条数
 }
 
 # --- 各功能使用的自定义端点模型配置 ---
@@ -201,6 +261,42 @@ WEB_SEARCH_CONFIG = {
     "RATE_LIMIT_WINDOW": int(os.getenv("WEB_SEARCH_RATE_LIMIT_WINDOW", "60")),
 }
 
+# --- 社区搜索工具执行器 (search_executor) ---
+SEARCH_EXECUTOR_CONFIG = {
+    "DISCORD_SEARCH_MAX_CONCURRENCY": 2,  # 同时进行的 Discord 消息搜索请求数
+    "DISCORD_SEARCH_MAX_RETRIES": 2,  # 遇到 429 / 202（索引未就绪）时的重试次数
+    "DISCORD_SEARCH_MAX_RETRY_AFTER": 10.0,  # 单次等待 retry_after 的上限（秒）
+    "RESULT_CACHE_TTL_SECONDS": 60,  # 相同参数的搜索结果复用时间
+    "RESULT_CACHE_MAX_ENTRIES": 256,
+    "SOURCE_TIMEOUT_SECONDS": 20.0,  # 单个数据源的最长等待时间，超时返回错误而不是一直挂起
+    "CHANNEL_PARTIAL_TIMEOUT_SECONDS": 6.0,  # 频道 / 全服搜索中较慢的一路超时后，只返回已完成的结果
+    "COUNTER_FLUSH_INTERVAL_SECONDS": 30.0,  # 论坛搜索次数批量写入间隔
+}
+
+# --- 出站 HTTP 连接池配置 (http_client_registry) ---
+HTTP_CLIENT_CONFIG = {
+    "MAX_CONNECTIONS": int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+    "MAX_CONNECTIONS_PER_HOST": int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20")),
+    "MAX_KEEPALIVE": int(os.getenv("HTTP_MAX_KEEPALIVE", "40")),
+    "KEEPALIVE_EXPIRY": float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+    "TIMEOUT": float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30")),
+    "CONNECT_RETRIES": 1,  # 建连失败时的重试次数
+    "DNS_CACHE_TTL": int(os.getenv("HTTP_DNS_CACHE_TTL", "300")),  # 秒
+    "HTTP2": os.getenv("HTTP2_ENABLED", "True").lower() == "true",  # 需安装 h2
+    "METRICS_LOG_INTERVAL_MINUTES": 60,  # 定期把出站统计写入日志
+}
+
+# --- 图片处理线程池 ---
+# Pillow 的缩放与编码会释放 GIL，放到专用线程池里执行即可避免阻塞事件循环
+IMAGE_PIPELINE_CONFIG = {
+    "MAX_WORKERS": int(os.getenv("IMAGE_PIPELINE_WORKERS", "2")),
+    "MAX_PENDING": int(os.getenv("IMAGE_PIPELINE_MAX_PENDING", "8")),  # 排队+处理中的上限，超出后调用方等待
+    "TIMEOUT_SECONDS": 30.0,  # 单张图片处理的最长时间
+    "ATTACHMENT_MAX_BYTES": 1 * 1024 * 1024,  # 超过此大小的附件图片才压缩
+    "ATTACHMENT_MAX_DIMENSION": 1024,
+    "ATTACHMENT_QUALITY": 75,
+}
+
 # RAG 搜索结果的距离阈值。分数越低越相似。
 # 只有距离小于或等于此值的知识才会被采纳。
 # 注意：bge-m3 模型使用余弦距离，范围是 [0, 2]
@@ -230,6 +326,15 @@ WORLD_BOOK_RAG_CONFIG = {
     "MAX_PARENT_DOCS": 5,  # 世界之书返回更多父文档
 }
 
+# 世界之书 / 知识库检索的语义结果缓存：检索词相同、且查询向量与缓存查询的余弦相似度
+# 达到阈值时直接返回缓存的融合结果
+KNOWLEDGE_RESULT_CACHE_CONFIG = {
+    "ENABLED": True,
+    "SIMILARITY_THRESHOLD": 0.95,  # 过低会把不同成员的提问当作同一个问题
+    "TTL_SECONDS": 600,  # 兜底过期时间；增量 RAG 写入 / 删除条目时会立即失效
+    "MAX_ENTRIES": 256,
+}
+
 # --- Forum 搜索 RAG 配置 ---
 FORUM_RAG_CONFIG = {
     "TOP_K_VECTOR": 20,  # 向量搜索返回的初始结果数量
@@ -301,6 +406,26 @@ BLACKLIST_BAN_DURATION_MINUTES = (15, 30)
 # --- API 并发与密钥配置 ---
 MAX_CONCURRENT_REQUESTS = 50  # 同时处理的最大API请求数
 
+# --- AI 回复准入控制 (admission_controller) ---
+# 全局并发上限为 MAX_CONCURRENT_REQUESTS；帖子内的请求优先获得名额
+ADMISSION_CONTROL_CONFIG = {
+    "ENABLED": os.getenv("ADMISSION_CONTROL_ENABLED", "True").lower() == "true",
+    "PER_CHANNEL_CONCURRENCY": 4,  # 同一频道同时生成的回复数
+    "PER_USER_CONCURRENCY": 1,  # 同一用户同时生成的回复数，其余按顺序排队
+    "PER_USER_MAX_PENDING": 3,  # 同一用户排队 + 处理中的请求上限，超出直接丢弃
+    "MAX_CHANNEL_QUEUE": 20,  # 单个频道的排队上限
+    "MAX_GLOBAL_QUEUE": 200,  # 全局排队上限
+    "MAX_QUEUE_WAIT_SECONDS": 120.0,  # 排队超过此时间则放弃
+    # 频道队列已满时的策略: "reject_new" 拒绝新请求 / "drop_oldest" 丢弃最早排队的请求
+    "SHED_POLICY": "reject_new",
+    "THREAD_PRIORITY": True,  # 帖子内的请求优先于普通频道
+    # 同一频道排队期间到达的新请求合并到正在排队的请求中，一次回复所有人
+    "COALESCE_ENABLED": os.getenv("ADMISSION_COALESCE_ENABLED", "False").lower()
+    == "true",
+    "COALESCE_MAX_BATCH": 5,  # 一次合并回复最多包含的消息数（含发起者）
+    "SHED_REACTION": "⏳",  # 请求被丢弃时给原消息添加的反应，留空则不添加
+}
+
 # --- API 密钥重试与轮换配置 ---
 API_RETRY_CONFIG = {
     "MAX_ATTEMPTS_PER_KEY": 1,  # 单个密钥在因可重试错误而被轮换前，允许的最大尝试次数
@@ -369,6 +494,54 @@ COIN_CONFIG = {
     "LOAN_THUMBNAIL_URL": "https://cdn.discordapp.com/attachments/1403347767912562728/1429130259541917716/3_229109312468835_00001_.png",  # 借贷中心缩略图URL
 }
 
+# --- 商店目录缓存 ---
+# 商品目录在内存中保存快照，由 add_item_to_shop 等写操作主动失效；TTL 只是兜底（防止有人直接改库）
+SHOP_CACHE_CONFIG = {
+    "CATALOG_TTL_SECONDS": 600,
+    "GUIDANCE_URL_TTL_SECONDS": 600,  # 商店公告中 {guidance_url} 的缓存时间
+}
+
+# --- 排行榜内存物化视图 ---
+# 余额、卖屁股次数和阵营积分变化时增量更新；未挂钩的写入路径由定时对账（整表重新载入）修正
+LEADERBOARD_CONFIG = {
+    "RECONCILE_INTERVAL_SECONDS": 300,
+}
+
+# --- 每条消息的用户状态写回缓冲 (user_state_aggregator) ---
+# 好感度、每日首聊奖励、对话历史和模型使用计数先在内存中按用户合并，
+# 定时或积累到阈值后在一个事务中写入；每次变更先追加到本地 WAL 文件，崩溃后重放（至少一次）
+USER_STATE_AGGREGATOR_CONFIG = {
+    "ENABLED": os.getenv("USER_STATE_WRITE_BEHIND", "True").lower() == "true",
+    "FLUSH_INTERVAL_SECONDS": float(os.getenv("USER_STATE_FLUSH_INTERVAL", "2")),
+    "FLUSH_THRESHOLD": 500,  # 缓冲中的变更条数达到此值时立即写入
+    "WAL_DIR": os.path.join(DATA_DIR, "user_state_wal"),
+    "WAL_FSYNC": False,  # True 时每条变更都 fsync（可抵御断电，代价是每条消息一次磁盘同步）
+}
+
+# --- AI 调用用量记录 ---
+# 每次 AI 生成调用的 token / 延迟 / 重试信息先写入内存，再批量写入 ai_call_usage 表
+USAGE_RECORDER_CONFIG = {
+    "ENABLED": os.getenv("AI_USAGE_RECORDER_ENABLED", "True").lower() == "true",
+    "FLUSH_INTERVAL_SECONDS": 10.0,
+    "FLUSH_THRESHOLD": 200,  # 缓冲中的记录达到此值时立即写入
+    "MAX_BUFFERED_RECORDS": 5000,  # 数据库不可用时最多保留的记录数，超出丢弃最旧的
+}
+
+# --- 提示词前缀稳定性监控 ---
+# 缓存优化构建时，按 (用户, 频道) 比较相邻两轮提示词各层的指纹，统计缓存从哪一层开始失效
+PROMPT_PREFIX_MONITOR_CONFIG = {
+    "ENABLED": os.getenv("PROMPT_PREFIX_MONITOR_ENABLED", "True").lower() == "true",
+    "MAX_TRACKED_CONVERSATIONS": 5000,  # 最多保留多少个 (用户, 频道) 的上一轮指纹
+}
+
+# --- 帖子元数据缓存 ---
+# 首楼内容、标题、标签与发帖人昵称，供提示词构建、论坛索引、暖贴和发帖奖励共用
+THREAD_METADATA_CACHE_CONFIG = {
+    "ENABLED": True,
+    "TTL_SECONDS": 1800,  # 兜底过期时间；帖子更新与首楼编辑会立即失效
+    "MAX_ENTRIES": 2000,
+}
+
 # --- 个人记忆功能 ---
 PERSONAL_MEMORY_CONFIG = {
     "summary_threshold": 20,  # 触发总结的消息数量阈值 (测试用 5, 原为 50)
@@ -474,6 +647,14 @@ FORUM_POLL_CONCURRENCY = 20
 # 是否启用失效帖子清理（可用于调试或临时禁用）
 FORUM_CLEANUP_ENABLED = os.getenv("FORUM_CLEANUP_ENABLED", "true").lower() == "true"
 
+# --- 论坛帖子目录配置 (forum.thread_directory) ---
+# 目录由帖子事件实时维护，定期对账用于补齐机器人离线期间错过的事件
+FORUM_THREAD_DIRECTORY_CONFIG = {
+    "INCREMENTAL_SYNC_INTERVAL_MINUTES": 60,  # 增量对账间隔
+    "INCREMENTAL_SYNC_OVERLAP_MINUTES": 10,  # 增量对账水位线的回看余量
+    "FULL_SYNC_INTERVAL_DAYS": 7,  # 全量对账间隔（用于发现离线期间被删除的帖子）
+}
+
 # --- 论坛帖子 ChromeDB 迁移配置 ---
 # 用于数据迁移脚本，迁移完成后可删除
 FORUM_VECTOR_DB_PATH = "data/forum_chroma_db"
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+管理面板通用的异步键集（keyset）分页器。
+
+- 只查询显式列出的列（可以是 `bge_embedding IS NOT NULL AS has_bge` 这类表达式），
+  避免把 1024 维的向量列整行拉回内存
+- 顺序翻页使用 `WHERE (k1, k2) < (:k1, :k2)`，不再随页码增长扫描 OFFSET 之前的所有行
+- 跳页时只在排序键上做一次 OFFSET 定位，拿到边界后仍按键集读取整页
+- COUNT(*) 结果按 (表, 条件, 参数) 缓存若干秒，多个视图实例共享
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from src.database.database import AsyncSessionLocal
+
+log = logging.getLogger(__name__)
+
+# COUNT / 聚合结果缓存时间（秒）
+COUNT_CACHE_TTL_SECONDS = 30.0
+
+_aggregate_cache: Dict[Tuple[Any, ...], Tuple[float, Dict[str, Any]]] = {}
+
+
+def _cache_key(sql: str, params: Optional[Mapping[str, Any]]) -> Tuple[Any, ...]:
+    return (sql, tuple(sorted((params or {}).items())))
+
+
+async def cached_aggregate(
+    sql: str,
+    params: Optional[Mapping[str, Any]] = None,
+    ttl: float = COUNT_CACHE_TTL_SECONDS,
+    session_factory=AsyncSessionLocal,
+) -> Dict[str, Any]:
+    """执行返回单行的聚合查询，并在 ttl 秒内复用结果"""
+    key = _cache_key(sql, params)
+    cached = _aggregate_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] > now:
+        return cached[1]
+
+    async with session_factory() as session:
+        result = await session.execute(text(sql), dict(params or {}))
+        row = result.mappings().first()
+    value = dict(row) if row else {}
+    _aggregate_cache[key] = (now + ttl, value)
+    return value
+
+
+def invalidate_aggregates(table: Optional[str] = None) -> None:
+    """清空聚合缓存；指定表名时只清除涉及该表的条目"""
+    if table is None:
+        _aggregate_cache.clear()
+        return
+    for key in [k for k in _aggregate_cache if table in k[0]]:
+        _aggregate_cache.pop(key, None)
+
+
+async def fetch_row(
+    table: str,
+    columns: Sequence[str],
+    pk_value: Any,
+    pk: str = "id",
+    session_factory=AsyncSessionLocal,
+) -> Optional[Dict[str, Any]]:
+    """按主键读取单行（同样只取指定列）"""
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE {pk} = :pk"
+    async with session_factory() as session:
+        result = await session.execute(text(sql), {"pk": pk_value})
+        row = result.mappings().first()
+    return dict(row) if row else None
+
+
+class KeysetPaginator:
+    """
+    基于排序键的分页器。
+
+    Args:
+        table: 表名（含 schema）
+        columns: 列表页需要的列或表达式，必须包含全部排序键
+        order_by: 排序键，例如 ("start_time", "id")；最后一个应当唯一
+        where: 可选的过滤条件（使用 :name 占位符）
+        params: 过滤条件的参数
+        page_size: 每页条数
+        descending: 是否倒序（所有排序键同向）
+    """
+
+    def __init__(
+        self,
+        table: str,
+        columns: Sequence[str],
+        order_by: Sequence[str],
+        where: str = "",
+        params: Optional[Mapping[str, Any]] = None,
+        page_size: int = 10,
+        descending: bool = True,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.table = table
+        self.columns = list(columns)
+        self.order_by = list(order_by)
+        self.where = where
+        self.params = dict(params or {})
+        self.page_size = page_size
+        self.descending = descending
+        self._session_factory = session_factory
+        # 页码 -> 该页最后一行的排序键
+        self._boundaries: Dict[int, Tuple[Any, ...]] = {}
+        self.total_count: int = 0
+
+    @property
+    def total_pages(self) -> int:
+        return max(1, (self.total_count + self.page_size - 1) // self.page_size)
+
+    def _where_sql(self, after_key: bool) -> str:
+        clauses = [f"({self.where})"] if self.where else []
+        if after_key:
+            keys = ", ".join(self.order_by)
+            marks = ", ".join(f":_k{i}" for i in range(len(self.order_by)))
+            op = "<" if self.descending else ">"
+            clauses.append(f"({keys}) {op} ({marks})")
+        return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    def _order_sql(self) -> str:
+        direction = "DESC" if self.descending else "ASC"
+        return " ORDER BY " + ", ".join(f"{k} {direction}" for k in self.order_by)
+
+    def _bind(self, key: Optional[Tuple[Any, ...]]) -> Dict[str, Any]:
+        params = dict(self.params)
+        if key is not None:
+            params.update({f"_k{i}": v for i, v in enumerate(key)})
+        return params
+
+    async def count(self, refresh: bool = False) -> int:
+        """带缓存的总行数"""
+        sql = f"SELECT COUNT(*) AS count FROM {self.table}{self._where_sql(False)}"
+        if refresh:
+            _aggregate_cache.pop(_cache_key(sql, self.params), None)
+        row = await cached_aggregate(
+            sql, self.params, session_factory=self._session_factory
+        )
+        self.total_count = int(row.get("count") or 0)
+        return self.total_count
+
+    def invalidate(self) -> None:
+        """数据被修改后调用：丢弃页边界和该表的 COUNT 缓存"""
+        self._boundaries.clear()
+        invalidate_aggregates(self.table)
+
+    async def _seek_boundary(self, page: int) -> Optional[Tuple[Any, ...]]:
+        """找到第 page 页之前最后一行的排序键（page >= 1）"""
+        if page - 1 in self._boundaries:
+            return self._boundaries[page - 1]
+
+        # 从最近的已知边界出发，只在排序键上做 OFFSET
+        known = [p for p in self._boundaries if p < page - 1]
+        start_page = max(known) if known else None
+        start_key = self._boundaries[start_page] if start_page is not None else None
+        skipped_pages = page - 1 - (start_page if start_page is not None else -1)
+        offset = skipped_pages * self.page_size - 1
+
+        sql = (
+            f"SELECT {', '.join(self.order_by)} FROM {self.table}"
+            f"{self._where_sql(start_key is not None)}{self._order_sql()}"
+            f" LIMIT 1 OFFSET {int(offset)}"
+        )
+        async with self._session_factory() as session:
+            result = await session.execute(text(sql), self._bind(start_key))
+            row = result.first()
+        if row is None:
+            return None
+        key = tuple(row)
+        self._boundaries[page - 1] = key
+        return key
+
+    async def get_page(self, page: int) -> List[Dict[str, Any]]:
+        """读取第 page 页（从 0 开始）"""
+        key = None
+        if page > 0:
+            key = await self._seek_boundary(page)
+            if key is None:
+                return []
+
+        sql = (
+            f"SELECT {', '.join(self.columns)} FROM {self.table}"
+            f"{self._where_sql(key is not None)}{self._order_sql()}"
+            f" LIMIT {int(self.page_size)}"
+        )
+        async with self._session_factory() as session:
+            result = await session.execute(text(sql), self._bind(key))
+            rows = [dict(r) for r in result.mappings().all()]
+
+        if rows:
+            self._boundaries[page] = tuple(rows[-1][k] for k in self.order_by)
+        return rows
@@ -10,6 +10,7 @@ from sqlalchemy.orm import sessionmaker
 
 from src import config
 from src.chat.features.admin_panel.services import db_services
+from src.chat.features.admin_panel.services.keyset_paginator import KeysetPaginator
 from src.chat.features.admin_panel.ui.modals.utility_modals import JumpToPageModal
 from src.chat.features.world_book.services.incremental_rag_service import (
     incremental_rag_service,
@@ -53,6 +54,8 @@ class BaseTableView(discord.ui.View):
         self.current_list_items: List[Any] = []  # 改为 Any 以兼容不同数据库行类型
         self.search_mode: bool = False
         self.search_keyword: Optional[str] = None
+        # 使用服务端键集分页的子类会设置此项（见 keyset_paginator）
+        self.paginator: Optional[KeysetPaginator] = None
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.author_id:
@@ -287,6 +290,9 @@ class BaseTableView(discord.ui.View):
                         )
                         # 注意：即使向量删除失败，主记录也已删除，这里只记录错误。
 
+                    if self.paginator:
+                        self.paginator.invalidate()
+
                     await interaction.response.edit_message(
                         content=f"🗑️ 记录 `#{item_id}` 已被成功删除。", view=None
                     )
@@ -7,6 +7,10 @@ from typing import Any, Mapping, Optional
 import discord
 
 from src.chat.features.admin_panel.services import db_services
+from src.chat.features.admin_panel.services.keyset_paginator import (
+    KeysetPaginator,
+    cached_aggregate,
+)
 from src.chat.features.admin_panel.services.profile_formatter import (
     format_member_profile,
 )
@@ -36,6 +40,13 @@ class CommunityMembersView(BaseTableView):
         super().__init__(author_id, message, parent_view)
         self.current_table = "community.member_profiles"
         self.db_type = "parade"
+        # 列表只取标题相关的列，不取 full_text / source_metadata / history 等大字段
+        self.paginator = KeysetPaginator(
+            "community.member_profiles",
+            ["id", "title", "discord_id"],
+            ["id"],
+            page_size=self.items_per_page,
+        )
 
     def _get_entry_title(self, entry: Mapping[str, Any]) -> str:
         try:
@@ -406,86 +417,63 @@ class CommunityMembersView(BaseTableView):
                 conn.close()
 
     async def _build_list_embed(self) -> discord.Embed:
-        conn = self._get_db_connection()
-        if not conn:
-            return discord.Embed(title="错误", description="数据库连接失败。")
-
-        try:
-            cursor = db_services.get_cursor(conn)
-            if self.search_mode:
-                start_idx = self.current_page * self.items_per_page
-                end_idx = start_idx + self.items_per_page
-                page_items = self.current_list_items[start_idx:end_idx]
-                embed = discord.Embed(
-                    title=f"搜索社区成员 (关键词: '{self.search_keyword}')",
-                    color=discord.Color.gold(),
-                )
-            else:
-                cursor.execute("SELECT COUNT(*) FROM community.member_profiles")
-                count_result = cursor.fetchone()
-                total_rows = count_result["count"] if count_result else 0
-
-                # 查询 member_chunks 表的 embedding 统计
-                cursor.execute("SELECT COUNT(*) FROM community.member_chunks")
-                chunks_result = cursor.fetchone()
-                total_chunks = chunks_result["count"] if chunks_result else 0
-
-                cursor.execute(
-                    "SELECT COUNT(*) FROM community.member_chunks WHERE bge_embedding IS NOT NULL"
-                )
-                bge_result = cursor.fetchone()
-                bge_count = bge_result["count"] if bge_result else 0
-
-                cursor.execute(
-                    "SELECT COUNT(*) FROM community.member_chunks WHERE qwen_embedding IS NOT NULL"
-                )
-                qwen_result = cursor.fetchone()
-                qwen_count = qwen_result["count"] if qwen_result else 0
-
-                self.total_pages = (
-                    total_rows + self.items_per_page - 1
-                ) // self.items_per_page
-                offset = self.current_page * self.items_per_page
-                cursor.execute(
-                    "SELECT * FROM community.member_profiles ORDER BY id DESC LIMIT %s OFFSET %s",
-                    (self.items_per_page, offset),
-                )
-                page_items = cursor.fetchall()
-                self.current_list_items = page_items
-                embed = discord.Embed(
-                    title="浏览：社区成员档案", color=discord.Color.green()
+        if self.search_mode:
+            start_idx = self.current_page * self.items_per_page
+            end_idx = start_idx + self.items_per_page
+            page_items = self.current_list_items[start_idx:end_idx]
+            embed = discord.Embed(
+                title=f"搜索社区成员 (关键词: '{self.search_keyword}')",
+                color=discord.Color.gold(),
+            )
+        else:
+            try:
+                await self.paginator.count()
+                self.total_pages = self.paginator.total_pages
+                page_items = await self.paginator.get_page(self.current_page)
+
+                # member_chunks 表的 embedding 统计（一次聚合，短时缓存）
+                chunk_stats = await cached_aggregate(
+                    "SELECT COUNT(*) AS total, COUNT(bge_embedding) AS bge, "
+                    "COUNT(qwen_embedding) AS qwen FROM community.member_chunks"
                 )
+            except Exception as e:
+                log.error(f"加载社区成员列表失败: {e}", exc_info=True)
+                return discord.Embed(title="错误", description="数据库连接失败。")
 
-                # 添加 embedding 统计信息
-                embed.add_field(
-                    name="📊 Embedding 统计 (Chunks)",
-                    value=f"🟢 BGE: {bge_count}/{total_chunks} | 🔵 Qwen: {qwen_count}/{total_chunks}",
-                    inline=False,
-                )
+            self.current_list_items = page_items
+            embed = discord.Embed(
+                title="浏览：社区成员档案", color=discord.Color.green()
+            )
 
-            if not page_items:
-                embed.description = "没有找到任何社区成员档案。"
-            else:
-                list_text = "\n".join(
-                    [
-                        f"**`#{item['id']}`** - {self._get_entry_title(dict(item))}"
-                        for item in page_items
-                    ]
-                )
-                embed.description = list_text
+            total_chunks = chunk_stats.get("total") or 0
+            bge_count = chunk_stats.get("bge") or 0
+            qwen_count = chunk_stats.get("qwen") or 0
 
-            total_display = (
-                f"(共 {len(self.current_list_items)} 条结果)"
-                if self.search_mode
-                else ""
+            # 添加 embedding 统计信息
+            embed.add_field(
+                name="📊 Embedding 统计 (Chunks)",
+                value=f"🟢 BGE: {bge_count}/{total_chunks} | 🔵 Qwen: {qwen_count}/{total_chunks}",
+                inline=False,
             )
-            embed.set_footer(
-                text=f"第 {self.current_page + 1} / {self.total_pages or 1} 页 {total_display}"
+
+        if not page_items:
+            embed.description = "没有找到任何社区成员档案。"
+        else:
+            list_text = "\n".join(
+                [
+                    f"**`#{item['id']}`** - {self._get_entry_title(dict(item))}"
+                    for item in page_items
+                ]
             )
-            return embed
-        finally:
-            if conn:
-                conn.close()
+            embed.description = list_text
+
+        total_display = (
+            f"(共 {len(self.current_list_items)} 条结果)" if self.search_mode else ""
+        )
+        embed.set_footer(
+            text=f"第 {self.current_page + 1} / {self.total_pages or 1} 页 {total_display}"
+        )
+        return embed
 
     async def _build_detail_embed(self) -> discord.Embed:
         if not self.current_item_id:
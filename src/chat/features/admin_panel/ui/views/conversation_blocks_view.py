@@ -13,6 +13,10 @@ from typing import Any, Mapping, Optional, List
 import discord
 
 from src.chat.features.admin_panel.services import db_services
+from src.chat.features.admin_panel.services.keyset_paginator import (
+    KeysetPaginator,
+    fetch_row,
+)
 from src.chat.features.admin_panel.ui.views.base_view import BaseTableView
 from src.chat.features.personal_memory.services.conversation_block_service import (
     format_time_description,
@@ -20,6 +24,25 @@ from src.chat.features.personal_memory.services.conversation_block_service impor
 
 log = logging.getLogger(__name__)
 
+BLOCKS_TABLE = "conversation.conversation_blocks"
+
+# 列表只需要标题和向量状态，不取出向量列本身
+BLOCK_LIST_COLUMNS = [
+    "id",
+    "discord_id",
+    "start_time",
+    "message_count",
+    "bge_embedding IS NOT NULL AS has_bge",
+    "qwen_embedding IS NOT NULL AS has_qwen",
+]
+BLOCK_DETAIL_COLUMNS = BLOCK_LIST_COLUMNS + [
+    "end_time",
+    "conversation_text",
+    "created_at",
+    "updated_at",
+]
+BLOCK_ORDER_BY = ("start_time", "id")
+
 
 # --- 用户级别对话块管理视图 ---
 
@@ -44,9 +67,18 @@ class UserConversationBlocksView(discord.ui.View):
         self.current_page = 0
         self.items_per_page = 5
         self.total_pages = 1
-        self.current_list_items: List[Any] = []
+        self.total_items = 0
+        self.current_list_items: List[Any] = []  # 仅当前页
         self.current_item_id: Optional[str] = None
         self.view_mode = "list"  # "list" or "detail"
+        self.paginator = KeysetPaginator(
+            BLOCKS_TABLE,
+            BLOCK_LIST_COLUMNS,
+            BLOCK_ORDER_BY,
+            where="discord_id = :discord_id",
+            params={"discord_id": user_id},
+            page_size=self.items_per_page,
+        )
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.author_id:
@@ -61,27 +93,18 @@ class UserConversationBlocksView(discord.ui.View):
         await self._load_user_blocks()
         self._initialize_components()
 
-    async def _load_user_blocks(self):
-        """加载该用户的对话块"""
-        conn = self._get_db_connection()
-        if not conn:
-            return
+    async def _load_user_blocks(self, refresh: bool = False):
+        """加载该用户对话块的总数与当前页"""
+        if refresh:
+            self.paginator.invalidate()
+        self.total_items = await self.paginator.count()
+        self.total_pages = self.paginator.total_pages
+        self.current_page = min(self.current_page, self.total_pages - 1)
+        self.current_list_items = await self.paginator.get_page(self.current_page)
 
-        try:
-            cursor = db_services.get_cursor(conn)
-            cursor.execute(
-                "SELECT * FROM conversation.conversation_blocks WHERE discord_id = %s ORDER BY start_time DESC",
-                (self.user_id,),
-            )
-            self.current_list_items = cursor.fetchall()
-            self.total_pages = max(
-                1,
-                (len(self.current_list_items) + self.items_per_page - 1)
-                // self.items_per_page,
-            )
-        finally:
-            if conn:
-                conn.close()
+    async def _fetch_block(self, item_id: str) -> Optional[Any]:
+        """按 ID 读取对话块详情（不含向量列）"""
+        return await fetch_row(BLOCKS_TABLE, BLOCK_DETAIL_COLUMNS, int(item_id))
 
     def _get_db_connection(self):
         """获取数据库连接"""
@@ -135,17 +158,13 @@ class UserConversationBlocksView(discord.ui.View):
         if not self.current_list_items:
             embed.description = f"用户 ID: `{self.user_id}`\n\n该用户暂无对话块记录。"
         else:
-            start_idx = self.current_page * self.items_per_page
-            end_idx = start_idx + self.items_per_page
-            page_items = self.current_list_items[start_idx:end_idx]
-
             list_text = []
-            for item in page_items:
+            for item in self.current_list_items:
                 title = self._get_entry_title(dict(item))
                 item_id = item.get("id")
                 # 向量状态
-                bge_status = "🟢" if item.get("bge_embedding") else "⚫"
-                qwen_status = "🔵" if item.get("qwen_embedding") else "⚫"
+                bge_status = "🟢" if item.get("has_bge") else "⚫"
+                qwen_status = "🔵" if item.get("has_qwen") else "⚫"
                 list_text.append(
                     f"**`#{item_id}`** - {title} {bge_status}{qwen_status}"
                 )
@@ -153,7 +172,7 @@ class UserConversationBlocksView(discord.ui.View):
             embed.description = f"用户 ID: `{self.user_id}`\n\n" + "\n".join(list_text)
 
         embed.set_footer(
-            text=f"第 {self.current_page + 1} / {self.total_pages} 页 | 共 {len(self.current_list_items)} 个对话块"
+            text=f"第 {self.current_page + 1} / {self.total_pages} 页 | 共 {self.total_items} 个对话块"
         )
         return embed
 
@@ -162,7 +181,7 @@ class UserConversationBlocksView(discord.ui.View):
         if not self.current_item_id:
             return await self._build_list_embed()
 
-        current_item = self._get_item_by_id(self.current_item_id)
+        current_item = await self._fetch_block(self.current_item_id)
         if not current_item:
             self.view_mode = "list"
             return await self._build_list_embed()
@@ -187,8 +206,8 @@ class UserConversationBlocksView(discord.ui.View):
         )
 
         # 向量嵌入状态
-        bge_status = "✅ 已生成" if current_item.get("bge_embedding") else "❌ 未生成"
-        qwen_status = "✅ 已生成" if current_item.get("qwen_embedding") else "❌ 未生成"
+        bge_status = "✅ 已生成" if current_item.get("has_bge") else "❌ 未生成"
+        qwen_status = "✅ 已生成" if current_item.get("has_qwen") else "❌ 未生成"
         embed.add_field(
             name="🧠 向量嵌入",
             value=f"🟢 BGE: {bge_status}\n🔵 Qwen: {qwen_status}",
@@ -210,13 +229,6 @@ class UserConversationBlocksView(discord.ui.View):
 
         return embed
 
-    def _get_item_by_id(self, item_id: str) -> Optional[Any]:
-        """根据 ID 获取对话块"""
-        for item in self.current_list_items:
-            if str(item.get("id")) == str(item_id):
-                return item
-        return None
-
     def _initialize_components(self):
         """初始化 UI 组件"""
         self.clear_items()
@@ -298,11 +310,7 @@ class UserConversationBlocksView(discord.ui.View):
     def _create_block_select(self) -> discord.ui.Select:
         """创建对话块选择下拉菜单"""
         options = []
-        start_idx = self.current_page * self.items_per_page
-        end_idx = start_idx + self.items_per_page
-        page_items = self.current_list_items[start_idx:end_idx]
-
-        for item in page_items:
+        for item in self.current_list_items:
             item_id = item.get("id")
             title = self._get_entry_title(dict(item))
             # 截断过长的标题
@@ -327,6 +335,7 @@ class UserConversationBlocksView(discord.ui.View):
         await interaction.response.defer()
         if self.current_page > 0:
             self.current_page -= 1
+            self.current_list_items = await self.paginator.get_page(self.current_page)
             self._initialize_components()
             await self.update_view()
 
@@ -335,6 +344,7 @@ class UserConversationBlocksView(discord.ui.View):
         await interaction.response.defer()
         if self.current_page < self.total_pages - 1:
             self.current_page += 1
+            self.current_list_items = await self.paginator.get_page(self.current_page)
             self._initialize_components()
             await self.update_view()
 
@@ -359,7 +369,7 @@ class UserConversationBlocksView(discord.ui.View):
         if not self.current_item_id:
             return
 
-        current_item = self._get_item_by_id(self.current_item_id)
+        current_item = await self._fetch_block(self.current_item_id)
         if not current_item:
             await interaction.response.send_message("找不到该对话块。", ephemeral=True)
             return
@@ -412,10 +422,10 @@ class UserConversationBlocksView(discord.ui.View):
                         conn.close()
 
                 # 返回列表视图
-                await self._load_user_blocks()
                 self.view_mode = "list"
                 self.current_item_id = None
                 self.current_page = 0
+                await self._load_user_blocks(refresh=True)
                 self._initialize_components()
                 await self.update_view()
 
@@ -445,7 +455,7 @@ class UserConversationBlocksView(discord.ui.View):
 
     async def confirm_delete_all(self, interaction: discord.Interaction):
         """确认删除该用户所有对话块"""
-        block_count = len(self.current_list_items)
+        block_count = self.total_items
         if block_count == 0:
             await interaction.response.send_message(
                 "该用户没有对话块可删除。", ephemeral=True
@@ -481,9 +491,9 @@ class UserConversationBlocksView(discord.ui.View):
                         conn.close()
 
                 # 返回列表视图
-                await self._load_user_blocks()
                 self.view_mode = "list"
                 self.current_page = 0
+                await self._load_user_blocks(refresh=True)
                 self._initialize_components()
                 await self.update_view()
 
@@ -535,9 +545,15 @@ class ConversationBlocksView(BaseTableView):
         self, author_id: int, message: discord.Message, parent_view: discord.ui.View
     ):
         super().__init__(author_id, message, parent_view)
-        self.current_table = "conversation.conversation_blocks"
+        self.current_table = BLOCKS_TABLE
         self.db_type = "parade"
         self.items_per_page = 8  # 对话块内容较长，减少每页数量
+        self.paginator = KeysetPaginator(
+            BLOCKS_TABLE,
+            BLOCK_LIST_COLUMNS,
+            BLOCK_ORDER_BY,
+            page_size=self.items_per_page,
+        )
 
     def _get_entry_title(self, entry: Mapping[str, Any]) -> str:
         """获取对话块的标题显示"""
@@ -736,7 +752,7 @@ class ConversationBlocksView(BaseTableView):
         if not self.current_item_id:
             return
 
-        current_item = self._get_item_by_id(self.current_item_id)
+        current_item = await self._fetch_block(self.current_item_id)
         if not current_item:
             await interaction.response.send_message("找不到该对话块。", ephemeral=True)
             return
@@ -760,7 +776,7 @@ class ConversationBlocksView(BaseTableView):
         if not self.current_item_id:
             return
 
-        current_item = self._get_item_by_id(self.current_item_id)
+        current_item = await self._fetch_block(self.current_item_id)
         if not current_item:
             await interaction.response.send_message("找不到该对话块。", ephemeral=True)
             return
@@ -817,6 +833,7 @@ class ConversationBlocksView(BaseTableView):
                         conn.close()
 
                 # 返回列表视图
+                self.paginator.invalidate()
                 self.view_mode = "list"
                 await self.update_view()
 
@@ -851,100 +868,70 @@ class ConversationBlocksView(BaseTableView):
             ephemeral=True,
         )
 
-    def _get_item_by_id(self, item_id: str) -> Optional[Any]:
-        """根据 ID 获取对话块"""
-        conn = self._get_db_connection()
-        if not conn:
-            return None
-        try:
-            cursor = db_services.get_cursor(conn)
-            cursor.execute(
-                "SELECT * FROM conversation.conversation_blocks WHERE id = %s",
-                (item_id,),
-            )
-            return cursor.fetchone()
-        finally:
-            if conn:
-                conn.close()
+    async def _fetch_block(self, item_id: str) -> Optional[Any]:
+        """按 ID 读取对话块详情（不含向量列）"""
+        return await fetch_row(BLOCKS_TABLE, BLOCK_DETAIL_COLUMNS, int(item_id))
 
     async def _build_list_embed(self) -> discord.Embed:
         """构建列表视图 Embed"""
-        conn = self._get_db_connection()
-        if not conn:
-            return discord.Embed(title="错误", description="数据库连接失败。")
+        total_rows = 0
 
-        try:
-            cursor = db_services.get_cursor(conn)
-
-            total_rows = 0
+        if self.search_mode:
+            # 搜索模式
+            start_idx = self.current_page * self.items_per_page
+            end_idx = start_idx + self.items_per_page
+            page_items = self.current_list_items[start_idx:end_idx]
 
-            if self.search_mode:
-                # 搜索模式
-                start_idx = self.current_page * self.items_per_page
-                end_idx = start_idx + self.items_per_page
-                page_items = self.current_list_items[start_idx:end_idx]
+            embed = discord.Embed(
+                title=f"搜索对话块 (关键词: '{self.search_keyword}')",
+                color=discord.Color.gold(),
+            )
+            self.total_pages = (
+                len(self.current_list_items) + self.items_per_page - 1
+            ) // self.items_per_page
+        else:
+            # 正常浏览模式：键集分页，只取列表需要的列
+            try:
+                total_rows = await self.paginator.count()
+                self.total_pages = self.paginator.total_pages
+                page_items = await self.paginator.get_page(self.current_page)
+            except Exception as e:
+                log.error(f"加载对话块列表失败: {e}", exc_info=True)
+                return discord.Embed(title="错误", description="数据库连接失败。")
+            self.current_list_items = page_items
 
-                embed = discord.Embed(
-                    title=f"搜索对话块 (关键词: '{self.search_keyword}')",
-                    color=discord.Color.gold(),
-                )
-                self.total_pages = (
-                    len(self.current_list_items) + self.items_per_page - 1
-                ) // self.items_per_page
-            else:
-                # 正常浏览模式
-                cursor.execute("SELECT COUNT(*) FROM conversation.conversation_blocks")
-                count_result = cursor.fetchone()
-                total_rows = count_result["count"] if count_result else 0
-
-                self.total_pages = (
-                    total_rows + self.items_per_page - 1
-                ) // self.items_per_page
-                offset = self.current_page * self.items_per_page
-
-                cursor.execute(
-                    "SELECT * FROM conversation.conversation_blocks ORDER BY start_time DESC LIMIT %s OFFSET %s",
-                    (self.items_per_page, offset),
-                )
-                page_items = cursor.fetchall()
-                self.current_list_items = page_items
+            embed = discord.Embed(
+                title="浏览：对话块管理",
+                color=discord.Color.green(),
+            )
 
-                embed = discord.Embed(
-                    title="浏览：对话块管理",
-                    color=discord.Color.green(),
-                )
+        if not page_items:
+            embed.description = "没有找到任何对话块。"
+        else:
+            list_text = []
+            for item in page_items:
+                title = self._get_entry_title(dict(item))
+                item_id = item.get("id")
+                list_text.append(f"**`#{item_id}`** - {title}")
 
-            if not page_items:
-                embed.description = "没有找到任何对话块。"
-            else:
-                list_text = []
-                for item in page_items:
-                    title = self._get_entry_title(dict(item))
-                    item_id = item.get("id")
-                    list_text.append(f"**`#{item_id}`** - {title}")
-
-                embed.description = "\n".join(list_text)
-
-            total_display = (
-                f"(共 {len(self.current_list_items)} 条结果)"
-                if self.search_mode
-                else f"(共 {total_rows} 条记录)"
-            )
-            embed.set_footer(
-                text=f"第 {self.current_page + 1} / {self.total_pages or 1} 页 {total_display}"
-            )
-            return embed
+            embed.description = "\n".join(list_text)
 
-        finally:
-            if conn:
-                conn.close()
+        total_display = (
+            f"(共 {len(self.current_list_items)} 条结果)"
+            if self.search_mode
+            else f"(共 {total_rows} 条记录)"
+        )
+        embed.set_footer(
+            text=f"第 {self.current_page + 1} / {self.total_pages or 1} 页 {total_display}"
+        )
+        return embed
 
     async def _build_detail_embed(self) -> discord.Embed:
         """构建详情视图 Embed"""
         if not self.current_item_id:
             return await self._build_list_embed()
 
-        current_item = self._get_item_by_id(self.current_item_id)
+        current_item = await self._fetch_block(self.current_item_id)
         if not current_item:
             self.view_mode = "list"
             return await self._build_list_embed()
@@ -970,8 +957,8 @@ class ConversationBlocksView(BaseTableView):
         )
 
         # 向量嵌入状态
-        bge_status = "✅ 已生成" if current_item.get("bge_embedding") else "❌ 未生成"
-        qwen_status = "✅ 已生成" if current_item.get("qwen_embedding") else "❌ 未生成"
+        bge_status = "✅ 已生成" if current_item.get("has_bge") else "❌ 未生成"
+        qwen_status = "✅ 已生成" if current_item.get("has_qwen") else "❌ 未生成"
         embed.add_field(
             name="🧠 向量嵌入",
             value=f"🟢 BGE: {bge_status}\n🔵 Qwen: {qwen_status}",
@@ -1029,7 +1016,7 @@ class SearchUserBlocksModal(discord.ui.Modal, title="按用户 ID 搜索对话
         try:
             cursor = db_services.get_cursor(conn)
             cursor.execute(
-                "SELECT * FROM conversation.conversation_blocks WHERE discord_id = %s ORDER BY start_time DESC",
+                f"SELECT {', '.join(BLOCK_LIST_COLUMNS)} FROM {BLOCKS_TABLE} WHERE discord_id = %s ORDER BY start_time DESC, id DESC",
                 (user_id,),
             )
             results = cursor.fetchall()
@@ -1081,7 +1068,7 @@ class SearchContentModal(discord.ui.Modal, title="按内容搜索对话块"):
             cursor = db_services.get_cursor(conn)
             # 使用 ILIKE 进行模糊搜索
             cursor.execute(
-                "SELECT * FROM conversation.conversation_blocks WHERE conversation_text ILIKE %s ORDER BY start_time DESC",
+                f"SELECT {', '.join(BLOCK_LIST_COLUMNS)} FROM {BLOCKS_TABLE} WHERE conversation_text ILIKE %s ORDER BY start_time DESC, id DESC",
                 (f"%{keyword}%",),
             )
             results = cursor.fetchall()
@@ -3,7 +3,7 @@
 import discord
 import logging
 import asyncio
-from typing import Any, Dict, Mapping
+from typing import Any, Dict, List, Mapping
 from sqlalchemy import select, func
 
 from .base_view import BaseTableView
@@ -11,6 +11,9 @@ from ..modals.search_modals import SearchVectorDBModal
 from src.chat.features.forum_search.services.forum_vector_db_service import (
     forum_vector_db_service,
 )
+from src.chat.features.forum_search.services.thread_directory_service import (
+    thread_directory_service,
+)
 from src.chat.config import chat_config
 from src.database.database import AsyncSessionLocal
 from src.database.models import ForumThread
@@ -91,20 +94,9 @@ class VectorDBView(BaseTableView):
             "⏳ 正在开始查询，这可能需要几分钟时间，请稍候...", ephemeral=True
         )
         try:
-            bot = interaction.client
-            all_forum_thread_ids = set()
-            for channel_id in chat_config.FORUM_SEARCH_CHANNEL_IDS:
-                channel = bot.get_channel(channel_id)
-                if isinstance(channel, discord.ForumChannel):
-                    async for thread in channel.archived_threads(limit=None):
-                        all_forum_thread_ids.add(thread.id)
-                    for thread in channel.threads:
-                        all_forum_thread_ids.add(thread.id)
-
-            indexed_thread_ids = set(
-                await forum_vector_db_service.get_all_indexed_thread_ids()
+            missing_thread_ids = await self._get_missing_thread_ids(
+                interaction.client
             )
-            missing_thread_ids = all_forum_thread_ids - indexed_thread_ids
             missing_count = len(missing_thread_ids)
 
             if missing_count == 0:
@@ -117,6 +109,16 @@ class VectorDBView(BaseTableView):
             log.error(f"查询缺失帖子时出错: {e}", exc_info=True)
             await interaction.followup.send(f"查询时发生错误: {e}", ephemeral=True)
 
+    async def _get_missing_thread_ids(self, bot) -> List[int]:
+        """确保各频道的帖子目录已完成全量对账，然后查询尚未索引的帖子 ID"""
+        channel_ids = []
+        for channel_id in chat_config.FORUM_SEARCH_CHANNEL_IDS:
+            channel = bot.get_channel(channel_id)
+            if isinstance(channel, discord.ForumChannel):
+                await thread_directory_service.ensure_channel_synced(channel)
+                channel_ids.append(channel_id)
+        return await thread_directory_service.get_missing_thread_ids(channel_ids)
+
     async def index_missing_threads(self, interaction: discord.Interaction):
         await interaction.response.send_message(
             "⏳ **任务已启动**\n\n正在后台开始索引所有缺失的帖子。", ephemeral=True
@@ -131,48 +133,37 @@ class VectorDBView(BaseTableView):
                 forum_search_service,
             )
 
-            # 获取所有应该索引的帖子
-            all_forum_threads = []
-            for channel_id in chat_config.FORUM_SEARCH_CHANNEL_IDS:
-                channel = bot.get_channel(channel_id)
-                if isinstance(channel, discord.ForumChannel):
-                    async for thread in channel.archived_threads(limit=None):
-                        all_forum_threads.append(thread)
-                    for thread in channel.threads:
-                        all_forum_threads.append(thread)
-
-            # 获取已索引的帖子
-            indexed_thread_ids = set(
-                await forum_vector_db_service.get_all_indexed_thread_ids()
-            )
+            # 帖子目录与索引表做差集，得到缺失的帖子
+            missing_thread_ids = await self._get_missing_thread_ids(bot)
 
-            # 过滤出缺失的帖子
-            missing_threads = [
-                t for t in all_forum_threads if t.id not in indexed_thread_ids
-            ]
-
-            if not missing_threads:
+            if not missing_thread_ids:
                 await interaction.followup.send(
                     "✅ 没有需要索引的帖子。", ephemeral=True
                 )
                 return
 
-            # 索引缺失的帖子
+            # 只为缺失的帖子获取 Thread 对象并索引
             success_count = 0
-            for thread in missing_threads:
+            for thread_id in missing_thread_ids:
                 try:
+                    thread = bot.get_channel(thread_id) or await bot.fetch_channel(
+                        thread_id
+                    )
                     await forum_search_service.process_thread(thread)
                     success_count += 1
                     if success_count % 10 == 0:
                         await interaction.followup.send(
-                            f"已索引 {success_count}/{len(missing_threads)} 个帖子...",
+                            f"已索引 {success_count}/{len(missing_thread_ids)} 个帖子...",
                             ephemeral=True,
                         )
+                except discord.NotFound:
+                    # 帖子已被删除，顺手从目录中移除
+                    await thread_directory_service.remove_thread(thread_id)
                 except Exception as e:
-                    log.error(f"索引帖子 {thread.id} 时出错: {e}", exc_info=True)
+                    log.error(f"索引帖子 {thread_id} 时出错: {e}", exc_info=True)
 
             await interaction.followup.send(
-                f"✅ 索引完成！成功索引 {success_count}/{len(missing_threads)} 个帖子。",
+                f"✅ 索引完成！成功索引 {success_count}/{len(missing_thread_ids)} 个帖子。",
                 ephemeral=True,
             )
 
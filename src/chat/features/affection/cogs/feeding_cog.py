@@ -19,7 +19,7 @@ from src.chat.config.chat_config import (
     PROMPT_CONFIG,
     GEMINI_FEEDING_GEN_CONFIG,
 )
-from src.chat.services.message_processor import message_processor
+from src.chat.services.image_pipeline import image_pipeline
 from src.chat.config import chat_config
 from src.chat.utils.prompt_utils import extract_persona_prompt, replace_emojis
 from src.chat.utils.message_utils import truncate_text, DISCORD_EMBED_DESCRIPTION_LIMIT
@@ -38,8 +38,12 @@ logger = logging.getLogger(__name__)
 _TAG_PATTERN = re.compile(r"`?\s*<([^>]*:[^>]*;[^>]*)>\s*`?", re.DOTALL)
 
 
-def _compress_image(image_bytes: bytes) -> tuple[bytes, str]:
-    return message_processor._compress_image_bytes(image_bytes)
+async def _compress_image(image_bytes: bytes) -> tuple[bytes, str]:
+    return await image_pipeline.compress(
+        image_bytes,
+        chat_config.IMAGE_PIPELINE_CONFIG["ATTACHMENT_MAX_DIMENSION"],
+        chat_config.IMAGE_PIPELINE_CONFIG["ATTACHMENT_QUALITY"],
+    )
 
 
 def _parse_feeding_response(response_text: str):
@@ -155,7 +159,7 @@ class FeedingCog(commands.Cog):
                 f"投喂原图生成失败(413)，原图 {len(image_bytes)} bytes，"
                 f"尝试压缩后重试..."
             )
-            compressed_bytes, compressed_mime = _compress_image(image_bytes)
+            compressed_bytes, compressed_mime = await _compress_image(image_bytes)
             logger.info(
                 f"图片压缩完成: {len(image_bytes)} -> {len(compressed_bytes)} bytes"
             )
@@ -202,7 +206,7 @@ class FeedingCog(commands.Cog):
             image_bytes = await image.read()
 
             original_size = len(image_bytes)
-            image_bytes, image.content_type = _compress_image(image_bytes)
+            image_bytes, image.content_type = await _compress_image(image_bytes)
             if len(image_bytes) < original_size:
                 logger.info(
                     f"投喂图片预压缩: {original_size} -> {len(image_bytes)} bytes"
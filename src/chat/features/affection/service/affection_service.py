@@ -4,7 +4,8 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 import yaml
 
-from sqlalchemy import select, func
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from src.chat.config.chat_config import AFFECTION_CONFIG
 from src.config import DEVELOPER_USER_IDS, BOT_NAME
@@ -36,42 +37,46 @@ class AffectionService:
             log.error(f"解析好感度等级配置文件时出错: {e}")
             return []
 
+    @staticmethod
+    def _effective_daily_gain(today: str):
+        """当日已获得的聊天好感度（SQL 表达式）：last_update_date 不是今天时视为 0"""
+        return case(
+            (UserAffection.last_update_date == today, UserAffection.daily_affection_gain),
+            else_=0,
+        )
+
     async def _get_or_create_affection(self, user_id: int) -> Dict[str, Any]:
+        """
+        读取好感度记录。每日计数的重置在读取时于 SQL 中计算，不再为此单独写库；
+        记录不存在时插入一条默认记录（仅首次）。
+        """
         uid = str(user_id)
         today = datetime.now(BEIJING_TZ).date().isoformat()
 
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(UserAffection).where(UserAffection.user_id == uid)
+                select(
+                    UserAffection.affection_points,
+                    self._effective_daily_gain(today).label("daily_affection_gain"),
+                    UserAffection.last_interaction_date,
+                    UserAffection.last_gift_date,
+                ).where(UserAffection.user_id == uid)
             )
-            record = result.scalar_one_or_none()
-
-            if record:
-                if record.last_update_date != today:
-                    record.daily_affection_gain = 0
-                    record.last_update_date = today
-                    await session.commit()
-                    await session.refresh(record)
-                    log.info(f"用户 {user_id} 的每日聊天好感度上限已于 {today} 重置。")
-
-                return {
-                    "user_id": record.user_id,
-                    "affection_points": record.affection_points,
-                    "daily_affection_gain": record.daily_affection_gain,
-                    "last_update_date": record.last_update_date,
-                    "last_interaction_date": record.last_interaction_date,
-                    "last_gift_date": record.last_gift_date,
-                }
-            else:
-                new_record = UserAffection(
-                    user_id=uid,
-                    affection_points=0,
-                    daily_affection_gain=0,
-                    last_update_date=today,
-                    last_interaction_date=today,
-                    last_gift_date=None,
+            row = result.one_or_none()
+
+            if row is None:
+                await session.execute(
+                    pg_insert(UserAffection)
+                    .values(
+                        user_id=uid,
+                        affection_points=0,
+                        daily_affection_gain=0,
+                        last_update_date=today,
+                        last_interaction_date=today,
+                        last_gift_date=None,
+                    )
+                    .on_conflict_do_nothing(index_elements=[UserAffection.user_id])
                 )
-                session.add(new_record)
                 await session.commit()
                 log.info(f"为用户 {user_id} 创建了新的好感度记录。")
                 return {
@@ -83,103 +88,209 @@ class AffectionService:
                     "last_gift_date": None,
                 }
 
-    async def _update_affection(self, user_id: int, **kwargs) -> None:
-        uid = str(user_id)
+            return {
+                "user_id": uid,
+                "affection_points": row.affection_points,
+                "daily_affection_gain": row.daily_affection_gain,
+                "last_update_date": today,
+                "last_interaction_date": row.last_interaction_date,
+                "last_gift_date": row.last_gift_date,
+            }
+
+    async def _upsert_affection(
+        self,
+        user_id: int,
+        today: str,
+        insert_values: Dict[str, Any],
+        update_values: Dict[str, Any],
+        where=None,
+        returning=(),
+    ):
+        """
+        单条 INSERT ... ON CONFLICT DO UPDATE ... RETURNING。
+
+        每日计数的重置在 SQL 中完成：未在 update_values 中指定时，
+        daily_affection_gain 取当日有效值，last_update_date 置为今天。
+        where 不满足时不更新，返回 None。
+        """
+        stmt = pg_insert(UserAffection).values(
+            user_id=str(user_id),
+            **{
+                "affection_points": 0,
+                "daily_affection_gain": 0,
+                "last_update_date": today,
+                "last_interaction_date": today,
+                **insert_values,
+            },
+        )
+        set_ = {
+            "daily_affection_gain": self._effective_daily_gain(today),
+            "last_update_date": today,
+            "updated_at": func.now(),
+            **update_values,
+        }
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserAffection.user_id], set_=set_, where=where
+        ).returning(*returning)
+
         async with AsyncSessionLocal() as session:
             async with session.begin():
-                result = await session.execute(
-                    select(UserAffection)
-                    .where(UserAffection.user_id == uid)
-                    .with_for_update()
-                )
-                record = result.scalar_one_or_none()
-                if record:
-                    for key, value in kwargs.items():
-                        setattr(record, key, value)
-                else:
-                    new_record = UserAffection(user_id=uid, **kwargs)
-                    session.add(new_record)
+                result = await session.execute(stmt)
+                return result.one_or_none()
 
     async def increase_affection_on_message(self, user_id: int) -> Optional[int]:
         if random.random() > AFFECTION_CONFIG["INCREASE_CHANCE"]:
             return None
 
-        affection_data = await self._get_or_create_affection(user_id)
-
-        if (
-            affection_data["daily_affection_gain"]
-            >= AFFECTION_CONFIG["DAILY_CHAT_AFFECTION_CAP"]
-        ):
-            log.info(f"用户 {user_id} 今日通过聊天获取好感度已达上限。")
-            return None
-
-        points_to_add = min(
-            AFFECTION_CONFIG["INCREASE_AMOUNT"],
-            AFFECTION_CONFIG["DAILY_CHAT_AFFECTION_CAP"]
-            - affection_data["daily_affection_gain"],
+        today = datetime.now(BEIJING_TZ).date().isoformat()
+        amount = AFFECTION_CONFIG["INCREASE_AMOUNT"]
+        cap = AFFECTION_CONFIG["DAILY_CHAT_AFFECTION_CAP"]
+        gain = self._effective_daily_gain(today)
+        points_to_add = func.least(amount, cap - gain)
+
+        # 语句开始时的当日累计，仅用于计算返回值
+        previous = (
+            select(gain)
+            .where(UserAffection.user_id == str(user_id))
+            .scalar_subquery()
         )
-
-        new_points = affection_data["affection_points"] + points_to_add
-        new_daily_gain = affection_data["daily_affection_gain"] + points_to_add
-
-        await self._update_affection(
+        row = await self._upsert_affection(
             user_id,
-            affection_points=new_points,
-            daily_affection_gain=new_daily_gain,
-            last_interaction_date=datetime.now(BEIJING_TZ).date().isoformat(),
+            today,
+            insert_values={
+                "affection_points": min(amount, cap),
+                "daily_affection_gain": min(amount, cap),
+            },
+            update_values={
+                "affection_points": UserAffection.affection_points + points_to_add,
+                "daily_affection_gain": gain + points_to_add,
+                "last_interaction_date": today,
+            },
+            where=gain < cap,
+            returning=(
+                UserAffection.daily_affection_gain,
+                func.coalesce(previous, 0).label("previous_gain"),
+            ),
         )
-        log.info(f"用户 {user_id} 的好感度增加了 {points_to_add} 点。")
-        return points_to_add
+        if row is None:
+            log.info(f"用户 {user_id} 今日通过聊天获取好感度已达上限。")
+            return None
 
-    async def decrease_affection_on_blacklist(self, user_id: int) -> int:
-        affection_data = await self._get_or_create_affection(user_id)
+        added = row.daily_affection_gain - row.previous_gain
+        log.info(f"用户 {user_id} 的好感度增加了 {added} 点。")
+        return added
+
+    async def apply_chat_gains(self, session, gains: Dict[int, int], today: str) -> int:
+        """
+        在调用方的事务中批量结算聊天好感度（由 user_state_aggregator 调用）。
+
+        gains 为 用户ID -> 待增加点数，由一条多行 UPSERT 按每日上限截断后写入。
+        today 为这些点数产生的日期；记录已更新到更晚的日期时跳过该用户（否则会把
+        last_update_date 改回旧日期，并用旧日期的累计覆盖当日累计）。
+        返回实际获得好感度的用户数。
+        """
+        if not gains:
+            return 0
+        cap = AFFECTION_CONFIG["DAILY_CHAT_AFFECTION_CAP"]
+        rows = [
+            {
+                "user_id": str(user_id),
+                "affection_points": min(points, cap),
+                "daily_affection_gain": min(points, cap),
+                "last_update_date": today,
+                "last_interaction_date": today,
+            }
+            # 按 user_id 排序插入，保证并发批次的加锁顺序一致
+            for user_id, points in sorted(gains.items(), key=lambda kv: str(kv[0]))
+        ]
+        stmt = pg_insert(UserAffection).values(rows)
+        gain = self._effective_daily_gain(today)
+        # excluded.daily_affection_gain 即本批次请求的点数（已按上限截断）
+        points_to_add = func.least(stmt.excluded.daily_affection_gain, cap - gain)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserAffection.user_id],
+            set_={
+                "affection_points": UserAffection.affection_points + points_to_add,
+                "daily_affection_gain": gain + points_to_add,
+                "last_update_date": today,
+                "last_interaction_date": today,
+                "updated_at": func.now(),
+            },
+            where=and_(
+                gain < cap,
+                or_(
+                    UserAffection.last_update_date.is_(None),
+                    UserAffection.last_update_date <= today,
+                ),
+            ),
+        ).returning(UserAffection.user_id)
+        result = await session.execute(stmt)
+        applied = len(result.all())
+        if applied:
+            log.info(f"批量结算聊天好感度: {applied} 名用户。")
+        return applied
 
-        new_points = (
-            affection_data["affection_points"] + AFFECTION_CONFIG["BLACKLIST_PENALTY"]
+    async def decrease_affection_on_blacklist(self, user_id: int) -> int:
+        today = datetime.now(BEIJING_TZ).date().isoformat()
+        penalty = AFFECTION_CONFIG["BLACKLIST_PENALTY"]
+        row = await self._upsert_affection(
+            user_id,
+            today,
+            insert_values={"affection_points": penalty},
+            update_values={"affection_points": UserAffection.affection_points + penalty},
+            returning=(UserAffection.affection_points,),
         )
-
-        await self._update_affection(user_id, affection_points=new_points)
         log.warning(
-            f"用户 {user_id} 因被列入黑名单，好感度扣除了 {abs(AFFECTION_CONFIG['BLACKLIST_PENALTY'])} 点。"
+            f"用户 {user_id} 因被列入黑名单，好感度扣除了 {abs(penalty)} 点。"
         )
-        return new_points
+        return row.affection_points
 
     async def increase_affection_for_gift(
         self, user_id: int, points_to_add: int
     ) -> tuple[bool, str]:
-        affection_data = await self._get_or_create_affection(user_id)
         today = datetime.now(BEIJING_TZ).date().isoformat()
+        is_developer = user_id in DEVELOPER_USER_IDS
 
-        if (
-            user_id not in DEVELOPER_USER_IDS
-            and affection_data.get("last_gift_date") == today
-        ):
+        row = await self._upsert_affection(
+            user_id,
+            today,
+            insert_values={"affection_points": points_to_add, "last_gift_date": today},
+            update_values={
+                "affection_points": UserAffection.affection_points + points_to_add,
+                "last_gift_date": today,
+                "last_interaction_date": today,
+            },
+            # 每日一次的判断与写入在同一条语句中完成，并发送礼不会重复成功
+            where=None
+            if is_developer
+            else or_(
+                UserAffection.last_gift_date.is_(None),
+                UserAffection.last_gift_date != today,
+            ),
+            returning=(UserAffection.affection_points,),
+        )
+        if row is None:
             log.info(f"用户 {user_id} 今天已经送过礼物了，送礼失败。")
             return False, f"你今天已经送过礼物啦，{BOT_NAME}很开心，不过明天再来吧！"
-        elif user_id in DEVELOPER_USER_IDS:
+        if is_developer:
             log.info(f"开发者用户 {user_id} 正在送礼，已绕过每日限制。")
 
-        new_points = affection_data["affection_points"] + points_to_add
-
-        await self._update_affection(
-            user_id,
-            affection_points=new_points,
-            last_gift_date=today,
-            last_interaction_date=today,
-        )
         log.info(f"用户 {user_id} 通过送礼增加了 {points_to_add} 点好感度。")
         return True, f"你送的礼物{BOT_NAME}很喜欢！好感度增加了 {points_to_add} 点。"
 
     async def add_affection_points(self, user_id: int, points_to_add: int) -> int:
-        affection_data = await self._get_or_create_affection(user_id)
-
-        new_points = affection_data["affection_points"] + points_to_add
-
-        await self._update_affection(
+        today = datetime.now(BEIJING_TZ).date().isoformat()
+        row = await self._upsert_affection(
             user_id,
-            affection_points=new_points,
-            last_interaction_date=datetime.now(BEIJING_TZ).date().isoformat(),
+            today,
+            insert_values={"affection_points": points_to_add},
+            update_values={
+                "affection_points": UserAffection.affection_points + points_to_add,
+                "last_interaction_date": today,
+            },
+            returning=(UserAffection.affection_points,),
         )
+        new_points = row.affection_points
         log.info(
             f"用户 {user_id} 的好感度直接增加了 {points_to_add} 点。新总点数: {new_points}"
         )
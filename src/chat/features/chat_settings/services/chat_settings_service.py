@@ -484,6 +484,10 @@ class ChatSettingsService:
         if model_id not in available_ids:
             raise ValueError(f"无效的 Embedding 模型 ID: {model_id}")
         await self.db_manager.set_global_setting("embedding_model", model_id)
+        # 唤醒后台任务，为已有数据回填新模型的 embedding
+        from src.chat.services.embedding_lifecycle import embedding_lifecycle
+
+        embedding_lifecycle.notify_model_changed()
 
     async def get_embedding_config(self) -> Dict[str, Any]:
         """获取当前 Embedding 模型的完整配置。"""
@@ -562,17 +566,25 @@ class ChatSettingsService:
     # --- AI Model Usage ---
 
     async def increment_model_usage(
-        self, model_name: str, provider_name: str = "unknown"
+        self,
+        model_name: str,
+        provider_name: str = "unknown",
+        count: int = 1,
+        usage_date: Optional[str] = None,
     ) -> None:
         """
-        记录一次模型使用。
+        记录模型使用。
 
         Args:
             model_name: 模型名称
             provider_name: Provider 名称（如 gemini_official, deepseek 等）
+            count: 次数（写回缓冲合并后的累计值）
+            usage_date: 计入的日期，默认为今天
         """
         if model_name:
-            await self.db_manager.increment_model_usage(model_name, provider_name)
+            await self.db_manager.increment_model_usage(
+                model_name, provider_name, count=count, usage_date=usage_date
+            )
 
     async def get_model_usage_counts(self) -> Dict[str, int]:
         """获取所有模型的使用计数。"""
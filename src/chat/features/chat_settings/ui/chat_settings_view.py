@@ -11,6 +11,7 @@ from src.chat.features.chat_settings.services.chat_settings_service import (
     chat_settings_service,
 )
 from src.database.services.token_usage_service import token_usage_service
+from src.chat.services.prompt_prefix_monitor import prompt_prefix_monitor
 from src.database.database import AsyncSessionLocal
 from src.database.models import TokenUsage
 from datetime import datetime
@@ -648,6 +649,22 @@ class ChatSettingsView(View):
         embed.add_field(name="🔢 呼叫次數", value=str(call_count), inline=False)
         embed.add_field(name="📊 平均每次", value=f"{average_per_call:,}", inline=False)
 
+        # 提示词前缀缓存：每一层作为「首个变化层」的比例（自启动以来）
+        prefix_report = prompt_prefix_monitor.report()
+        if prefix_report["turns"]:
+            lines = []
+            for item in prefix_report["layers"][:5]:
+                ratio = item["cache_hit_ratio"]
+                ratio_text = f"{ratio:.0%}" if ratio is not None else "-"
+                lines.append(
+                    f"`{item['layer']}` {item['share']:.0%}（缓存命中 {ratio_text}）"
+                )
+            embed.add_field(
+                name=f"🧩 前缀首个变化层（{prefix_report['turns']} 轮）",
+                value="\n".join(lines),
+                inline=False,
+            )
+
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     async def on_embedding_settings(self, interaction: Interaction):
@@ -12,6 +12,10 @@ from typing import Optional, List
 from src.chat.features.chat_settings.services.chat_settings_service import (
     chat_settings_service,
 )
+from src.chat.services.embedding_lifecycle import embedding_lifecycle
+from src.chat.features.world_book.services.knowledge_result_cache import (
+    knowledge_result_cache,
+)
 
 
 class EmbeddingSettingsView(View):
@@ -25,6 +29,7 @@ class EmbeddingSettingsView(View):
         self.current_model_id: Optional[str] = None
         self.available_models: list = []
         self.disabled_models: List[str] = []
+        self.lifecycle_progress: str = ""
         self.message: Optional[discord.Message] = None
 
     async def _initialize(self):
@@ -32,8 +37,17 @@ class EmbeddingSettingsView(View):
         self.current_model_id = await self.service.get_current_embedding_model()
         self.available_models = self.service.get_available_embedding_models()
         self.disabled_models = await self.service.get_disabled_embedding_models()
+        await self._refresh_lifecycle_progress()
         self._create_view_items()
 
+    async def _refresh_lifecycle_progress(self):
+        """读取各表的检索模型与回填进度"""
+        if not embedding_lifecycle.enabled:
+            self.lifecycle_progress = ""
+            return
+        await embedding_lifecycle.sync_targets()
+        self.lifecycle_progress = await embedding_lifecycle.format_progress()
+
     @classmethod
     async def create(
         cls, interaction: Interaction, parent_message: discord.Message
@@ -131,8 +145,9 @@ class EmbeddingSettingsView(View):
         embed = discord.Embed(
             title="🧠 Embedding 模型设置",
             description="选择用于向量搜索的 Embedding 模型。\n"
-            "更改设置后，新的搜索请求将使用所选模型。\n\n"
-            "**注意**: 切换模型不会重新生成已有数据的 embedding。",
+            "更改设置后，后台会为已有数据分批生成所选模型的 embedding，"
+            "每张表回填完成后搜索才切换到新模型。\n"
+            "稳定状态下只为当前模型生成新数据的 embedding。",
             color=discord.Color.purple(),
         )
 
@@ -161,6 +176,20 @@ class EmbeddingSettingsView(View):
             inline=False,
         )
 
+        if self.lifecycle_progress:
+            embed.add_field(
+                name="🔄 各表检索模型 / 回填进度",
+                value=self.lifecycle_progress[:1024],
+                inline=False,
+            )
+
+        if knowledge_result_cache.enabled:
+            embed.add_field(
+                name="🧠 世界之书检索缓存",
+                value=knowledge_result_cache.format_metrics(),
+                inline=False,
+            )
+
         # 添加模型对比信息
         embed.add_field(
             name="📊 模型对比",
@@ -188,6 +217,7 @@ class EmbeddingSettingsView(View):
         try:
             await self.service.set_embedding_model(selected_model_id)
             self.current_model_id = selected_model_id
+            await self._refresh_lifecycle_progress()
             self._create_view_items()
             embed = self._create_embed()
             await interaction.response.edit_message(embed=embed, view=self)
@@ -4,12 +4,15 @@ import logging
 import discord
 from discord.ext import commands, tasks
 import datetime
-from typing import Set, Dict, Any
+from typing import Set, Dict, Any, Optional
 
 from src.chat.config import chat_config
 from src.chat.features.forum_search.services.forum_vector_db_service import (
     forum_vector_db_service,
 )
+from src.chat.features.forum_search.services.thread_directory_service import (
+    thread_directory_service,
+)
 
 log = logging.getLogger(__name__)
 
@@ -96,6 +99,8 @@ class ForumCleanupCog(commands.Cog):
 
         # 2. 获取 Discord 中实际存在的帖子 ID
         discord_thread_ids = await self._get_existing_thread_ids(channel)
+        if discord_thread_ids is None:
+            return 0
         log.info(f"[ForumCleanup] Discord 中有 {len(discord_thread_ids)} 个帖子。")
 
         # 3. 计算差集：数据库中有但 Discord 中没有的
@@ -117,27 +122,27 @@ class ForumCleanupCog(commands.Cog):
 
         return deleted_count
 
-    async def _get_existing_thread_ids(self, channel: discord.ForumChannel) -> Set[int]:
+    async def _get_existing_thread_ids(
+        self, channel: discord.ForumChannel
+    ) -> Optional[Set[int]]:
         """
         获取频道中所有实际存在的帖子 ID（活跃 + 归档）。
 
+        读取由帖子事件与定期对账维护的本地目录，不再全量翻页归档帖子；
+        全量对账不够新（或之后有实时写入失败）时，会先执行一次。
+
         Args:
             channel: 论坛频道
 
         Returns:
-            帖子 ID 集合
+            帖子 ID 集合；目录无法作为权威数据时为 None，调用方不应据此删除索引
         """
-        thread_ids: Set[int] = set()
-
-        # 获取活跃帖子
-        for thread in channel.threads:
-            thread_ids.add(thread.id)
-
-        # 获取归档帖子
-        async for thread in channel.archived_threads(limit=None):
-            thread_ids.add(thread.id)
-
-        return thread_ids
+        if not await thread_directory_service.ensure_full_sync_fresh(channel):
+            log.warning(
+                f"[ForumCleanup] 频道 {channel.name} 的帖子目录未完成最近的全量对账，跳过清理。"
+            )
+            return None
+        return await thread_directory_service.get_thread_ids_by_channel(channel.id)
 
     @cleanup_task.before_loop
     async def before_cleanup_task(self):
@@ -191,6 +196,8 @@ class ForumCleanupCog(commands.Cog):
 
             # 获取 Discord 中的帖子
             discord_thread_ids = await self._get_existing_thread_ids(channel)
+            if discord_thread_ids is None:
+                continue
 
             # 计算差集并删除
             deleted_thread_ids = db_thread_ids - discord_thread_ids
@@ -239,6 +246,8 @@ class ForumCleanupCog(commands.Cog):
         )
 
         discord_thread_ids = await self._get_existing_thread_ids(channel)
+        if discord_thread_ids is None:
+            return {}
 
         deleted_thread_ids = db_thread_ids - discord_thread_ids
 
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import datetime
+
+import discord
+from discord.ext import commands, tasks
+
+from src.chat.config import chat_config
+from src.chat.features.forum_search.services.thread_directory_service import (
+    thread_directory_service,
+)
+
+log = logging.getLogger(__name__)
+
+_config = chat_config.FORUM_THREAD_DIRECTORY_CONFIG
+
+
+class ForumThreadDirectoryCog(commands.Cog):
+    """
+    维护论坛帖子目录：
+    - 实时：监听帖子创建 / 更新 / 删除事件，直接写入目录
+    - 定时：增量对账（只翻最近归档的帖子），每隔若干天做一次全量对账兜底
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.reconcile_task.start()
+
+    async def cog_unload(self):
+        """Cog 卸载时取消任务"""
+        self.reconcile_task.cancel()
+
+    @staticmethod
+    def _is_tracked(channel_id: int | None) -> bool:
+        return channel_id in chat_config.FORUM_SEARCH_CHANNEL_IDS
+
+    @commands.Cog.listener()
+    async def on_thread_create(self, thread: discord.Thread):
+        if self._is_tracked(thread.parent_id):
+            await thread_directory_service.upsert_thread(thread)
+
+    @commands.Cog.listener()
+    async def on_thread_update(self, before: discord.Thread, after: discord.Thread):
+        if self._is_tracked(after.parent_id):
+            await thread_directory_service.upsert_thread(after)
+
+    @commands.Cog.listener()
+    async def on_raw_thread_delete(self, payload: discord.RawThreadDeleteEvent):
+        if self._is_tracked(payload.parent_id):
+            await thread_directory_service.remove_thread(payload.thread_id)
+
+    @tasks.loop(minutes=_config["INCREMENTAL_SYNC_INTERVAL_MINUTES"])
+    async def reconcile_task(self):
+        """定时对账：默认增量，超过全量间隔的频道执行全量"""
+        full_interval = datetime.timedelta(days=_config["FULL_SYNC_INTERVAL_DAYS"])
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+        for channel_id in chat_config.FORUM_SEARCH_CHANNEL_IDS:
+            channel = self.bot.get_channel(channel_id)
+            if not isinstance(channel, discord.ForumChannel):
+                continue
+
+            try:
+                last_full = await thread_directory_service.get_last_full_sync(
+                    channel_id
+                )
+                full = last_full is None or now - last_full >= full_interval
+                await thread_directory_service.reconcile_channel(channel, full=full)
+            except Exception as e:
+                log.error(
+                    f"[ThreadDirectory] 对账频道 {channel_id} 时出错: {e}",
+                    exc_info=True,
+                )
+
+    @reconcile_task.before_loop
+    async def before_reconcile_task(self):
+        """在任务开始前等待机器人准备就绪"""
+        await self.bot.wait_until_ready()
+
+
+async def setup(bot: commands.Bot):
+    """将此 Cog 添加到机器人中。"""
+    await bot.add_cog(ForumThreadDirectoryCog(bot))
+    log.info("[ThreadDirectory] ForumThreadDirectoryCog 已加载。")
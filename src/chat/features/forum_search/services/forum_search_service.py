@@ -11,6 +11,7 @@ from src.chat.features.forum_search.services.forum_vector_db_service import (
     forum_vector_db_service,
 )
 from src.chat.services.regex_service import regex_service
+from src.chat.services.thread_metadata_cache import thread_metadata_cache
 from src.chat.config import chat_config as config
 from src.chat.utils.document_builder import build_forum_thread_document
 
@@ -50,34 +51,24 @@ class ForumSearchService:
             self.qwen_embedding_service = qwen_embedding_service
         return self.qwen_embedding_service
 
-    async def _generate_dual_embeddings(
+    async def _generate_embeddings(
         self, document_text: str, title: str
     ) -> Tuple[Optional[List[float]], Optional[List[float]]]:
         """
-        并行生成 BGE 和 Qwen 两种 embedding。
-        会检查禁用状态，跳过被禁用的模型。
+        并行生成帖子表当前需要写入的 embedding。
+        稳定状态下只生成检索所用模型的向量，切换模型的回填期间同时生成新旧两种；
+        被禁用的模型会被跳过（见 embedding_lifecycle.write_models）。
 
         Args:
             document_text: 文档文本
             title: 标题
 
         Returns:
-            Tuple[bge_embedding, qwen_embedding]: 两种 embedding，如果生成失败或被禁用则为 None
+            Tuple[bge_embedding, qwen_embedding]: 两种 embedding，未生成或生成失败则为 None
         """
-        from src.chat.utils.database import chat_db_manager
+        from src.chat.services.embedding_lifecycle import embedding_lifecycle
 
-        # 获取禁用的模型列表
-        try:
-            disabled_str = await chat_db_manager.get_global_setting(
-                "disabled_embedding_models"
-            )
-            disabled_models = (
-                [m.strip() for m in disabled_str.split(",") if m.strip()]
-                if disabled_str
-                else []
-            )
-        except Exception:
-            disabled_models = []
+        write_models = await embedding_lifecycle.write_models("forum.forum_threads")
 
         bge_service = self._get_ollama_embedding_service()
         qwen_service = self._get_qwen_embedding_service()
@@ -86,7 +77,7 @@ class ForumSearchService:
         tasks = []
         task_names = []
 
-        if "bge" not in disabled_models:
+        if "bge" in write_models:
             tasks.append(
                 bge_service.generate_embedding(
                     text=document_text, title=title, task_type="retrieval_document"
@@ -94,9 +85,9 @@ class ForumSearchService:
             )
             task_names.append("bge")
         else:
-            log.debug("[FORUM_SEARCH] BGE 模型已禁用，跳过生成 embedding")
+            log.debug("[FORUM_SEARCH] 当前无需写入 BGE embedding，跳过")
 
-        if "qwen" not in disabled_models:
+        if "qwen" in write_models:
             tasks.append(
                 qwen_service.generate_embedding(
                     text=document_text, title=title, task_type="retrieval_document"
@@ -104,7 +95,7 @@ class ForumSearchService:
             )
             task_names.append("qwen")
         else:
-            log.debug("[FORUM_SEARCH] Qwen 模型已禁用，跳过生成 embedding")
+            log.debug("[FORUM_SEARCH] 当前无需写入 Qwen embedding，跳过")
 
         # 并行生成
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -142,43 +133,21 @@ class ForumSearchService:
             return
 
         try:
-            # 1. 获取首楼消息
-            # messages.next() 在 v2.0 中已弃用, 使用 history()
-            first_message = await anext(thread.history(limit=1, oldest_first=True))
+            # 1. 获取首楼消息与作者信息（与提示词构建等共用帖子元数据缓存）
+            metadata = await thread_metadata_cache.get(thread, allow_first_message=True)
+            first_message = metadata.starter_message
             if not first_message:
                 log.warning(f"无法获取帖子 {thread.id} 的首楼消息。")
                 return
 
             # 2. 构建文档
             # 清理标题中的换行符和回车符，以确保数据一致性
-            title = thread.name.replace("\n", " ").replace("\r", " ")
+            title = metadata.title.replace("\n", " ").replace("\r", " ")
             content = first_message.content
 
-            # 3. 获取作者信息 (更稳健的方式)
-            author_id = thread.owner_id
-            author_name = "未知作者"
-            if author_id:
-                # 优先从缓存中获取
-                author = thread.owner or thread.guild.get_member(author_id)
-                if not author:
-                    try:
-                        # 缓存未命中，则通过 API 拉取
-                        log.info(
-                            f"缓存未命中，正在为帖子 {thread.id} 拉取作者信息 (ID: {author_id})..."
-                        )
-                        author = await thread.guild.fetch_member(author_id)
-                    except discord.NotFound:
-                        log.warning(
-                            f"无法为帖子 {thread.id} 找到作者 (ID: {author_id})，可能已离开服务器。"
-                        )
-                    except discord.HTTPException as e:
-                        log.error(
-                            f"通过 API 获取作者 (ID: {author_id}) 信息时出错: {e}"
-                        )
-
-                if author:
-                    # 使用 display_name，因为它能更好地反映用户在服务器中的昵称
-                    author_name = author.display_name
+            # 3. 作者信息：使用 display_name，因为它能更好地反映用户在服务器中的昵称
+            author_id = metadata.owner_id
+            author_name = metadata.owner_name or "未知作者"
 
             # 4. 提取论坛频道的名称作为分类
             raw_category_name = thread.parent.name if thread.parent else "未知分类"
@@ -194,8 +163,8 @@ class ForumSearchService:
                 category_name=category_name,
             )
 
-            # 6. 并行生成两种 embedding（双写策略）
-            bge_embedding, qwen_embedding = await self._generate_dual_embeddings(
+            # 6. 生成当前需要写入的 embedding（见 embedding_lifecycle）
+            bge_embedding, qwen_embedding = await self._generate_embeddings(
                 document_text, title
             )
             if not bge_embedding and not qwen_embedding:
@@ -213,7 +182,7 @@ class ForumSearchService:
                 "guild_id": thread.guild.id,
             }
 
-            # 8. 写入 ParadeDB（双写两种 embedding）
+            # 8. 写入 ParadeDB
             # Discord 的 created_at 是带时区的，需要转换为不带时区的 datetime
             created_at = (
                 thread.created_at if thread.created_at else datetime.now(BEIJING_TZ)
@@ -237,7 +206,7 @@ class ForumSearchService:
             )
 
             if success:
-                log.info(f"成功将帖子 {thread.id} 添加到 ParadeDB（双写 BGE + Qwen）。")
+                log.info(f"成功将帖子 {thread.id} 添加到 ParadeDB。")
             else:
                 log.warning(f"添加帖子 {thread.id} 到 ParadeDB 失败。")
 
@@ -284,15 +253,15 @@ class ForumSearchService:
                     category_name=category_name,
                 )
 
-                # 4. 并行生成两种 embedding（双写策略）
-                bge_embedding, qwen_embedding = await self._generate_dual_embeddings(
+                # 4. 生成当前需要写入的 embedding（见 embedding_lifecycle）
+                bge_embedding, qwen_embedding = await self._generate_embeddings(
                     document_text, title
                 )
                 if not bge_embedding and not qwen_embedding:
                     log.warning(f"无法为文档 {doc_id} 生成任何嵌入向量。")
                     continue
 
-                # 5. 写入 ParadeDB（双写两种 embedding）
+                # 5. 写入 ParadeDB
                 success = await self.vector_db_service.add_document(
                     thread_id=int(doc_id),
                     thread_name=title,
@@ -309,7 +278,7 @@ class ForumSearchService:
                 )
 
                 if success:
-                    log.info(f"成功添加文档 {doc_id} 到 ParadeDB（双写 BGE + Qwen）。")
+                    log.info(f"成功添加文档 {doc_id} 到 ParadeDB。")
                 else:
                     log.warning(f"添加文档 {doc_id} 到 ParadeDB 失败。")
 
@@ -404,7 +373,10 @@ class ForumSearchService:
                     log.info(f"[FORUM_SEARCH] 执行混合搜索，查询: '{query}'")
 
                     # 使用统一的 embedding 服务工厂
-                    embedding_service = await get_embedding_service()
+                    # 查询向量必须与帖子表当前检索的列使用同一模型
+                    embedding_service = await get_embedding_service(
+                        table="forum.forum_threads"
+                    )
 
                     query_embedding = await embedding_service.generate_embedding(
                         text=query, task_type="retrieval_query"
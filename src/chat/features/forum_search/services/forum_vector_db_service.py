@@ -6,17 +6,25 @@ from sqlalchemy import select, text
 
 from src.database.database import AsyncSessionLocal
 from src.database.models import ForumThread
+from src.database.vector_codec import to_halfvec
 from src.chat.services.embedding_factory import (
     get_embedding_column as factory_get_embedding_column,
     is_vector_enabled,
 )
+from src.chat.services.embedding_storage import (
+    build_semantic_search_sql,
+    prepare_vector_search,
+)
 
 log = logging.getLogger(__name__)
 
 
+FORUM_TABLE = "forum.forum_threads"
+
+
 async def get_embedding_column() -> str:
-    """根据配置返回当前使用的 embedding 列名"""
-    return await factory_get_embedding_column()
+    """根据配置返回论坛帖子表当前检索所用的 embedding 列名"""
+    return await factory_get_embedding_column(FORUM_TABLE)
 
 
 class ForumVectorDBService:
@@ -96,15 +104,13 @@ class ForumVectorDBService:
                         existing_thread.channel_id = channel_id
                         existing_thread.guild_id = guild_id
                         existing_thread.created_at = created_at
-                        # 双写：同时更新两个 embedding 列（真正的双写，使用不同的 embedding）
+                        # 未生成的列写入 NULL：内容已变，旧向量不再有效，需要时由回填补齐
                         existing_thread.bge_embedding = bge_embedding
                         existing_thread.qwen_embedding = qwen_embedding
                         existing_thread.source_metadata = source_metadata
-                        log.info(
-                            f"更新现有帖子: {thread_id} (双写 BGE + Qwen embedding)"
-                        )
+                        log.info(f"更新现有帖子: {thread_id}")
                     else:
-                        # 创建新记录，双写两个 embedding 列（真正的双写）
+                        # 创建新记录
                         new_thread = ForumThread(
                             thread_id=thread_id,
                             thread_name=thread_name,
@@ -120,7 +126,7 @@ class ForumVectorDBService:
                             qwen_embedding=qwen_embedding,
                         )
                         session.add(new_thread)
-                        log.info(f"添加新帖子: {thread_id} (双写 BGE + Qwen embedding)")
+                        log.info(f"添加新帖子: {thread_id}")
 
                     await session.commit()
                     return True
@@ -344,6 +350,12 @@ class ForumVectorDBService:
                 f"TOP_K_FTS: {top_k_fts} | RRF_K: {rrf_k} | FINAL_K: {final_k} | EXACT_MATCH_BOOST: {exact_match_boost}"
             )
 
+            semantic_search = build_semantic_search_sql(
+                columns="ft.id",
+                from_clause="forum.forum_threads ft",
+                column=f"ft.{embedding_col}",
+            )
+
             async with AsyncSessionLocal() as session:
                 # 构建混合搜索查询
                 # 使用 RRF (Reciprocal Rank Fusion) 合并向量搜索和 BM25 搜索的结果
@@ -351,14 +363,7 @@ class ForumVectorDBService:
                 sql_query = text(
                     f"""
                     WITH semantic_search AS (
-                        SELECT
-                            ft.id,
-                            ft.{embedding_col} <=> CAST(:query_vector AS halfvec) as vector_distance,
-                            RANK() OVER (ORDER BY ft.{embedding_col} <=> CAST(:query_vector AS halfvec)) as rank
-                        FROM forum.forum_threads ft
-                        WHERE ft.{embedding_col} IS NOT NULL
-                        ORDER BY ft.{embedding_col} <=> CAST(:query_vector AS halfvec)
-                        LIMIT :top_k_vector
+                        {semantic_search}
                     ),
                     keyword_search AS (
                         SELECT
@@ -406,13 +411,16 @@ class ForumVectorDBService:
 
                 # 添加过滤条件
                 params: Dict[str, Any] = {
-                    "query_vector": str(query_embedding),
+                    "query_vector": to_halfvec(query_embedding),
                     "query_text": query_text,
                     "top_k_vector": top_k_vector,
                     "top_k_fts": top_k_fts,
                     "rrf_k": rrf_k,
                     "exact_match_boost": exact_match_boost,
                     "max_distance": max_distance,
+                    **await prepare_vector_search(
+                        session, top_k_vector, profile="forum"
+                    ),
                 }
                 conditions = []
 
@@ -555,7 +563,7 @@ class ForumVectorDBService:
                 )
 
                 # 添加过滤条件
-                params: Dict[str, Any] = {"query_vector": str(query_embedding)}
+                params: Dict[str, Any] = {"query_vector": to_halfvec(query_embedding)}
                 conditions = []
 
                 if where_filter:
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+论坛帖子目录服务
+
+在 forum.thread_directory 中维护 Discord 论坛频道里实际存在的帖子，
+使清理失效帖子、查询/索引缺失帖子都变成对本地表的差集查询，
+不再每次都全量翻页 channel.archived_threads(limit=None)。
+"""
+
+import datetime
+import logging
+from typing import Iterable, List, Optional, Set
+
+import discord
+from sqlalchemy import BigInteger, all_, bindparam, delete, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.chat.config import chat_config
+from src.database.database import AsyncSessionLocal
+from src.database.models import ForumThreadDirectory, ForumThreadDirectorySync
+
+log = logging.getLogger(__name__)
+
+
+def _to_naive_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Discord 的时间戳带时区，数据库列不带时区，统一存为 UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _thread_to_row(thread: discord.Thread) -> dict:
+    return {
+        "thread_id": thread.id,
+        "channel_id": thread.parent_id,
+        "guild_id": thread.guild.id,
+        "thread_name": thread.name or "",
+        "archived": bool(thread.archived),
+        "created_at": _to_naive_utc(thread.created_at),
+        "archive_timestamp": _to_naive_utc(thread.archive_timestamp),
+    }
+
+
+class ThreadDirectoryService:
+    """维护并查询论坛帖子目录"""
+
+    def __init__(self):
+        # 实时事件写入失败的频道：目录可能缺帖子，完成下一次全量对账前不能作为权威数据
+        self._dirty_channels: Set[int] = set()
+
+    async def upsert_threads(self, threads: Iterable[discord.Thread]) -> int:
+        """
+        批量写入（或更新）帖子目录。写入失败时抛出异常。
+
+        Returns:
+            写入的行数
+        """
+        rows = [_thread_to_row(t) for t in threads if t.parent_id is not None]
+        if not rows:
+            return 0
+
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                stmt = pg_insert(ForumThreadDirectory).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ForumThreadDirectory.thread_id],
+                    set_={
+                        "channel_id": stmt.excluded.channel_id,
+                        "thread_name": stmt.excluded.thread_name,
+                        "archived": stmt.excluded.archived,
+                        "archive_timestamp": stmt.excluded.archive_timestamp,
+                        "last_seen_at": text("now()"),
+                    },
+                )
+                await session.execute(stmt)
+        return len(rows)
+
+    async def upsert_thread(self, thread: discord.Thread) -> None:
+        """帖子事件的实时写入；失败时把频道标记为需要全量对账"""
+        try:
+            await self.upsert_threads([thread])
+        except Exception as e:
+            self._dirty_channels.add(thread.parent_id)
+            log.error(
+                f"[ThreadDirectory] 写入帖子 {thread.id} 时出错，"
+                f"频道 {thread.parent_id} 在下次全量对账前不再作为清理依据: {e}",
+                exc_info=True,
+            )
+
+    async def remove_threads(self, thread_ids: Iterable[int]) -> int:
+        ids = list(thread_ids)
+        if not ids:
+            return 0
+        try:
+            async with AsyncSessionLocal() as session:
+                async with session.begin():
+                    result = await session.execute(
+                        delete(ForumThreadDirectory).where(
+                            ForumThreadDirectory.thread_id.in_(ids)
+                        )
+                    )
+                    return getattr(result, "rowcount", 0) or 0
+        except Exception as e:
+            log.error(f"[ThreadDirectory] 删除帖子目录记录时出错: {e}", exc_info=True)
+            return 0
+
+    async def remove_thread(self, thread_id: int) -> None:
+        await self.remove_threads([thread_id])
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    async def get_last_full_sync(self, channel_id: int) -> Optional[datetime.datetime]:
+        """频道上一次全量对账的时间（UTC，无时区），从未全量对账过则为 None"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(ForumThreadDirectorySync.full_synced_at).where(
+                    ForumThreadDirectorySync.channel_id == channel_id
+                )
+            )
+            return result.scalar_one_or_none()
+
+    async def is_channel_synced(self, channel_id: int) -> bool:
+        """频道是否已完成过全量对账（否则目录还不能作为权威数据）"""
+        return await self.get_last_full_sync(channel_id) is not None
+
+    async def is_full_sync_fresh(self, channel_id: int) -> bool:
+        """
+        目录能否作为删除索引的依据：全量对账在 FULL_SYNC_INTERVAL_DAYS 以内，
+        且之后没有实时写入失败。
+        """
+        if channel_id in self._dirty_channels:
+            return False
+        last_full = await self.get_last_full_sync(channel_id)
+        if last_full is None:
+            return False
+        max_age = datetime.timedelta(
+            days=chat_config.FORUM_THREAD_DIRECTORY_CONFIG["FULL_SYNC_INTERVAL_DAYS"]
+        )
+        now = _to_naive_utc(datetime.datetime.now(datetime.timezone.utc))
+        return now - last_full < max_age
+
+    async def get_thread_ids_by_channel(self, channel_id: int) -> Set[int]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(ForumThreadDirectory.thread_id).where(
+                    ForumThreadDirectory.channel_id == channel_id
+                )
+            )
+            return {row[0] for row in result.fetchall()}
+
+    async def get_missing_thread_ids(self, channel_ids: Iterable[int]) -> List[int]:
+        """目录中存在、但尚未写入 forum.forum_threads 索引的帖子 ID"""
+        ids = list(channel_ids)
+        if not ids:
+            return []
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                text("""
+                    SELECT d.thread_id
+                    FROM forum.thread_directory d
+                    WHERE d.channel_id = ANY(:channel_ids)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM forum.forum_threads f
+                          WHERE f.thread_id = d.thread_id
+                      )
+                    ORDER BY d.created_at DESC NULLS LAST
+                """),
+                {"channel_ids": ids},
+            )
+            return [row[0] for row in result.fetchall()]
+
+    # ------------------------------------------------------------------
+    # 对账
+    # ------------------------------------------------------------------
+    async def _get_sync_state(self, channel_id: int) -> Optional[ForumThreadDirectorySync]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(ForumThreadDirectorySync).where(
+                    ForumThreadDirectorySync.channel_id == channel_id
+                )
+            )
+            return result.scalar_one_or_none()
+
+    async def _database_now(self) -> datetime.datetime:
+        """数据库当前时间，与 last_seen_at 的默认值 now() 使用同一时钟和时区"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text("SELECT LOCALTIMESTAMP"))
+            return result.scalar_one()
+
+    async def _prune_unseen(
+        self, channel_id: int, seen: Set[int], before: datetime.datetime
+    ) -> int:
+        """
+        删除本次全量对账没有见到、且对账开始后也没有被写入过的帖子。
+        对账期间由实时事件写入的新帖子 last_seen_at 晚于 before，不会被误删。
+        """
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                result = await session.execute(
+                    delete(ForumThreadDirectory).where(
+                        ForumThreadDirectory.channel_id == channel_id,
+                        ForumThreadDirectory.last_seen_at < before,
+                        ForumThreadDirectory.thread_id
+                        != all_(
+                            bindparam("seen", list(seen), type_=ARRAY(BigInteger))
+                        ),
+                    )
+                )
+                return getattr(result, "rowcount", 0) or 0
+
+    async def _save_sync_state(
+        self, channel_id: int, started_at: datetime.datetime, full: bool
+    ) -> None:
+        values = {"channel_id": channel_id, "incremental_synced_at": started_at}
+        if full:
+            values["full_synced_at"] = started_at
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                stmt = pg_insert(ForumThreadDirectorySync).values(values)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[ForumThreadDirectorySync.channel_id],
+                    set_={k: v for k, v in values.items() if k != "channel_id"},
+                )
+                await session.execute(stmt)
+
+    async def reconcile_channel(
+        self, channel: discord.ForumChannel, full: bool = False
+    ) -> int:
+        """
+        把目录与 Discord 对齐。
+
+        - 增量模式：写入活跃帖子（来自网关缓存，零 REST 调用），
+          再从最新归档开始向前翻页，直到早于上次对账的水位线为止。
+        - 全量模式：翻完所有归档帖子，并删除目录中已不存在的帖子
+          （只删除对账开始前写入、且本次没有见到的记录）。
+          频道从未全量对账过（或有实时写入失败）时，增量请求会自动升级为全量。
+
+        任一批写入失败时异常直接抛出：不删除目录记录，也不更新对账时间。
+
+        Returns:
+            本次写入的帖子数量
+        """
+        state = await self._get_sync_state(channel.id)
+        if (
+            state is None
+            or state.full_synced_at is None
+            or channel.id in self._dirty_channels
+        ):
+            full = True
+
+        started_at = _to_naive_utc(datetime.datetime.now(datetime.timezone.utc))
+        watermark = None
+        if not full and state and state.incremental_synced_at:
+            overlap = datetime.timedelta(
+                minutes=chat_config.FORUM_THREAD_DIRECTORY_CONFIG[
+                    "INCREMENTAL_SYNC_OVERLAP_MINUTES"
+                ]
+            )
+            watermark = state.incremental_synced_at - overlap
+
+        # 全量对账只清理这个时间点之前写入的记录
+        prune_before = await self._database_now() if full else None
+        seen: Set[int] = set()
+        written = await self.upsert_threads(channel.threads)
+        seen.update(t.id for t in channel.threads)
+
+        batch: List[discord.Thread] = []
+        async for thread in channel.archived_threads(limit=None):
+            archived_at = _to_naive_utc(thread.archive_timestamp)
+            if watermark and archived_at and archived_at < watermark:
+                break
+            seen.add(thread.id)
+            batch.append(thread)
+            if len(batch) >= 100:
+                written += await self.upsert_threads(batch)
+                batch = []
+        written += await self.upsert_threads(batch)
+
+        if full:
+            removed = await self._prune_unseen(channel.id, seen, prune_before)
+            if removed:
+                log.info(
+                    f"[ThreadDirectory] 频道 {channel.name} 全量对账移除了 {removed} 个已不存在的帖子。"
+                )
+
+        await self._save_sync_state(channel.id, started_at, full)
+        if full:
+            self._dirty_channels.discard(channel.id)
+        log.info(
+            f"[ThreadDirectory] 频道 {channel.name} ({channel.id}) "
+            f"{'全量' if full else '增量'}对账完成，写入 {written} 个帖子。"
+        )
+        return written
+
+    async def ensure_channel_synced(self, channel: discord.ForumChannel) -> None:
+        """首次使用目录前，确保该频道至少完成过一次全量对账"""
+        if not await self.is_channel_synced(channel.id):
+            await self.reconcile_channel(channel, full=True)
+
+    async def ensure_full_sync_fresh(self, channel: discord.ForumChannel) -> bool:
+        """
+        删除索引前调用：全量对账不够新时先执行一次全量对账。
+
+        Returns:
+            目录此时能否作为权威数据；对账失败时为 False
+        """
+        if await self.is_full_sync_fresh(channel.id):
+            return True
+        try:
+            await self.reconcile_channel(channel, full=True)
+        except Exception as e:
+            log.error(
+                f"[ThreadDirectory] 频道 {channel.name} 全量对账失败: {e}", exc_info=True
+            )
+            return False
+        return await self.is_full_sync_fresh(channel.id)
+
+
+thread_directory_service = ThreadDirectoryService()
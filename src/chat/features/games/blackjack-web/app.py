@@ -1,7 +1,6 @@
 import os
 import httpx
 import logging
-import asyncio
 from typing import List, Optional
 from fastapi import FastAPI, HTTPException, Request, Depends
 from fastapi.responses import JSONResponse
@@ -15,6 +14,7 @@ from src.chat.features.odysseia_coin.service.coin_service import coin_service
 from src.chat.features.games.config import blackjack_config
 from src.chat.features.games.services.blackjack_service import blackjack_service
 from src.chat.utils.database import chat_db_manager
+from src.chat.services.http_client_registry import http_client_registry
 
 # 从根目录加载 .env 文件
 load_dotenv(
@@ -24,23 +24,6 @@ load_dotenv(
 app = FastAPI()
 log = logging.getLogger(__name__)
 
-# --- 用户操作锁，防止竞态条件 ---
-from cachetools import TTLCache
-
-
-class LockCache(TTLCache):
-    """一个在键缺失时创建 asyncio.Lock 的 TTLCache。"""
-
-    def __missing__(self, key):
-        lock = asyncio.Lock()
-        self[key] = lock
-        return lock
-
-
-# 创建一个TTL缓存来存储用户锁，TTL设置为30分钟（1800秒）
-# 减少TTL时间以防止锁对象积累，maxsize设置为100以限制内存使用
-user_locks = LockCache(maxsize=100, ttl=1800)
-
 
 async def _record_game_result(bet_amount: int, payout_amount: int):
     """
@@ -84,6 +67,8 @@ async def shutdown_event():
     """在应用关闭时断开数据库连接"""
     from src.chat.utils.database import chat_db_manager
 
+    await blackjack_service.shutdown()
+    await http_client_registry.aclose()
     log.info("Application shutting down.")
 
 
@@ -129,29 +114,29 @@ async def get_current_user_id(
     # 如果有token，则执行原有的Discord API验证流程
     headers = {"Authorization": f"Bearer {token.credentials}"}
     log.info("正在从Discord API获取用户信息...")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                "https://discord.com/api/users/@me", headers=headers
-            )
-            response.raise_for_status()
-            user_data = response.json()
-            user_id = int(user_data["id"])
-            log.info(f"成功识别用户: {user_data['username']} ({user_id})")
-            return user_id
-        except httpx.HTTPStatusError as e:
-            log.error(
-                f"从Discord API获取用户信息失败。状态码: {e.response.status_code}，"
-                f"响应: {e.response.text}",
-                exc_info=True,
-            )
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        except httpx.RequestError as e:
-            log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=503,
-                detail="Service Unavailable: Cannot connect to Discord API",
-            )
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.get(
+            "https://discord.com/api/users/@me", headers=headers
+        )
+        response.raise_for_status()
+        user_data = response.json()
+        user_id = int(user_data["id"])
+        log.info(f"成功识别用户: {user_data['username']} ({user_id})")
+        return user_id
+    except httpx.HTTPStatusError as e:
+        log.error(
+            f"从Discord API获取用户信息失败。状态码: {e.response.status_code}，"
+            f"响应: {e.response.text}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    except httpx.RequestError as e:
+        log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=503,
+            detail="Service Unavailable: Cannot connect to Discord API",
+        )
 
 
 class TokenRequest(BaseModel):
@@ -184,29 +169,29 @@ async def exchange_code_for_token(request: TokenRequest):
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
     log.info("正在向Discord API发送令牌交换请求...")
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                "https://discord.com/api/oauth2/token", data=data, headers=headers
-            )
-            response.raise_for_status()
-            log.info("成功交换代码获取令牌。")
-            return JSONResponse(content=response.json())
-        except httpx.HTTPStatusError as e:
-            log.error(
-                f"与Discord API交换代码失败。状态码: {e.response.status_code}，"
-                f"响应: {e.response.text}",
-                exc_info=True,
-            )
-            raise HTTPException(
-                status_code=500, detail="Failed to exchange code with Discord"
-            )
-        except httpx.RequestError as e:
-            log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=503,
-                detail="Service Unavailable: Cannot connect to Discord API",
-            )
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.post(
+            "https://discord.com/api/oauth2/token", data=data, headers=headers
+        )
+        response.raise_for_status()
+        log.info("成功交换代码获取令牌。")
+        return JSONResponse(content=response.json())
+    except httpx.HTTPStatusError as e:
+        log.error(
+            f"与Discord API交换代码失败。状态码: {e.response.status_code}，"
+            f"响应: {e.response.text}",
+            exc_info=True,
+        )
+        raise HTTPException(
+            status_code=500, detail="Failed to exchange code with Discord"
+        )
+    except httpx.RequestError as e:
+        log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=503,
+            detail="Service Unavailable: Cannot connect to Discord API",
+        )
 
 
 @app.get("/api/user")
@@ -270,7 +255,7 @@ async def start_game(
         raise HTTPException(status_code=400, detail="Bet amount must be positive")
 
     log.info(f"用户 {user_id} 正在下注 {bet_amount} 开始新游戏")
-    async with user_locks[user_id]:
+    async with blackjack_service.user_lock(user_id):
         # 检查并清理任何卡住的旧游戏
         if await blackjack_service.get_active_game(user_id):
             log.warning(
@@ -341,7 +326,7 @@ async def forfeit_game(user_id: int = Depends(get_current_user_id)):
     用于解决玩家因任何原因（如网络断开、浏览器关闭）被卡在游戏中的问题。
     """
     log.warning(f"用户 {user_id} 正在请求放弃当前游戏。")
-    async with user_locks[user_id]:
+    async with blackjack_service.user_lock(user_id):
         active_game = await blackjack_service.get_active_game(user_id)
         if not active_game:
             log.info(f"用户 {user_id} 请求放弃游戏，但没有活跃游戏。")
@@ -367,7 +352,7 @@ async def forfeit_game(user_id: int = Depends(get_current_user_id)):
 @app.post("/api/game/double")
 async def double_down(user_id: int = Depends(get_current_user_id)):
     """API: 玩家双倍下注"""
-    async with user_locks[user_id]:
+    async with blackjack_service.user_lock(user_id):
         game = await blackjack_service.get_active_game(user_id)
         if not game:
             raise HTTPException(
@@ -444,7 +429,7 @@ async def double_down(user_id: int = Depends(get_current_user_id)):
 @app.post("/api/game/hit")
 async def player_hit(user_id: int = Depends(get_current_user_id)):
     """API: 玩家要牌"""
-    async with user_locks[user_id]:
+    async with blackjack_service.user_lock(user_id):
         try:
             game = await blackjack_service.player_hit(user_id)
             new_balance = await coin_service.get_balance(user_id)
@@ -476,7 +461,7 @@ async def player_hit(user_id: int = Depends(get_current_user_id)):
 @app.post("/api/game/stand")
 async def player_stand(user_id: int = Depends(get_current_user_id)):
     """API: 玩家停牌，庄家行动并结算"""
-    async with user_locks[user_id]:
+    async with blackjack_service.user_lock(user_id):
         try:
             game = await blackjack_service.player_stand(user_id)
 
@@ -26,3 +26,6 @@ DEALER_BET_THRESHOLDS = {
     "high": 1000,  # 高于或等于此值为大赌注
     # 两者之间的为中等赌注
 }
+
+# 进行中的牌局保存在内存中，状态变更按此间隔（秒）批量写回数据库
+SESSION_FLUSH_INTERVAL_SECONDS = 5
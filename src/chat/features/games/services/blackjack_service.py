@@ -1,8 +1,12 @@
+import asyncio
 import logging
 import json
 import random
-from typing import Optional, List, Dict, Any
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, List, Dict, Any, Iterable, Set
 
+from src.chat.features.games.config import blackjack_config
 from src.chat.utils.database import chat_db_manager
 
 log = logging.getLogger(__name__)
@@ -11,9 +15,56 @@ log = logging.getLogger(__name__)
 SUITS = ["Club", "Diamond", "Heart", "Spade"]
 RANKS = ["A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
 
+# Cards are stored as indices 0..51 (suit * 13 + rank); names/values are lookups.
+CARD_NAMES = tuple(f"{suit}{rank}" for suit in SUITS for rank in RANKS)
+CARD_INDEX = {name: i for i, name in enumerate(CARD_NAMES)}
+CARD_VALUES = tuple(
+    11 if rank == "A" else 10 if rank in ("10", "J", "Q", "K") else int(rank)
+    for _ in SUITS
+    for rank in RANKS
+)
+
+
+def _score_indices(cards: Iterable[int]) -> int:
+    """Blackjack score of a hand given as card indices."""
+    score = 0
+    aces = 0
+    for card in cards:
+        value = CARD_VALUES[card]
+        score += value
+        if value == 11:
+            aces += 1
+    while score > 21 and aces:
+        score -= 10
+        aces -= 1
+    return score
+
+
+def _is_soft_indices(cards: Iterable[int]) -> bool:
+    """True if at least one Ace in the hand is still counted as 11."""
+    cards = list(cards)
+    hard = sum(1 if CARD_VALUES[c] == 11 else CARD_VALUES[c] for c in cards)
+    return _score_indices(cards) > hard
+
 
 class BlackjackGame:
-    """Represents the full state of a single blackjack game."""
+    """
+    Represents the full state of a single blackjack game.
+
+    Live games are kept in memory by BlackjackService, so the state is compact:
+    the deck and both hands are bytearrays of card indices. `deck`,
+    `player_hand` and `dealer_hand` still expose card names for callers.
+    """
+
+    __slots__ = (
+        "user_id",
+        "bet_amount",
+        "game_state",
+        "_deck",
+        "_player",
+        "_dealer",
+        "updated_at",
+    )
 
     def __init__(
         self,
@@ -27,9 +78,45 @@ class BlackjackGame:
         self.user_id = user_id
         self.bet_amount = bet_amount
         self.game_state = game_state
-        self.deck = deck
-        self.player_hand = player_hand
-        self.dealer_hand = dealer_hand
+        self._deck = bytearray(CARD_INDEX[c] for c in deck)
+        self._player = bytearray(CARD_INDEX[c] for c in player_hand)
+        self._dealer = bytearray(CARD_INDEX[c] for c in dealer_hand)
+        self.updated_at = time.monotonic()
+
+    @classmethod
+    def new_shuffled(cls, user_id: int, bet_amount: int) -> "BlackjackGame":
+        """Creates a game with a freshly shuffled deck and no cards dealt."""
+        game = cls(user_id, bet_amount, "player_turn", [], [], [])
+        deck = list(range(len(CARD_NAMES)))
+        random.shuffle(deck)
+        game._deck = bytearray(deck)
+        return game
+
+    @property
+    def deck(self) -> List[str]:
+        return [CARD_NAMES[c] for c in self._deck]
+
+    @property
+    def player_hand(self) -> List[str]:
+        return [CARD_NAMES[c] for c in self._player]
+
+    @property
+    def dealer_hand(self) -> List[str]:
+        return [CARD_NAMES[c] for c in self._dealer]
+
+    @property
+    def player_score(self) -> int:
+        return _score_indices(self._player)
+
+    @property
+    def dealer_score(self) -> int:
+        return _score_indices(self._dealer)
+
+    def deal_to_player(self) -> None:
+        self._player.append(self._deck.pop())
+
+    def deal_to_dealer(self) -> None:
+        self._dealer.append(self._deck.pop())
 
     def to_dict(self) -> Dict[str, Any]:
         """Serializes the game state to a dictionary for API responses."""
@@ -38,15 +125,13 @@ class BlackjackGame:
         # Correctly prepare dealer's hand for the UI
         if is_player_turn:
             # Show only the first card and a hidden card
-            ui_dealer_hand = [self.dealer_hand[0], "Hidden"]
+            ui_dealer_hand = [CARD_NAMES[self._dealer[0]], "Hidden"]
             # Calculate score based only on the visible card
-            ui_dealer_score = BlackjackService._calculate_hand_score(
-                [self.dealer_hand[0]]
-            )
+            ui_dealer_score = _score_indices(self._dealer[:1])
         else:
             # Show all cards once the player's turn is over
             ui_dealer_hand = self.dealer_hand
-            ui_dealer_score = BlackjackService._calculate_hand_score(self.dealer_hand)
+            ui_dealer_score = self.dealer_score
 
         return {
             "user_id": self.user_id,
@@ -54,14 +139,30 @@ class BlackjackGame:
             "game_state": self.game_state,
             "player_hand": self.player_hand,
             "dealer_hand": ui_dealer_hand,
-            "player_score": BlackjackService._calculate_hand_score(self.player_hand),
+            "player_score": self.player_score,
             "dealer_score": ui_dealer_score,
         }
 
 
 class BlackjackService:
+    """
+    Blackjack game logic with an in-process session store.
+
+    Live games are held in memory and every hit/stand/double is pure CPU.
+    Persistence to SQLite is write-behind: a new game is written immediately
+    (so a crash can still refund the bet), later changes are flushed
+    periodically, and a finished game is deleted. The store assumes a single
+    process serves the blackjack web app.
+    """
+
     def __init__(self, db_manager):
         self._db_manager = db_manager
+        self._sessions: Dict[int, BlackjackGame] = {}
+        self._dirty: Set[int] = set()
+        self._persisted: Set[int] = set()
+        # user_id -> [lock, holders]; removed when nobody holds or waits for it
+        self._locks: Dict[int, list] = {}
+        self._flush_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """
@@ -73,79 +174,46 @@ class BlackjackService:
             "Blackjack games table initialized (only once at application startup)."
         )
         await self.cleanup_stale_games()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
 
-    # --- Core Game Logic ---
-    @staticmethod
-    def _create_deck() -> List[str]:
-        """Creates a standard 52-card deck."""
-        return [f"{suit}{rank}" for suit in SUITS for rank in RANKS]
-
-    @staticmethod
-    def _shuffle_deck(deck: List[str]) -> None:
-        """Shuffles the deck in place."""
-        random.shuffle(deck)
-
-    @staticmethod
-    def _deal_card(deck: List[str]) -> str:
-        """Deals one card from the deck."""
-        return deck.pop()
-
-    @staticmethod
-    def _get_card_value(card: str) -> int:
-        """Gets the numerical value of a card."""
-        # Check for "10" first, as it's two characters
-        if card.endswith("10"):
-            return 10
-
-        # Then check for single-character ranks
-        rank_char = card[-1]
-        if rank_char in ["J", "Q", "K"]:
-            return 10
-        if rank_char == "A":
-            return 11
-
-        # Otherwise, it's a number card
-        return int(rank_char)
+    async def shutdown(self):
+        """Stops the flush loop and writes any pending state."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    @asynccontextmanager
+    async def user_lock(self, user_id: int) -> AsyncIterator[None]:
+        """Serializes actions of one user without keeping idle locks around."""
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(user_id, None)
 
+    # --- Core Game Logic ---
     @staticmethod
     def _calculate_hand_score(hand: List[str]) -> int:
-        """Calculates the score of a hand."""
-        score = 0
-        ace_count = 0
-        for card in hand:
-            if card == "Hidden":
-                continue
-            score += BlackjackService._get_card_value(card)
-            if "A" in card:
-                ace_count += 1
-
-        while score > 21 and ace_count > 0:
-            score -= 10
-            ace_count -= 1
-        return score
+        """Calculates the score of a hand given as card names."""
+        return _score_indices(CARD_INDEX[c] for c in hand if c != "Hidden")
 
-    @staticmethod
-    def _is_soft_hand(hand: List[str]) -> bool:
-        """Checks if a hand is 'soft' (contains an Ace counted as 11)."""
-        score = BlackjackService._calculate_hand_score(hand)
-
-        non_ace_score = 0
-        ace_count = 0
-        for card in hand:
-            if "A" in card:
-                ace_count += 1
-            else:
-                if card == "Hidden":
-                    continue
-                non_ace_score += BlackjackService._get_card_value(card)
-
-        hard_score = non_ace_score + ace_count
-
-        # If the calculated score is greater than the hard score, it means
-        # at least one Ace was counted as 11, making the hand soft.
-        return ace_count > 0 and score > hard_score
+    # --- Persistence (write-behind) ---
+    def _mark_dirty(self, game: BlackjackGame) -> None:
+        game.updated_at = time.monotonic()
+        self._dirty.add(game.user_id)
 
-    # --- Database Interaction ---
     async def _save_game_state(self, game: BlackjackGame):
         """Saves the entire game state to the database."""
         query = """
@@ -163,90 +231,100 @@ class BlackjackService:
         await self._db_manager._execute(
             self._db_manager._db_transaction, query, params, commit=True
         )
+        self._persisted.add(game.user_id)
+
+    async def flush(self) -> int:
+        """Writes all games changed since the last flush. Returns the count."""
+        pending, self._dirty = self._dirty, set()
+        flushed = 0
+        for user_id in pending:
+            game = self._sessions.get(user_id)
+            if game is None:
+                continue
+            try:
+                await self._save_game_state(game)
+                flushed += 1
+            except Exception as e:
+                self._dirty.add(user_id)
+                log.error(
+                    f"Failed to flush blackjack game for user {user_id}: {e}",
+                    exc_info=True,
+                )
+        return flushed
+
+    async def _flush_loop(self):
+        interval = blackjack_config.SESSION_FLUSH_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"Blackjack flush loop error: {e}", exc_info=True)
 
     async def get_active_game(self, user_id: int) -> Optional[BlackjackGame]:
-        """Retrieves the current active game for a user from the database."""
-        query = "SELECT * FROM blackjack_games WHERE user_id = ?"
-        row = await self._db_manager._execute(
-            self._db_manager._db_transaction, query, (user_id,), fetch="one"
-        )
-        if row:
-            return BlackjackGame(
-                user_id=row["user_id"],
-                bet_amount=row["bet_amount"],
-                game_state=row["game_state"],
-                deck=json.loads(row["deck"]),
-                player_hand=json.loads(row["player_hand"]),
-                dealer_hand=json.loads(row["dealer_hand"]),
-            )
-        return None
+        """Returns the user's live game from the session store."""
+        return self._sessions.get(user_id)
 
     async def delete_game(self, user_id: int):
-        """Deletes a game record for a user."""
-        query = "DELETE FROM blackjack_games WHERE user_id = ?"
-        await self._db_manager._execute(
-            self._db_manager._db_transaction, query, (user_id,), commit=True
-        )
+        """Ends a user's game, removing it from memory and the database."""
+        self._sessions.pop(user_id, None)
+        self._dirty.discard(user_id)
+        if user_id in self._persisted:
+            query = "DELETE FROM blackjack_games WHERE user_id = ?"
+            await self._db_manager._execute(
+                self._db_manager._db_transaction, query, (user_id,), commit=True
+            )
+            self._persisted.discard(user_id)
         log.info(f"Deleted game for user {user_id}.")
 
     # --- Public Service Methods ---
     async def start_game(self, user_id: int, bet_amount: int) -> BlackjackGame:
         """Starts a new game of blackjack, checking for immediate win/loss conditions."""
-        deck = self._create_deck()
-        self._shuffle_deck(deck)
-
-        player_hand = [self._deal_card(deck), self._deal_card(deck)]
-        dealer_hand = [self._deal_card(deck), self._deal_card(deck)]
-
-        player_score = self._calculate_hand_score(player_hand)
-        dealer_score = self._calculate_hand_score(dealer_hand)
+        game = BlackjackGame.new_shuffled(user_id, bet_amount)
+        game.deal_to_player()
+        game.deal_to_player()
+        game.deal_to_dealer()
+        game.deal_to_dealer()
 
-        game_state = "player_turn"  # Default state
+        player_score = game.player_score
+        dealer_score = game.dealer_score
 
         # Check for immediate Blackjack scenarios
         if player_score == 21:
             if dealer_score == 21:
-                game_state = "finished_push"  # Both have Blackjack
+                game.game_state = "finished_push"  # Both have Blackjack
             else:
-                game_state = "finished_blackjack"  # Player has Blackjack
+                game.game_state = "finished_blackjack"  # Player has Blackjack
         elif dealer_score == 21:
-            game_state = "finished_loss"  # Dealer has Blackjack, player does not
-
-        game = BlackjackGame(
-            user_id=user_id,
-            bet_amount=bet_amount,
-            game_state=game_state,  # Use the newly determined state
-            deck=deck,
-            player_hand=player_hand,
-            dealer_hand=dealer_hand,
-        )
+            game.game_state = "finished_loss"  # Dealer has Blackjack, player does not
 
-        await self._save_game_state(game)
+        self._sessions[user_id] = game
+        if game.game_state == "player_turn":
+            # The bet has already been taken; persist now so a restart refunds it.
+            await self._save_game_state(game)
         log.info(
-            f"Started new game for user {user_id} with bet {bet_amount}. Initial state: {game_state}"
+            f"Started new game for user {user_id} with bet {bet_amount}. Initial state: {game.game_state}"
         )
         return game
 
     async def player_hit(self, user_id: int) -> BlackjackGame:
         """Handles the player's 'hit' action."""
-        game = await self.get_active_game(user_id)
+        game = self._sessions.get(user_id)
         if not game or game.game_state != "player_turn":
             raise ValueError("It's not your turn to hit.")
 
-        game.player_hand.append(self._deal_card(game.deck))
-
-        player_score = self._calculate_hand_score(game.player_hand)
-        if player_score > 21:
+        game.deal_to_player()
+        if game.player_score > 21:
             game.game_state = "finished_loss"
 
-        await self._save_game_state(game)
+        self._mark_dirty(game)
         return game
 
     async def player_stand(
         self, user_id: int, is_double_down: bool = False
     ) -> BlackjackGame:
         """Handles the player's 'stand' action and completes the dealer's turn."""
-        game = await self.get_active_game(user_id)
+        game = self._sessions.get(user_id)
         if not game:
             raise ValueError("No active game found.")
 
@@ -255,17 +333,17 @@ class BlackjackService:
 
         game.game_state = "dealer_turn"
 
-        dealer_score = self._calculate_hand_score(game.dealer_hand)
+        dealer_score = game.dealer_score
         while dealer_score < 17 or (
-            dealer_score == 17 and BlackjackService._is_soft_hand(game.dealer_hand)
+            dealer_score == 17 and _is_soft_indices(game._dealer)
         ):
-            game.dealer_hand.append(self._deal_card(game.deck))
-            dealer_score = self._calculate_hand_score(game.dealer_hand)
+            game.deal_to_dealer()
+            dealer_score = game.dealer_score
 
-        player_score = self._calculate_hand_score(game.player_hand)
+        player_score = game.player_score
 
         # --- 调试日志 ---
-        log.info(
+        log.debug(
             f"结算判断: UserID={game.user_id}, PlayerHand={game.player_hand} ({player_score}), "
             f"DealerHand={game.dealer_hand} ({dealer_score})"
         )
@@ -280,32 +358,28 @@ class BlackjackService:
         log.info(f"最终结果: UserID={game.user_id}, Result={game.game_state}")
         # --- 日志结束 ---
 
-        await self._save_game_state(game)
+        self._mark_dirty(game)
         return game
 
     async def double_down(self, user_id: int, double_amount: int) -> BlackjackGame:
         """Handles the player's 'double down' action."""
-        game = await self.get_active_game(user_id)
+        game = self._sessions.get(user_id)
         if not game or game.game_state != "player_turn":
             raise ValueError("It's not your turn to double down.")
 
-        if len(game.player_hand) != 2:
+        if len(game._player) != 2:
             raise ValueError("You can only double down on your initial two cards.")
 
         # Double the bet
         game.bet_amount += double_amount
 
         # Player hits once
-        game.player_hand.append(self._deal_card(game.deck))
-        player_score = self._calculate_hand_score(game.player_hand)
+        game.deal_to_player()
 
-        if player_score > 21:
+        if game.player_score > 21:
             game.game_state = "finished_loss"
-            # Save the final state when player busts
-            await self._save_game_state(game)
+            self._mark_dirty(game)
         else:
-            # Save state with the player's new card before the dealer plays.
-            await self._save_game_state(game)
             # Automatically stand after doubling down
             game = await self.player_stand(user_id, is_double_down=True)
 
@@ -338,6 +412,7 @@ class BlackjackService:
                 await coin_service.add_coins(
                     user_id, bet_amount, "Blackjack game refund due to service restart"
                 )
+                self._persisted.add(user_id)
                 await self.delete_game(user_id)
                 log.info(
                     f"Successfully refunded {bet_amount} to user {user_id} and deleted stale game."
@@ -195,6 +195,11 @@ class GuidanceCog(commands.Cog):
         await chat_db_manager.set_global_setting("guidance_message_id", str(msg.id))
         await chat_db_manager.set_global_setting("guidance_url", guidance_url)
         self._guidance_url = guidance_url
+
+        # 商店公告中引用了 guidance_url，使其缓存失效
+        from src.chat.features.odysseia_coin.service.shop_service import shop_service
+
+        shop_service.invalidate_announcement()
         log.info(f"Sent guidance channel message: {msg.id}, url: {guidance_url}")
 
     def _get_guidance_jump_url(self) -> str | None:
@@ -7,6 +7,7 @@ from src.chat.features.odysseia_coin.service.coin_service import coin_service
 from src.chat.features.odysseia_coin.ui.shop_ui import SimpleShopView
 from src.chat.config import chat_config
 from src.chat.features.odysseia_coin.service.shop_service import shop_service
+from src.chat.services.user_state_aggregator import user_state_aggregator
 from src.config import CURRENCY_NAME
 
 log = logging.getLogger(__name__)
@@ -36,13 +37,8 @@ class CoinCog(commands.Cog):
                 return
 
         try:
-            reward_granted = await coin_service.grant_daily_message_reward(
-                message.author.id
-            )
-            if reward_granted:
-                log.info(
-                    f"用户 {message.author.name} ({message.author.id}) 获得了每日首次发言奖励。"
-                )
+            # 同一用户当天只会排队一次，实际发放在写回时按日期判定
+            await user_state_aggregator.add_daily_message_reward(message.author.id)
         except Exception as e:
             log.error(
                 f"处理用户 {message.author.id} 的每日发言奖励时出错: {e}", exc_info=True
@@ -1,11 +1,13 @@
 import logging
 import random
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from src.chat.config.chat_config import COIN_CONFIG
 from src.config import BOT_NAME, CURRENCY_NAME
 from ...affection.service.affection_service import affection_service
+from src.chat.features.odysseia_coin.service.shop_catalog import shop_catalog
+from src.chat.services.leaderboard_service import leaderboard_service
 from src.database.database import AsyncSessionLocal
 from src.database.models import (
     ShopItem,
@@ -52,6 +54,27 @@ class CoinService:
             balance = result.scalar_one_or_none()
             return balance if balance is not None else 0
 
+    async def get_balance_and_personal_memory(self, user_id: int) -> Tuple[int, bool]:
+        """一次查询同时取得余额与是否已有个人记忆（打开商店时使用）"""
+        uid = str(user_id)
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(
+                    select(UserCoins.balance)
+                    .where(UserCoins.user_id == uid)
+                    .scalar_subquery(),
+                    select(CommunityMemberProfile.personal_summary)
+                    .where(CommunityMemberProfile.discord_id == uid)
+                    .limit(1)
+                    .scalar_subquery(),
+                )
+            )
+            balance, summary = result.one()
+            return (
+                balance if balance is not None else 0,
+                bool(summary and summary.strip()),
+            )
+
     async def add_coins(self, user_id: int, amount: int, reason: str) -> int:
         if amount <= 0:
             raise ValueError("增加的金额必须为正数")
@@ -74,6 +97,7 @@ class CoinService:
                 await session.flush()
                 new_balance = row.balance
 
+            leaderboard_service.record_coin_balance(user_id, new_balance)
             log.info(
                 f"用户 {user_id} 获得 {amount} {CURRENCY_NAME}，原因: {reason}。新余额: {new_balance}"
             )
@@ -104,6 +128,7 @@ class CoinService:
                 await session.flush()
                 new_balance = row.balance
 
+            leaderboard_service.record_coin_balance(user_id, new_balance)
             log.info(
                 f"用户 {user_id} 消费 {amount} {CURRENCY_NAME}，原因: {reason}。新余额: {new_balance}"
             )
@@ -149,6 +174,62 @@ class CoinService:
         log.info(f"用户 {user_id} 获得每日首次与AI对话奖励 ({reward_amount} {CURRENCY_NAME})。")
         return True
 
+    async def grant_daily_message_rewards(
+        self, session, user_ids, today_str: str
+    ) -> list:
+        """
+        在调用方的事务中批量发放每日首次对话奖励（由 user_state_aggregator 调用）。
+
+        与 grant_daily_message_reward 判定一致：last_daily_message_date 早于 today_str 才发放。
+        返回实际获得奖励的用户ID列表。
+        """
+        uids = sorted({str(user_id) for user_id in user_ids})
+        if not uids:
+            return []
+        today = datetime.fromisoformat(today_str).date()
+        result = await session.execute(
+            select(UserCoins)
+            .where(UserCoins.user_id.in_(uids))
+            .order_by(UserCoins.user_id)
+            .with_for_update()
+        )
+        rows = {row.user_id: row for row in result.scalars()}
+
+        reward_amount = COIN_CONFIG["DAILY_FIRST_CHAT_REWARD"]
+        granted = []
+        for uid in uids:
+            row = rows.get(uid)
+            if row and row.last_daily_message_date:
+                last_daily_date = datetime.fromisoformat(
+                    row.last_daily_message_date
+                ).date()
+                if last_daily_date >= today:
+                    continue
+            if row:
+                row.balance += reward_amount
+                row.last_daily_message_date = today_str
+            else:
+                session.add(
+                    UserCoins(
+                        user_id=uid,
+                        balance=reward_amount,
+                        last_daily_message_date=today_str,
+                    )
+                )
+            session.add(
+                CoinTransaction(
+                    user_id=uid, amount=reward_amount, reason="每日首次与AI对话奖励"
+                )
+            )
+            granted.append(int(uid))
+
+        if granted:
+            log.info(
+                f"批量发放每日首次对话奖励: {len(granted)} 名用户 "
+                f"(每人 {reward_amount} {CURRENCY_NAME})。"
+            )
+        return granted
+
     async def add_item_to_shop(
         self,
         name: str,
@@ -185,74 +266,18 @@ class CoinService:
                 session.add(new_item)
 
             await session.commit()
+            shop_catalog.invalidate()
             log.info(f"已添加或更新商品: {name} ({category})")
 
+    # 商品读取走内存目录快照（shop_catalog），写操作后调用 shop_catalog.invalidate()
     async def get_items_by_category(self, category: str) -> list:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(ShopItem)
-                .where(ShopItem.category == category)
-                .where(ShopItem.is_available == 1)
-                .order_by(ShopItem.price)
-            )
-            items = result.scalars().all()
-            return [
-                {
-                    "item_id": item.id,
-                    "name": item.name,
-                    "description": item.description,
-                    "price": item.price,
-                    "category": item.category,
-                    "target": item.target,
-                    "effect_id": item.effect_id,
-                    "cg_url": item.cg_url,
-                    "is_available": item.is_available,
-                }
-                for item in items
-            ]
+        return await shop_catalog.get_items_by_category(category)
 
     async def get_all_items(self) -> list:
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(ShopItem)
-                .where(ShopItem.is_available == 1)
-                .order_by(ShopItem.category, ShopItem.price)
-            )
-            items = result.scalars().all()
-            return [
-                {
-                    "item_id": item.id,
-                    "name": item.name,
-                    "description": item.description,
-                    "price": item.price,
-                    "category": item.category,
-                    "target": item.target,
-                    "effect_id": item.effect_id,
-                    "cg_url": item.cg_url,
-                    "is_available": item.is_available,
-                }
-                for item in items
-            ]
+        return await shop_catalog.get_all_items()
 
     async def get_item_by_id(self, item_id: int):
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(ShopItem).where(ShopItem.id == item_id)
-            )
-            item = result.scalar_one_or_none()
-            if not item:
-                return None
-            return {
-                "item_id": item.id,
-                "name": item.name,
-                "description": item.description,
-                "price": item.price,
-                "category": item.category,
-                "target": item.target,
-                "effect_id": item.effect_id,
-                "cg_url": item.cg_url,
-                "is_available": item.is_available,
-            }
+        return await shop_catalog.get_item_by_id(item_id)
 
     async def purchase_item(
         self, user_id: int, guild_id: int, item_id: int, quantity: int = 1
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+商店商品目录的内存快照
+
+打开商店、翻页、点击购买都会读取商品；商品只有在管理员添加 / 修改时才变化。
+这里把 shop.shop_items 整表载入为不可变快照，并建立按 ID 与按类别的索引：
+- 写操作（add_item_to_shop、初始化填充等）调用 invalidate() 使快照失效，下次读取时重新载入
+- CATALOG_TTL_SECONDS 作为兜底，防止直接改库后一直读到旧数据
+- 返回给调用方的都是字典副本，调用方可以随意修改（例如按用户调整价格）
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from src.chat.config.chat_config import SHOP_CACHE_CONFIG
+from src.database.database import AsyncSessionLocal
+from src.database.models import ShopItem
+
+log = logging.getLogger(__name__)
+
+
+def _item_to_dict(item: ShopItem) -> Dict[str, Any]:
+    return {
+        "item_id": item.id,
+        "name": item.name,
+        "description": item.description,
+        "price": item.price,
+        "category": item.category,
+        "target": item.target,
+        "effect_id": item.effect_id,
+        "cg_url": item.cg_url,
+        "is_available": item.is_available,
+    }
+
+
+class CatalogSnapshot:
+    """某一时刻的完整商品目录"""
+
+    __slots__ = ("items", "by_id", "by_category", "loaded_at")
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        # 上架商品按 (类别, 价格) 排序，与原先 get_all_items 的 ORDER BY 一致
+        available = sorted(
+            (row for row in rows if row["is_available"] == 1),
+            key=lambda row: (row["category"], row["price"]),
+        )
+        self.items: Tuple[Dict[str, Any], ...] = tuple(available)
+        # by_id 包含下架商品（get_item_by_id 原本不过滤 is_available）
+        self.by_id: Dict[int, Dict[str, Any]] = {row["item_id"]: row for row in rows}
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for row in available:
+            by_category.setdefault(row["category"], []).append(row)
+        self.by_category: Dict[str, Tuple[Dict[str, Any], ...]] = {
+            category: tuple(sorted(items, key=lambda row: row["price"]))
+            for category, items in by_category.items()
+        }
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+
+class ShopCatalog:
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else SHOP_CACHE_CONFIG["CATALOG_TTL_SECONDS"]
+        )
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+        # 每次失效加一；载入期间发生失效时，载入结果不会被当作最新快照
+        self._generation = 0
+        self.loads = 0
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+        log.debug("商店商品目录缓存已失效。")
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and time.monotonic() - snapshot.loaded_at < self.ttl_seconds
+        )
+
+    async def _load_rows(self) -> List[Dict[str, Any]]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(ShopItem))
+            return [_item_to_dict(item) for item in result.scalars().all()]
+
+    async def get_snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        async with self._lock:
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+            generation = self._generation
+            snapshot = CatalogSnapshot(await self._load_rows())
+            self.loads += 1
+            if generation == self._generation:
+                self._snapshot = snapshot
+            log.debug(f"已载入商店商品目录: {len(snapshot)} 个商品。")
+            return snapshot
+
+    async def get_all_items(self) -> List[Dict[str, Any]]:
+        snapshot = await self.get_snapshot()
+        return [dict(item) for item in snapshot.items]
+
+    async def get_items_by_category(self, category: str) -> List[Dict[str, Any]]:
+        snapshot = await self.get_snapshot()
+        return [dict(item) for item in snapshot.by_category.get(category, ())]
+
+    async def get_item_by_id(self, item_id: int) -> Optional[Dict[str, Any]]:
+        snapshot = await self.get_snapshot()
+        item = snapshot.by_id.get(item_id)
+        return dict(item) if item is not None else None
+
+
+shop_catalog = ShopCatalog()
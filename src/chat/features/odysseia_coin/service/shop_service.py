@@ -4,8 +4,10 @@ import logging
 import os
 
 from src.chat.features.odysseia_coin.service.coin_service import coin_service
+from src.chat.features.odysseia_coin.service.shop_catalog import shop_catalog
 from src.chat.services.event_service import event_service
 import asyncio
+import time
 from sqlalchemy import text, select
 from src.database.database import AsyncSessionLocal
 from src.database.models import ShopItem
@@ -14,9 +16,12 @@ from src.chat.features.tutorial_search.services.tutorial_rag_service import (
     tutorial_rag_service,
 )
 from src.chat.config.shop_config import SHOP_ITEMS, BOT_EATING_IMAGES
+from src.chat.config.chat_config import SHOP_CACHE_CONFIG
 
 log = logging.getLogger(__name__)
 
+SHOP_ANNOUNCEMENT_PATH = "src/chat/features/odysseia_coin/shop_announcement.md"
+
 
 @dataclass
 class ShopData:
@@ -36,6 +41,11 @@ class ShopService:
 
     def __init__(self):
         self._initialized = False
+        # 公告原文按文件 (mtime_ns, size) 缓存
+        self._announcement_key: Optional[tuple] = None
+        self._announcement_text: Optional[str] = None
+        # {guidance_url} 的取值缓存: (值, 载入时间)
+        self._guidance_url: Optional[tuple] = None
 
     async def _ensure_shop_items_initialized(self):
         """
@@ -45,6 +55,14 @@ class ShopService:
         if self._initialized:
             return
 
+        # 目录快照非空即说明已初始化，省去单独的 SELECT ... LIMIT 1
+        try:
+            if len(await shop_catalog.get_snapshot()) > 0:
+                self._initialized = True
+                return
+        except Exception as e:
+            log.warning(f"读取商店商品目录失败，改为直接检查商品表: {e}")
+
         try:
             async with AsyncSessionLocal() as session:
                 # 检查商品表是否为空
@@ -85,6 +103,7 @@ class ShopService:
 
                 # 提交所有更改
                 await session.commit()
+                shop_catalog.invalidate()
                 log.info(f"商店商品数据自动填充完成，共添加 {success_count} 个商品")
 
             self._initialized = True
@@ -107,13 +126,14 @@ class ShopService:
             # 0. 确保商品数据已初始化
             await self._ensure_shop_items_initialized()
 
-            # 1. 获取用户余额和商品列表
-            balance = await coin_service.get_balance(user_id)
-            items_rows = await coin_service.get_all_items()
-            items = [dict(item) for item in items_rows]
+            # 1. 获取用户余额和商品列表（商品来自内存目录，返回的是副本）
+            (
+                balance,
+                has_personal_memory,
+            ) = await coin_service.get_balance_and_personal_memory(user_id)
+            items = await coin_service.get_all_items()
 
             # 2. 处理特定商品的业务逻辑（例如，个人记忆功能）
-            has_personal_memory = await coin_service._has_personal_memory(user_id)
             if has_personal_memory:
                 for item in items:
                     if item.get("name") == "个人记忆功能":
@@ -140,22 +160,47 @@ class ShopService:
             log.error(f"为用户 {user_id} 准备商店数据时出错: {e}", exc_info=True)
             raise
 
+    def invalidate_announcement(self) -> None:
+        """guidance_url 变化时调用，下次打开商店重新读取"""
+        self._guidance_url = None
+
+    def _read_announcement_file(self) -> Optional[str]:
+        """读取公告原文；文件未变化时直接返回缓存"""
+        try:
+            stat = os.stat(SHOP_ANNOUNCEMENT_PATH)
+        except FileNotFoundError:
+            self._announcement_key = None
+            self._announcement_text = None
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key != self._announcement_key:
+            if stat.st_size == 0:
+                content = None
+            else:
+                with open(SHOP_ANNOUNCEMENT_PATH, "r", encoding="utf-8") as f:
+                    content = f.read()
+            self._announcement_key = key
+            self._announcement_text = content
+        return self._announcement_text
+
+    async def _get_guidance_url(self) -> Optional[str]:
+        cached = self._guidance_url
+        ttl = SHOP_CACHE_CONFIG["GUIDANCE_URL_TTL_SECONDS"]
+        if cached is not None and time.monotonic() - cached[1] < ttl:
+            return cached[0]
+        url = await chat_db_manager.get_global_setting("guidance_url")
+        self._guidance_url = (url, time.monotonic())
+        return url
+
     async def _get_shop_announcement(self) -> Optional[str]:
         """读取商店公告文件内容，并替换动态变量"""
         try:
-            announcement_path = "src/chat/features/odysseia_coin/shop_announcement.md"
-            if not (
-                os.path.exists(announcement_path)
-                and os.path.getsize(announcement_path) > 0
-            ):
+            content = self._read_announcement_file()
+            if not content:
                 return None
-            with open(announcement_path, "r", encoding="utf-8") as f:
-                content = f.read()
 
             if "{guidance_url}" in content:
-                from src.chat.utils.database import chat_db_manager
-
-                url = await chat_db_manager.get_global_setting("guidance_url")
+                url = await self._get_guidance_url()
                 if url:
                     content = content.replace("{guidance_url}", url)
                 else:
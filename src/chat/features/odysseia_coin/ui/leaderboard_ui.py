@@ -1,13 +1,21 @@
 import discord
 import logging
-from typing import List, Dict, Any, TYPE_CHECKING, TypeVar, cast
+from itertools import islice
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TYPE_CHECKING,
+    TypeVar,
+    cast,
+)
 from discord.ext import commands
 
 from src.config import CURRENCY_NAME
-from src.chat.utils.database import chat_db_manager
-from src.database.database import AsyncSessionLocal
-from src.database.models import UserCoins
-from sqlalchemy import select, desc
+from src.chat.services.leaderboard_service import RankedBoard, leaderboard_service
 
 if TYPE_CHECKING:
     from .shop_ui import SimpleShopView
@@ -40,6 +48,8 @@ class LeaderboardView(discord.ui.View):
         self.leaderboard_type = "coins"  # 默认显示类脑币排行榜
         self.total_pages = 1
         self.leaderboard_data = []
+        # 当前榜单上自己的名次，刷新榜单时计算一次，翻页时沿用
+        self.my_rank: Optional[int] = None
 
         # 添加按钮
         self.add_item(CoinsLeaderboardButton())
@@ -52,11 +62,10 @@ class LeaderboardView(discord.ui.View):
         self._initialized = False
 
     async def refresh_leaderboard(self):
-        """刷新排行榜数据"""
-        if self.leaderboard_type == "coins":
-            self.leaderboard_data = await self.get_coin_leaderboard()
-        else:
-            self.leaderboard_data = await self.get_sell_body_leaderboard()
+        """刷新排行榜数据与页脚中自己的名次"""
+        board = await self._get_board()
+        self.leaderboard_data = self._resolve_entries(board, 20)
+        self.my_rank = self._resolved_rank_of(board, self.author.id)
 
         # 计算总页数（每页10个用户，总共20个用户分2页）
         self.total_pages = max(1, (len(self.leaderboard_data) + 9) // 10)
@@ -68,71 +77,61 @@ class LeaderboardView(discord.ui.View):
         # 标记为已初始化
         self._initialized = True
 
-    async def get_coin_leaderboard(self, limit: int = 20) -> List[Dict[str, Any]]:
-        """获取类脑币排行榜数据"""
-        async with AsyncSessionLocal() as session:
-            result = await session.execute(
-                select(UserCoins)
-                .where(UserCoins.balance > 0)
-                .order_by(desc(UserCoins.balance))
-                .limit(limit)
-            )
-            rows = result.scalars().all()
-
-        leaderboard = []
+    def _iter_resolved(
+        self, board: RankedBoard
+    ) -> Iterator[Tuple[int, int, discord.User, int]]:
+        """按名次遍历内存榜单，跳过无法解析的用户，产出 (名次, 用户ID, 用户, 分值)。"""
         rank = 1
-        for row in rows:
+        for user_id, value in board.iter_ranked():
             try:
-                user = self.bot.get_user(int(row.user_id))
-                if user:
-                    leaderboard.append(
-                        {
-                            "rank": rank,
-                            "user_id": row.user_id,
-                            "username": user.display_name,
-                            "value": row.balance,
-                        }
-                    )
-                    rank += 1
+                user = self.bot.get_user(user_id)
             except Exception as e:
-                log.warning(f"获取用户 {row.user_id} 信息失败: {e}")
+                log.warning(f"获取用户 {user_id} 信息失败: {e}")
                 continue
+            if user:
+                yield rank, user_id, user, value
+                rank += 1
+
+    def _resolve_entries(
+        self, board: RankedBoard, limit: int
+    ) -> List[Dict[str, Any]]:
+        """取前 limit 名可解析的用户。"""
+        return [
+            {
+                "rank": rank,
+                "user_id": user_id,
+                "username": user.display_name,
+                "value": value,
+            }
+            for rank, user_id, user, value in islice(self._iter_resolved(board), limit)
+        ]
+
+    def _resolved_rank_of(self, board: RankedBoard, user_id: int) -> Optional[int]:
+        """与榜单显示一致的名次：跳过无法解析的用户；不在榜上时返回 None。"""
+        if board.rank_of(user_id) is None:
+            return None
+        for entry in self.leaderboard_data:
+            if entry["user_id"] == user_id:
+                return entry["rank"]
+        for rank, entry_id, _, _ in self._iter_resolved(board):
+            if entry_id == user_id:
+                return rank
+        return None
+
+    async def _get_board(self) -> RankedBoard:
+        if self.leaderboard_type == "coins":
+            return await leaderboard_service.get_coin_board()
+        return await leaderboard_service.get_sell_body_board()
 
-        return leaderboard
+    async def get_coin_leaderboard(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """获取类脑币排行榜数据"""
+        board = await leaderboard_service.get_coin_board()
+        return self._resolve_entries(board, limit)
 
     async def get_sell_body_leaderboard(self, limit: int = 20) -> List[Dict[str, Any]]:
         """获取卖屁股次数排行榜数据"""
-        query = """
-            SELECT user_id, total_sell_body_count
-            FROM user_work_status
-            WHERE total_sell_body_count > 0
-            ORDER BY total_sell_body_count DESC
-            LIMIT ?
-        """
-        results = await chat_db_manager._execute(
-            chat_db_manager._db_transaction, query, (limit,), fetch="all"
-        )
-
-        leaderboard = []
-        rank = 1
-        for row in results:
-            try:
-                user = self.bot.get_user(row["user_id"])
-                if user:
-                    leaderboard.append(
-                        {
-                            "rank": rank,
-                            "user_id": row["user_id"],
-                            "username": user.display_name,
-                            "value": row["total_sell_body_count"],
-                        }
-                    )
-                    rank += 1
-            except Exception as e:
-                log.warning(f"获取用户 {row['user_id']} 信息失败: {e}")
-                continue
-
-        return leaderboard
+        board = await leaderboard_service.get_sell_body_board()
+        return self._resolve_entries(board, limit)
 
     async def create_leaderboard_embed(self) -> discord.Embed:
         """创建排行榜Embed"""
@@ -186,7 +185,10 @@ class LeaderboardView(discord.ui.View):
                 inline=False,
             )
 
-        embed.set_footer(text=f"第 {self.current_page + 1}/{self.total_pages} 页")
+        footer = f"第 {self.current_page + 1}/{self.total_pages} 页"
+        if self.my_rank is not None:
+            footer += f" · 你的排名: 第 {self.my_rank} 名"
+        embed.set_footer(text=footer)
         return embed
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
@@ -1,7 +1,8 @@
 import discord
 
 from src.config import BOT_NAME, CURRENCY_NAME, MASCOT_TITLE
-from src.chat.utils.database import chat_db_manager
+from src.chat.features.tools.services.search_executor import search_executor
+from src.chat.utils.database import chat_db_manager, get_beijing_today_str
 
 from .base_panel import BasePanel
 
@@ -189,7 +190,11 @@ class DailyPanel(BasePanel):
             embed.add_field(name="星辰指引", value=tarot_stats_text, inline=False)
 
             # --- 获取并显示今日论坛搜索次数 ---
+            # 加上尚未批量写入数据库的次数
             forum_search_count = await chat_db_manager.get_forum_search_count_today()
+            forum_search_count += search_executor.forum_search_counter.pending_for(
+                get_beijing_today_str()
+            )
             if forum_search_count == 0:
                 forum_comment = "今天论坛好安静呀，都没有人找我搜东西。"
             elif forum_search_count <= 10:
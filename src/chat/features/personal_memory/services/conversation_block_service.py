@@ -18,10 +18,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.database import AsyncSessionLocal
 from src.database.models import ConversationBlock
 from src.chat.services.embedding_factory import (
+    get_embedding_column,
     get_embedding_service,
+    get_vector_mode,
     is_vector_enabled,
 )
 from src.chat.config import chat_config
+from src.chat.utils.text_normalization import strip_discord_emojis
 from src.config import BOT_NAME
 
 log = logging.getLogger(__name__)
@@ -108,15 +111,9 @@ class ConversationBlockService:
         Returns:
             清理后的文本
         """
-        # 匹配 <:name:id> 和 <a:name:id> 格式的 Discord 表情
         # 静态表情: <:emoji_name:123456789>
         # 动态表情: <a:emoji_name:123456789>
-        import re
-
-        cleaned = re.sub(r"<a?:[^:]+:\d+>", "", text)
-        # 清理多余的空格
-        cleaned = re.sub(r"\s+", " ", cleaned).strip()
-        return cleaned
+        return strip_discord_emojis(text)
 
     def _format_conversation_text(self, history: List[Dict]) -> str:
         """
@@ -172,6 +169,32 @@ class ConversationBlockService:
             now = datetime.now()
             return now, now
 
+    async def _generate_embeddings(
+        self, conversation_text: str
+    ) -> Dict[str, List[float]]:
+        """
+        生成对话块需要写入的嵌入向量，返回 {列名: 向量}。
+        本地模式下按 embedding_lifecycle.write_models 生成（切换模型的回填期间为新旧两个），
+        其他模式只生成当前服务的向量。
+        """
+        if get_vector_mode() != "local":
+            embedding_service = await get_embedding_service()
+            embedding = await embedding_service.generate_embedding(
+                text=conversation_text, task_type="retrieval_document"
+            )
+            if not embedding:
+                return {}
+            embedding_col = await get_embedding_column()
+            if embedding_col != "qwen_embedding":
+                embedding_col = "bge_embedding"
+            return {embedding_col: embedding}
+
+        from src.chat.services.embedding_lifecycle import embedding_lifecycle
+
+        return await embedding_lifecycle.generate_embeddings(
+            "conversation.conversation_blocks", conversation_text
+        )
+
     async def create_block_from_history(
         self,
         discord_id: str,
@@ -213,11 +236,8 @@ class ConversationBlockService:
 
         # 生成向量嵌入
         try:
-            embedding_service = await get_embedding_service()
-            embedding = await embedding_service.generate_embedding(
-                text=conversation_text, task_type="retrieval_document"
-            )
-            if not embedding:
+            embeddings = await self._generate_embeddings(conversation_text)
+            if not embeddings:
                 log.error(f"用户 {discord_id} 的对话块嵌入生成失败")
                 return None
         except Exception as e:
@@ -226,11 +246,6 @@ class ConversationBlockService:
 
         # 创建数据库记录
         async def _create_block(sess: AsyncSession) -> Optional[int]:
-            # 确定使用哪个嵌入列
-            from src.chat.services.embedding_factory import get_embedding_column
-
-            embedding_col = await get_embedding_column()
-
             block = ConversationBlock(
                 discord_id=discord_id,
                 conversation_text=conversation_text,
@@ -240,10 +255,8 @@ class ConversationBlockService:
             )
 
             # 设置对应的嵌入向量
-            if embedding_col == "qwen_embedding":
-                block.qwen_embedding = embedding
-            else:
-                block.bge_embedding = embedding
+            for embedding_col, embedding in embeddings.items():
+                setattr(block, embedding_col, embedding)
 
             sess.add(block)
             await sess.flush()
@@ -9,25 +9,31 @@
 """
 
 import logging
-import re
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
 from sqlalchemy import text
 
 from src.database.database import AsyncSessionLocal
+from src.database.vector_codec import to_halfvec
 from src.chat.services.embedding_factory import (
     get_embedding_service,
     get_embedding_column,
     is_vector_enabled,
 )
+from src.chat.services.embedding_storage import (
+    build_semantic_search_sql,
+    prepare_vector_search,
+)
 from src.chat.config import chat_config
+from src.chat.utils.text_normalization import clean_fts_query
 from src.chat.features.personal_memory.services.conversation_block_service import (
     format_time_description,
 )
 
 log = logging.getLogger(__name__)
 
+CONVERSATION_BLOCKS_TABLE = "conversation.conversation_blocks"
 
 class ConversationMemorySearchService:
     """
@@ -48,7 +54,7 @@ class ConversationMemorySearchService:
         清理全文搜索查询，移除可能导致 paradedb 解析错误的特殊字符。
         只保留字母、数字、中日韩统一表意文字和空格。
         """
-        cleaned_query = re.sub(r"[^\w\s\u4e00-\u9fff]", "", query)
+        cleaned_query = clean_fts_query(query)
         log.debug(f"原始 FTS 查询: '{query}' -> 清理后: '{cleaned_query}'")
         return cleaned_query
 
@@ -74,7 +80,7 @@ class ConversationMemorySearchService:
         Returns:
             检索结果列表
         """
-        embedding_col = await get_embedding_column()
+        embedding_col = await get_embedding_column(CONVERSATION_BLOCKS_TABLE)
         embedding_model = "Qwen" if embedding_col == "qwen_embedding" else "BGE"
 
         # 混合搜索配置
@@ -97,22 +103,20 @@ class ConversationMemorySearchService:
         if exclude_block_ids:
             exclude_clause = f"AND id NOT IN ({','.join(map(str, exclude_block_ids))})"
 
+        semantic_search = build_semantic_search_sql(
+            columns="id",
+            from_clause="conversation.conversation_blocks",
+            column=embedding_col,
+            where=f"discord_id = :discord_id {exclude_clause}",
+        )
+
         # 混合搜索 SQL
         # 使用 RRF (Reciprocal Rank Fusion) 融合向量搜索和 BM25 搜索结果
         # 参考论坛搜索的实现方式
         sql_query = text(
             f"""
             WITH semantic_search AS (
-                SELECT
-                    id,
-                    {embedding_col} <=> CAST(:query_vector AS halfvec) as vector_distance,
-                    RANK() OVER (ORDER BY {embedding_col} <=> CAST(:query_vector AS halfvec)) as rank
-                FROM conversation.conversation_blocks
-                WHERE discord_id = :discord_id
-                  AND {embedding_col} IS NOT NULL
-                  {exclude_clause}
-                ORDER BY {embedding_col} <=> CAST(:query_vector AS halfvec)
-                LIMIT :top_k_vector
+                {semantic_search}
             ),
             keyword_search AS (
                 SELECT
@@ -150,12 +154,17 @@ class ConversationMemorySearchService:
         )
 
         try:
+            # 按 discord_id 过滤的检索依赖迭代扫描才能取满 top_k（见 VECTOR_SEARCH_PROFILES）
+            vector_params = await prepare_vector_search(
+                session, top_k_vector, profile="conversation"
+            )
             result = await session.execute(
                 sql_query,
                 {
+                    **vector_params,
                     "discord_id": discord_id,
                     "query_text": query_text,
-                    "query_vector": str(query_vector),
+                    "query_vector": to_halfvec(query_vector),
                     "top_k_vector": top_k_vector,
                     "top_k_fts": top_k_fts,
                     "rrf_k": rrf_k,
@@ -220,7 +229,9 @@ class ConversationMemorySearchService:
 
         try:
             # 生成查询嵌入
-            embedding_service = await get_embedding_service()
+            embedding_service = await get_embedding_service(
+                table=CONVERSATION_BLOCKS_TABLE
+            )
             query_embedding = await embedding_service.generate_embedding(
                 text=query, task_type="retrieval_query"
             )
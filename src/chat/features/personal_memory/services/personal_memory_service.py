@@ -40,6 +40,12 @@ class PersonalMemoryService:
 
         block_size = CONVERSATION_MEMORY_CONFIG.get("block_size", 10)
 
+        # 写回缓冲中还有该用户的对话时先落库，保证阈值判断与打包内容完整
+        from src.chat.services.user_state_aggregator import user_state_aggregator
+
+        if user_state_aggregator.has_pending_history(user_id):
+            await user_state_aggregator.flush()
+
         try:
             async with AsyncSessionLocal() as session:
                 stmt = select(CommunityMemberProfile).where(
@@ -170,6 +176,37 @@ class PersonalMemoryService:
         # --- [DISABLED] 印象总结功能（flash模型）已禁用 ---
         # await self._check_and_summarize_blocks(user_id, current_model)
 
+    async def append_history_batch(
+        self, session, turns_by_user: Dict[int, List[Dict]]
+    ) -> int:
+        """
+        在调用方的事务中批量追加对话历史（由 user_state_aggregator 调用）。
+
+        没有个人档案的用户会被跳过。返回实际更新的档案数。
+        """
+        if not turns_by_user:
+            return 0
+        discord_ids = sorted(str(user_id) for user_id in turns_by_user)
+        result = await session.execute(
+            select(CommunityMemberProfile)
+            .where(CommunityMemberProfile.discord_id.in_(discord_ids))
+            .order_by(CommunityMemberProfile.discord_id)
+            .with_for_update()
+        )
+        profiles = {profile.discord_id: profile for profile in result.scalars()}
+
+        updated = 0
+        for user_id, turns in turns_by_user.items():
+            profile = profiles.get(str(user_id))
+            if not profile:
+                log.warning(f"用户 {user_id} 没有个人档案，无法记录记忆。")
+                continue
+            new_history = list(getattr(profile, "history", []) or [])
+            new_history.extend(turns)
+            setattr(profile, "history", new_history)
+            updated += 1
+        return updated
+
     # --- [DISABLED] 印象总结功能（flash模型）已禁用 - 以下两个方法不再使用 ---
     # async def _check_and_summarize_blocks(
     #     self, user_id: int, current_model: str | None = None
@@ -299,11 +336,15 @@ class PersonalMemoryService:
             result = await session.execute(stmt)
             history = result.scalars().first()
 
-            if not history:
-                return []
+        # 合并尚在写回缓冲中的对话
+        from src.chat.services.user_state_aggregator import user_state_aggregator
 
-            history_list = list(history)
-            return history_list[-limit:] if len(history_list) > limit else history_list
+        history_list = list(history or []) + user_state_aggregator.pending_history(
+            user_id
+        )
+        if not history_list:
+            return []
+        return history_list[-limit:] if len(history_list) > limit else history_list
 
     async def update_summary_manually(self, user_id: int, new_summary: str):
         """
@@ -324,6 +365,12 @@ class PersonalMemoryService:
         )
         await session.execute(stmt)
 
+    async def _flush_pending_history(self):
+        """重置历史前先写完缓冲中的对话，避免之后被写回的旧对话覆盖重置结果。"""
+        from src.chat.services.user_state_aggregator import user_state_aggregator
+
+        await user_state_aggregator.flush()
+
     async def _reset_history_and_count(self, session, user_id: int):
         """私有方法：只重置计数和历史。"""
         stmt = (
@@ -343,6 +390,7 @@ class PersonalMemoryService:
         在 ParadeDB 中更新摘要，同时重置个人消息计数和对话历史。
         (重构后，此函数调用两个独立的私有方法)
         """
+        await self._flush_pending_history()
         async with AsyncSessionLocal() as session:
             async with session.begin():
                 await self._update_summary(session, user_id, new_summary)
@@ -372,6 +420,7 @@ class PersonalMemoryService:
         这仅删除指定用户的对话历史记录和重置消息计数，不影响其个人记忆摘要。
         """
         log.info(f"正在为用户 {user_id} 删除对话历史...")
+        await self._flush_pending_history()
         async with AsyncSessionLocal() as session:
             async with session.begin():
                 await self._reset_history_and_count(session, user_id)
@@ -1,18 +1,36 @@
 import asyncio
 import io
 import json
+import logging
 import os
 import random
+import threading
+import time
+from collections import OrderedDict
 from typing import List, Dict, Any, Tuple, Optional
 
 from PIL import Image
 
 from src.chat.config.chat_config import TAROT_CONFIG
 
+log = logging.getLogger(__name__)
+
+# (image_file, orientation)
+CardKey = Tuple[str, str]
+
+SPREAD_PADDING = 25
+SPREAD_BACKGROUND = "#1E1E1E"
+
 
 class TarotService:
     _instance = None
     _cards = []
+    # Pre-rendered card images at spread size, keyed by (image_file, orientation)
+    _atlas: Dict[CardKey, Image.Image] = {}
+    _atlas_lock = threading.Lock()
+    # Recently rendered spreads: tuple of CardKey -> encoded image bytes
+    _spread_cache: "OrderedDict[Tuple[CardKey, ...], bytes]" = OrderedDict()
+    _spread_cache_lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -31,10 +49,10 @@ class TarotService:
             ) as f:
                 self._cards = json.load(f)
         except FileNotFoundError:
-            print("Error: tarot_cards.json not found. Make sure the path is correct.")
+            log.error("tarot_cards.json not found. Make sure the path is correct.")
             self._cards = []
         except json.JSONDecodeError:
-            print("Error: Could not decode tarot_cards.json. Check for syntax errors.")
+            log.error("Could not decode tarot_cards.json. Check for syntax errors.")
             self._cards = []
 
     def draw_cards(self, count: int = 3) -> List[Dict[str, Any]]:
@@ -45,63 +63,141 @@ class TarotService:
         if not self._cards:
             return []
 
-        drawn_cards = random.sample(self._cards, count)
+        # Copy so concurrent readings never share (and overwrite) an orientation
+        return [
+            dict(card, orientation=random.choice(["upright", "reversed"]))
+            for card in random.sample(self._cards, count)
+        ]
+
+    @property
+    def spread_image_extension(self) -> str:
+        """File extension matching SPREAD_IMAGE_FORMAT."""
+        return TAROT_CONFIG["SPREAD_IMAGE_FORMAT"].lower()
+
+    def _render_card(self, image_file: str) -> Optional[Image.Image]:
+        """Opens one card file and resizes it to CARD_SIZE."""
+        card_path = os.path.join(TAROT_CONFIG["CARDS_PATH"], image_file)
+        if not os.path.exists(card_path):
+            log.warning(f"Card image not found at {card_path}")
+            return None
 
-        for card in drawn_cards:
-            card["orientation"] = random.choice(["upright", "reversed"])
+        card_width, card_height = TAROT_CONFIG["CARD_SIZE"]
+        with Image.open(card_path) as img:
+            # JPEG fast path: let the decoder downscale by 1/2, 1/4 or 1/8 first
+            img.draft("RGB", (card_width, card_height))
+            has_alpha = "A" in img.getbands() or "transparency" in img.info
+            card_img = img.convert("RGBA" if has_alpha else "RGB")
+        return card_img.resize((card_width, card_height), Image.Resampling.LANCZOS)
 
-        return drawn_cards
+    def build_atlas(self) -> int:
+        """
+        (Sync) Pre-renders every card and its reversed variant at spread size.
+        Safe to call more than once; returns the number of atlas entries.
+        """
+        with self._atlas_lock:
+            if self._atlas:
+                return len(self._atlas)
+
+            started = time.perf_counter()
+            atlas: Dict[CardKey, Image.Image] = {}
+            for card in self._cards:
+                image_file = card["image_file"]
+                card_img = self._render_card(image_file)
+                if card_img is None:
+                    continue
+                atlas[(image_file, "upright")] = card_img
+                atlas[(image_file, "reversed")] = card_img.rotate(180)
+
+            TarotService._atlas = atlas
+            log.info(
+                f"Tarot card atlas built: {len(atlas)} images "
+                f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+            return len(atlas)
+
+    async def warm_up(self) -> None:
+        """(Async) Builds the card atlas in a worker thread."""
+        await asyncio.to_thread(self.build_atlas)
+
+    def _get_cached_spread(self, key: Tuple[CardKey, ...]) -> Optional[bytes]:
+        with self._spread_cache_lock:
+            data = self._spread_cache.get(key)
+            if data is not None:
+                self._spread_cache.move_to_end(key)
+            return data
+
+    def _cache_spread(self, key: Tuple[CardKey, ...], data: bytes) -> None:
+        max_size = TAROT_CONFIG["SPREAD_CACHE_SIZE"]
+        if max_size <= 0:
+            return
+        with self._spread_cache_lock:
+            self._spread_cache[key] = data
+            self._spread_cache.move_to_end(key)
+            while len(self._spread_cache) > max_size:
+                self._spread_cache.popitem(last=False)
+
+    def _encode_spread(self, background: Image.Image) -> bytes:
+        img_byte_arr = io.BytesIO()
+        image_format = TAROT_CONFIG["SPREAD_IMAGE_FORMAT"].upper()
+        if image_format == "WEBP":
+            background.save(
+                img_byte_arr, format="WEBP", quality=TAROT_CONFIG["WEBP_QUALITY"]
+            )
+        else:
+            background.save(
+                img_byte_arr,
+                format="PNG",
+                compress_level=TAROT_CONFIG["PNG_COMPRESS_LEVEL"],
+            )
+        return img_byte_arr.getvalue()
 
     def _generate_spread_image_sync(
         self, cards: List[Dict[str, Any]]
     ) -> Optional[bytes]:
         """
-        (Sync) Generates a tarot spread image from card files using Pillow.
+        (Sync) Composes a tarot spread image from the pre-rendered card atlas.
         This function is designed to be run in a separate thread.
         """
         try:
+            key = tuple((card["image_file"], card["orientation"]) for card in cards)
+            cached = self._get_cached_spread(key)
+            if cached is not None:
+                return cached
+
+            if not self._atlas:
+                self.build_atlas()
+
             # --- Image Dimensions ---
-            card_width, card_height = 275, 475
-            padding = 25
+            card_width, card_height = TAROT_CONFIG["CARD_SIZE"]
+            padding = SPREAD_PADDING
             num_cards = len(cards)
             spread_width = (card_width * num_cards) + (padding * (num_cards + 1))
             spread_height = card_height + (padding * 2)
 
             # --- Create Background ---
             background = Image.new(
-                "RGB", (spread_width, spread_height), color="#1E1E1E"
+                "RGB", (spread_width, spread_height), color=SPREAD_BACKGROUND
             )
 
             # --- Paste Cards ---
-            for i, card in enumerate(cards):
-                # Construct file path
-                file_name = card["image_file"]
-                card_path = os.path.join(TAROT_CONFIG["CARDS_PATH"], file_name)
-
-                if not os.path.exists(card_path):
-                    print(f"Warning: Card image not found at {card_path}")
+            for i, card_key in enumerate(key):
+                card_img = self._atlas.get(card_key)
+                if card_img is None:
+                    log.warning(f"Card image missing from atlas: {card_key[0]}")
                     continue
 
-                # Open, resize, and rotate card image
-                card_img = Image.open(card_path).convert("RGBA")
-                card_img = card_img.resize(
-                    (card_width, card_height), Image.Resampling.LANCZOS
-                )
-                if card["orientation"] == "reversed":
-                    card_img = card_img.rotate(180)
-
-                # Calculate position and paste
                 x_pos = (i * card_width) + ((i + 1) * padding)
                 y_pos = padding
-                background.paste(card_img, (x_pos, y_pos), card_img)
+                mask = card_img if card_img.mode == "RGBA" else None
+                background.paste(card_img, (x_pos, y_pos), mask)
 
             # --- Save to Bytes ---
-            img_byte_arr = io.BytesIO()
-            background.save(img_byte_arr, format="PNG")
-            return img_byte_arr.getvalue()
+            data = self._encode_spread(background)
+            self._cache_spread(key, data)
+            return data
 
         except Exception as e:
-            print(f"Error generating tarot spread image: {e}")
+            log.error(f"Error generating tarot spread image: {e}", exc_info=True)
             return None
 
     async def _generate_spread_image(
@@ -9,6 +9,7 @@ from datetime import datetime, timezone, timedelta
 
 from src.chat.services.ai.service import ai_service
 from src.chat.services.ai.providers.base import GenerationConfig
+from src.chat.services.thread_metadata_cache import thread_metadata_cache
 from src.chat.config.thread_prompts import get_random_praise_prompt
 from src.chat.config.prompts import PROMPT_CONFIG
 from src.chat.utils.prompt_utils import replace_emojis, get_thread_commentor_persona
@@ -114,16 +115,12 @@ class ThreadCommentorService:
                 return None
 
             # 1. 获取帖子的初始消息
-            # 注意：thread.starter_message 可能返回缓存中不完整的消息对象
-            # 始终使用 fetch_message 来获取完整内容
+            # 与提示词构建、论坛索引、发帖奖励共用帖子元数据缓存，
+            # 缓存内部会在 starter_message 不完整时重新拉取
             log.info("[暖贴调试] 尝试获取帖子初始消息...")
             try:
-                # 使用 thread.id 作为起始消息的 ID
-                first_message = await thread.fetch_message(thread.id)
-                log.info("[暖贴调试] 从 fetch_message 获取成功")
-            except discord.NotFound:
-                log.warning(f"[暖贴调试] 无法找到帖子 {thread.id} 的初始消息")
-                first_message = None
+                metadata = await thread_metadata_cache.get(thread)
+                first_message = metadata.starter_message
             except Exception as e:
                 log.error(f"[暖贴调试] 获取帖子初始消息时出错: {e}")
                 first_message = None
@@ -146,8 +143,8 @@ class ThreadCommentorService:
                 return None
 
             # 2. 准备帖子内容
-            title = thread.name
-            tags = ", ".join([tag.name for tag in thread.applied_tags])
+            title = metadata.title
+            tags = ", ".join(metadata.tags)
 
             # 处理内容：如果没有文字但有附件，使用占位符
             content = first_message.content
@@ -13,6 +13,7 @@ from pydantic import BaseModel, Field
 import discord
 
 from src.chat.features.odysseia_coin.service.coin_service import coin_service
+from src.chat.services.http_client_registry import http_client_registry
 from src.chat.features.tools.tool_metadata import tool_metadata
 from src.config import CURRENCY_NAME
 
@@ -92,13 +93,14 @@ async def get_user_profile(
                 avatar_url = str(user.display_avatar.url)
                 result["profile"]["avatar_url"] = avatar_url
 
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(avatar_url)
-                    response.raise_for_status()
-                    image_bytes = response.content
-                    result["profile"]["avatar_image_base64"] = base64.b64encode(
-                        image_bytes
-                    ).decode("utf-8")
+                # 与下载消息中的图片一样，Discord CDN 通过 PROXY_URL 访问
+                client = http_client_registry.get_client(use_proxy=True)
+                response = await client.get(avatar_url)
+                response.raise_for_status()
+                image_bytes = response.content
+                result["profile"]["avatar_image_base64"] = base64.b64encode(
+                    image_bytes
+                ).decode("utf-8")
 
                 result["queries_successful"].append("avatar")
                 log.info(f"成功获取用户 {target_id} 的头像 URL 并下载了图片。")
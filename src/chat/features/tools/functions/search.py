@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import asyncio
 import logging
 import re
 import time
@@ -23,7 +22,13 @@ from src.chat.features.personal_memory.services.conversation_memory_search_servi
     conversation_memory_search_service,
 )
 from src.chat.services.prompt_service import prompt_service
-from src.chat.utils.database import chat_db_manager
+from src.chat.config.chat_config import SEARCH_EXECUTOR_CONFIG
+from src.chat.features.tools.services.search_executor import (
+    freeze,
+    gather_with_partial_timeout,
+    normalize_query,
+    search_executor,
+)
 from src.chat.utils.time_utils import BEIJING_TZ
 from src.chat.features.tools.tool_metadata import tool_metadata
 
@@ -122,21 +127,29 @@ def _format_channel_results(messages: List[Dict]) -> List[Dict[str, Any]]:
     return results
 
 
+async def _fetch_channel_search(
+    bot, query: str, guild_id: int, channel_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    if channel_id:
+        route = Route(
+            "GET", "/channels/{channel_id}/messages/search", channel_id=channel_id
+        )
+    else:
+        route = Route("GET", "/guilds/{guild_id}/messages/search", guild_id=guild_id)
+    params = {"content": query}
+    data = await search_executor.discord_limiter.request(bot, route, params)
+    return _format_channel_results(data.get("messages", []))
+
+
 async def _execute_channel_search(
     bot, query: str, guild_id: int, channel_id: Optional[int] = None
 ) -> List[Dict[str, Any]]:
+    cache_key = ("channel", guild_id, channel_id, normalize_query(query))
     try:
-        if channel_id:
-            route = Route(
-                "GET", "/channels/{channel_id}/messages/search", channel_id=channel_id
-            )
-        else:
-            route = Route(
-                "GET", "/guilds/{guild_id}/messages/search", guild_id=guild_id
-            )
-        params = {"content": query}
-        data = await bot.http.request(route, params=params)
-        return _format_channel_results(data.get("messages", []))
+        return await search_executor.result_cache.get_or_compute(
+            cache_key,
+            lambda: _fetch_channel_search(bot, query, guild_id, channel_id),
+        )
     except discord.Forbidden:
         scope = f"频道 {channel_id}" if channel_id else f"服务器 {guild_id}"
         log.error(f"没有在 {scope} 中搜索消息的权限。")
@@ -222,12 +235,16 @@ async def _search_forum(params: SearchParams, **kwargs) -> Dict[str, Any]:
     if not forum_search_service.is_ready():
         return {"results": [], "error": "论坛搜索服务当前不可用，请稍后再试。"}
 
-    await chat_db_manager.increment_forum_search_count()
+    search_executor.forum_search_counter.increment()
 
     start_time = time.monotonic()
     safe_query = query if query is not None else ""
-    results = await forum_search_service.search(
-        safe_query, n_results=limit, filters=filter_dict, use_hybrid=True
+    cache_key = ("forum", normalize_query(safe_query), limit, freeze(filter_dict))
+    results = await search_executor.result_cache.get_or_compute(
+        cache_key,
+        lambda: forum_search_service.search(
+            safe_query, n_results=limit, filters=filter_dict, use_hybrid=True
+        ),
     )
     duration = time.monotonic() - start_time
     log.info(f"forum_search_service.search 调用完成, 耗时: {duration:.4f} 秒。")
@@ -279,25 +296,22 @@ async def _search_channel(params: SearchParams, **kwargs) -> Dict[str, Any]:
         int(channel_id) if channel_id and isinstance(channel_id, str) else channel_id
     )
 
-    tasks = []
-    task_names = []
-
+    tasks = {}
     if int_channel_id:
-        tasks.append(_execute_channel_search(bot, query, int_guild_id, int_channel_id))
-        task_names.append("channel")
-    tasks.append(_execute_channel_search(bot, query, int_guild_id))
-    task_names.append("guild")
-
-    results_list = await asyncio.gather(*tasks)
-
-    channel_results = []
-    guild_results = []
+        tasks["channel"] = _execute_channel_search(
+            bot, query, int_guild_id, int_channel_id
+        )
+    tasks["guild"] = _execute_channel_search(bot, query, int_guild_id)
+
+    # 其中一路较慢时不整体等待，先返回已完成的那一路
+    results, timed_out = await gather_with_partial_timeout(
+        tasks, SEARCH_EXECUTOR_CONFIG["CHANNEL_PARTIAL_TIMEOUT_SECONDS"]
+    )
+    if timed_out:
+        log.warning(f"频道搜索 {timed_out} 超时，仅返回已完成的部分结果。")
 
-    for name, result in zip(task_names, results_list):
-        if name == "channel":
-            channel_results = result
-        else:
-            guild_results = result
+    channel_results = results.get("channel") or []
+    guild_results = results.get("guild") or []
 
     all_channel_ids = {msg["id"] for msg in channel_results}
     unique_guild_results = [
@@ -305,6 +319,8 @@ async def _search_channel(params: SearchParams, **kwargs) -> Dict[str, Any]:
     ]
 
     combined = channel_results + unique_guild_results
+    if timed_out:
+        return {"results": combined, "partial": True}
     return {"results": combined}
 
 
@@ -438,11 +454,18 @@ async def search(
     if not tasks:
         return {"error": "没有可用的数据源。"}
 
-    results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+    results, timed_out = await gather_with_partial_timeout(
+        tasks, SEARCH_EXECUTOR_CONFIG["SOURCE_TIMEOUT_SECONDS"]
+    )
 
     output = {}
-    for name, result in zip(tasks.keys(), results):
-        if isinstance(result, Exception):
+    for name in tasks:
+        if name in timed_out:
+            log.warning(f"搜索数据源 '{name}' 超时。")
+            output[name] = {"results": [], "error": "搜索超时，请稍后再试。"}
+            continue
+        result = results[name]
+        if isinstance(result, BaseException):
             log.error(f"搜索数据源 '{name}' 失败: {result}", exc_info=result)
             output[name] = {"results": [], "error": str(result)}
         else:
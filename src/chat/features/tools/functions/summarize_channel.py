@@ -11,7 +11,6 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import discord
-from PIL import Image, ImageDraw, ImageFont
 from pydantic import BaseModel, Field
 
 from src.chat.features.tools.tool_metadata import tool_metadata
@@ -134,6 +133,9 @@ def text_to_summary_image(
     """
     将文本转换为一张自适应高度的长图，能正确处理换行和避让右上角的Logo。
     """
+    # Pillow 只在真正生成图片时才导入，避免拖慢启动时的工具加载
+    from PIL import Image, ImageDraw, ImageFont
+
     if title is None:
         title = f"{BOT_NAME}的总结时间到!"
     LOGO_PATH = "src/chat/assets/logo.png"
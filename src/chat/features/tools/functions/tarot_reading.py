@@ -81,7 +81,8 @@ async def tarot_reading(
             log.info(f"成功生成塔罗牌图片，准备发送到频道 {channel.id}。")
 
             image_file = discord.File(
-                io.BytesIO(image_data), filename="tarot_reading.png"
+                io.BytesIO(image_data),
+                filename=f"tarot_reading.{tarot_service.spread_image_extension}",
             )
             await channel.send(file=image_file)
 
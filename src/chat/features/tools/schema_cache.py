@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+工具 Schema 磁盘缓存
+
+extract_function_schema 需要解析签名并对 Pydantic 模型调用 model_json_schema()，
+每次重启都要为全部工具重新生成。这里把生成结果按「工具模块源码哈希」缓存到磁盘：
+- 键 = 模块路径；条目内记录源码哈希（同时混入 schema_utils 源码与 pydantic 版本）
+- 源码或生成逻辑变化时哈希不同，自动重新生成
+- 无法经 JSON 原样往返的 schema（例如默认值不是 JSON 类型）不缓存
+
+前提：工具的参数模型定义在工具模块自身（目前 functions/ 下均如此）。
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import pydantic
+
+from src import config
+from src.chat.features.tools import schema_utils
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(config.DATA_DIR, "tool_schema_cache.json")
+
+
+def _file_digest(path: Optional[str]) -> str:
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# 生成逻辑、pydantic 版本以及可能被拼进描述文字的社区配置变化时，缓存整体失效
+_GENERATOR_SALT = ":".join(
+    [
+        _file_digest(inspect.getsourcefile(schema_utils)),
+        pydantic.VERSION,
+        str(getattr(config, "BOT_NAME", "")),
+        str(getattr(config, "COMMUNITY_NAME", "")),
+        str(getattr(config, "CURRENCY_NAME", "")),
+    ]
+)
+
+
+def module_source_hash(module) -> str:
+    """工具模块源码的哈希（混入 schema 生成器版本）"""
+    try:
+        source_file = inspect.getsourcefile(module)
+    except TypeError:
+        source_file = None
+    digest = _file_digest(source_file)
+    if not digest:
+        return ""
+    return hashlib.sha256(f"{digest}:{_GENERATOR_SALT}".encode()).hexdigest()
+
+
+class ToolSchemaCache:
+    """按模块源码哈希缓存工具 schema 的 JSON 文件"""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> "ToolSchemaCache":
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._data = data
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            log.warning(f"工具 schema 缓存读取失败，将重新生成: {e}")
+        return self
+
+    def get(self, module_path: str, source_hash: str, func_name: str) -> Optional[Dict[str, Any]]:
+        entry = self._data.get(module_path)
+        if not source_hash or not entry or entry.get("hash") != source_hash:
+            self.misses += 1
+            return None
+        schema = entry.get("tools", {}).get(func_name)
+        if schema is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return schema
+
+    def put(
+        self, module_path: str, source_hash: str, func_name: str, schema: Dict[str, Any]
+    ) -> None:
+        if not source_hash:
+            return
+        try:
+            if json.loads(json.dumps(schema, ensure_ascii=False)) != schema:
+                return
+        except (TypeError, ValueError):
+            return
+
+        entry = self._data.get(module_path)
+        if not entry or entry.get("hash") != source_hash:
+            entry = {"hash": source_hash, "tools": {}}
+            self._data[module_path] = entry
+        entry["tools"][func_name] = schema
+        self._dirty = True
+
+    def retain(self, module_paths) -> None:
+        """移除已不存在的模块的条目"""
+        keep = set(module_paths)
+        for key in [k for k in self._data if k not in keep]:
+            del self._data[key]
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            log.warning(f"写入工具 schema 缓存失败: {e}")
@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+社区搜索工具的执行器
+
+search 工具的各个数据源共用这里的基础设施：
+- Discord 消息搜索的并发限制器：所有请求共享一个信号量，遇到 429 / 202（索引未就绪）时
+  按 retry_after 暂停整个搜索端点，而不是让每个请求各自撞限流
+- 按规范化参数缓存的短 TTL 结果缓存：同一问题在几十秒内重复搜索直接复用；
+  相同参数的并发请求只执行一次
+- 论坛搜索次数在内存中累计，定时批量写入 daily_stats
+- 部分结果超时：多路搜索中较慢的一路超时后，先返回已完成的结果
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import discord
+
+from src.chat.config.chat_config import SEARCH_EXECUTOR_CONFIG
+from src.chat.utils.database import chat_db_manager, get_beijing_today_str
+
+log = logging.getLogger(__name__)
+
+
+def normalize_query(query: Optional[str]) -> str:
+    """用于缓存键的查询规范化：去掉首尾及重复空白，忽略大小写。"""
+    return " ".join((query or "").split()).casefold()
+
+
+def freeze(value: Any) -> Hashable:
+    """把筛选条件等参数转换为可哈希、与顺序无关的缓存键。"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted((freeze(v) for v in value), key=repr))
+    return value
+
+
+class DiscordSearchLimiter:
+    """Discord 消息搜索端点的共享并发与限流控制。"""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        max_retry_after: Optional[float] = None,
+    ):
+        self.max_concurrency = (
+            max_concurrency or SEARCH_EXECUTOR_CONFIG["DISCORD_SEARCH_MAX_CONCURRENCY"]
+        )
+        self.max_retries = (
+            max_retries
+            if max_retries is not None
+            else SEARCH_EXECUTOR_CONFIG["DISCORD_SEARCH_MAX_RETRIES"]
+        )
+        self.max_retry_after = (
+            max_retry_after
+            if max_retry_after is not None
+            else SEARCH_EXECUTOR_CONFIG["DISCORD_SEARCH_MAX_RETRY_AFTER"]
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._blocked_until = 0.0
+        self.in_flight = 0
+        self.rate_limited = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # 延迟创建，避免在导入时绑定事件循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def cool_down(self, retry_after: float) -> None:
+        retry_after = min(max(float(retry_after), 0.0), self.max_retry_after)
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        self.rate_limited += 1
+
+    async def _wait_cool_down(self) -> None:
+        delay = self._blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retry_after_from(error: Exception) -> Optional[float]:
+        if isinstance(error, discord.RateLimited):
+            return error.retry_after
+        if isinstance(error, discord.HTTPException) and error.status == 429:
+            headers = getattr(error.response, "headers", None) or {}
+            try:
+                return float(headers.get("Retry-After", 1.0))
+            except (TypeError, ValueError):
+                return 1.0
+        return None
+
+    async def request(self, bot, route, params: Dict[str, Any]) -> Dict[str, Any]:
+        """在限制器下执行一次搜索请求；429 和索引未就绪时按 retry_after 重试。"""
+        attempt = 0
+        while True:
+            await self._wait_cool_down()
+            async with self._get_semaphore():
+                # 排队期间可能有其他请求触发了限流
+                await self._wait_cool_down()
+                self.in_flight += 1
+                try:
+                    data = await bot.http.request(route, params=params)
+                except (discord.RateLimited, discord.HTTPException) as e:
+                    retry_after = self._retry_after_from(e)
+                    if retry_after is None or attempt >= self.max_retries:
+                        raise
+                    self.cool_down(retry_after)
+                    attempt += 1
+                    continue
+                finally:
+                    self.in_flight -= 1
+
+            # 202：Discord 尚未为该频道建立搜索索引，响应中带有 retry_after
+            if (
+                isinstance(data, dict)
+                and "messages" not in data
+                and data.get("retry_after") is not None
+                and attempt < self.max_retries
+            ):
+                self.cool_down(data["retry_after"])
+                attempt += 1
+                continue
+            return data
+
+
+class SearchResultCache:
+    """短 TTL 的 LRU 结果缓存，带相同键的并发请求合并。"""
+
+    def __init__(
+        self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None
+    ):
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else SEARCH_EXECUTOR_CONFIG["RESULT_CACHE_TTL_SECONDS"]
+        )
+        self.max_entries = (
+            max_entries or SEARCH_EXECUTOR_CONFIG["RESULT_CACHE_MAX_ENTRIES"]
+        )
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_compute(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        命中缓存直接返回；否则执行 factory 并缓存结果（异常不缓存）。
+        factory 在独立任务中运行：调用方因超时被取消时，搜索仍会完成并写入缓存，
+        下一次相同的搜索可以直接用上。
+        """
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, factory))
+            # 调用方都已超时离开时，异常由这里取走，避免 "never retrieved" 警告
+            task.add_done_callback(
+                lambda t: t.cancelled() or t.exception()
+            )
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        try:
+            value = await factory()
+            if self.ttl_seconds > 0:
+                self.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+class BatchedCounter:
+    """按日期累计的计数器，定时合并为一次 UPSERT 写入。"""
+
+    def __init__(
+        self,
+        write: Callable[[str, int], Awaitable[None]],
+        flush_interval: Optional[float] = None,
+    ):
+        self._write = write
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else SEARCH_EXECUTOR_CONFIG["COUNTER_FLUSH_INTERVAL_SECONDS"]
+        )
+        self._pending: Dict[str, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def increment(self, count: int = 1) -> None:
+        date_str = get_beijing_today_str()
+        self._pending[date_str] = self._pending.get(date_str, 0) + count
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    def pending_for(self, date_str: str) -> int:
+        return self._pending.get(date_str, 0)
+
+    async def _delayed_flush(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self) -> int:
+        pending, self._pending = self._pending, {}
+        written = 0
+        for date_str, count in pending.items():
+            try:
+                await self._write(date_str, count)
+                written += count
+            except Exception as e:
+                log.error(f"批量写入搜索计数失败，将在下次重试: {e}", exc_info=True)
+                self._pending[date_str] = self._pending.get(date_str, 0) + count
+        return written
+
+    async def aclose(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        self._flush_task = None
+        await self.flush()
+
+
+async def gather_with_partial_timeout(
+    coros: Dict[str, Awaitable[Any]], timeout: float
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    并发执行多个协程，最多等待 timeout 秒。
+    返回 (已完成的结果, 超时的名称列表)；结果可能是异常对象，超时的任务会被取消。
+    """
+    tasks = {name: asyncio.ensure_future(coro) for name, coro in coros.items()}
+    if not tasks:
+        return {}, []
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    results: Dict[str, Any] = {}
+    timed_out: List[str] = []
+    for name, task in tasks.items():
+        if task not in done:
+            timed_out.append(name)
+        elif task.cancelled():
+            results[name] = asyncio.CancelledError()
+        else:
+            results[name] = task.exception() or task.result()
+    return results, timed_out
+
+
+class SearchExecutor:
+    def __init__(self):
+        self.discord_limiter = DiscordSearchLimiter()
+        self.result_cache = SearchResultCache()
+        self.forum_search_counter = BatchedCounter(
+            chat_db_manager.increment_forum_search_count
+        )
+
+    async def aclose(self) -> None:
+        """关闭时写入尚未落库的计数。"""
+        await self.forum_search_counter.aclose()
+        log.info(
+            f"搜索执行器已关闭: 缓存命中 {self.result_cache.hits} 次，"
+            f"未命中 {self.result_cache.misses} 次，"
+            f"Discord 搜索限流 {self.discord_limiter.rate_limited} 次。"
+        )
+
+
+search_executor = SearchExecutor()
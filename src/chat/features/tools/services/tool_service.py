@@ -10,10 +10,11 @@
 3. 执行工具调用并返回结果
 """
 
-from google.genai import types
+from __future__ import annotations
+
 import discord
 import inspect
-from typing import Optional, Dict, Callable, Any, List, Union
+from typing import TYPE_CHECKING, Optional, Dict, Callable, Any, List, Union
 from pydantic import BaseModel
 
 import logging
@@ -27,6 +28,10 @@ from src.chat.features.tools.services.global_tool_settings_service import (
 from src.chat.features.tools.tool_declaration import ToolDeclaration
 from src.chat.features.tools.llm_adapters import to_gemini_tools
 from src.chat.services.ai.providers.provider_format import ProviderFormat
+from src.chat.utils.log_utils import truncated
+
+if TYPE_CHECKING:
+    from google.genai import types
 
 log = logging.getLogger(__name__)
 
@@ -181,33 +186,31 @@ class ToolService:
         # 根据 provider 类型选择返回格式（使用统一的格式判断工具）
         # 调试日志：打印 provider_type 和判断结果
         is_gemini = ProviderFormat.is_gemini_provider(actual_provider_type)
-        log.info(
-            f"[工具格式调试] provider_type={repr(provider_type)}, "
-            f"actual_provider_type={repr(actual_provider_type)}, "
-            f"is_gemini_provider={is_gemini}"
+        log.debug(
+            "[工具格式调试] provider_type=%r, actual_provider_type=%r, is_gemini_provider=%s",
+            provider_type,
+            actual_provider_type,
+            is_gemini,
         )
 
         if is_gemini:
             # Gemini Provider: 返回 genai_types.Tool 格式
             log.info(
-                f"为 Gemini Provider 返回工具（共 {len(filtered_declarations)} 个）"
+                "为 Gemini Provider 返回工具（共 %d 个）", len(filtered_declarations)
             )
             gemini_tools = to_gemini_tools(filtered_declarations)
-            # 调试日志：打印返回的工具类型
-            log.info(
-                f"[工具格式调试] 返回 Gemini 工具，类型={type(gemini_tools)}, "
-                f"第一个工具类型={type(gemini_tools[0]) if gemini_tools else 'N/A'}"
-            )
             return gemini_tools
         else:
             # 其他 Provider (DeepSeek, OpenAI 等): 返回 OpenAI 格式
             log.info(
-                f"为 OpenAI 兼容 Provider 返回工具（共 {len(filtered_declarations)} 个）"
+                "为 OpenAI 兼容 Provider 返回工具（共 %d 个）",
+                len(filtered_declarations),
             )
             openai_tools = [decl.to_openai_format() for decl in filtered_declarations]
-            # 调试日志：打印返回的工具内容
-            log.info(
-                f"[工具格式调试] 返回 OpenAI 工具，第一个工具={openai_tools[0] if openai_tools else 'N/A'}"
+            # 调试日志：完整 schema 只在真正写出时才序列化，且截断
+            log.debug(
+                "[工具格式调试] 返回 OpenAI 工具，第一个工具=%s",
+                truncated(openai_tools[0] if openai_tools else "N/A"),
             )
             return openai_tools
 
@@ -245,6 +248,9 @@ class ToolService:
         Returns:
             一个格式化为 FunctionResponse 的 Part 对象，其中包含工具的输出。
         """
+        # google-genai 导入较慢，首次执行工具时才加载
+        from google.genai import types
+
         # 兼容 Gemini FunctionCall 对象和 OpenAI dict 格式
         if isinstance(tool_call, dict):
             tool_name = tool_call.get("name")
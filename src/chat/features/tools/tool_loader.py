@@ -16,17 +16,20 @@ import os
 import importlib
 import inspect
 import logging
-from typing import Dict, Callable, List, Tuple
+from typing import Dict, Callable, List, Optional, Tuple
 
 from src.chat.features.tools.tool_declaration import ToolDeclaration
 from src.chat.features.tools.tool_metadata import get_tool_metadata
 from src.chat.features.tools.schema_utils import extract_function_schema
+from src.chat.features.tools.schema_cache import ToolSchemaCache, module_source_hash
+from src.chat.utils.startup_profiler import startup_profiler
 
 log = logging.getLogger(__name__)
 
 
 def load_tools_from_directory(
     directory: str,
+    schema_cache: Optional[ToolSchemaCache] = None,
 ) -> Tuple[List[ToolDeclaration], Dict[str, Callable]]:
     """
     动态地从指定目录加载所有工具函数，并生成通用工具声明。
@@ -37,8 +40,11 @@ def load_tools_from_directory(
     3. 检测函数签名中的 Pydantic 模型，自动生成带 description 的 schema
     4. 创建通用工具声明（ToolDeclaration）
 
+    生成的 schema 按模块源码哈希缓存在磁盘上（见 schema_cache），源码未变时直接复用。
+
     Args:
         directory: 包含工具函数模块的目录路径。
+        schema_cache: 可选的 schema 缓存；默认使用 data/ 下的缓存文件。
 
     Returns:
         一个元组，包含：
@@ -47,6 +53,9 @@ def load_tools_from_directory(
     """
     tool_declarations: List[ToolDeclaration] = []
     tool_map: Dict[str, Callable] = {}
+    if schema_cache is None:
+        schema_cache = ToolSchemaCache().load()
+    seen_modules: List[str] = []
 
     log.info(f"--- [工具加载器]: 开始从 '{directory}' 目录加载工具 ---")
     log.info(f"--- [工具加载器]: 注意 - 工具启用/禁用状态由运行时配置控制 ---")
@@ -62,6 +71,8 @@ def load_tools_from_directory(
             try:
                 module = importlib.import_module(module_path)
                 log.info(f"成功导入模块: {module_path}")
+                source_hash = module_source_hash(module)
+                seen_modules.append(module_path)
 
                 # 遍历模块中的所有成员，查找异步函数
                 for name, func in inspect.getmembers(
@@ -82,10 +93,14 @@ def load_tools_from_directory(
                     # extract_function_schema 会自动检测 Pydantic 模型并生成带 description 的 schema
                     # 注意：不传递 metadata 的 description，因为那是给配置面板用的
                     # AI 应该看到的是函数的 docstring 和 Pydantic 模型字段的 description
-                    func_schema = extract_function_schema(
-                        func=func,
-                        function_description=None,  # 使用函数的 docstring
-                    )
+                    func_schema = schema_cache.get(module_path, source_hash, name)
+                    if func_schema is None:
+                        with startup_profiler.measure("schema", f"{module_path}.{name}"):
+                            func_schema = extract_function_schema(
+                                func=func,
+                                function_description=None,  # 使用函数的 docstring
+                            )
+                        schema_cache.put(module_path, source_hash, name, func_schema)
 
                     # 创建通用工具声明
                     declaration = ToolDeclaration(
@@ -106,7 +121,13 @@ def load_tools_from_directory(
             except Exception as e:
                 log.error(f"处理模块 {module_path} 时出错: {e}", exc_info=True)
 
-    log.info(f"--- [工具加载器]: 加载完成。共发现 {len(tool_declarations)} 个工具 ---")
+    schema_cache.retain(seen_modules)
+    schema_cache.save()
+
+    log.info(
+        f"--- [工具加载器]: 加载完成。共发现 {len(tool_declarations)} 个工具 "
+        f"(schema 缓存命中 {schema_cache.hits}，重新生成 {schema_cache.misses}) ---"
+    )
     return tool_declarations, tool_map
 
 
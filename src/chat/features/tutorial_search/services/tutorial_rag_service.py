@@ -5,7 +5,8 @@ from sqlalchemy import delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database.database import AsyncSessionLocal
 from src.database.models import TutorialDocument, KnowledgeChunk
-from src.chat.services.embedding_factory import get_embedding_service, is_vector_enabled
+from src.chat.services.embedding_factory import get_vector_mode, is_vector_enabled
+from src.chat.services.embedding_lifecycle import embedding_lifecycle
 from sqlalchemy.future import select
 
 log = logging.getLogger(__name__)
@@ -46,18 +47,17 @@ class TutorialRAGService:
                     log.warning(f"文档 {document_id} 的内容为空。")
                     return
 
-                # 3. 检查向量模式是否启用
-                if not is_vector_enabled():
+                # 3. 检查向量模式是否启用（教程块只有本地模式的向量列）
+                if not is_vector_enabled() or get_vector_mode() != "local":
                     log.debug(f"向量模式已禁用，跳过文档 {document_id} 的嵌入生成")
                     return
 
-                # 4. 为完整内容生成一个嵌入
-                embedding_service = await get_embedding_service()
-                embedding = await embedding_service.generate_embedding(
-                    text=str(content), task_type="retrieval_document"
+                # 4. 为完整内容生成当前需要写入的嵌入（{列名: 向量}）
+                embeddings = await embedding_lifecycle.generate_embeddings(
+                    "tutorials.knowledge_chunks", str(content)
                 )
 
-                if not embedding:
+                if not embeddings:
                     log.error(f"为文档 {document_id} 的内容生成嵌入失败。")
                     return
 
@@ -66,7 +66,7 @@ class TutorialRAGService:
                     document_id=document.id,
                     chunk_text=content,  # 存储原文以便可能的调试或预览
                     chunk_order=0,  # 顺序为0，因为只有一个块
-                    embedding=embedding,
+                    **embeddings,
                 )
                 session.add(new_chunk)
                 await session.commit()
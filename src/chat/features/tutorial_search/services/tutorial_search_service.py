@@ -7,6 +7,7 @@ from sqlalchemy import select, text
 # 导入父文档和子文档的模型
 from src.database.database import AsyncSessionLocal
 from src.database.models import KnowledgeChunk, TutorialDocument
+from src.database.vector_codec import to_halfvec
 
 import os
 
@@ -18,6 +19,10 @@ from src.chat.services.embedding_factory import (
     get_embedding_service,
     get_embedding_column,
 )
+from src.chat.services.embedding_storage import (
+    build_semantic_search_sql,
+    prepare_vector_search,
+)
 
 
 # --- RAG 追踪日志系统 ---
@@ -46,6 +51,8 @@ log = logging.getLogger(__name__)
 # 从全局配置导入 RAG 设置
 from src.chat.config.chat_config import TUTORIAL_RAG_CONFIG
 
+TUTORIAL_CHUNKS_TABLE = "tutorials.knowledge_chunks"
+
 
 class TutorialSearchService:
     def __init__(self):
@@ -64,19 +71,18 @@ class TutorialSearchService:
     ) -> List:
         """使用原生 SQL 在数据库中执行高效的混合搜索和 RRF 融合，返回最佳 chunk 及其分数。"""
         # 根据配置选择使用哪个 embedding 列
-        embedding_col = await get_embedding_column()
+        embedding_col = await get_embedding_column(TUTORIAL_CHUNKS_TABLE)
         # We need to join with tutorial_documents to get the thread_id
+        semantic_search = build_semantic_search_sql(
+            columns="kc.id, td.thread_id",
+            from_clause="tutorials.knowledge_chunks kc "
+            "JOIN tutorials.tutorial_documents td ON kc.document_id = td.id",
+            column=f"kc.{embedding_col}",
+        )
         sql_query = text(
             f"""
             WITH semantic_search AS (
-                SELECT
-                    kc.id,
-                    RANK() OVER (ORDER BY kc.{embedding_col} <=> :query_vector) as rank,
-                    td.thread_id
-                FROM tutorials.knowledge_chunks kc
-                JOIN tutorials.tutorial_documents td ON kc.document_id = td.id
-                ORDER BY kc.{embedding_col} <=> :query_vector
-                LIMIT :top_k_vector
+                {semantic_search}
             ),
             keyword_search AS (
                 SELECT
@@ -122,16 +128,20 @@ class TutorialSearchService:
                 LIMIT :final_k;
                 """
             )
+        vector_params = await prepare_vector_search(
+            session, self.config["TOP_K_VECTOR"], profile="tutorial"
+        )
         result = await session.execute(
             sql_query,
             {
                 "query_text": query_text,
-                "query_vector": str(query_vector),
+                "query_vector": to_halfvec(query_vector),
                 "thread_id": str(thread_id) if thread_id is not None else None,
                 "top_k_vector": self.config["TOP_K_VECTOR"],
                 "top_k_fts": self.config["TOP_K_FTS"],
                 "rrf_k": self.config["RRF_K"],
                 "final_k": self.config["HYBRID_SEARCH_FINAL_K"],
+                **vector_params,
             },
         )
         return result.fetchall()
@@ -228,7 +238,9 @@ class TutorialSearchService:
 
         try:
             # 根据配置选择对应的 embedding 服务
-            embedding_service = await get_embedding_service()
+            embedding_service = await get_embedding_service(
+                table=TUTORIAL_CHUNKS_TABLE
+            )
             query_embedding = await embedding_service.generate_embedding(
                 text=query, task_type="retrieval_query"
             )
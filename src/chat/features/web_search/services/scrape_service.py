@@ -13,6 +13,7 @@ from urllib.parse import urlparse
 import httpx
 
 from src.chat.config.chat_config import WEB_SEARCH_CONFIG
+from src.chat.services.http_client_registry import http_client_registry
 
 log = logging.getLogger(__name__)
 
@@ -54,25 +55,20 @@ class ScrapeResult:
 class WebScrapeService:
     """抓取网页并提取正文内容"""
 
-    def __init__(self):
-        self._client: Optional[httpx.AsyncClient] = None
-
     def _get_client(self) -> httpx.AsyncClient:
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(
-                timeout=WEB_SEARCH_CONFIG["SCRAPE_TIMEOUT"],
-                follow_redirects=True,
-                headers={
-                    "User-Agent": (
-                        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/120.0.0.0 Safari/537.36"
-                    ),
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "*",
-                },
-            )
-        return self._client
+        return http_client_registry.get_client(
+            timeout=WEB_SEARCH_CONFIG["SCRAPE_TIMEOUT"],
+            follow_redirects=True,
+            headers={
+                "User-Agent": (
+                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                    "AppleWebKit/537.36 (KHTML, like Gecko) "
+                    "Chrome/120.0.0.0 Safari/537.36"
+                ),
+                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+                "Accept-Language": "*",
+            },
+        )
 
     def _validate_url(self, url: str) -> Optional[str]:
         parsed = urlparse(url)
@@ -182,9 +178,8 @@ class WebScrapeService:
         )
 
     async def close(self):
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
-            self._client = None
+        # 客户端由 http_client_registry 统一管理
+        return None
 
 
 web_scrape_service = WebScrapeService()
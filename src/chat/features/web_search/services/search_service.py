@@ -10,6 +10,7 @@ from typing import List, Optional
 import httpx
 
 from src.chat.config.chat_config import WEB_SEARCH_CONFIG
+from src.chat.services.http_client_registry import http_client_registry
 
 log = logging.getLogger(__name__)
 
@@ -37,12 +38,11 @@ class WebSearchService:
 
     def __init__(self, base_url: str):
         self.base_url = base_url.rstrip("/")
-        self._client: Optional[httpx.AsyncClient] = None
 
     def _get_client(self) -> httpx.AsyncClient:
-        if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=WEB_SEARCH_CONFIG["TIMEOUT"])
-        return self._client
+        return http_client_registry.get_client(
+            self.base_url, timeout=WEB_SEARCH_CONFIG["TIMEOUT"]
+        )
 
     async def search(
         self,
@@ -104,9 +104,8 @@ class WebSearchService:
         )
 
     async def close(self):
-        if self._client and not self._client.is_closed:
-            await self._client.aclose()
-            self._client = None
+        # 客户端由 http_client_registry 统一管理
+        return None
 
 
 web_search_service = WebSearchService(
@@ -3,6 +3,7 @@ from typing import Tuple, Dict, Any, Optional
 import logging
 
 import random
+from src.chat.services.leaderboard_service import leaderboard_service
 from src.chat.utils.database import chat_db_manager
 from src.chat.utils.time_utils import format_time_delta
 from ..config.work_config import WorkConfig
@@ -65,80 +66,89 @@ class WorkDBService:
         """
         更新用户的工作记录，增加每日计数，并检查是否触发了全勤奖。
         返回一个元组 (is_streak_achieved, new_streak_days)。
+
+        每日计数重置与连续天数计算都在一条 UPSERT ... RETURNING 中完成，
+        同一用户的并发请求不会互相覆盖。
         """
         now = datetime.now(timezone.utc)
-        today_str = now.date().isoformat()
-
-        status = await self.get_user_work_status(user_id)
-        status = await self._reset_daily_counts_if_needed(status)
-
-        # 更新每日工作次数
-        status["work_count_today"] += 1
-        status["last_work_timestamp"] = now
-
-        # --- 全勤奖逻辑 ---
-        # --- 全勤奖逻辑 (已修复) ---
-        # 修复了同一天多次打工导致连续天数重置的BUG
-        #
-        # 旧逻辑问题:
-        # 1. 每次开始时都将 `consecutive_days` 初始化为 1, 导致无法正确继承之前的连续天数。
-        # 2. 当用户在同一天第二次打工时, `last_streak_date == yesterday` 和
-        #    `last_streak_date != now.date()` 两个条件都不满足, 导致 `consecutive_days`
-        #    维持初始值 1, 从而错误地重置了用户的连续记录。
-        #
-        # 新逻辑:
-        # 1. 首先从数据库状态 `status` 中获取当前的连续天数。
-        # 2. 检查上次打工日期 `last_streak_date` 是否存在且早于今天。
-        # 3. 如果上次打工是昨天, 则连续天数加一。
-        # 4. 如果上次打工不是昨天 (且不是今天), 则说明中断, 连续天数重置为 1。
-        # 5. 如果上次打工就是今天, 则不进行任何操作, 保持现有连续天数。
-
         now_date = now.date()
-        last_streak_date_str = status.get("last_streak_date")
-        consecutive_days = status.get("consecutive_work_days", 0)
-        is_streak_achieved = False
-
-        if last_streak_date_str:
-            last_streak_date = datetime.fromisoformat(last_streak_date_str).date()
-
-            # [最终修复] 如果今天已经打过工，直接返回现有状态，不进行任何计算
-            if last_streak_date == now_date:
-                # 在返回前，仍然需要更新数据库以确保状态一致
-                status["last_streak_date"] = now_date.isoformat()
-                await self._update_user_work_status_from_dict(user_id, status)
-                return False, consecutive_days
-
-            yesterday = now_date - timedelta(days=1)
-            if last_streak_date == yesterday:
-                consecutive_days += 1
-            else:
-                consecutive_days = 1
-        else:
-            consecutive_days = 1
 
-        if consecutive_days >= WorkConfig.STREAK_DAYS:
-            is_streak_achieved = True
-            consecutive_days = 0
-
-        status["consecutive_work_days"] = consecutive_days
-        status["last_streak_date"] = now_date.isoformat()
-
-        # --- 更新数据库 ---
-        await self._update_user_work_status_from_dict(user_id, status)
+        # --- 全勤奖逻辑 ---
+        # 1. 上次打工就是今天：保持现有连续天数，不做任何计算
+        # 2. 上次打工是昨天：连续天数加一
+        # 3. 其他情况（中断或首次）：连续天数重置为 1
+        # 达到 STREAK_DAYS 时发放全勤奖，连续天数归零
+        query = """
+            INSERT INTO user_work_status (
+                user_id, last_work_timestamp, consecutive_work_days, last_streak_date,
+                work_count_today, sell_body_count_today, last_count_date
+            ) VALUES (
+                :user_id, :now,
+                CASE WHEN 1 >= :streak_days THEN 0 ELSE 1 END,
+                :today, 1, 0, :today
+            )
+            ON CONFLICT(user_id) DO UPDATE SET
+                last_work_timestamp = excluded.last_work_timestamp,
+                work_count_today = CASE
+                    WHEN last_count_date = :today THEN work_count_today + 1 ELSE 1 END,
+                sell_body_count_today = CASE
+                    WHEN last_count_date = :today THEN sell_body_count_today ELSE 0 END,
+                last_count_date = :today,
+                consecutive_work_days = CASE
+                    WHEN date(last_streak_date) = :today THEN consecutive_work_days
+                    WHEN (CASE WHEN date(last_streak_date) = :yesterday
+                               THEN consecutive_work_days + 1 ELSE 1 END) >= :streak_days
+                        THEN 0
+                    ELSE (CASE WHEN date(last_streak_date) = :yesterday
+                               THEN consecutive_work_days + 1 ELSE 1 END)
+                END,
+                last_streak_date = :today
+            RETURNING consecutive_work_days, work_count_today;
+        """
+        params = {
+            "user_id": user_id,
+            "now": now,
+            "today": now_date.isoformat(),
+            "yesterday": (now_date - timedelta(days=1)).isoformat(),
+            "streak_days": WorkConfig.STREAK_DAYS,
+        }
+        row = await chat_db_manager._execute(
+            chat_db_manager._db_transaction, query, params, fetch="one", commit=True
+        )
 
+        consecutive_days = row["consecutive_work_days"]
+        # 当天第一次打工时连续天数至少为 1，只有达成全勤奖才会归零
+        is_streak_achieved = row["work_count_today"] == 1 and consecutive_days == 0
         return is_streak_achieved, consecutive_days
 
-    async def increment_sell_body_count(self, user_id: int):
-        """更新卖屁股的时间戳和每日计数。"""
+    async def increment_sell_body_count(self, user_id: int) -> Dict[str, int]:
+        """更新卖屁股的时间戳和每日计数（单条 UPSERT），返回更新后的计数。"""
         now = datetime.now(timezone.utc)
-        status = await self.get_user_work_status(user_id)
-        status = await self._reset_daily_counts_if_needed(status)
-
-        status["sell_body_count_today"] += 1
-        status["total_sell_body_count"] = status.get("total_sell_body_count", 0) + 1
-        status["last_sell_body_timestamp"] = now
-
-        await self._update_user_work_status_from_dict(user_id, status)
+        query = """
+            INSERT INTO user_work_status (
+                user_id, last_sell_body_timestamp, consecutive_work_days,
+                work_count_today, sell_body_count_today, last_count_date,
+                total_sell_body_count
+            ) VALUES (:user_id, :now, 0, 0, 1, :today, 1)
+            ON CONFLICT(user_id) DO UPDATE SET
+                last_sell_body_timestamp = excluded.last_sell_body_timestamp,
+                sell_body_count_today = CASE
+                    WHEN last_count_date = :today THEN sell_body_count_today + 1 ELSE 1 END,
+                work_count_today = CASE
+                    WHEN last_count_date = :today THEN work_count_today ELSE 0 END,
+                last_count_date = :today,
+                total_sell_body_count = total_sell_body_count + 1
+            RETURNING sell_body_count_today, total_sell_body_count;
+        """
+        params = {"user_id": user_id, "now": now, "today": now.date().isoformat()}
+        row = await chat_db_manager._execute(
+            chat_db_manager._db_transaction, query, params, fetch="one", commit=True
+        )
+        counts = dict(row)
+        leaderboard_service.record_sell_body_total(
+            user_id, counts["total_sell_body_count"]
+        )
+        return counts
 
     async def check_work_cooldown(self, user_id: int) -> Tuple[bool, str]:
         """
@@ -184,39 +194,6 @@ class WorkDBService:
                 return True, format_time_delta(remaining)
         return False, ""
 
-    async def _update_user_work_status_from_dict(self, user_id: int, status: dict):
-        """使用字典中的值来更新数据库。"""
-        query = """
-            INSERT INTO user_work_status (
-                user_id, last_work_timestamp, consecutive_work_days, last_streak_date,
-                last_sell_body_timestamp, work_count_today, sell_body_count_today, last_count_date,
-                total_sell_body_count
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET
-                last_work_timestamp = excluded.last_work_timestamp,
-                consecutive_work_days = excluded.consecutive_work_days,
-                last_streak_date = excluded.last_streak_date,
-                last_sell_body_timestamp = excluded.last_sell_body_timestamp,
-                work_count_today = excluded.work_count_today,
-                sell_body_count_today = excluded.sell_body_count_today,
-                last_count_date = excluded.last_count_date,
-                total_sell_body_count = excluded.total_sell_body_count;
-        """
-        params = (
-            user_id,
-            status.get("last_work_timestamp"),
-            status.get("consecutive_work_days"),
-            status.get("last_streak_date"),
-            status.get("last_sell_body_timestamp"),
-            status.get("work_count_today"),
-            status.get("sell_body_count_today"),
-            status.get("last_count_date"),
-            status.get("total_sell_body_count"),
-        )
-        await chat_db_manager._execute(
-            chat_db_manager._db_transaction, query, params, commit=True
-        )
-
     async def add_custom_event(self, event_data: Dict[str, Any]) -> bool:
         """
         将一个通过审核的自定义事件添加到数据库。
@@ -8,7 +8,14 @@ import json
 import psycopg2
 from psycopg2.extras import DictCursor
 
+from sqlalchemy import text
+
 from src.chat.utils.database import chat_db_manager
+from src.database.database import AsyncSessionLocal
+from src.database.vector_codec import to_halfvec
+from src.chat.features.world_book.services.knowledge_result_cache import (
+    knowledge_result_cache,
+)
 
 
 async def get_embedding_column() -> str:
@@ -490,149 +497,117 @@ class IncrementalRAGService:
             await self._delete_entry_from_parade(entry_id, table_type)
 
             # 为每个块生成嵌入并添加到 Parade DB
-            success_count = 0
-            conn = self._get_parade_connection()
-            if not conn:
-                return False
+            # 导入两个 embedding 服务实例
+            from src.chat.services.ollama_embedding_service import (
+                ollama_embedding_service as bge_service,
+                qwen_embedding_service as qwen_service,
+            )
+            from src.chat.services.embedding_lifecycle import embedding_lifecycle
 
-            cursor = conn.cursor()
+            # 只生成该表当前需要写入的模型（回填期间为新旧两个，已排除禁用的模型）
+            write_models = await embedding_lifecycle.write_models(
+                "community.member_chunks"
+                if table_type == "community"
+                else "general_knowledge.knowledge_chunks"
+            )
 
-            try:
-                for chunk_index, chunk_content in enumerate(chunks):
-                    log.debug(f"正在为块 {chunk_index} 生成嵌入向量...")
+            rows = []
+            for chunk_index, chunk_content in enumerate(chunks):
+                log.debug(f"正在为块 {chunk_index} 生成嵌入向量...")
 
-                    # 导入两个 embedding 服务实例
-                    from src.chat.services.ollama_embedding_service import (
-                        ollama_embedding_service as bge_service,
-                        qwen_embedding_service as qwen_service,
-                    )
+                # 根据写入模型决定是否生成 embedding
+                tasks = []
+                task_names = []
 
-                    # 获取禁用的模型列表
-                    try:
-                        disabled_str = await chat_db_manager.get_global_setting(
-                            "disabled_embedding_models"
+                if "bge" in write_models:
+                    tasks.append(
+                        bge_service.generate_embedding(
+                            text=chunk_content,
+                            title=entry.get("title", entry_id),
+                            task_type="retrieval_document",
                         )
-                        disabled_models = (
-                            [m.strip() for m in disabled_str.split(",") if m.strip()]
-                            if disabled_str
-                            else []
-                        )
-                    except Exception:
-                        disabled_models = []
-
-                    # 根据禁用状态决定是否生成 embedding
-                    tasks = []
-                    task_names = []
-
-                    if "bge" not in disabled_models:
-                        tasks.append(
-                            bge_service.generate_embedding(
-                                text=chunk_content,
-                                title=entry.get("title", entry_id),
-                                task_type="retrieval_document",
-                            )
-                        )
-                        task_names.append("bge")
-                    else:
-                        log.debug(
-                            "[INCREMENTAL_RAG] BGE 模型已禁用，跳过生成 embedding"
-                        )
-
-                    if "qwen" not in disabled_models:
-                        tasks.append(
-                            qwen_service.generate_embedding(
-                                text=chunk_content,
-                                title=entry.get("title", entry_id),
-                                task_type="retrieval_document",
-                            )
+                    )
+                    task_names.append("bge")
+                else:
+                    log.debug("[INCREMENTAL_RAG] 当前无需写入 BGE embedding，跳过")
+
+                if "qwen" in write_models:
+                    tasks.append(
+                        qwen_service.generate_embedding(
+                            text=chunk_content,
+                            title=entry.get("title", entry_id),
+                            task_type="retrieval_document",
                         )
-                        task_names.append("qwen")
+                    )
+                    task_names.append("qwen")
+                else:
+                    log.debug("[INCREMENTAL_RAG] 当前无需写入 Qwen embedding，跳过")
+
+                # 等待 embedding 任务完成
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+
+                # 检查结果
+                embeddings: Dict[str, Any] = {"bge": None, "qwen": None}
+                for i, name in enumerate(task_names):
+                    result = results[i]
+                    if isinstance(result, Exception):
+                        log.error(f"生成 {name} embedding 失败: {result}")
+                    elif isinstance(result, list):
+                        embeddings[name] = to_halfvec(result)
                     else:
-                        log.debug(
-                            "[INCREMENTAL_RAG] Qwen 模型已禁用，跳过生成 embedding"
-                        )
+                        log.error(f"无法为块 {chunk_index} 生成 {name} 嵌入向量")
 
-                    # 等待 embedding 任务完成
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-
-                    # 检查结果
-                    bge_embedding_str: str | None = None
-                    qwen_embedding_str: str | None = None
-
-                    for i, name in enumerate(task_names):
-                        result = results[i]
-                        if isinstance(result, Exception):
-                            log.error(f"生成 {name} embedding 失败: {result}")
-                        elif isinstance(result, list):
-                            embedding_str = "[" + ",".join(str(x) for x in result) + "]"
-                            if name == "bge":
-                                bge_embedding_str = embedding_str
-                            elif name == "qwen":
-                                qwen_embedding_str = embedding_str
-                        else:
-                            log.error(f"无法为块 {chunk_index} 生成 {name} 嵌入向量")
-
-                    # 至少需要一个 embedding 才能继续
-                    if not bge_embedding_str and not qwen_embedding_str:
-                        raise Exception(f"无法为块 {chunk_index} 生成任何嵌入向量")
-
-                    if table_type == "community":
-                        # 插入到 community.member_chunks 表（双写）
-                        cursor.execute(
-                            """
-                            INSERT INTO community.member_chunks
-                            (profile_id, chunk_index, chunk_text, bge_embedding, qwen_embedding)
-                            VALUES (%s, %s, %s, %s::vector, %s::vector)
-                            """,
-                            (
-                                entry_id,
-                                chunk_index,
-                                chunk_content,
-                                bge_embedding_str,
-                                qwen_embedding_str,
-                            ),
-                        )
-                    else:  # general_knowledge
-                        # 插入到 general_knowledge.knowledge_chunks 表（双写）
-                        cursor.execute(
-                            """
-                            INSERT INTO general_knowledge.knowledge_chunks
-                            (document_id, chunk_index, chunk_text, bge_embedding, qwen_embedding)
-                            VALUES (%s, %s, %s, %s::vector, %s::vector)
-                            """,
-                            (
-                                entry_id,
-                                chunk_index,
-                                chunk_content,
-                                bge_embedding_str,
-                                qwen_embedding_str,
-                            ),
-                        )
-
-                    success_count += 1
-                    log.debug(f"成功为块 {chunk_index} 生成双嵌入向量并存入 Parade DB")
+                # 至少需要一个 embedding 才能继续（任一块失败则整个条目不写入）
+                if embeddings["bge"] is None and embeddings["qwen"] is None:
+                    log.error(
+                        f"处理条目 {entry_id} 时发生错误: 无法为块 {chunk_index} 生成任何嵌入向量"
+                    )
+                    return False
 
-                conn.commit()
-                cursor.close()
+                rows.append(
+                    {
+                        "parent_id": int(entry_id),
+                        "chunk_index": chunk_index,
+                        "chunk_text": chunk_content,
+                        "bge_embedding": embeddings["bge"],
+                        "qwen_embedding": embeddings["qwen"],
+                    }
+                )
+                log.debug(f"成功为块 {chunk_index} 生成嵌入向量")
 
-                if success_count > 0:
-                    log.info(
-                        f"成功将 {success_count} 个文档块添加到 Parade DB 向量数据库，条目 {entry_id} 处理完成。"
+            # 写入走 asyncpg：向量以二进制参数发送（psycopg2 只能以文本发送，见 vector_codec）
+            if table_type == "community":
+                # 插入到 community.member_chunks 表
+                insert_sql = """
+                    INSERT INTO community.member_chunks
+                    (profile_id, chunk_index, chunk_text, bge_embedding, qwen_embedding)
+                    VALUES (
+                        :parent_id, :chunk_index, :chunk_text,
+                        CAST(:bge_embedding AS halfvec),
+                        CAST(:qwen_embedding AS halfvec)
                     )
-                    return True
-                else:
-                    log.warning(
-                        f"没有成功生成任何嵌入向量，条目 {entry_id} 未添加到 Parade DB 向量数据库"
+                """
+            else:  # general_knowledge
+                # 插入到 general_knowledge.knowledge_chunks 表
+                insert_sql = """
+                    INSERT INTO general_knowledge.knowledge_chunks
+                    (document_id, chunk_index, chunk_text, bge_embedding, qwen_embedding)
+                    VALUES (
+                        :parent_id, :chunk_index, :chunk_text,
+                        CAST(:bge_embedding AS halfvec),
+                        CAST(:qwen_embedding AS halfvec)
                     )
-                    return False
+                """
 
-            except Exception as e:
-                log.error(f"处理条目 {entry_id} 时发生错误: {e}", exc_info=True)
-                if conn:
-                    conn.rollback()
-                if cursor:
-                    cursor.close()
-                return False
+            async with AsyncSessionLocal() as session:
+                await session.execute(text(insert_sql), rows)
+                await session.commit()
+            knowledge_result_cache.invalidate(f"写入条目 {entry_id}")
+
+            log.info(
+                f"成功将 {len(rows)} 个文档块添加到 Parade DB 向量数据库，条目 {entry_id} 处理完成。"
+            )
+            return True
 
         except Exception as e:
             log.error(f"处理条目 {entry_id} 时发生错误: {e}", exc_info=True)
@@ -675,6 +650,7 @@ class IncrementalRAGService:
 
             conn.commit()
             cursor.close()
+            knowledge_result_cache.invalidate(f"删除条目 {entry_id}")
             return True
 
         except Exception as e:
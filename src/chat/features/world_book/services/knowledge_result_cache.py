@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+世界之书 / 知识库检索的语义结果缓存
+
+WorldBookService.find_entries 几乎每轮对话都会调用 knowledge_search_service.search，
+每次都要生成查询向量并在两个 chunks 表上执行 向量 + BM25 的四路 RRF 融合查询。
+很多轮次问的是几乎相同的问题（例如反复问同一个社区成员），这里缓存
+（查询向量 -> 融合后的结果）：
+- 清理后的查询文本（即 BM25 使用的查询）完全相同时直接命中，连查询向量也不必生成
+- 否则生成查询向量后，与缓存查询的余弦相似度达到 SIMILARITY_THRESHOLD 时命中，
+  省去数据库查询。只比较向量时，只差一个成员名字的两个问题相似度往往也很高，会返回
+  另一个成员的资料，因此还要求区分性检索词（去掉语气词、疑问词等虚词后的英文单词与
+  单个汉字）相同；"小明是谁" 与 "介绍一下小明吧" 只差虚词，由相似度决定是否命中
+- 缓存按各表当前检索所用的 embedding 列分组，切换模型后不会用旧模型的向量比较
+- IncrementalRAGService 写入或删除条目后整体失效（新内容可能进入任何查询的结果）；
+  检索期间发生失效时，该次结果仍返回给调用方，但不写入缓存
+"""
+
+import copy
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.chat.config.chat_config import KNOWLEDGE_RESULT_CACHE_CONFIG
+
+log = logging.getLogger(__name__)
+
+# 汉字逐字切分，其余按连续的字母数字切分
+_TERM_RE = re.compile(r"[\u4e00-\u9fff]|[^\W\u4e00-\u9fff]+")
+
+# 不区分查询对象的虚词：语气词、疑问词与 "介绍一下" 之类的请求用语。
+# 代词会改变查询对象（"我是谁" / "你是谁"），不在其中。
+# 两个查询只在这些词上不同时，交给余弦相似度判断是否为同一个问题
+_FILLER_TERMS = frozenset(
+    "的了吗呢啊呀吧嘛哦哈么"
+    "是谁什怎如何哪几"
+    "请问一下个这那些"
+    "有在和与及就都也还要能会可以"
+    "给说讲介绍知道告诉查找看"
+) | frozenset(
+    (
+        "a an the is are was were do does did of to in on for about "
+        "what who whom whose which how why when where "
+        "please tell know"
+    ).split()
+)
+
+
+@dataclass
+class _CacheEntry:
+    # 各表检索所用的 embedding 列，只有相同时向量才可比较
+    key: Tuple[str, ...]
+    query: str
+    terms: FrozenSet[str]
+    # 与 key 对应的各表查询向量（已归一化）
+    vectors: Tuple[np.ndarray, ...]
+    results: List[Dict[str, Any]]
+    expires_at: float
+    # 生成该结果时的耗时，命中时记为节省的时间
+    embed_ms: float
+    search_ms: float
+
+
+def query_terms(query: str) -> FrozenSet[str]:
+    """
+    查询中的区分性检索词：语义命中要求它们相同，避免只差一个名字的问题互相命中；
+    虚词不参与比较，只差语气词或问法的查询仍可按相似度命中。
+    """
+    return frozenset(_TERM_RE.findall(query.lower())) - _FILLER_TERMS
+
+
+def _normalize(vector: Sequence[float]) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    if norm == 0.0:
+        return None
+    return array / norm
+
+
+class KnowledgeResultCache:
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**KNOWLEDGE_RESULT_CACHE_CONFIG, **(config or {})}
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        # 每次失效递增；检索开始时记下，写入缓存时不一致则丢弃结果
+        self.generation = 0
+        # --- 统计 ---
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_ms = 0.0
+        self.lookup_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.config["ENABLED"])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _live_entries(self, key: Tuple[str, ...]) -> List[Tuple[int, _CacheEntry]]:
+        now = time.monotonic()
+        expired = [
+            entry_id
+            for entry_id, entry in self._entries.items()
+            if now >= entry.expires_at
+        ]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        return [
+            (entry_id, entry)
+            for entry_id, entry in self._entries.items()
+            if entry.key == key
+        ]
+
+    def _hit(self, entry_id: int, saved_ms: float) -> List[Dict[str, Any]]:
+        entry = self._entries[entry_id]
+        self._entries.move_to_end(entry_id)
+        self.saved_ms += saved_ms
+        # 调用方可能修改结果，返回副本
+        return copy.deepcopy(entry.results)
+
+    def get_exact(
+        self, key: Tuple[str, ...], query: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """清理后的查询文本与缓存完全相同时返回结果（不需要查询向量）。"""
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        for entry_id, entry in reversed(self._live_entries(key)):
+            if entry.query == query:
+                self.exact_hits += 1
+                self.lookup_ms += (time.perf_counter() - started) * 1000
+                return self._hit(entry_id, entry.embed_ms + entry.search_ms)
+        self.lookup_ms += (time.perf_counter() - started) * 1000
+        return None
+
+    def get_similar(
+        self, key: Tuple[str, ...], query: str, vectors: Sequence[Sequence[float]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        在区分性检索词与 query 相同的缓存中返回与查询向量最相似的结果；
+        各表向量的相似度取最小值，达到阈值才算命中。未命中时计入 misses。
+        """
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        terms = query_terms(query)
+        candidates = [
+            (entry_id, entry)
+            for entry_id, entry in self._live_entries(key)
+            if entry.terms == terms
+        ]
+        queries = [_normalize(vector) for vector in vectors]
+        best: Optional[Tuple[int, _CacheEntry]] = None
+        best_similarity = -1.0
+        if candidates and all(q is not None for q in queries):
+            similarities = np.min(
+                [
+                    np.stack([entry.vectors[i] for _, entry in candidates]) @ query
+                    for i, query in enumerate(queries)
+                ],
+                axis=0,
+            )
+            index = int(np.argmax(similarities))
+            best, best_similarity = candidates[index], float(similarities[index])
+        self.lookup_ms += (time.perf_counter() - started) * 1000
+
+        if best is None or best_similarity < self.config["SIMILARITY_THRESHOLD"]:
+            self.misses += 1
+            return None
+        entry_id, entry = best
+        self.semantic_hits += 1
+        log.debug(
+            f"[知识库缓存] 语义命中 (相似度 {best_similarity:.4f}): '{entry.query}'"
+        )
+        return self._hit(entry_id, entry.search_ms)
+
+    def put(
+        self,
+        key: Tuple[str, ...],
+        query: str,
+        vectors: Sequence[Sequence[float]],
+        results: List[Dict[str, Any]],
+        generation: int,
+        embed_ms: float,
+        search_ms: float,
+    ) -> None:
+        """写入检索结果；query 为清理后的查询，generation 为检索开始时的 self.generation。"""
+        if not self.enabled or generation != self.generation:
+            return
+        normalized = [_normalize(vector) for vector in vectors]
+        if any(vector is None for vector in normalized):
+            return
+        self._entries[self._next_id] = _CacheEntry(
+            key=key,
+            query=query,
+            terms=query_terms(query),
+            vectors=tuple(normalized),
+            results=copy.deepcopy(results),
+            expires_at=time.monotonic() + self.config["TTL_SECONDS"],
+            embed_ms=embed_ms,
+            search_ms=search_ms,
+        )
+        self._next_id += 1
+        while len(self._entries) > self.config["MAX_ENTRIES"]:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, reason: str = "") -> None:
+        """丢弃全部缓存；正在进行的检索结果也不会再写入缓存。"""
+        self.generation += 1
+        self.invalidations += 1
+        if self._entries:
+            log.debug(f"[知识库缓存] 失效 {len(self._entries)} 条缓存: {reason}")
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+            # 命中省下的 embedding / 数据库耗时，扣除所有查找缓存的耗时
+            "saved_ms": self.saved_ms - self.lookup_ms,
+            "avg_lookup_ms": self.lookup_ms / total if total else 0.0,
+        }
+
+    def format_metrics(self) -> str:
+        m = self.metrics()
+        return (
+            f"命中 {m['exact_hits'] + m['semantic_hits']}"
+            f"（文本 {m['exact_hits']} / 语义 {m['semantic_hits']}），"
+            f"未命中 {m['misses']}，命中率 {m['hit_rate']:.0%}，"
+            f"节省约 {m['saved_ms'] / 1000:.1f} s，"
+            f"失效 {m['invalidations']} 次，缓存 {m['entries']} 条"
+        )
+
+    def log_metrics_summary(self) -> None:
+        log.info(f"知识库检索缓存统计: {self.format_metrics()}")
+
+
+knowledge_result_cache = KnowledgeResultCache()
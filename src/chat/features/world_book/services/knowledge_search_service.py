@@ -1,19 +1,32 @@
 # -*- coding: utf-8 -*-
 import logging
-import re
+import time
 from typing import Any, List, Dict
 
 from sqlalchemy import text
 from src.database.database import AsyncSessionLocal
+from src.database.vector_codec import to_halfvec
 from src.chat.services.embedding_factory import (
     get_embedding_service,
     get_embedding_column,
     is_vector_enabled,
 )
+from src.chat.services.embedding_storage import (
+    build_semantic_search_sql,
+    prepare_vector_search,
+)
 from src.chat.config import chat_config
+from src.chat.features.world_book.services.knowledge_result_cache import (
+    knowledge_result_cache,
+)
+from src.chat.utils.log_utils import truncated
+from src.chat.utils.text_normalization import clean_fts_query
 
 log = logging.getLogger(__name__)
 
+COMMUNITY_CHUNKS_TABLE = "community.member_chunks"
+KNOWLEDGE_CHUNKS_TABLE = "general_knowledge.knowledge_chunks"
+
 
 class KnowledgeSearchService:
     """
@@ -39,50 +52,48 @@ class KnowledgeSearchService:
         清理全文搜索查询，移除可能导致 paradedb 解析错误的特殊字符。
         只保留字母、数字、中日韩统一表意文字和空格。
         """
-        # 正则表达式匹配所有非（字母、数字、CJK字符、空格）的字符
-        cleaned_query = re.sub(r"[^\w\s\u4e00-\u9fff]", "", query)
+        cleaned_query = clean_fts_query(query)
         log.debug(f"原始 FTS 查询: '{query}' -> 清理后: '{cleaned_query}'")
         return cleaned_query
 
     async def _hybrid_search_chunks(
-        self, session, query_text: str, query_vector: List[float]
+        self, session, query_text: str, query_vectors: Dict[str, List[float]]
     ) -> List[Dict[str, Any]]:
         """
         在 community.member_chunks 和 general_knowledge.knowledge_chunks
         两个表中执行混合搜索，并返回融合排序后的 chunk 结果。
+        query_vectors 按表名给出查询向量：切换模型的回填期间两个表检索的列可能不同。
         """
-        # 根据配置选择使用哪个 embedding 列
-        embedding_col = await get_embedding_column()
-        # 记录当前搜索配置
-        embedding_model = "Qwen" if embedding_col == "qwen_embedding" else "BGE"
-        log.info(
-            f"[知识库搜索配置] Embedding模型: {embedding_model} | 搜索模式: 混合搜索 (向量 + BM25) | "
-            f"向量列: {embedding_col} | TOP_K_VECTOR: {self.config['TOP_K_VECTOR']} | "
+        # 每个表使用其当前检索所用的 embedding 列
+        community_col = await get_embedding_column(COMMUNITY_CHUNKS_TABLE)
+        knowledge_col = await get_embedding_column(KNOWLEDGE_CHUNKS_TABLE)
+        log.debug(
+            f"[知识库搜索配置] 搜索模式: 混合搜索 (向量 + BM25) | "
+            f"向量列: {community_col} / {knowledge_col} | TOP_K_VECTOR: {self.config['TOP_K_VECTOR']} | "
             f"TOP_K_FTS: {self.config['TOP_K_FTS']} | RRF_K: {self.config['RRF_K']} | FINAL_K: {self.config['HYBRID_SEARCH_FINAL_K']}"
         )
+        # 向量检索部分按存储模式构建（全精度 / 量化后全精度重排）
+        community_semantic = build_semantic_search_sql(
+            columns="'community' as source_table, profile_id as document_id, chunk_text",
+            from_clause=COMMUNITY_CHUNKS_TABLE,
+            column=community_col,
+            vector_param="community_vector",
+        )
+        knowledge_semantic = build_semantic_search_sql(
+            columns="'general_knowledge' as source_table, document_id, chunk_text",
+            from_clause=KNOWLEDGE_CHUNKS_TABLE,
+            column=knowledge_col,
+            vector_param="knowledge_vector",
+        )
         # SQL 查询同时搜索两个 chunks 表
         sql_query = text(
             f"""
             WITH semantic_search AS (
                 -- 社区成员向量搜索
-                (SELECT
-                    'community' as source_table,
-                    profile_id as document_id,
-                    chunk_text,
-                    RANK() OVER (ORDER BY {embedding_col} <=> :query_vector) as rank
-                FROM community.member_chunks
-                ORDER BY {embedding_col} <=> :query_vector
-                LIMIT :top_k_vector)
+                ({community_semantic})
                 UNION ALL
                 -- 通用知识向量搜索
-                (SELECT
-                    'general_knowledge' as source_table,
-                    document_id,
-                    chunk_text,
-                    RANK() OVER (ORDER BY {embedding_col} <=> :query_vector) as rank
-                FROM general_knowledge.knowledge_chunks
-                ORDER BY {embedding_col} <=> :query_vector
-                LIMIT :top_k_vector)
+                ({knowledge_semantic})
             ),
             keyword_search AS (
                 -- 社区成员 BM25 搜索 (使用 paradedb.score)
@@ -121,18 +132,25 @@ class KnowledgeSearchService:
             LIMIT :final_k;
             """
         )
-        log.info(
-            f"执行混合搜索: query_text='{query_text[:100]}...', final_k={self.config['HYBRID_SEARCH_FINAL_K']}"
+        log.debug(
+            "执行混合搜索: query_text='%s...', final_k=%s",
+            query_text[:100],
+            self.config["HYBRID_SEARCH_FINAL_K"],
+        )
+        vector_params = await prepare_vector_search(
+            session, self.config["TOP_K_VECTOR"], profile="knowledge"
         )
         result = await session.execute(
             sql_query,
             {
                 "query_text": query_text,
-                "query_vector": str(query_vector),
+                "community_vector": to_halfvec(query_vectors[COMMUNITY_CHUNKS_TABLE]),
+                "knowledge_vector": to_halfvec(query_vectors[KNOWLEDGE_CHUNKS_TABLE]),
                 "top_k_vector": self.config["TOP_K_VECTOR"],
                 "top_k_fts": self.config["TOP_K_FTS"],
                 "rrf_k": self.config["RRF_K"],
                 "final_k": self.config["HYBRID_SEARCH_FINAL_K"],
+                **vector_params,
             },
         )
         # SQLAlchemy 2.x 的 Row 对象需要通过 ._mapping 转换为字典
@@ -146,6 +164,7 @@ class KnowledgeSearchService:
         1. 生成查询嵌入。
         2. 在 chunks 表中进行混合搜索。
         3. (暂定)直接返回 chunks 内容，因为我们的场景下，chunk 可能就是全部。
+        相同或语义相近的查询直接返回 knowledge_result_cache 中的结果。
         """
         log.info(f"收到知识库混合搜索请求: '{query}'")
 
@@ -154,35 +173,74 @@ class KnowledgeSearchService:
             log.info("[知识库搜索] 向量功能未启用，跳过搜索")
             return []
 
+        tables = (COMMUNITY_CHUNKS_TABLE, KNOWLEDGE_CHUNKS_TABLE)
+        # 清理用于全文搜索的查询文本；缓存也以它为准
+        cleaned_fts_query = self._clean_fts_query(query)
         try:
-            # 根据配置选择对应的 embedding 服务
-            embedding_service = await get_embedding_service()
-            query_embedding = await embedding_service.generate_embedding(
-                text=query, task_type="retrieval_query"
+            # 缓存按各表当前检索所用的 embedding 列分组
+            cache_key = tuple([await get_embedding_column(table) for table in tables])
+            cached_results = knowledge_result_cache.get_exact(
+                cache_key, cleaned_fts_query
             )
-            if not query_embedding:
-                raise ValueError("Embedding 生成失败，返回为空。")
+            if cached_results is not None:
+                log.info(f"知识库搜索命中缓存（相同查询）: '{query}'")
+                return cached_results
+            # 检索期间条目被修改时，结果不写入缓存
+            generation = knowledge_result_cache.generation
+
+            # 按各表当前检索所用的模型生成查询向量，两个表模型相同时只生成一次
+            started = time.perf_counter()
+            query_embeddings: Dict[str, List[float]] = {}
+            generated: Dict[int, List[float]] = {}
+            for table in tables:
+                embedding_service = await get_embedding_service(table=table)
+                if id(embedding_service) not in generated:
+                    embedding = await embedding_service.generate_embedding(
+                        text=query, task_type="retrieval_query"
+                    )
+                    if not embedding:
+                        raise ValueError("Embedding 生成失败，返回为空。")
+                    generated[id(embedding_service)] = embedding
+                query_embeddings[table] = generated[id(embedding_service)]
+            embed_ms = (time.perf_counter() - started) * 1000
         except Exception as e:
             log.error(f"为查询 '{query}' 生成 embedding 时出错: {e}", exc_info=True)
             return []
 
+        query_vectors = [query_embeddings[table] for table in tables]
+        cached_results = knowledge_result_cache.get_similar(
+            cache_key, cleaned_fts_query, query_vectors
+        )
+        if cached_results is not None:
+            log.info(f"知识库搜索命中缓存（语义相近的查询）: '{query}'")
+            return cached_results
+
         search_results = []
+        started = time.perf_counter()
         try:
-            # 清理用于全文搜索的查询文本
-            cleaned_fts_query = self._clean_fts_query(query)
-
             async with AsyncSessionLocal() as session:
                 search_results = await self._hybrid_search_chunks(
-                    session, cleaned_fts_query, query_embedding
+                    session, cleaned_fts_query, query_embeddings
                 )
-                log.info(f"混合搜索 RRF 结果: {search_results}")
+                log.debug("混合搜索 RRF 结果: %s", truncated(search_results, 2000))
 
         except Exception as e:
             log.error(f"在数据库中执行混合搜索时出错: {e}", exc_info=True)
             return []
 
+        search_ms = (time.perf_counter() - started) * 1000
+
         if not search_results:
             log.info(f"知识库混合搜索未找到 '{query}' 的相关文档。")
+            knowledge_result_cache.put(
+                cache_key,
+                cleaned_fts_query,
+                query_vectors,
+                [],
+                generation,
+                embed_ms,
+                search_ms,
+            )
             return []
 
         # 转换为 world_book_service 期望的格式
@@ -199,6 +257,15 @@ class KnowledgeSearchService:
                 }
             )
 
+        knowledge_result_cache.put(
+            cache_key,
+            cleaned_fts_query,
+            query_vectors,
+            formatted_results,
+            generation,
+            embed_ms,
+            search_ms,
+        )
         return formatted_results
 
 
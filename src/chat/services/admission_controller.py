@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+AI 回复的准入控制
+
+每个 @mention 都会启动一整条回复管线（数据库查询、RAG、模型调用）。
+活动或刷屏时，同一频道几十条 @ 会同时构建几乎相同的上下文并同时请求模型。
+这里在生成回复前做一次准入：
+- 全局名额 MAX_CONCURRENT_REQUESTS，排队时帖子内的请求优先
+- 每个频道同时只生成 PER_CHANNEL_CONCURRENCY 条回复，其余按到达顺序排队
+- 每个用户同时只生成 PER_USER_CONCURRENCY 条回复，其余按到达顺序排队；
+  排队 + 处理中的请求超过 PER_USER_MAX_PENDING 时直接丢弃（user_busy），
+  避免单个用户连续 @ 占满频道队列
+- 队列已满或等待超时时按 SHED_POLICY 丢弃请求
+- 可选：同一频道排队期间到达的新请求合并到正在排队的请求中，由它一次回复；
+  发起请求被丢弃时，合并进来的消息随之一起丢弃（留在 batch 中由调用方提示）
+所有队列深度、丢弃原因和等待时间都有统计，关闭时写入日志。
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from src.chat.config.chat_config import (
+    ADMISSION_CONTROL_CONFIG,
+    MAX_CONCURRENT_REQUESTS,
+)
+
+log = logging.getLogger(__name__)
+
+# 排队优先级，数值越小越先获得名额
+PRIORITY_THREAD = 0
+PRIORITY_CHANNEL = 1
+
+
+class _Evicted(Exception):
+    """排队中的请求被 drop_oldest 策略挤出。"""
+
+
+class _PriorityGate:
+    """带优先级的计数信号量；同优先级按到达顺序。"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.active = 0
+        self._waiters: List[Any] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    def would_wait(self) -> bool:
+        return self.active >= self.capacity or self.waiting > 0
+
+    async def acquire(self, priority: int = 0) -> None:
+        if not self.would_wait():
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except BaseException:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # 已经分到名额但调用方被取消了，把名额让给下一个
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self.active < self.capacity and self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.active += 1
+            future.set_result(None)
+
+    def evict_oldest(self) -> bool:
+        """让最早排队的请求失败；返回是否挤出了请求。"""
+        pending = [entry for entry in self._waiters if not entry[2].done()]
+        if not pending:
+            return False
+        oldest = min(pending, key=lambda entry: entry[1])
+        oldest[2].set_exception(_Evicted())
+        return True
+
+
+class Admission:
+    """一次准入的结果。admitted 为 True 时，调用方处理完必须调用 release()。"""
+
+    def __init__(self, controller: "AdmissionController", channel_id: int, user_id: int):
+        self._controller = controller
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.admitted = False
+        self.reason: Optional[str] = None
+        # 合并到本请求中的其他消息（不含本请求自己的消息）
+        self.batch: List[Any] = []
+        self.wait_seconds = 0.0
+        self._released = False
+
+    def release(self) -> None:
+        if self.admitted and not self._released:
+            self._released = True
+            self._controller._release(self)
+
+
+class _ChannelState:
+    def __init__(self, capacity: int):
+        self.gate = _PriorityGate(capacity)
+        # 正在排队、可以接收合并消息的请求
+        self.coalesce_leader: Optional[Admission] = None
+
+    def is_idle(self) -> bool:
+        return (
+            self.gate.active == 0
+            and self.gate.waiting == 0
+            and self.coalesce_leader is None
+        )
+
+
+class AdmissionController:
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {
+            "MAX_CONCURRENT_REQUESTS": MAX_CONCURRENT_REQUESTS,
+            **ADMISSION_CONTROL_CONFIG,
+            **(config or {}),
+        }
+        self._global = _PriorityGate(self.config["MAX_CONCURRENT_REQUESTS"])
+        self._channels: Dict[int, _ChannelState] = {}
+        self._user_pending: Counter = Counter()
+        self._user_gates: Dict[int, _PriorityGate] = {}
+        # --- 统计 ---
+        self.admitted = 0
+        self.coalesced = 0
+        self.shed: Counter = Counter()
+        self.max_wait_seconds = 0.0
+        self.max_global_queue = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config["ENABLED"]
+
+    def _shed(self, admission: Admission, reason: str) -> Admission:
+        admission.reason = reason
+        # 合并进来的消息与发起请求一起被丢弃
+        self.shed[reason] += 1 + len(admission.batch)
+        log.info(
+            f"AI 回复请求被丢弃 (原因: {reason}, 频道: {admission.channel_id}, "
+            f"用户: {admission.user_id}, 合并消息: {len(admission.batch)})"
+        )
+        return admission
+
+    async def acquire(
+        self,
+        channel_id: int,
+        user_id: int,
+        is_thread: bool = False,
+        message: Any = None,
+    ) -> Admission:
+        """
+        为一次 AI 回复申请名额，可能需要排队。
+        返回的 Admission.admitted 为 False 时，reason 说明原因：
+        "coalesced"（已合并到同频道排队中的请求）或各类丢弃原因；
+        丢弃时 batch 中是随之丢弃的合并消息。
+        """
+        admission = Admission(self, channel_id, user_id)
+        config = self.config
+
+        if self._user_pending[user_id] >= config["PER_USER_MAX_PENDING"]:
+            return self._shed(admission, "user_busy")
+
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = _ChannelState(config["PER_CHANNEL_CONCURRENCY"])
+            self._channels[channel_id] = channel
+
+        leader = channel.coalesce_leader
+        if (
+            config["COALESCE_ENABLED"]
+            and leader is not None
+            and len(leader.batch) + 1 < config["COALESCE_MAX_BATCH"]
+        ):
+            leader.batch.append(message)
+            admission.reason = "coalesced"
+            self.coalesced += 1
+            return admission
+
+        if channel.gate.would_wait() and channel.gate.waiting >= config["MAX_CHANNEL_QUEUE"]:
+            if config["SHED_POLICY"] == "drop_oldest" and channel.gate.evict_oldest():
+                pass
+            else:
+                return self._shed(admission, "channel_queue_full")
+        if self._global.would_wait() and self._global.waiting >= config["MAX_GLOBAL_QUEUE"]:
+            self._cleanup(channel_id, user_id)
+            return self._shed(admission, "global_queue_full")
+
+        priority = (
+            PRIORITY_THREAD
+            if is_thread and config["THREAD_PRIORITY"]
+            else PRIORITY_CHANNEL
+        )
+        if config["COALESCE_ENABLED"] and channel.coalesce_leader is None and (
+            channel.gate.would_wait() or self._global.would_wait()
+        ):
+            channel.coalesce_leader = admission
+
+        user_gate = self._user_gates.get(user_id)
+        if user_gate is None:
+            user_gate = _PriorityGate(config["PER_USER_CONCURRENCY"])
+            self._user_gates[user_id] = user_gate
+
+        self._user_pending[user_id] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(
+                self._acquire_slots(user_gate, channel, priority),
+                timeout=config["MAX_QUEUE_WAIT_SECONDS"],
+            )
+            admission.admitted = True
+        except _Evicted:
+            self._user_pending[user_id] -= 1
+            return self._shed(admission, "evicted")
+        except asyncio.TimeoutError:
+            self._user_pending[user_id] -= 1
+            return self._shed(admission, "timeout")
+        except BaseException:
+            self._user_pending[user_id] -= 1
+            raise
+        finally:
+            if channel.coalesce_leader is admission:
+                channel.coalesce_leader = None
+            if not admission.admitted:
+                self._cleanup(admission.channel_id, admission.user_id)
+
+        admission.wait_seconds = time.monotonic() - started
+        self.max_wait_seconds = max(self.max_wait_seconds, admission.wait_seconds)
+        self.admitted += 1
+        return admission
+
+    async def _acquire_slots(
+        self, user_gate: _PriorityGate, channel: _ChannelState, priority: int
+    ) -> None:
+        # 先等同一用户的上一条回复，排队期间不占用频道名额
+        await user_gate.acquire()
+        try:
+            await channel.gate.acquire()
+            try:
+                self.max_global_queue = max(
+                    self.max_global_queue, self._global.waiting + 1
+                )
+                await self._global.acquire(priority)
+            except BaseException:
+                # 排队超时或被挤出时归还已拿到的频道名额
+                channel.gate.release()
+                raise
+        except BaseException:
+            user_gate.release()
+            raise
+
+    def _release(self, admission: Admission) -> None:
+        self._global.release()
+        channel = self._channels.get(admission.channel_id)
+        if channel is not None:
+            channel.gate.release()
+        user_gate = self._user_gates.get(admission.user_id)
+        if user_gate is not None:
+            user_gate.release()
+        self._user_pending[admission.user_id] -= 1
+        self._cleanup(admission.channel_id, admission.user_id)
+
+    def _cleanup(self, channel_id: int, user_id: int) -> None:
+        if self._user_pending[user_id] <= 0:
+            del self._user_pending[user_id]
+            self._user_gates.pop(user_id, None)
+        channel = self._channels.get(channel_id)
+        if channel is not None and channel.is_idle():
+            del self._channels[channel_id]
+
+    # --- 统计 ---
+
+    def metrics(self) -> Dict[str, Any]:
+        channel_queues = {
+            channel_id: state.gate.waiting
+            for channel_id, state in self._channels.items()
+            if state.gate.waiting
+        }
+        return {
+            "in_flight": self._global.active,
+            "global_queue": self._global.waiting,
+            "channel_queues": channel_queues,
+            "admitted": self.admitted,
+            "coalesced": self.coalesced,
+            "shed": dict(self.shed),
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "max_global_queue": self.max_global_queue,
+        }
+
+    def log_metrics_summary(self) -> None:
+        m = self.metrics()
+        log.info(
+            f"AI 回复准入统计: 准入 {m['admitted']}，合并 {m['coalesced']}，"
+            f"丢弃 {m['shed'] or 0}，最长排队 {m['max_wait_seconds']}s，"
+            f"全局队列峰值 {m['max_global_queue']}"
+        )
+
+
+admission_controller = AdmissionController()
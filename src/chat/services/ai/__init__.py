@@ -23,8 +23,6 @@ from .providers.base import (
     GenerationError,
 )
 from .providers import (
-    GeminiProvider,
-    GeminiCustomProvider,
     DeepSeekProvider,
     OpenAICompatibleProvider,
 )
@@ -59,3 +57,12 @@ __all__ = [
     "get_model_configs",
     "FALLBACK_PRIORITY",
 ]
+
+
+def __getattr__(name):
+    # Gemini Provider 依赖的 google-genai 导入较慢，按需加载
+    if name in ("GeminiProvider", "GeminiCustomProvider"):
+        from . import providers
+
+        return getattr(providers, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -15,7 +15,6 @@ from .base import (
     ModelNotSupportedError,
     GenerationError,
 )
-from .gemini_provider import GeminiProvider, GeminiCustomProvider
 from .deepseek_provider import DeepSeekProvider
 from .openai_provider import OpenAICompatibleProvider
 from .provider_format import ProviderFormat, MessageFormat
@@ -42,3 +41,12 @@ __all__ = [
     "ProviderFormat",
     "MessageFormat",
 ]
+
+
+def __getattr__(name):
+    # Gemini Provider 依赖的 google-genai 导入较慢，按需加载
+    if name in ("GeminiProvider", "GeminiCustomProvider"):
+        from . import gemini_provider
+
+        return getattr(gemini_provider, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
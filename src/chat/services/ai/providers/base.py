@@ -36,6 +36,8 @@ class GenerationResult:
         tool_calls: 工具调用列表（如果有）
         thinking_content: 思考链内容（如果有）
         raw_response: 原始响应对象（用于调试）
+        cached_tokens: 命中 Provider 前缀缓存的输入 token 数量（可选）
+        first_byte_seconds: 从发出请求到收到第一个响应分片的耗时（仅流式调用可测）
     """
 
     content: str
@@ -47,6 +49,8 @@ class GenerationResult:
     tool_calls: Optional[List[Dict[str, Any]]] = None
     thinking_content: Optional[str] = None
     raw_response: Optional[Any] = None
+    cached_tokens: Optional[int] = None
+    first_byte_seconds: Optional[float] = None
 
     @property
     def has_tool_calls(self) -> bool:
@@ -23,6 +23,7 @@ from .base import (
     GenerationError,
 )
 from ..utils.tool_converter import ToolConverter
+from src.chat.services.http_client_registry import http_client_registry
 
 log = logging.getLogger(__name__)
 
@@ -66,7 +67,6 @@ class DeepSeekProvider(BaseProvider):
         self.base_url = base_url or os.getenv(
             "DEEPSEEK_BASE_URL", "https://api.deepseek.com"
         )
-        self._client: Optional[httpx.AsyncClient] = None
 
         if not self.api_key:
             log.warning(f"DeepSeekProvider '{provider_name}' 未配置 API 密钥")
@@ -74,17 +74,15 @@ class DeepSeekProvider(BaseProvider):
             log.info(f"DeepSeekProvider '{provider_name}' 初始化完成")
 
     def _get_client(self) -> httpx.AsyncClient:
-        """获取 HTTP 客户端"""
-        if self._client is None:
-            self._client = httpx.AsyncClient(
-                base_url=self.base_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                timeout=120.0,
-            )
-        return self._client
+        """获取 HTTP 客户端（来自共享注册表，按 base_url 复用连接池）"""
+        return http_client_registry.get_client(
+            self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            timeout=120.0,
+        )
 
     def get_client(self) -> Any:
         """获取底层客户端对象"""
@@ -674,6 +672,8 @@ class DeepSeekProvider(BaseProvider):
         input_tokens = usage.get("prompt_tokens")
         output_tokens = usage.get("completion_tokens")
         tokens_used = (input_tokens or 0) + (output_tokens or 0)
+        # DeepSeek 的上下文硬盘缓存命中量
+        cached_tokens = usage.get("prompt_cache_hit_tokens")
 
         return GenerationResult(
             content=content,
@@ -685,10 +685,9 @@ class DeepSeekProvider(BaseProvider):
             tool_calls=tool_calls,
             thinking_content=thinking_content,
             raw_response=response_data,
+            cached_tokens=cached_tokens,
         )
 
     async def close(self):
-        """关闭客户端"""
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        """客户端由 http_client_registry 统一管理，这里无需释放"""
+        return None
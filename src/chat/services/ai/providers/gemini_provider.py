@@ -9,6 +9,7 @@ Gemini Provider - 支持 Gemini 官方 API 和自定义端点
 
 import logging
 import io
+import time
 from typing import Optional, Dict, Any, List
 
 from PIL import Image
@@ -562,6 +563,8 @@ class GeminiProvider(BaseProvider):
         accumulated_function_calls: List[Any] = []
         final_candidate: Optional[genai_types.Candidate] = None
         final_usage_metadata: Optional[Any] = None
+        first_chunk_seconds: Optional[float] = None
+        started = time.perf_counter()
 
         stream = await client.aio.models.generate_content_stream(
             model=model_name,
@@ -572,6 +575,7 @@ class GeminiProvider(BaseProvider):
         async for chunk in stream:
             chunks_received += 1
             if chunks_received == 1:
+                first_chunk_seconds = time.perf_counter() - started
                 log.info("[流式] 已收到第一个 chunk，连接建立成功")
 
             if not chunk.candidates:
@@ -614,17 +618,23 @@ class GeminiProvider(BaseProvider):
         merged_candidates = [final_candidate] if final_candidate else []
 
         class _MergedResponse:
-            def __init__(self, candidates, usage_metadata, function_calls):
+            def __init__(
+                self, candidates, usage_metadata, function_calls, first_chunk_seconds
+            ):
                 self.candidates = candidates
                 self.usage_metadata = usage_metadata
                 self._function_calls = function_calls
+                self.first_chunk_seconds = first_chunk_seconds
 
             @property
             def function_calls(self):
                 return self._function_calls
 
         return _MergedResponse(
-            merged_candidates, final_usage_metadata, accumulated_function_calls
+            merged_candidates,
+            final_usage_metadata,
+            accumulated_function_calls,
+            first_chunk_seconds,
         )
 
     def _build_generation_config(
@@ -892,10 +902,14 @@ class GeminiProvider(BaseProvider):
         tokens_used = None
         input_tokens = None
         output_tokens = None
+        cached_tokens = None
         if response.usage_metadata:
             input_tokens = response.usage_metadata.prompt_token_count
             output_tokens = response.usage_metadata.candidates_token_count
             tokens_used = (input_tokens or 0) + (output_tokens or 0)
+            cached_tokens = getattr(
+                response.usage_metadata, "cached_content_token_count", None
+            )
 
         return GenerationResult(
             content=content,
@@ -905,6 +919,8 @@ class GeminiProvider(BaseProvider):
             output_tokens=output_tokens,
             finish_reason=finish_reason,
             raw_response=response,
+            cached_tokens=cached_tokens,
+            first_byte_seconds=getattr(response, "first_chunk_seconds", None),
         )
 
     def _calculate_safety_penalty(
@@ -23,13 +23,12 @@ from .providers.base import (
     ModelNotSupportedError,
 )
 from .providers import (
-    GeminiProvider,
-    GeminiCustomProvider,
     DeepSeekProvider,
     OpenAICompatibleProvider,
 )
 from .config.providers import get_provider_configs, ProviderConfig, _get_provider_configs_from_env
 from .config.models import get_fallback_providers, get_model_config
+from .usage_recorder import CallTrace, usage_recorder
 from src.chat.config.chat_config import PROVIDER_RETRY_CONFIG
 from src.config import BOT_NAME
 
@@ -154,7 +153,9 @@ class AIService:
             Optional[BaseProvider]: Provider 实例
         """
         if config.type == "gemini":
-            # Gemini 官方 API
+            # Gemini 官方 API（google-genai 导入较慢，只有配置了 Gemini 时才加载）
+            from .providers.gemini_provider import GeminiProvider
+
             api_keys_str = os.getenv("GOOGLE_API_KEYS_LIST", "")
             api_keys = [k.strip() for k in api_keys_str.split(",") if k.strip()]
 
@@ -200,6 +201,8 @@ class AIService:
             api_key = config.api_key or ""
             base_url = config.base_url or ""
             if extra.get("original_provider") == "gemini":
+                from .providers.gemini_provider import GeminiCustomProvider
+
                 return GeminiCustomProvider(
                     api_key=api_key,
                     base_url=base_url,
@@ -347,6 +350,7 @@ class AIService:
         model: Optional[str] = None,
         tools: Optional[List[Any]] = None,
         fallback: bool = True,
+        usage_label: Optional[str] = None,
         **kwargs,
     ) -> GenerationResult:
         """
@@ -358,6 +362,7 @@ class AIService:
             model: 模型 ID，支持 "provider:model" 格式或纯模型名
             tools: 工具列表
             fallback: 是否启用故障转移
+            usage_label: 用量记录中的调用类型，默认为 "generate"
             **kwargs: 其他参数
 
         Returns:
@@ -394,44 +399,54 @@ class AIService:
         # 记录完整上下文日志（如果启用）
         self._log_full_context_if_enabled(messages, tools, model_name)
 
+        trace = CallTrace(usage_label or "generate", provider_name, actual_model)
         try:
-            return await self._retry_generate(
-                provider=provider,
-                messages=messages,
-                config=config,
-                tools=tools,
-                model=actual_model,
-                provider_name=provider_name,
-                **kwargs,
-            )
-        except GenerationError as e:
-            if fallback:
-                return await self._fallback_generate(
+            try:
+                result = await self._retry_generate(
+                    provider=provider,
+                    messages=messages,
+                    config=config,
+                    tools=tools,
+                    model=actual_model,
+                    provider_name=provider_name,
+                    trace=trace,
+                    **kwargs,
+                )
+            except GenerationError as e:
+                if not fallback:
+                    raise
+                result = await self._fallback_generate(
                     messages=messages,
                     config=config,
                     tools=tools,
                     failed_provider=provider_name,
                     original_error=e,
                     model=model_name,
+                    trace=trace,
                     **kwargs,
                 )
-            raise
-        except Exception as e:
-            if fallback:
-                return await self._fallback_generate(
+            except Exception as e:
+                if not fallback:
+                    raise GenerationError(
+                        f"生成失败: {e}",
+                        provider_type=provider_name,
+                        original_error=e,
+                    )
+                result = await self._fallback_generate(
                     messages=messages,
                     config=config,
                     tools=tools,
                     failed_provider=provider_name,
                     original_error=e,
                     model=model_name,
+                    trace=trace,
                     **kwargs,
                 )
-            raise GenerationError(
-                f"生成失败: {e}",
-                provider_type=provider_name,
-                original_error=e,
-            )
+        except BaseException as e:
+            usage_recorder.record(trace.to_record(error=e))
+            raise
+        usage_recorder.record(trace.to_record(result=result))
+        return result
 
     async def generate_with_tools(
         self,
@@ -444,6 +459,7 @@ class AIService:
         fallback: bool = True,
         user_id_for_settings: Optional[str] = None,
         allow_empty_response: bool = False,
+        usage_label: Optional[str] = None,
         **kwargs,
     ) -> GenerationResult:
         """
@@ -458,6 +474,7 @@ class AIService:
             max_iterations: 最大迭代次数
             fallback: 是否启用故障转移
             user_id_for_settings: 用于获取工具设置的用户 ID（故障转移时需要重新获取工具）
+            usage_label: 用量记录中的调用类型，默认为 "generate_with_tools"
             **kwargs: 其他参数
 
         Returns:
@@ -493,22 +510,28 @@ class AIService:
         # 记录完整上下文日志（如果启用）
         self._log_full_context_if_enabled(messages, tools, model_name)
 
+        trace = CallTrace(
+            usage_label or "generate_with_tools", provider_name, actual_model
+        )
         try:
-            return await self._retry_generate_with_tools(
-                provider=provider,
-                messages=messages,
-                config=config,
-                tools=tools,
-                model=actual_model,
-                provider_name=provider_name,
-                tool_executor=tool_executor,
-                max_iterations=max_iterations,
-                allow_empty_response=allow_empty_response,
-                **kwargs,
-            )
-        except GenerationError as e:
-            if fallback:
-                return await self._fallback_generate(
+            try:
+                result = await self._retry_generate_with_tools(
+                    provider=provider,
+                    messages=messages,
+                    config=config,
+                    tools=tools,
+                    model=actual_model,
+                    provider_name=provider_name,
+                    tool_executor=tool_executor,
+                    max_iterations=max_iterations,
+                    allow_empty_response=allow_empty_response,
+                    trace=trace,
+                    **kwargs,
+                )
+            except GenerationError as e:
+                if not fallback:
+                    raise
+                result = await self._fallback_generate(
                     messages=messages,
                     config=config,
                     tools=tools,
@@ -518,12 +541,17 @@ class AIService:
                     tool_executor=tool_executor,
                     max_iterations=max_iterations,
                     user_id_for_settings=user_id_for_settings,
+                    trace=trace,
                     **kwargs,
                 )
-            raise
-        except Exception as e:
-            if fallback:
-                return await self._fallback_generate(
+            except Exception as e:
+                if not fallback:
+                    raise GenerationError(
+                        f"工具调用生成失败: {e}",
+                        provider_type=provider_name,
+                        original_error=e,
+                    )
+                result = await self._fallback_generate(
                     messages=messages,
                     config=config,
                     tools=tools,
@@ -533,13 +561,14 @@ class AIService:
                     tool_executor=tool_executor,
                     max_iterations=max_iterations,
                     user_id_for_settings=user_id_for_settings,
+                    trace=trace,
                     **kwargs,
                 )
-            raise GenerationError(
-                f"工具调用生成失败: {e}",
-                provider_type=provider_name,
-                original_error=e,
-            )
+        except BaseException as e:
+            usage_recorder.record(trace.to_record(error=e))
+            raise
+        usage_recorder.record(trace.to_record(result=result))
+        return result
 
     async def generate_two_stage(
         self,
@@ -592,6 +621,7 @@ class AIService:
                 fallback=True,
                 user_id_for_settings=user_id_for_settings,
                 allow_empty_response=True,
+                usage_label="two_stage_tools",
                 **kwargs,
             )
             stage1_tokens = (
@@ -620,6 +650,7 @@ class AIService:
             model=writer_model,
             tools=None,
             fallback=True,
+            usage_label="two_stage_writer",
             **kwargs,
         )
 
@@ -679,6 +710,7 @@ class AIService:
         tools: Optional[List[Any]],
         model: str,
         provider_name: str,
+        trace: Optional[CallTrace] = None,
         **kwargs,
     ) -> GenerationResult:
         """
@@ -693,6 +725,7 @@ class AIService:
             tools: 工具列表
             model: 实际模型名称
             provider_name: Provider 名称（用于日志）
+            trace: 用量记录的调用过程信息（可选）
             **kwargs: 其他参数
 
         Returns:
@@ -723,6 +756,8 @@ class AIService:
             except Exception as e:
                 last_error = e
                 if attempt < max_retries:
+                    if trace is not None:
+                        trace.retries += 1
                     log.warning(
                         f"Provider '{provider_name}' 第 {attempt + 1}/{max_retries + 1} 次请求失败: {e}，"
                         f"将在 {retry_delay}s 后重试..."
@@ -753,6 +788,7 @@ class AIService:
         tool_executor: Optional[Any] = None,
         max_iterations: int = 5,
         allow_empty_response: bool = False,
+        trace: Optional[CallTrace] = None,
         **kwargs,
     ) -> GenerationResult:
         """
@@ -769,6 +805,7 @@ class AIService:
             provider_name: Provider 名称（用于日志）
             tool_executor: 工具执行函数
             max_iterations: 最大迭代次数
+            trace: 用量记录的调用过程信息（可选）
             **kwargs: 其他参数
 
         Returns:
@@ -801,6 +838,8 @@ class AIService:
             except Exception as e:
                 last_error = e
                 if attempt < max_retries:
+                    if trace is not None:
+                        trace.retries += 1
                     log.warning(
                         f"Provider '{provider_name}' 第 {attempt + 1}/{max_retries + 1} 次工具调用请求失败: {e}，"
                         f"将在 {retry_delay}s 后重试..."
@@ -831,6 +870,7 @@ class AIService:
         tool_executor: Optional[Any] = None,
         max_iterations: int = 5,
         user_id_for_settings: Optional[str] = None,
+        trace: Optional[CallTrace] = None,
         **kwargs,
     ) -> GenerationResult:
         """
@@ -846,6 +886,7 @@ class AIService:
             tool_executor: 工具执行函数
             max_iterations: 最大迭代次数
             user_id_for_settings: 用于重新获取工具的用户 ID
+            trace: 用量记录的调用过程信息（可选）
             **kwargs: 其他参数
 
         Returns:
@@ -884,6 +925,8 @@ class AIService:
                 continue
 
             tried_providers.add(fallback_name)
+            if trace is not None:
+                trace.fallback_hops += 1
 
             log.info(f"尝试故障转移到 Provider '{fallback_name}'")
 
@@ -957,6 +1000,9 @@ class AIService:
                     )
 
                 log.info(f"故障转移到 Provider '{fallback_name}' 成功")
+                if trace is not None:
+                    trace.provider = fallback_name
+                    trace.model = result.model_used or fallback_model or trace.model
                 return result
 
             except Exception as e:
@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+AI 调用用量记录
+
+各 Provider 的 _process_response 都会解析 token 用量，但此前没有任何地方按调用保存，
+token_usage 表也只有读取没有写入。这里在 AIService 的入口处为每次调用记录：
+Provider、模型、输入 / 输出 / 缓存命中 token、首个响应分片耗时、总耗时、重试次数和故障转移跳数。
+
+记录先进入内存缓冲，定时（或积累到阈值）后一次性批量写入 ai_call_usage，
+同时把当天的 token 合计累加到 token_usage（设置面板的「今日 Token 统计」）。
+写入失败的记录放回缓冲等待下次写入，缓冲有上限，数据库长时间不可用时丢弃最旧的记录。
+
+get_daily_rollup 按天、按 Provider / 模型汇总调用次数、失败次数、延迟 p50 / p95 和 token 消耗。
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from src.chat.config.chat_config import USAGE_RECORDER_CONFIG
+from src.database.database import AsyncSessionLocal
+from src.database.models import AiCallUsage, TokenUsage
+
+from .providers.base import GenerationResult
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class UsageRecord:
+    """一次 AI 调用的用量，字段与 ai_call_usage 表的列一一对应。"""
+
+    created_at: datetime.datetime
+    call_type: str
+    provider: str
+    model: str
+    success: bool
+    latency_ms: int
+    retries: int = 0
+    fallback_hops: int = 0
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    ttfb_ms: Optional[int] = None
+    error_type: Optional[str] = None
+
+
+class CallTrace:
+    """
+    一次 AIService 调用的过程信息。
+    重试与故障转移逻辑在执行过程中更新它，调用结束后转换为 UsageRecord。
+    """
+
+    __slots__ = (
+        "call_type",
+        "provider",
+        "model",
+        "retries",
+        "fallback_hops",
+        "created_at",
+        "_started",
+    )
+
+    def __init__(self, call_type: str, provider: str, model: str):
+        self.call_type = call_type
+        self.provider = provider
+        self.model = model
+        self.retries = 0
+        self.fallback_hops = 0
+        self.created_at = datetime.datetime.utcnow()
+        self._started = time.perf_counter()
+
+    def elapsed_ms(self) -> int:
+        return int((time.perf_counter() - self._started) * 1000)
+
+    def to_record(
+        self,
+        result: Optional[GenerationResult] = None,
+        error: Optional[BaseException] = None,
+    ) -> UsageRecord:
+        record = UsageRecord(
+            created_at=self.created_at,
+            call_type=self.call_type,
+            provider=self.provider or "unknown",
+            model=self.model or "unknown",
+            success=result is not None and error is None,
+            latency_ms=self.elapsed_ms(),
+            retries=self.retries,
+            fallback_hops=self.fallback_hops,
+        )
+        if result is not None:
+            record.input_tokens = result.input_tokens
+            record.output_tokens = result.output_tokens
+            record.cached_tokens = result.cached_tokens
+            if result.first_byte_seconds is not None:
+                record.ttfb_ms = int(result.first_byte_seconds * 1000)
+        if error is not None:
+            record.error_type = type(error).__name__
+        return record
+
+
+async def _write_to_postgres(records: List[UsageRecord]) -> None:
+    """在一个事务中批量插入调用记录，并把 token 合计累加到 token_usage 的当日行。"""
+    daily: Dict[datetime.datetime, Dict[str, int]] = {}
+    for record in records:
+        if not record.success:
+            continue
+        day = datetime.datetime.combine(record.created_at.date(), datetime.time())
+        totals = daily.setdefault(day, {"input": 0, "output": 0, "calls": 0})
+        totals["input"] += record.input_tokens or 0
+        totals["output"] += record.output_tokens or 0
+        totals["calls"] += 1
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(AiCallUsage), [asdict(r) for r in records])
+        for day, totals in sorted(daily.items()):
+            stmt = pg_insert(TokenUsage).values(
+                date=day,
+                input_tokens=totals["input"],
+                output_tokens=totals["output"],
+                total_tokens=totals["input"] + totals["output"],
+                call_count=totals["calls"],
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[TokenUsage.date],
+                set_={
+                    "input_tokens": TokenUsage.input_tokens + stmt.excluded.input_tokens,
+                    "output_tokens": TokenUsage.output_tokens
+                    + stmt.excluded.output_tokens,
+                    "total_tokens": TokenUsage.total_tokens + stmt.excluded.total_tokens,
+                    "call_count": TokenUsage.call_count + stmt.excluded.call_count,
+                },
+            )
+            await session.execute(stmt)
+        await session.commit()
+
+
+class UsageRecorder:
+    def __init__(
+        self,
+        write: Optional[Callable[[List[UsageRecord]], Awaitable[None]]] = None,
+        config: Optional[Dict[str, Any]] = None,
+    ):
+        self._write = write or _write_to_postgres
+        self.config = {**USAGE_RECORDER_CONFIG, **(config or {})}
+        self._buffer: Deque[UsageRecord] = deque()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        # --- 统计 ---
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config["ENABLED"]
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(self, record: UsageRecord) -> None:
+        """记录一次调用；不做任何 I/O，写入在后台批量进行。"""
+        if not self.enabled:
+            return
+        self.recorded += 1
+        self._append([record])
+        if self._wake is None:
+            # 延迟创建，避免在导入时绑定事件循环
+            self._wake = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+        if len(self._buffer) >= self.config["FLUSH_THRESHOLD"]:
+            # 积累到阈值时提前写入
+            self._wake.set()
+
+    def _append(self, records: List[UsageRecord]) -> None:
+        self._buffer.extend(records)
+        overflow = len(self._buffer) - self.config["MAX_BUFFERED_RECORDS"]
+        for _ in range(max(overflow, 0)):
+            self._buffer.popleft()
+            self.dropped += 1
+
+    async def _delayed_flush(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self._wake.wait(), timeout=self.config["FLUSH_INTERVAL_SECONDS"]
+            )
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
+        await self.flush()
+
+    async def flush(self) -> int:
+        """写入缓冲中的全部记录，返回写入条数；失败的记录放回缓冲。"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            batch = list(self._buffer)
+            self._buffer.clear()
+            try:
+                await self._write(batch)
+            except Exception as e:
+                log.error(
+                    f"批量写入 {len(batch)} 条 AI 调用记录失败，将在下次重试: {e}",
+                    exc_info=True,
+                )
+                # 放回缓冲头部，保持时间顺序
+                pending = list(self._buffer)
+                self._buffer.clear()
+                self._append(batch + pending)
+                return 0
+            self.written += len(batch)
+            return len(batch)
+
+    async def aclose(self) -> None:
+        """关闭时写入尚未落库的记录。"""
+        # 不取消后台任务，避免中断正在进行的写入；唤醒它立即写入并等待完成
+        if self._flush_task is not None and not self._flush_task.done():
+            self._wake.set()
+            await self._flush_task
+        self._flush_task = None
+        await self.flush()
+        log.info(
+            f"AI 调用用量记录器已关闭: 记录 {self.recorded} 条，写入 {self.written} 条，"
+            f"丢弃 {self.dropped} 条，未写入 {self.pending} 条。"
+        )
+
+    async def get_daily_rollup(
+        self,
+        start_date: datetime.date,
+        end_date: Optional[datetime.date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        按天（UTC）、Provider、模型汇总 [start_date, end_date] 内的调用。
+        返回每组的调用次数、失败次数、延迟 p50 / p95、首分片 p95 以及 token 合计。
+        """
+        # 先写入缓冲，让汇总包含最近的调用
+        await self.flush()
+        end_date = end_date or start_date
+        start = datetime.datetime.combine(start_date, datetime.time())
+        end = datetime.datetime.combine(
+            end_date + datetime.timedelta(days=1), datetime.time()
+        )
+        day = func.date(AiCallUsage.created_at).label("day")
+        stmt = (
+            select(
+                day,
+                AiCallUsage.provider,
+                AiCallUsage.model,
+                func.count().label("calls"),
+                func.sum(case((AiCallUsage.success.is_(False), 1), else_=0)).label(
+                    "failures"
+                ),
+                func.percentile_cont(0.5)
+                .within_group(AiCallUsage.latency_ms)
+                .label("latency_p50_ms"),
+                func.percentile_cont(0.95)
+                .within_group(AiCallUsage.latency_ms)
+                .label("latency_p95_ms"),
+                func.percentile_cont(0.95)
+                .within_group(AiCallUsage.ttfb_ms)
+                .label("ttfb_p95_ms"),
+                func.coalesce(func.sum(AiCallUsage.input_tokens), 0).label(
+                    "input_tokens"
+                ),
+                func.coalesce(func.sum(AiCallUsage.output_tokens), 0).label(
+                    "output_tokens"
+                ),
+                func.coalesce(func.sum(AiCallUsage.cached_tokens), 0).label(
+                    "cached_tokens"
+                ),
+                func.sum(AiCallUsage.retries).label("retries"),
+                func.sum(AiCallUsage.fallback_hops).label("fallback_hops"),
+            )
+            .where(AiCallUsage.created_at >= start, AiCallUsage.created_at < end)
+            .group_by(day, AiCallUsage.provider, AiCallUsage.model)
+            .order_by(day, AiCallUsage.provider, AiCallUsage.model)
+        )
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(stmt)
+            return [dict(row._mapping) for row in result]
+
+
+usage_recorder = UsageRecorder()
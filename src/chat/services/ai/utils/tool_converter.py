@@ -6,11 +6,15 @@
 支持 Gemini、OpenAI、Claude 等格式。
 """
 
+from __future__ import annotations
+
 import logging
-from typing import Any, Dict, List, Union
+import sys
+from typing import TYPE_CHECKING, Any, Dict, List, Union
 
-# 导入 Google Gemini types（用于 Gemini 格式转换）
-from google.genai import types as genai_types
+# google-genai 导入耗时较长（约 0.5~1 秒），只在真正需要 Gemini 格式时才导入
+if TYPE_CHECKING:
+    from google.genai import types as genai_types
 
 # 导入通用工具声明
 from src.chat.features.tools.tool_declaration import ToolDeclaration
@@ -19,6 +23,12 @@ from src.chat.services.ai.providers.provider_format import ProviderFormat
 log = logging.getLogger(__name__)
 
 
+def _is_genai_part(obj: Any) -> bool:
+    """SDK 尚未导入时不可能存在 Part 对象，无需为了 isinstance 触发导入"""
+    genai_types = sys.modules.get("google.genai.types")
+    return genai_types is not None and isinstance(obj, genai_types.Part)
+
+
 class ToolConverter:
     """
     工具格式转换器
@@ -44,6 +54,8 @@ class ToolConverter:
         Returns:
             genai_types.Tool: Gemini 格式的工具
         """
+        from google.genai import types as genai_types
+
         # 构建 FunctionDeclaration
         function_declaration = genai_types.FunctionDeclaration(
             name=declaration.name,
@@ -200,6 +212,8 @@ class ToolConverter:
         else:
             response = {"result": result}
 
+        from google.genai import types as genai_types
+
         return genai_types.Part.from_function_response(
             name=tool_name,
             response=response,
@@ -216,7 +230,7 @@ class ToolConverter:
             return None
         elif isinstance(obj, str | int | float | bool):
             return obj
-        elif isinstance(obj, genai_types.Part):
+        elif _is_genai_part(obj):
             # Gemini Part 对象转换为文本
             if hasattr(obj, "text") and obj.text:
                 return obj.text
@@ -11,10 +11,12 @@ from src.config import BOT_NAME
 from src.chat.services.ai.service import ai_service
 from src.chat.utils.prompt_utils import replace_emojis
 from src.chat.services.prompt_service import prompt_service
+from src.chat.services.prompt_prefix_monitor import prompt_prefix_monitor
 from src.chat.services.context_service_test import get_context_service  # 导入测试服务
 from src.chat.features.world_book.services.world_book_service import world_book_service
 from src.chat.features.affection.service.affection_service import affection_service
 from src.chat.features.odysseia_coin.service.coin_service import coin_service
+from src.chat.services.user_state_aggregator import user_state_aggregator
 from src.chat.utils.database import chat_db_manager
 from src.chat.features.personal_memory.services.personal_memory_service import (
     personal_memory_service,
@@ -203,16 +205,15 @@ class ChatService:
                     log.error(f"获取用户 {author.id} 最近聊天历史失败: {hist_e}")
 
             # 3. --- 好感度与奖励更新（前置） ---
+            # 两者都进入写回缓冲，由 user_state_aggregator 合并后批量写入
             try:
-                # 在生成回复前更新好感度，以确保日志顺序正确
-                await affection_service.increase_affection_on_message(author.id)
+                await user_state_aggregator.add_chat_affection(author.id)
             except Exception as aff_e:
                 log.error(f"增加用户 {author.id} 的好感度时出错: {aff_e}")
 
             try:
                 # 发放每日首次对话奖励
-                if await coin_service.grant_daily_message_reward(author.id):
-                    log.info(f"已为用户 {author.id} 发放每日首次对话奖励。")
+                await user_state_aggregator.add_daily_message_reward(author.id)
             except Exception as coin_e:
                 log.error(f"为用户 {author.id} 发放每日对话奖励时出错: {coin_e}")
 
@@ -307,6 +308,7 @@ class ChatService:
                 persona_style=persona_style,
                 memory_notes=memory_notes_text,
                 recent_chat_history=recent_chat_history,
+                user_id=author.id,
             )
 
             # Stage 1：极简工具路由提示（无人设、无世界书、无好感度、无历史，最大化缓存命中）
@@ -429,13 +431,22 @@ class ChatService:
                     _provider_name = ai_service._model_to_provider.get(
                         _model_name, "unknown"
                     )
-                await chat_settings_service.increment_model_usage(
+                await user_state_aggregator.add_model_usage(
                     model_name=_model_name, provider_name=_provider_name
                 )
                 log.debug(
                     f"记录模型使用: {_model_name} (Provider: {_provider_name})"
                 )
 
+            # 把本轮的缓存命中 token 关联到提示词前缀观测
+            # （两阶段模式下 input_tokens 含 Stage 1 的消耗，命中率会略微偏低）
+            prompt_prefix_monitor.record_usage(
+                author.id,
+                message.channel.id,
+                result.cached_tokens,
+                result.input_tokens,
+            )
+
             ai_response = result.content
 
             if not ai_response:
@@ -447,7 +458,7 @@ class ChatService:
             # 传递 current_model 使总结逻辑跟随主模型
             if user_profile_data:
                 try:
-                    await personal_memory_service.update_and_conditionally_summarize_memory(
+                    await user_state_aggregator.append_history(
                         user_id=author.id,
                         user_name=author.display_name,
                         user_content=user_content,
@@ -4,9 +4,9 @@ import logging
 from typing import Optional, Dict, List, Any
 import discord
 from discord.ext import commands
-import re
 from collections import OrderedDict
 from src.chat.config import chat_config
+from src.chat.utils.text_normalization import clean_discord_message
 
 log = logging.getLogger(__name__)
 
@@ -161,8 +161,9 @@ class ContextServiceTest:
                 # 3. 检查并清理超出容量的缓存
                 while len(self.message_cache) > self.MAX_CACHE_SIZE:
                     removed_item = self.message_cache.popitem(last=False)
-                    log.info(
-                        f"[单条消息缓存] 清理: 缓存已满，移除最旧的消息 {removed_item[0]}。"
+                    log.debug(
+                        "[单条消息缓存] 清理: 缓存已满，移除最旧的消息 %s。",
+                        removed_item[0],
                     )
 
             # --- 处理历史消息 ---
@@ -218,20 +219,15 @@ class ContextServiceTest:
         """
         净化消息内容，移除或替换不适合模型处理的元素。
         """
-        # 还原 Discord 为了 Markdown 显示而自动添加的转义
-        content = content.replace("\\_", "_")
-
-        content = re.sub(r"https?://cdn\.discordapp\.com\S+", "", content)
+        replace_mention = None
         if guild:
 
-            def replace_mention(match):
-                user_id = int(match.group(1))
+            def replace_mention(user_id: int) -> str:
                 member = guild.get_member(user_id)
                 return f"@{member.display_name}" if member else "@未知用户"
 
-            content = re.sub(r"<@!?(\d+)>", replace_mention, content)
-        content = re.sub(r"<a?:\w+:\d+>", "", content)
-        return content.strip()
+        # 还原转义、移除 CDN 链接和自定义表情（见 text_normalization）
+        return clean_discord_message(content, replace_mention)
 
 
 # 全局实例
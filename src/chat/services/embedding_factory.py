@@ -177,18 +177,29 @@ def _create_service(mode: VectorMode) -> EmbeddingServiceProtocol:
 
 async def get_embedding_service(
     mode: Optional[VectorMode] = None,
+    table: Optional[str] = None,
 ) -> EmbeddingServiceProtocol:
     """
     获取 embedding 服务实例
 
     Args:
         mode: 向量模式，如果为 None 则使用全局配置 VECTOR_MODE
+        table: 要检索的表（schema.表名）。本地模式下返回该表当前检索所用模型的服务，
+            切换模型的回填期间它可能与全局设置不同，查询向量必须与检索的列一致
 
     Returns:
         对应模式的 embedding 服务实例
     """
     use_mode = mode or VECTOR_MODE
 
+    if table and use_mode == "local":
+        from src.chat.services.embedding_lifecycle import (
+            embedding_lifecycle,
+            get_model_service,
+        )
+
+        return get_model_service(await embedding_lifecycle.serving_model(table))
+
     if use_mode not in _service_cache:
         _service_cache[use_mode] = _create_service(use_mode)
         log.info(f"[Embedding 工厂] 创建 {use_mode} 模式的服务实例")
@@ -222,13 +233,17 @@ def get_embedding_column_for_mode(mode: Optional[VectorMode] = None) -> str:
     return "qwen_embedding"
 
 
-async def get_embedding_column() -> str:
+async def get_embedding_column(table: Optional[str] = None) -> str:
     """
     异步获取当前使用的 embedding 列名
 
     根据数据库配置返回当前使用的 embedding 列名。
     仅在本地向量模式下有效。
 
+    Args:
+        table: 要检索的表（schema.表名）。指定时返回该表当前检索所用的列，
+            切换模型后新列回填完成之前仍是旧列
+
     Returns:
         embedding 列名
     """
@@ -236,6 +251,11 @@ async def get_embedding_column() -> str:
         return ""
 
     try:
+        if table:
+            from src.chat.services.embedding_lifecycle import embedding_lifecycle
+
+            return await embedding_lifecycle.serving_column(table)
+
         from src.chat.utils.database import chat_db_manager
 
         model = await chat_db_manager.get_global_setting("embedding_model")
@@ -0,0 +1,587 @@
+# -*- coding: utf-8 -*-
+"""
+Embedding 生命周期管理
+
+此前每次写入都同时生成 BGE 与 Qwen 两种向量（双写），而检索只读取 get_embedding_column()
+返回的那一列，另一列的嵌入计算和 HNSW 索引维护都是浪费。这里按表记录两个模型：
+
+- serving: 检索读取的模型（查询向量也用它生成，保证与列一致）
+- target:  正在回填的模型；为空表示该表处于稳定状态
+
+稳定状态下写入只生成 serving 模型的向量。管理员在设置面板切换模型后，后台任务按批次
+（有间隔地）为 target 列缺失的行补齐向量，此期间新写入同时生成两种向量；一轮扫描结束后
+若仍有行缺少向量（嵌入失败），从头重新扫描这些行，全部补齐（或扫描达到 MAX_PASSES 轮，
+剩余的行保持 NULL 并在进度中报告）后该表的检索才切换到新模型，
+并删除不再使用的列上的 HNSW 索引（可选清空该列数据）。
+批量嵌入接口出错时会吞掉异常并返回空向量，因此整批都没有向量时视为嵌入服务故障，
+不推进游标，避免一次故障让整批行被当作"失败"跳过。索引以 CONCURRENTLY 方式在
+autocommit 连接上创建 / 删除，不阻塞写入；启动时按当前存储模式为检索列补建全精度索引
+与该模式的量化索引，并删除其他存储模式的量化索引。
+各表的状态保存在全局设置 embedding_lifecycle_state 中，重启后从断点继续；
+读取状态失败时直接报错，不会按当前模型重建状态（否则回填中的表会立即改用未补齐的列）。
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from src.chat.config.chat_config import EMBEDDING_LIFECYCLE_CONFIG, VECTOR_MODE
+from src.chat.services.embedding_storage import (
+    STORAGE_MODES,
+    VECTOR_TABLES,
+    get_storage_mode,
+    hnsw_index,
+)
+from src.chat.utils.document_builder import build_forum_thread_document
+from src.database.vector_codec import to_halfvec
+
+log = logging.getLogger(__name__)
+
+MODEL_COLUMNS: Dict[str, str] = {"bge": "bge_embedding", "qwen": "qwen_embedding"}
+DEFAULT_MODEL = "qwen"
+STATE_SETTING_KEY = "embedding_lifecycle_state"
+
+
+def _forum_document(row: Any) -> str:
+    return build_forum_thread_document(
+        thread_name=row.thread_name,
+        content=row.content,
+        author_name=row.author_name,
+        category_name=row.category_name,
+    )
+
+
+# 表名 -> (回填时读取的列, 由一行构建待嵌入文本的函数)
+TEXT_SOURCES: Dict[str, Tuple[str, Callable[[Any], str]]] = {
+    "forum.forum_threads": (
+        "thread_name, content, author_name, category_name",
+        _forum_document,
+    ),
+    "tutorials.knowledge_chunks": ("chunk_text", lambda row: row.chunk_text),
+    "general_knowledge.knowledge_chunks": ("chunk_text", lambda row: row.chunk_text),
+    "community.member_chunks": ("chunk_text", lambda row: row.chunk_text),
+    "conversation.conversation_blocks": (
+        "conversation_text",
+        lambda row: row.conversation_text,
+    ),
+}
+
+
+def model_column(model: str) -> str:
+    return MODEL_COLUMNS.get(model, MODEL_COLUMNS[DEFAULT_MODEL])
+
+
+def get_model_service(model: str):
+    """返回指定模型的 Ollama embedding 服务。"""
+    from src.chat.services.ollama_embedding_service import (
+        ollama_embedding_service,
+        qwen_embedding_service,
+    )
+
+    return ollama_embedding_service if model == "bge" else qwen_embedding_service
+
+
+@dataclass
+class TableState:
+    """单张表的生命周期状态。"""
+
+    serving: str
+    target: Optional[str] = None
+    processed: int = 0
+    failed: int = 0
+    total: int = 0
+    last_id: int = 0
+    started_at: Optional[float] = None
+    last_error: Optional[str] = None
+    # 已完成的扫描轮数；第一轮之后的轮次只处理之前嵌入失败的行
+    passes: int = 0
+    # 当前游标处的批次连续整批失败的次数
+    batch_retries: int = 0
+    # 达到扫描轮数上限后仍缺少向量、切换检索时保持 NULL 的行数
+    unembedded: int = 0
+
+    @property
+    def backfilling(self) -> bool:
+        return self.target is not None
+
+    def eta_seconds(self, now: float) -> Optional[float]:
+        """按已用时间与已处理行数估算剩余时间；尚无进度时返回 None。"""
+        if not self.backfilling or not self.processed or self.started_at is None:
+            return None
+        rate = self.processed / max(now - self.started_at, 1e-6)
+        return max(self.total - self.processed, 0) / rate
+
+
+class _SettingsStore:
+    """状态与当前模型都保存在 chat_db_manager 的全局设置中。"""
+
+    @staticmethod
+    def _db():
+        from src.chat.utils.database import chat_db_manager
+
+        return chat_db_manager
+
+    async def get_desired_model(self) -> str:
+        model = await self._db().get_global_setting("embedding_model")
+        return model if model in MODEL_COLUMNS else DEFAULT_MODEL
+
+    async def get_disabled_models(self) -> List[str]:
+        disabled = await self._db().get_global_setting("disabled_embedding_models")
+        return [m.strip() for m in (disabled or "").split(",") if m.strip()]
+
+    async def load_state(self) -> Optional[str]:
+        return await self._db().get_global_setting(STATE_SETTING_KEY)
+
+    async def save_state(self, value: str) -> None:
+        await self._db().set_global_setting(STATE_SETTING_KEY, value)
+
+
+class _PostgresRepository:
+    """回填与索引维护的数据库操作。"""
+
+    @staticmethod
+    def _session():
+        from src.database.database import AsyncSessionLocal
+
+        return AsyncSessionLocal()
+
+    async def count_missing(self, table: str, column: str) -> int:
+        async with self._session() as session:
+            result = await session.execute(
+                text(f"SELECT COUNT(*) FROM {table} WHERE {column} IS NULL")
+            )
+            return int(result.scalar() or 0)
+
+    async def fetch_batch(
+        self, table: str, column: str, after_id: int, limit: int
+    ) -> List[Tuple[int, str]]:
+        source_columns, build_text = TEXT_SOURCES[table]
+        async with self._session() as session:
+            result = await session.execute(
+                text(
+                    f"SELECT id, {source_columns} FROM {table} "
+                    f"WHERE {column} IS NULL AND id > :after_id "
+                    "ORDER BY id LIMIT :limit"
+                ),
+                {"after_id": after_id, "limit": limit},
+            )
+            return [(row.id, build_text(row) or "") for row in result]
+
+    async def write_batch(
+        self, table: str, column: str, rows: Sequence[Tuple[int, List[float]]]
+    ) -> None:
+        async with self._session() as session:
+            await session.execute(
+                text(
+                    f"UPDATE {table} SET {column} = CAST(:vector AS halfvec) "
+                    "WHERE id = :id"
+                ),
+                [{"id": row_id, "vector": to_halfvec(vector)} for row_id, vector in rows],
+            )
+            await session.commit()
+
+    async def execute_ddl(self, statement: str) -> None:
+        """在 autocommit 连接上执行（CREATE / DROP INDEX CONCURRENTLY 不能在事务中运行）。"""
+        from src.database.database import engine
+
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(statement))
+
+
+class EmbeddingLifecycleManager:
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        store: Any = None,
+        repository: Any = None,
+        get_service: Callable[[str], Any] = get_model_service,
+        tables: Optional[Sequence[str]] = None,
+    ):
+        self.config = {**EMBEDDING_LIFECYCLE_CONFIG, **(config or {})}
+        self._store = store or _SettingsStore()
+        self._repo = repository or _PostgresRepository()
+        self._get_service = get_service
+        self.tables = list(tables or [table for table, _ in VECTOR_TABLES])
+        self._states: Optional[Dict[str, TableState]] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.config["ENABLED"] and VECTOR_MODE == "local"
+
+    # --- 状态 ---
+
+    async def _load(self) -> Dict[str, TableState]:
+        if self._states is not None:
+            return self._states
+        # 读取失败时异常直接抛出，下次调用重试；不能按当前模型重建，
+        # 否则回填中的表会立即改用未补齐的列，下一次保存还会覆盖断点
+        raw = await self._store.load_state()
+        states: Dict[str, TableState] = {
+            table: TableState(**data)
+            for table, data in json.loads(raw or "{}").items()
+        }
+        desired = await self._store.get_desired_model()
+        for table in self.tables:
+            if table not in states:
+                # 首次接管：旧数据来自双写，以当前模型为准补齐缺失的行后再停用另一列
+                states[table] = TableState(serving=desired)
+        self._states = states
+        return states
+
+    async def _save(self) -> None:
+        payload = {table: asdict(state) for table, state in self._states.items()}
+        await self._store.save_state(json.dumps(payload))
+
+    async def serving_model(self, table: str) -> str:
+        """检索该表时应使用的模型（列与查询向量都以它为准）。"""
+        if not self.enabled:
+            return await self._store.get_desired_model()
+        states = await self._load()
+        return states[table].serving if table in states else DEFAULT_MODEL
+
+    async def serving_column(self, table: str) -> str:
+        return model_column(await self.serving_model(table))
+
+    async def write_models(self, table: str) -> List[str]:
+        """
+        写入该表时需要生成向量的模型。
+        稳定状态下只有 serving；回填期间同时写入 target，避免新行再次进入回填。
+        管理员在设置面板中禁用的模型会被跳过（但至少保留一个）。
+        """
+        if not self.enabled:
+            return list(MODEL_COLUMNS)
+        states = await self._load()
+        state = states.get(table)
+        if state is None:
+            return [await self._store.get_desired_model()]
+        models = [state.serving]
+        if state.target and state.target != state.serving:
+            models.append(state.target)
+        try:
+            disabled = await self._store.get_disabled_models()
+        except Exception:
+            disabled = []
+        return [m for m in models if m not in disabled] or models[:1]
+
+    async def generate_embeddings(
+        self, table: str, content: str, title: Optional[str] = None
+    ) -> Dict[str, List[float]]:
+        """为写入该表的一行按 write_models 生成向量，返回 {列名: 向量}（跳过失败的模型）。"""
+        embeddings: Dict[str, List[float]] = {}
+        for model in await self.write_models(table):
+            try:
+                vector = await self._get_service(model).generate_embedding(
+                    text=content, task_type="retrieval_document", title=title
+                )
+            except Exception as e:
+                log.error(f"[Embedding 生命周期] 生成 {model} 向量失败: {e}")
+                continue
+            if vector:
+                embeddings[model_column(model)] = list(vector)
+        return embeddings
+
+    # --- 回填 ---
+
+    async def step(self) -> bool:
+        """
+        推进一步：按当前模型设置开始 / 取消回填，并为一张表处理一个批次。
+        返回是否仍有回填在进行（调用方据此决定下一步的等待时间）。
+        """
+        async with self._get_lock():
+            states = await self._sync_targets()
+            for table in self.tables:
+                state = states[table]
+                if state.backfilling:
+                    await self._run_batch(table, state)
+                    return any(s.backfilling for s in states.values())
+            return False
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def sync_targets(self) -> None:
+        """只按当前模型设置开始 / 取消回填，不处理批次（设置面板刷新进度时使用）。"""
+        async with self._get_lock():
+            await self._sync_targets()
+
+    async def _sync_targets(self) -> Dict[str, TableState]:
+        states = await self._load()
+        desired = await self._store.get_desired_model()
+        for table in self.tables:
+            await self._sync_target(table, states[table], desired)
+        return states
+
+    async def _sync_target(self, table: str, state: TableState, desired: str) -> None:
+        if state.target == desired:
+            return
+        if state.target is None and state.serving == desired and state.started_at:
+            # 已处于稳定状态
+            return
+        if state.target is not None and state.serving == desired:
+            log.info(f"[Embedding 生命周期] {table}: 模型已切回 {desired}，取消回填。")
+            state.target = None
+            state.started_at = time.time()
+            await self._save()
+            return
+        state.target = desired
+        state.total = await self._repo.count_missing(table, model_column(desired))
+        state.processed = 0
+        state.failed = 0
+        state.last_id = 0
+        state.passes = 0
+        state.batch_retries = 0
+        state.unembedded = 0
+        state.started_at = time.time()
+        state.last_error = None
+        log.info(
+            f"[Embedding 生命周期] {table}: 开始回填 {desired} 向量，"
+            f"共 {state.total} 行待处理。"
+        )
+        await self._save()
+
+    async def _run_batch(self, table: str, state: TableState) -> None:
+        column = model_column(state.target)
+        batch = await self._repo.fetch_batch(
+            table, column, state.last_id, self.config["BATCH_SIZE"]
+        )
+        if not batch:
+            missing = await self._repo.count_missing(table, column)
+            if missing and state.passes + 1 < self.config["MAX_PASSES"]:
+                # 本轮有行嵌入失败（或写入时未生成该模型的向量），从头重新扫描，补齐前不切换
+                state.passes += 1
+                state.failed = 0
+                state.last_id = 0
+                state.last_error = f"{missing} 行缺少向量，第 {state.passes + 1} 轮重试"
+                log.warning(f"[Embedding 生命周期] {table}: {state.last_error}。")
+                await self._save()
+                return
+            if missing:
+                # 反复失败的行不能无限期阻止切换：保持 NULL，在进度中报告
+                state.unembedded = missing
+                log.warning(
+                    f"[Embedding 生命周期] {table}: {state.passes + 1} 轮扫描后仍有 "
+                    f"{missing} 行缺少向量，这些行保持 NULL，照常切换检索。"
+                )
+            await self._finish(table, state)
+            return
+
+        texts = [content for _, content in batch]
+        try:
+            vectors = await self._get_service(state.target).generate_embeddings_batch(
+                texts, task_type="retrieval_document"
+            )
+        except Exception as e:
+            # 嵌入服务不可用时不推进游标，下一步重试同一批次
+            state.last_error = f"{type(e).__name__}: {e}"
+            log.error(f"[Embedding 生命周期] {table}: 批量生成向量失败: {e}")
+            await self._save()
+            return
+
+        rows = [
+            (row_id, list(vector))
+            for (row_id, _), vector in zip(batch, vectors or [])
+            if vector
+        ]
+        if not rows and (
+            len(batch) > 1 or state.batch_retries < self.config["MAX_BATCH_RETRIES"]
+        ):
+            # 整批都没有向量：嵌入服务出错时会吞掉异常返回空结果，按服务故障处理，
+            # 不推进游标；单行批次重试达到上限后才当作该行嵌入失败跳过
+            state.batch_retries += 1
+            state.last_error = (
+                f"{len(batch)} 行嵌入失败（整批无向量，视为嵌入服务故障，"
+                f"第 {state.batch_retries} 次重试）"
+            )
+            log.error(f"[Embedding 生命周期] {table}: {state.last_error}。")
+            await self._save()
+            return
+        state.batch_retries = 0
+        if rows:
+            await self._repo.write_batch(table, column, rows)
+        if not state.passes:
+            state.processed += len(batch)
+        failed = len(batch) - len(rows)
+        state.failed += failed
+        state.last_id = batch[-1][0]
+        state.last_error = f"{failed} 行嵌入失败，本轮结束后重试" if failed else None
+        await self._save()
+        log.debug(
+            f"[Embedding 生命周期] {table}: {state.processed}/{state.total} 行，"
+            f"失败 {state.failed} 行。"
+        )
+
+    async def _create_index(self, table: str, column: str, mode: str) -> None:
+        name, ddl = hnsw_index(table, column, mode, concurrently=True)
+        try:
+            await self._repo.execute_ddl(ddl)
+        except Exception:
+            # 失败的 CONCURRENTLY 会留下 INVALID 索引，IF NOT EXISTS 下次会跳过它
+            await self._repo.execute_ddl(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            raise
+
+    async def _drop_index(self, table: str, column: str, mode: str) -> None:
+        name, _ = hnsw_index(table, column, mode)
+        await self._repo.execute_ddl(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    async def _ensure_serving_indexes(self, table: str, column: str) -> None:
+        """
+        检索列保留全精度索引与当前存储模式的量化索引；
+        其他存储模式的量化索引按 DROP_INACTIVE_INDEXES 删除。
+        """
+        storage_mode = get_storage_mode()
+        for mode in dict.fromkeys(("full", storage_mode)):
+            await self._create_index(table, column, mode)
+        if self.config["DROP_INACTIVE_INDEXES"]:
+            for mode in STORAGE_MODES:
+                if mode not in ("full", storage_mode):
+                    await self._drop_index(table, column, mode)
+
+    async def _retire_columns(self, table: str, active: str) -> None:
+        """删除不再检索的列上的全部索引，可选清空该列。"""
+        for model in MODEL_COLUMNS:
+            if model == active:
+                continue
+            column = model_column(model)
+            if self.config["DROP_INACTIVE_INDEXES"]:
+                for mode in STORAGE_MODES:
+                    await self._drop_index(table, column, mode)
+            if self.config["CLEAR_INACTIVE_COLUMN"]:
+                # 释放存储需要之后的 VACUUM；清空后切回该模型需要完整回填
+                await self._repo.execute_ddl(
+                    f"UPDATE {table} SET {column} = NULL WHERE {column} IS NOT NULL"
+                )
+
+    async def ensure_indexes(self) -> None:
+        """
+        启动时调用：按当前存储模式与各表的检索列补建 / 清理索引。
+        修改 EMBEDDING_STORAGE_MODE 后重启即可生效，不需要迁移预先建好所有组合。
+        回填中的表不动 target 列，它的索引在回填完成时创建。
+        """
+        async with self._get_lock():
+            states = await self._load()
+            for table in self.tables:
+                state = states[table]
+                await self._ensure_serving_indexes(table, model_column(state.serving))
+                if not state.backfilling:
+                    await self._retire_columns(table, state.serving)
+
+    async def _finish(self, table: str, state: TableState) -> None:
+        active = state.target
+        # 新的检索列必须有索引；回填期间不维护也没关系，这里补建
+        await self._ensure_serving_indexes(table, model_column(active))
+
+        previous = state.serving
+        state.serving = active
+        state.target = None
+        state.last_error = None
+        await self._save()
+        log.info(
+            f"[Embedding 生命周期] {table}: 回填完成（{state.processed} 行，"
+            f"{state.passes + 1} 轮扫描），检索由 {previous} 切换到 {active}。"
+        )
+        # 切换之后再删除旧列的索引，切换前的检索仍能走索引
+        await self._retire_columns(table, active)
+
+    # --- 后台任务 ---
+
+    def notify_model_changed(self) -> None:
+        """设置面板切换模型后调用，立即开始回填而不必等待下一次检查。"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            log.error(f"[Embedding 生命周期] 维护向量索引失败: {e}", exc_info=True)
+        while True:
+            try:
+                busy = await self.step()
+            except Exception as e:
+                log.error(f"[Embedding 生命周期] 回填任务出错: {e}", exc_info=True)
+                busy = False
+            interval = (
+                self.config["BATCH_INTERVAL_SECONDS"]
+                if busy
+                else self.config["IDLE_CHECK_INTERVAL_SECONDS"]
+            )
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    # --- 进度 ---
+
+    async def progress(self) -> List[Dict[str, Any]]:
+        states = await self._load()
+        now = time.time()
+        report = []
+        for table in self.tables:
+            state = states[table]
+            report.append(
+                {
+                    "table": table,
+                    "serving": state.serving,
+                    "target": state.target,
+                    "processed": state.processed,
+                    "failed": state.failed,
+                    "total": state.total,
+                    "percent": (
+                        min(state.processed / state.total, 1.0) if state.total else 1.0
+                    ),
+                    "eta_seconds": state.eta_seconds(now),
+                    "last_error": state.last_error,
+                    "unembedded": state.unembedded,
+                }
+            )
+        return report
+
+    async def format_progress(self) -> str:
+        lines = []
+        for item in await self.progress():
+            if item["target"] is None:
+                line = f"`{item['table']}`: {item['serving']}"
+                if item["unembedded"]:
+                    line += f"（{item['unembedded']} 行未能生成向量）"
+                lines.append(line)
+                continue
+            eta = item["eta_seconds"]
+            eta_text = f"约 {int(eta // 60)} 分 {int(eta % 60)} 秒" if eta else "估算中"
+            line = (
+                f"`{item['table']}`: {item['serving']} → {item['target']} "
+                f"{item['processed']}/{item['total']} ({item['percent']:.0%})，剩余 {eta_text}"
+            )
+            if item["last_error"]:
+                line += f"（最近错误: {item['last_error'][:60]}）"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+embedding_lifecycle = EmbeddingLifecycleManager()
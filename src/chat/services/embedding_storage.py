@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""
+向量检索的存储 / 量化模式
+
+五张向量表（论坛帖子、教程块、通用知识块、社区成员块、对话块）都保存两列
+1024 维 HALFVEC（bge_embedding / qwen_embedding），每列一个全精度 HNSW 索引，
+每个向量在索引中占 2 KB。这里提供三种第一阶段（ANN）检索方式：
+
+- "full":      直接在全精度列上做 HNSW 检索（原有行为）
+- "binary":    在 binary_quantize(列)::bit(1024) 表达式索引上按汉明距离检索（每个向量 128 字节）
+- "truncated": 在 subvector(列, 1, N)::halfvec(N) 表达式索引上按余弦距离检索
+               （Matryoshka 截断，N=256 时每个向量 512 字节；qwen3-embedding 支持 MRL，
+               bge-m3 未专门训练，召回损失更大，切换前请先跑基准）
+
+量化模式下第一阶段取 top_k × 倍数 个候选，再用全精度列的余弦距离重新排序取 top_k，
+返回的 vector_distance 始终是全精度距离，下游的阈值与 RRF 融合不受影响。
+表达式索引由 EmbeddingLifecycleManager 启动时按 hnsw_index() 为当前模式与检索列创建
+（CREATE INDEX CONCURRENTLY），其他模式的量化索引会被删除；全精度列和索引保持不变，
+改回 "full" 后重启即可。召回率 / 延迟对比见 scripts/benchmark_embedding_storage.py。
+
+各搜索场景（论坛、教程、知识库、对话记忆）的 HNSW 参数见 VECTOR_SEARCH_PROFILES，
+由 prepare_vector_search 在当前事务内设置；参数调优见 scripts/benchmark_hnsw_profiles.py。
+"""
+
+import logging
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.chat.config.chat_config import (
+    EMBEDDING_STORAGE_CONFIG,
+    VECTOR_SEARCH_PROFILES,
+)
+
+log = logging.getLogger(__name__)
+
+EmbeddingStorageMode = Literal["full", "binary", "truncated"]
+STORAGE_MODES: Tuple[str, ...] = ("full", "binary", "truncated")
+
+# 与 src.database.models.EMBEDDING_DIMENSION 一致；两种模型都是 1024 维
+FULL_DIMENSION = 1024
+
+# (schema.表名, 索引名前缀)，迁移脚本与基准脚本使用相同的列表
+VECTOR_TABLES: List[Tuple[str, str]] = [
+    ("forum.forum_threads", "forum"),
+    ("tutorials.knowledge_chunks", "tut"),
+    ("general_knowledge.knowledge_chunks", "gk"),
+    ("community.member_chunks", "cm"),
+    ("conversation.conversation_blocks", "conv"),
+]
+EMBEDDING_COLUMNS: Tuple[str, ...] = ("bge_embedding", "qwen_embedding")
+
+# 表 -> 检索该表的搜索场景（VECTOR_SEARCH_PROFILES 的键）
+TABLE_PROFILES: Dict[str, str] = {
+    "forum.forum_threads": "forum",
+    "tutorials.knowledge_chunks": "tutorial",
+    "general_knowledge.knowledge_chunks": "knowledge",
+    "community.member_chunks": "knowledge",
+    "conversation.conversation_blocks": "conversation",
+}
+
+ITERATIVE_SCAN_MODES: Tuple[str, ...] = ("off", "strict_order", "relaxed_order")
+# pgvector 允许的 hnsw.ef_search 上限
+MAX_EF_SEARCH = 1000
+
+
+def _query_vector(param: str = "query_vector") -> str:
+    return f"CAST(:{param} AS halfvec)"
+
+
+def get_search_profile(profile: Optional[str]) -> Dict[str, Any]:
+    """返回搜索场景的 HNSW 参数（未配置的项取 "default"）。"""
+    return {
+        **VECTOR_SEARCH_PROFILES["default"],
+        **VECTOR_SEARCH_PROFILES.get(profile or "default", {}),
+    }
+
+
+def get_storage_mode() -> EmbeddingStorageMode:
+    mode = EMBEDDING_STORAGE_CONFIG["MODE"]
+    if mode not in STORAGE_MODES:
+        log.warning(f"未知的向量存储模式 '{mode}'，使用全精度检索")
+        return "full"
+    return mode  # type: ignore[return-value]
+
+
+def quantized_expr(vector_expr: str, mode: EmbeddingStorageMode) -> str:
+    """
+    返回向量表达式在指定模式下的量化形式。
+    用于列时必须与 hnsw_index() 中的索引表达式完全一致，查询才能走表达式索引。
+    """
+    if mode == "binary":
+        return f"binary_quantize({vector_expr})::bit({FULL_DIMENSION})"
+    if mode == "truncated":
+        dim = EMBEDDING_STORAGE_CONFIG["TRUNCATE_DIM"]
+        return f"subvector({vector_expr}, 1, {dim})::halfvec({dim})"
+    return vector_expr
+
+
+def ann_distance_expr(
+    column: str, mode: EmbeddingStorageMode, vector_param: str = "query_vector"
+) -> str:
+    """第一阶段 ANN 检索的排序表达式。"""
+    operator = "<~>" if mode == "binary" else "<=>"
+    query = quantized_expr(_query_vector(vector_param), mode)
+    return f"{quantized_expr(column, mode)} {operator} {query}"
+
+
+def exact_distance_expr(column: str, vector_param: str = "query_vector") -> str:
+    """全精度余弦距离。"""
+    return f"{column} <=> {_query_vector(vector_param)}"
+
+
+def hnsw_index(
+    table: str,
+    column: str,
+    mode: EmbeddingStorageMode,
+    concurrently: bool = False,
+) -> Tuple[str, str]:
+    """
+    返回 (带 schema 的索引名, 建索引语句)。
+    全精度索引即各表建表时创建的索引；量化索引只为当前存储模式与检索列创建。
+    concurrently 为 True 时使用 CREATE INDEX CONCURRENTLY（不阻塞写入，不能在事务中执行）。
+    """
+    schema = table.split(".")[0]
+    prefix = dict(VECTOR_TABLES)[table]
+    if mode == "binary":
+        name = f"idx_{prefix}_{column}_bq_hnsw"
+        expression = f"({quantized_expr(column, mode)}) bit_hamming_ops"
+    elif mode == "truncated":
+        dim = EMBEDDING_STORAGE_CONFIG["TRUNCATE_DIM"]
+        name = f"idx_{prefix}_{column}_t{dim}_hnsw"
+        expression = f"({quantized_expr(column, mode)}) halfvec_cosine_ops"
+    else:
+        # 教程表的全精度索引建表时没有加前缀
+        name = (
+            f"idx_{column}_hnsw" if prefix == "tut" else f"idx_{prefix}_{column}_hnsw"
+        )
+        expression = f"{column} halfvec_cosine_ops"
+    profile = get_search_profile(TABLE_PROFILES.get(table))
+    create = "CREATE INDEX CONCURRENTLY" if concurrently else "CREATE INDEX"
+    ddl = (
+        f"{create} IF NOT EXISTS {name} ON {table} "
+        f"USING hnsw ({expression}) "
+        f"WITH (m = {profile['M']}, ef_construction = {profile['EF_CONSTRUCTION']})"
+    )
+    return f"{schema}.{name}", ddl
+
+
+def rescore_candidates(top_k: int) -> int:
+    """量化模式下第一阶段取回、交给全精度重排的候选数。"""
+    return max(
+        top_k * EMBEDDING_STORAGE_CONFIG["RESCORE_MULTIPLIER"],
+        EMBEDDING_STORAGE_CONFIG["MIN_RESCORE_CANDIDATES"],
+    )
+
+
+def build_semantic_search_sql(
+    columns: str,
+    from_clause: str,
+    column: str,
+    where: Optional[str] = None,
+    mode: Optional[EmbeddingStorageMode] = None,
+    vector_param: str = "query_vector",
+) -> str:
+    """
+    构建混合搜索中 semantic_search 部分的 SELECT 语句。
+
+    结果包含 columns、全精度距离 vector_distance 以及按该距离排列的 rank，
+    最多 :top_k_vector 行。查询参数为 :query_vector（可用 vector_param 改名）、:top_k_vector，
+    量化模式下另需 :ann_candidates（由 prepare_vector_search 提供）。
+    """
+    mode = mode or get_storage_mode()
+    distance = exact_distance_expr(column, vector_param)
+    conditions = f"{column} IS NOT NULL"
+    if where:
+        conditions += f" AND {where}"
+
+    if mode == "full":
+        return f"""SELECT
+                {columns},
+                {distance} as vector_distance,
+                RANK() OVER (ORDER BY {distance}) as rank
+            FROM {from_clause}
+            WHERE {conditions}
+            ORDER BY {distance}
+            LIMIT :top_k_vector"""
+
+    return f"""SELECT
+                candidates.*,
+                RANK() OVER (ORDER BY candidates.vector_distance) as rank
+            FROM (
+                SELECT
+                    {columns},
+                    {distance} as vector_distance
+                FROM {from_clause}
+                WHERE {conditions}
+                ORDER BY {ann_distance_expr(column, mode, vector_param)}
+                LIMIT :ann_candidates
+            ) candidates
+            ORDER BY candidates.vector_distance
+            LIMIT :top_k_vector"""
+
+
+def hnsw_session_settings(
+    profile: Optional[str], rows: int, mode: EmbeddingStorageMode
+) -> Dict[str, str]:
+    """
+    返回一次检索需要在事务内设置的 HNSW 参数。
+    rows 为本次 ANN 检索要取回的行数：HNSW 一次最多返回 ef_search 行，ef_search 不能小于它。
+    """
+    settings = get_search_profile(profile)
+    ef_search = min(max(settings["EF_SEARCH"], rows), MAX_EF_SEARCH)
+    result = {"hnsw.ef_search": str(ef_search)}
+
+    iterative_scan = settings["ITERATIVE_SCAN"]
+    if iterative_scan not in ITERATIVE_SCAN_MODES:
+        log.warning(f"未知的 HNSW 迭代扫描模式 '{iterative_scan}'，已关闭")
+        iterative_scan = "off"
+    if iterative_scan == "relaxed_order" and mode == "full":
+        # 全精度模式直接使用索引扫描的顺序，relaxed_order 可能返回乱序的结果
+        iterative_scan = "strict_order"
+    if iterative_scan != "off":
+        result["hnsw.iterative_scan"] = iterative_scan
+        result["hnsw.max_scan_tuples"] = str(settings["MAX_SCAN_TUPLES"])
+    return result
+
+
+async def apply_hnsw_settings(session, settings: Dict[str, str]) -> None:
+    """在当前事务内设置 HNSW 参数（等价于 SET LOCAL），一次往返完成。"""
+    if not settings:
+        return
+    assignments = ", ".join(
+        f"set_config('{name}', :{name.split('.')[-1]}, true)" for name in settings
+    )
+    await session.execute(
+        text(f"SELECT {assignments}"),
+        {name.split(".")[-1]: value for name, value in settings.items()},
+    )
+
+
+async def prepare_vector_search(
+    session,
+    top_k: int,
+    mode: Optional[EmbeddingStorageMode] = None,
+    profile: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    为本次检索准备会话并返回需要额外绑定的参数。
+
+    指定 profile 时按该搜索场景设置 ef_search 与迭代扫描；未指定时只在量化模式的候选数
+    超过默认 ef_search（40）时调高它，否则候选会被截断。
+    """
+    mode = mode or get_storage_mode()
+    rows = top_k if mode == "full" else rescore_candidates(top_k)
+    params = {} if mode == "full" else {"ann_candidates": rows}
+
+    if profile is not None:
+        await apply_hnsw_settings(session, hnsw_session_settings(profile, rows, mode))
+    elif mode != "full":
+        await apply_hnsw_settings(session, {"hnsw.ef_search": str(max(rows, 40))})
+    return params
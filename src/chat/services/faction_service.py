@@ -2,6 +2,7 @@ import logging
 from typing import List, Dict, Any
 
 from src.chat.services.event_service import event_service
+from src.chat.services.leaderboard_service import leaderboard_service
 from src.chat.utils.database import ChatDatabaseManager, chat_db_manager
 
 log = logging.getLogger(__name__)
@@ -42,14 +43,19 @@ class FactionService:
                 INSERT INTO event_faction_points (event_id, faction_id, total_points)
                 VALUES (?, ?, ?)
                 ON CONFLICT(event_id, faction_id) DO UPDATE SET
-                    total_points = total_points + excluded.total_points;
+                    total_points = total_points + excluded.total_points
+                RETURNING total_points;
             """
-            await self.db._execute(
+            row = await self.db._execute(
                 self.db._db_transaction,
                 update_query,
                 (event_id, faction_id, points_to_add),
+                fetch="one",
                 commit=True,
             )
+            leaderboard_service.record_faction_points(
+                event_id, faction_id, row["total_points"]
+            )
 
             # 2. 记录贡献日志
             log_query = """
@@ -72,27 +78,16 @@ class FactionService:
 
     async def get_faction_leaderboard(self) -> List[Dict[str, Any]]:
         """
-        获取当前激活活动的派系点数排行榜。
+        获取当前激活活动的派系点数排行榜（读取内存中的榜单）。
         """
         active_event = self.event_service.get_active_event()
         if not active_event:
             return []
 
-        event_id = active_event["event_id"]
-
-        query = """
-            SELECT faction_id, total_points
-            FROM event_faction_points
-            WHERE event_id = ?
-            ORDER BY total_points DESC;
-        """
-        rows = await self.db._execute(
-            self.db._db_transaction, query, (event_id,), fetch="all"
-        )
-
+        board = await leaderboard_service.get_faction_board(active_event["event_id"])
         return [
-            {"faction_id": row["faction_id"], "total_points": row["total_points"]}
-            for row in rows
+            {"faction_id": faction_id, "total_points": total_points}
+            for faction_id, total_points in board.iter_ranked()
         ]
 
     async def determine_winner_and_end_event(self):
@@ -100,7 +95,19 @@ class FactionService:
         决定获胜派系并通知 EventService。
         """
         log.info("正在执行活动结算逻辑...")
-        leaderboard = await self.get_faction_leaderboard()
+        active_event = self.event_service.get_active_event()
+        if not active_event:
+            log.warning("当前没有激活的活动，无法结算。")
+            return
+
+        # 结算前从数据库重新载入，确保按最终积分判定
+        board = await leaderboard_service.get_faction_board(
+            active_event["event_id"], refresh=True
+        )
+        leaderboard = [
+            {"faction_id": faction_id, "total_points": total_points}
+            for faction_id, total_points in board.iter_ranked()
+        ]
 
         if not leaderboard:
             log.warning("排行榜为空，无法决定获胜派系。")
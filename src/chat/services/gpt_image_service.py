@@ -10,6 +10,7 @@ from pathlib import Path
 import httpx
 
 from src.chat.config.chat_config import GPT_IMAGE_CONFIG
+from src.chat.services.http_client_registry import http_client_registry
 
 log = logging.getLogger(__name__)
 
@@ -23,7 +24,6 @@ class GPTImageService:
         self._quality = GPT_IMAGE_CONFIG["QUALITY"]
         self._timeout = GPT_IMAGE_CONFIG["TIMEOUT"]
         self._reference_image_url = GPT_IMAGE_CONFIG.get("REFERENCE_IMAGE_URL")
-        self._client: Optional[httpx.AsyncClient] = None
         self._reference_images: list[bytes] = []
         self._initialized = False
 
@@ -43,13 +43,13 @@ class GPTImageService:
             log.warning("GPTImageService: assets/ 下无 reference_*.png 文件")
             if self._reference_image_url:
                 try:
-                    async with httpx.AsyncClient(timeout=30) as client:
-                        resp = await client.get(self._reference_image_url)
-                        resp.raise_for_status()
-                        self._reference_images.append(resp.content)
-                        log.info(
-                            f"GPTImageService: 已缓存远程参考图 ({len(resp.content)} bytes)"
-                        )
+                    client = http_client_registry.get_client(timeout=30)
+                    resp = await client.get(self._reference_image_url)
+                    resp.raise_for_status()
+                    self._reference_images.append(resp.content)
+                    log.info(
+                        f"GPTImageService: 已缓存远程参考图 ({len(resp.content)} bytes)"
+                    )
                 except Exception as e:
                     log.warning(f"GPTImageService: 缓存参考图片失败: {e}")
 
@@ -59,13 +59,11 @@ class GPTImageService:
         self._initialized = True
 
     def _get_client(self) -> httpx.AsyncClient:
-        if self._client is None:
-            self._client = httpx.AsyncClient(
-                base_url=self._base_url,
-                headers={"Authorization": f"Bearer {self._api_key}"},
-                timeout=self._timeout,
-            )
-        return self._client
+        return http_client_registry.get_client(
+            self._base_url,
+            headers={"Authorization": f"Bearer {self._api_key}"},
+            timeout=self._timeout,
+        )
 
     @property
     def is_available(self) -> bool:
@@ -222,9 +220,8 @@ class GPTImageService:
         return None
 
     async def close(self):
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        # 客户端由 http_client_registry 统一管理
+        return None
 
 
 gpt_image_service = GPTImageService()
@@ -0,0 +1,626 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 客户端注册表 - 全进程共享的出站连接池
+
+所有 Provider / 服务不再各自创建 httpx.AsyncClient 或一次性的 aiohttp 会话，
+而是从这里按 base_url 取得客户端。注册表负责：
+- 统一的连接上限（总数与每个主机）与 keep-alive 配置（HTTP_CLIENT_CONFIG）
+- 上游支持时通过 ALPN 协商 HTTP/2（需要安装 h2）
+- 带 TTL 的 DNS 缓存，避免每个新连接都重新解析（httpx 侧通过 httpcore 连接池的
+  network_backend 参数接入）
+- use_proxy=True 的客户端（与 bot 一样访问 Discord 的请求）统一走 config.PROXY_URL；
+  其余客户端与原先各自创建的 httpx 客户端一样遵循 HTTP(S)_PROXY / NO_PROXY 环境变量
+- 按主机统计请求数、错误数、建连次数与延迟，便于定位出站耗时
+- 在 main.py 关闭时统一释放所有连接
+"""
+
+import asyncio
+import ipaddress
+import logging
+import socket
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+import httpx
+import httpcore
+
+from src import config
+from src.chat.config.chat_config import HTTP_CLIENT_CONFIG
+
+log = logging.getLogger(__name__)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class HostStats:
+    """单个上游主机的出站统计"""
+
+    host: str
+    requests: int = 0
+    errors: int = 0
+    connects: int = 0
+    connect_time: float = 0.0
+    dns_hits: int = 0
+    dns_misses: int = 0
+    ttfb_total: float = 0.0
+    latency_total: float = 0.0
+    latency_max: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        completed = max(self.requests - self.errors, 0)
+        return {
+            "host": self.host,
+            "requests": self.requests,
+            "errors": self.errors,
+            "connects": self.connects,
+            "avg_connect_ms": (
+                round(self.connect_time / self.connects * 1000, 1)
+                if self.connects
+                else 0.0
+            ),
+            "dns_hits": self.dns_hits,
+            "dns_misses": self.dns_misses,
+            "avg_ttfb_ms": (
+                round(self.ttfb_total / completed * 1000, 1) if completed else 0.0
+            ),
+            "avg_latency_ms": (
+                round(self.latency_total / completed * 1000, 1) if completed else 0.0
+            ),
+            "max_latency_ms": round(self.latency_max * 1000, 1),
+            "total_time_s": round(self.latency_total, 3),
+        }
+
+
+class _CachingNetworkBackend(httpcore.AsyncNetworkBackend):
+    """
+    包装 httpcore 的网络后端，为 connect_tcp 增加 DNS 缓存与建连统计。
+    TLS 的 SNI 与 Host 头仍使用原始主机名，因此直接连 IP 是安全的。
+    """
+
+    def __init__(self, inner: httpcore.AsyncNetworkBackend, registry: "HttpClientRegistry"):
+        self._inner = inner
+        self._registry = registry
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: Optional[float] = None,
+        local_address: Optional[str] = None,
+        socket_options=None,
+    ) -> httpcore.AsyncNetworkStream:
+        address = await self._registry._resolve(host, port)
+        start = time.perf_counter()
+        try:
+            stream = await self._inner.connect_tcp(
+                address,
+                port,
+                timeout=timeout,
+                local_address=local_address,
+                socket_options=socket_options,
+            )
+        except Exception:
+            # 缓存的地址可能已失效，下次重新解析
+            self._registry._dns_cache.pop((host, port), None)
+            raise
+        stats = self._registry._stats_for(host)
+        stats.connects += 1
+        stats.connect_time += time.perf_counter() - start
+        return stream
+
+    async def connect_unix_socket(self, path: str, timeout=None, socket_options=None):
+        return await self._inner.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options
+        )
+
+    async def sleep(self, seconds: float) -> None:
+        await self._inner.sleep(seconds)
+
+
+# httpcore 异常到 httpx 异常的映射（与 httpx.AsyncHTTPTransport 的行为一致），
+# 调用方只需捕获 httpx 的异常类型
+_HTTPCORE_EXCEPTIONS: Dict[type, type] = {
+    httpcore.TimeoutException: httpx.TimeoutException,
+    httpcore.ConnectTimeout: httpx.ConnectTimeout,
+    httpcore.ReadTimeout: httpx.ReadTimeout,
+    httpcore.WriteTimeout: httpx.WriteTimeout,
+    httpcore.PoolTimeout: httpx.PoolTimeout,
+    httpcore.NetworkError: httpx.NetworkError,
+    httpcore.ConnectError: httpx.ConnectError,
+    httpcore.ReadError: httpx.ReadError,
+    httpcore.WriteError: httpx.WriteError,
+    httpcore.ProxyError: httpx.ProxyError,
+    httpcore.UnsupportedProtocol: httpx.UnsupportedProtocol,
+    httpcore.ProtocolError: httpx.ProtocolError,
+    httpcore.LocalProtocolError: httpx.LocalProtocolError,
+    httpcore.RemoteProtocolError: httpx.RemoteProtocolError,
+}
+
+
+def _to_httpx_error(exc: Exception) -> Optional[Exception]:
+    """返回对应的 httpx 异常（取最具体的类型）；不是 httpcore 异常时返回 None"""
+    mapped = None
+    for source, target in _HTTPCORE_EXCEPTIONS.items():
+        if isinstance(exc, source) and (mapped is None or issubclass(target, mapped)):
+            mapped = target
+    return mapped(str(exc)) if mapped else None
+
+
+class _PoolResponseStream(httpx.AsyncByteStream):
+    """httpcore 响应体 -> httpx 响应体；关闭时释放主机并发名额"""
+
+    def __init__(self, inner, on_close):
+        self._inner = inner
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._inner:
+                yield chunk
+        except Exception as e:
+            mapped = _to_httpx_error(e)
+            if mapped is None:
+                raise
+            raise mapped from e
+
+    async def aclose(self) -> None:
+        try:
+            if hasattr(self._inner, "aclose"):
+                await self._inner.aclose()
+        finally:
+            self._on_close()
+
+
+class _PoolTransport(httpx.AsyncBaseTransport):
+    """
+    直接基于 httpcore 连接池的传输层。
+    httpx.AsyncHTTPTransport 不接受 network_backend，这里自己创建连接池，
+    通过 httpcore 公开的 network_backend 参数接入 DNS 缓存。
+    每个主机同时进行的请求数不超过 MAX_CONNECTIONS_PER_HOST（HTTP/1.1 下即连接数），
+    名额在响应体读完或关闭时释放。
+    """
+
+    def __init__(self, registry: "HttpClientRegistry", proxy_url: Optional[str]):
+        self._registry = registry
+        pool_options = dict(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=HTTP_CLIENT_CONFIG["MAX_CONNECTIONS"],
+            max_keepalive_connections=HTTP_CLIENT_CONFIG["MAX_KEEPALIVE"],
+            keepalive_expiry=HTTP_CLIENT_CONFIG["KEEPALIVE_EXPIRY"],
+            http1=True,
+            http2=registry._http2,
+            network_backend=_CachingNetworkBackend(httpcore.AnyIOBackend(), registry),
+        )
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._pool = self._create_pool(proxy_url, pool_options)
+
+    @staticmethod
+    def _create_pool(proxy_url: Optional[str], pool_options: Dict[str, Any]):
+        retries = HTTP_CLIENT_CONFIG["CONNECT_RETRIES"]
+        if not proxy_url:
+            return httpcore.AsyncConnectionPool(retries=retries, **pool_options)
+
+        # 与 httpx.AsyncHTTPTransport 相同：认证信息取自代理 URL 的 userinfo
+        proxy = httpx.Proxy(url=proxy_url)
+        core_proxy_url = httpcore.URL(
+            scheme=proxy.url.raw_scheme,
+            host=proxy.url.raw_host,
+            port=proxy.url.port,
+            target=proxy.url.raw_path,
+        )
+        if proxy.url.scheme in ("http", "https"):
+            return httpcore.AsyncHTTPProxy(
+                proxy_url=core_proxy_url,
+                proxy_auth=proxy.raw_auth,
+                proxy_headers=proxy.headers.raw,
+                proxy_ssl_context=proxy.ssl_context,
+                retries=retries,
+                **pool_options,
+            )
+        # httpx.Proxy 只接受 http / https / socks5 / socks5h
+        try:
+            import socksio  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                f"代理 {proxy.url.scheme}:// 需要安装 socksio（httpx[socks]）"
+            ) from None
+        return httpcore.AsyncSOCKSProxy(
+            proxy_url=core_proxy_url,
+            proxy_auth=proxy.raw_auth,
+            retries=retries,
+            **pool_options,
+        )
+
+    async def _acquire_host_slot(self, request: httpx.Request) -> asyncio.Semaphore:
+        host = request.url.host
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(
+                HTTP_CLIENT_CONFIG["MAX_CONNECTIONS_PER_HOST"]
+            )
+        pool_timeout = request.extensions.get("timeout", {}).get("pool")
+        try:
+            await asyncio.wait_for(slots.acquire(), pool_timeout)
+        except asyncio.TimeoutError:
+            raise httpx.PoolTimeout(
+                f"等待 {host} 的连接名额超时", request=request
+            ) from None
+        return slots
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slots = await self._acquire_host_slot(request)
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        try:
+            response = await self._pool.handle_async_request(core_request)
+        except Exception as e:
+            slots.release()
+            mapped = _to_httpx_error(e)
+            if mapped is None:
+                raise
+            raise mapped from e
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_PoolResponseStream(response.stream, slots.release),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._pool.aclose()
+
+
+class _TimedByteStream(httpx.AsyncByteStream):
+    """在响应体读完（或关闭）时记录完整请求耗时"""
+
+    def __init__(self, inner: httpx.AsyncByteStream, stats: HostStats, start: float):
+        self._inner = inner
+        self._stats = stats
+        self._start = start
+        self._recorded = False
+
+    async def __aiter__(self):
+        async for chunk in self._inner:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            if not self._recorded:
+                self._recorded = True
+                elapsed = time.perf_counter() - self._start
+                self._stats.latency_total += elapsed
+                self._stats.latency_max = max(self._stats.latency_max, elapsed)
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    共享传输层的轻量包装：记录每个主机的 TTFB / 总延迟 / 错误数。
+    aclose() 为空操作，底层连接池只由注册表统一关闭，
+    这样旧代码里对客户端调用 aclose() 不会误关共享连接池。
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, registry: "HttpClientRegistry"):
+        self._inner = inner
+        self._registry = registry
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self._registry._stats_for(request.url.host)
+        stats.requests += 1
+        start = time.perf_counter()
+        try:
+            response = await self._inner.handle_async_request(request)
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.ttfb_total += time.perf_counter() - start
+        response.stream = _TimedByteStream(response.stream, stats, start)
+        return response
+
+    async def aclose(self) -> None:
+        return None
+
+
+# 值不参与客户端缓存键的请求头
+_SECRET_HEADERS = frozenset(
+    {"authorization", "proxy-authorization", "x-api-key", "api-key", "cookie"}
+)
+
+
+class HttpClientRegistry:
+    """按 base_url 复用 httpx 客户端，并共享底层连接池"""
+
+    def __init__(self):
+        self._clients: Dict[Tuple, httpx.AsyncClient] = {}
+        # 代理地址（None 为直连）-> 共享传输层
+        self._transports: Dict[Optional[str], httpx.AsyncBaseTransport] = {}
+        self._aiohttp_session: Optional[aiohttp.ClientSession] = None
+        self._dns_cache: Dict[Tuple[str, int], Tuple[str, float]] = {}
+        self._stats: Dict[str, HostStats] = {}
+        self._http2 = HTTP_CLIENT_CONFIG["HTTP2"] and _http2_available()
+
+    @property
+    def proxy_url(self) -> Optional[str]:
+        """统一的出站代理地址（来自 config.PROXY_URL）"""
+        return config.PROXY_URL or None
+
+    @staticmethod
+    def _environment_proxies() -> Dict[str, Optional[str]]:
+        """
+        HTTP(S)_PROXY / ALL_PROXY / NO_PROXY 环境变量 -> httpx 的 mounts 模式。
+        传入 transport 的 httpx 客户端不再读取环境变量，这里按 httpx 的规则换算。
+        """
+        proxies = urllib.request.getproxies()
+        mounts: Dict[str, Optional[str]] = {}
+        for scheme in ("http", "https", "all"):
+            url = proxies.get(scheme)
+            if url:
+                mounts[f"{scheme}://"] = url if "://" in url else f"http://{url}"
+        for host in (h.strip() for h in proxies.get("no", "").split(",")):
+            if not host:
+                continue
+            if host == "*":
+                return {}
+            if "://" in host:
+                mounts[host] = None
+                continue
+            try:
+                ipaddress.ip_network(host, strict=False)
+                mounts[f"all://{host}"] = None
+            except ValueError:
+                if host == "localhost":
+                    mounts[f"all://{host}"] = None
+                else:
+                    mounts[f"all://*{host.lstrip('.')}"] = None
+        return mounts
+
+    # ------------------------------------------------------------------
+    # httpx
+    # ------------------------------------------------------------------
+    def get_client(
+        self,
+        base_url: str = "",
+        *,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Any = None,
+        follow_redirects: bool = False,
+        use_proxy: bool = False,
+    ) -> httpx.AsyncClient:
+        """
+        获取（或创建）与 base_url 绑定的共享客户端。
+
+        Args:
+            base_url: 上游基础 URL；为空时客户端可访问任意 URL
+            headers: 默认请求头（例如鉴权头）
+            timeout: httpx 超时配置，默认使用 HTTP_CLIENT_CONFIG["TIMEOUT"]
+            follow_redirects: 是否跟随重定向
+            use_proxy: 是否通过 config.PROXY_URL 代理出站（未配置时退回环境变量中的代理）
+
+        Returns:
+            httpx.AsyncClient: 不应由调用方关闭的共享客户端
+        """
+        if timeout is None:
+            timeout = HTTP_CLIENT_CONFIG["TIMEOUT"]
+        use_proxy = bool(use_proxy and self.proxy_url)
+        headers = headers or {}
+        # 鉴权头只取名字作为键：更换 API Key 时替换原有客户端，而不是不断新增
+        key = (
+            base_url.rstrip("/"),
+            tuple(
+                sorted(
+                    (name.lower(), None if name.lower() in _SECRET_HEADERS else value)
+                    for name, value in headers.items()
+                )
+            ),
+            repr(timeout),
+            follow_redirects,
+            use_proxy,
+        )
+        client = self._clients.get(key)
+        if (
+            client is None
+            or client.is_closed
+            or any(client.headers.get(name) != value for name, value in headers.items())
+        ):
+            # 被替换的客户端不需要关闭：连接池属于共享传输层，仍持有它的调用方可以继续使用
+            if use_proxy:
+                transport = self._get_transport(self.proxy_url)
+                mounts = {}
+            else:
+                transport = self._get_transport(None)
+                mounts = {
+                    pattern: proxy and self._get_transport(proxy)
+                    for pattern, proxy in self._environment_proxies().items()
+                }
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                headers=headers,
+                timeout=timeout,
+                follow_redirects=follow_redirects,
+                transport=transport,
+                mounts=mounts,
+            )
+            self._clients[key] = client
+        return client
+
+    def _get_transport(self, proxy_url: Optional[str]) -> _InstrumentedTransport:
+        transport = self._transports.get(proxy_url)
+        if transport is None:
+            transport = self._transports[proxy_url] = _PoolTransport(self, proxy_url)
+        return _InstrumentedTransport(transport, self)
+
+    async def _resolve(self, host: str, port: int) -> str:
+        """解析主机名，结果按 DNS_CACHE_TTL 缓存"""
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        stats = self._stats_for(host)
+        cached = self._dns_cache.get((host, port))
+        now = time.monotonic()
+        if cached and cached[1] > now:
+            stats.dns_hits += 1
+            return cached[0]
+
+        stats.dns_misses += 1
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError:
+            # 解析失败时交给底层后端，让它抛出标准的连接错误
+            return host
+        if not infos:
+            return host
+        address = infos[0][4][0]
+        self._dns_cache[(host, port)] = (
+            address,
+            now + HTTP_CLIENT_CONFIG["DNS_CACHE_TTL"],
+        )
+        return address
+
+    # ------------------------------------------------------------------
+    # aiohttp（Discord CDN 图片下载等）
+    # ------------------------------------------------------------------
+    def get_aiohttp_session(self) -> aiohttp.ClientSession:
+        """获取共享的 aiohttp 会话，连接器自带 DNS 缓存与连接上限"""
+        if self._aiohttp_session is None or self._aiohttp_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_CLIENT_CONFIG["MAX_CONNECTIONS"],
+                limit_per_host=HTTP_CLIENT_CONFIG["MAX_CONNECTIONS_PER_HOST"],
+                ttl_dns_cache=HTTP_CLIENT_CONFIG["DNS_CACHE_TTL"],
+                keepalive_timeout=HTTP_CLIENT_CONFIG["KEEPALIVE_EXPIRY"],
+            )
+            self._aiohttp_session = aiohttp.ClientSession(
+                connector=connector, trace_configs=[self._build_trace_config()]
+            )
+        return self._aiohttp_session
+
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host
+            ctx.start = time.perf_counter()
+            self._stats_for(ctx.host).requests += 1
+
+        # on_request_end 在收到响应头时触发（响应体尚未读取），即 TTFB；
+        # 之后每收到一块响应体就把耗时累加到总延迟，读完时即为完整请求耗时
+        async def on_request_end(session, ctx, params):
+            ctx.last = time.perf_counter()
+            elapsed = ctx.last - ctx.start
+            stats = self._stats_for(ctx.host)
+            stats.ttfb_total += elapsed
+            stats.latency_total += elapsed
+            stats.latency_max = max(stats.latency_max, elapsed)
+
+        async def on_response_chunk_received(session, ctx, params):
+            if not hasattr(ctx, "last"):
+                return
+            now = time.perf_counter()
+            stats = self._stats_for(ctx.host)
+            stats.latency_total += now - ctx.last
+            stats.latency_max = max(stats.latency_max, now - ctx.start)
+            ctx.last = now
+
+        async def on_request_exception(session, ctx, params):
+            self._stats_for(ctx.host).errors += 1
+
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def on_connection_create_end(session, ctx, params):
+            stats = self._stats_for(ctx.host)
+            stats.connects += 1
+            stats.connect_time += time.perf_counter() - ctx.connect_start
+
+        async def on_dns_cache_hit(session, ctx, params):
+            self._stats_for(params.host).dns_hits += 1
+
+        async def on_dns_cache_miss(session, ctx, params):
+            self._stats_for(params.host).dns_misses += 1
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_response_chunk_received.append(on_response_chunk_received)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+    def _stats_for(self, host: str) -> HostStats:
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = HostStats(host=host)
+        return stats
+
+    def get_host_metrics(self) -> List[Dict[str, Any]]:
+        """返回按累计耗时降序排列的各主机统计"""
+        return sorted(
+            (stats.to_dict() for stats in self._stats.values()),
+            key=lambda item: item["total_time_s"],
+            reverse=True,
+        )
+
+    def log_metrics_summary(self) -> None:
+        """把各主机的出站统计写入日志"""
+        metrics = self.get_host_metrics()
+        if not metrics:
+            return
+        lines = [
+            f"  {m['host']}: 请求 {m['requests']} (错误 {m['errors']}), "
+            f"建连 {m['connects']} (平均 {m['avg_connect_ms']}ms), "
+            f"DNS 命中/未命中 {m['dns_hits']}/{m['dns_misses']}, "
+            f"TTFB {m['avg_ttfb_ms']}ms, 平均 {m['avg_latency_ms']}ms, "
+            f"最大 {m['max_latency_ms']}ms, 累计 {m['total_time_s']}s"
+            for m in metrics
+        ]
+        log.info("出站 HTTP 统计:\n" + "\n".join(lines))
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    async def aclose(self) -> None:
+        """关闭所有共享连接（在进程关闭时调用）"""
+        self._clients.clear()
+        for transport in self._transports.values():
+            try:
+                await transport.aclose()
+            except Exception as e:
+                log.warning(f"关闭 HTTP 连接池时出错: {e}")
+        self._transports.clear()
+        if self._aiohttp_session and not self._aiohttp_session.closed:
+            await self._aiohttp_session.close()
+        self._aiohttp_session = None
+        self._dns_cache.clear()
+
+
+# 全局实例
+http_client_registry = HttpClientRegistry()
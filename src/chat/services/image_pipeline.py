@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+图片处理流水线 - 把解码、缩放、编码从事件循环挪到专用线程池
+
+附件压缩和投喂图片预压缩原先都直接在事件循环上执行，
+一张十几 MB 的手机照片就会让所有服务器的消息处理停顿数百毫秒。这里统一负责：
+- 专用的 ThreadPoolExecutor（Pillow 的解码/重采样/编码会释放 GIL，线程池即可并行，
+  也避免了进程池在进程间来回拷贝大块字节）
+- 有界的待处理槽位：排队 + 处理中的图片达到 MAX_PENDING 后，新的调用方在事件循环上等待，
+  不会无限堆积原图字节占用内存（背压）
+- 单张图片的处理超时
+- 按阶段（queue / download / decode / encode / total）统计耗时
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.chat.config.chat_config import IMAGE_PIPELINE_CONFIG
+from src.chat.utils import image_utils
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class StageStats:
+    """单个处理阶段的耗时统计（毫秒）"""
+
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 1),
+        }
+
+
+class ImagePipeline:
+    """图片处理线程池与背压控制"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.max_workers = max_workers or IMAGE_PIPELINE_CONFIG["MAX_WORKERS"]
+        self.max_pending = max_pending or IMAGE_PIPELINE_CONFIG["MAX_PENDING"]
+        self.timeout = timeout or IMAGE_PIPELINE_CONFIG["TIMEOUT_SECONDS"]
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self._stages: Dict[str, StageStats] = {}
+        self.timeouts = 0
+        self.errors = 0
+
+    @property
+    def pending(self) -> int:
+        """排队中与处理中的图片数量"""
+        return self._pending
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="image-pipeline"
+            )
+        return self._executor
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    def record(self, stage: str, ms: float) -> None:
+        """记录一个阶段的耗时（毫秒），也供调用方记录下载等外部阶段"""
+        self._stages.setdefault(stage, StageStats()).add(ms)
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        在线程池中执行 func(*args, timings=dict)。
+
+        槽位在工作线程真正结束后才释放：即使调用方因超时放弃等待，
+        仍在运行的任务也会继续占用槽位，保证并发的 CPU 工作不超过上限。
+        """
+        slots = self._get_slots()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        self._pending += 1
+        try:
+            await slots.acquire()
+        except BaseException:
+            self._pending -= 1
+            raise
+        self.record("queue", (time.perf_counter() - started) * 1000)
+
+        def _release(_=None) -> None:
+            self._pending -= 1
+            slots.release()
+
+        timings: Dict[str, float] = {}
+        try:
+            future = loop.run_in_executor(
+                self._get_executor(), lambda: func(*args, timings=timings)
+            )
+        except BaseException:
+            _release()
+            raise
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            log.warning(
+                f"图片处理超过 {self.timeout:.0f} 秒，放弃等待 ({getattr(func, '__name__', func)})"
+            )
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            if future.done():
+                _release()
+            else:
+                future.add_done_callback(_release)
+
+        for stage, ms in timings.items():
+            self.record(stage, ms)
+        total_ms = (time.perf_counter() - started) * 1000
+        self.record("total", total_ms)
+        log.debug(
+            f"图片处理完成 ({getattr(func, '__name__', func)}): 总计 {total_ms:.1f}ms, "
+            + ", ".join(f"{k} {v:.1f}ms" for k, v in timings.items())
+        )
+        return result
+
+    async def compress(
+        self,
+        image_bytes: bytes,
+        max_dimension: int,
+        quality: int,
+        max_bytes: Optional[int] = None,
+    ) -> Tuple[bytes, str]:
+        """缩放并重新编码为 JPEG（在线程池中执行）"""
+        return await self.run(
+            image_utils.compress_to_jpeg, image_bytes, max_dimension, quality, max_bytes
+        )
+
+    async def compress_attachment(self, image_bytes: bytes) -> Tuple[bytes, str]:
+        """按附件图片的配置压缩：最长边 / 质量 / 目标大小"""
+        return await self.compress(
+            image_bytes,
+            IMAGE_PIPELINE_CONFIG["ATTACHMENT_MAX_DIMENSION"],
+            IMAGE_PIPELINE_CONFIG["ATTACHMENT_QUALITY"],
+            IMAGE_PIPELINE_CONFIG["ATTACHMENT_MAX_BYTES"],
+        )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "pending": self._pending,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "stages": {name: s.to_dict() for name, s in self._stages.items()},
+        }
+
+    def log_metrics_summary(self) -> None:
+        """把各阶段耗时写入日志"""
+        if not self._stages:
+            return
+        log.info(f"图片处理流水线统计: {self.get_metrics()}")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局单例
+image_pipeline = ImagePipeline()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+排行榜的内存物化视图
+
+类脑币榜、卖屁股榜和活动阵营榜原本每次刷新都要排序查询一次数据库。
+这里在内存中为每个榜单维护一份按 (-分值, 键) 排好序的列表：
+- add_coins / remove_coins、increment_sell_body_count、add_points_to_faction 写库后
+  把新的分值推送过来，榜单增量更新（二分查找定位，无需重新排序）
+- 任意用户的名次通过二分查找得到，O(log n)
+- 没有挂钩的写入路径（批量发奖、直接改库等）由定时对账（整表重新载入）修正
+"""
+
+import asyncio
+import bisect
+import logging
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from src.chat.config.chat_config import LEADERBOARD_CONFIG
+from src.chat.utils.database import chat_db_manager
+from src.database.database import AsyncSessionLocal
+from src.database.models import UserCoins
+
+log = logging.getLogger(__name__)
+
+
+class RankedBoard:
+    """
+    一个有序榜单。_values 保存每个键的当前分值，_order 保存按 (-分值, 键) 排序的条目，
+    分值相同时按键排序，保证名次稳定。
+    """
+
+    def __init__(self, name: str, min_value: Optional[int] = None):
+        self.name = name
+        # 分值不大于 min_value 的条目不上榜（例如余额为 0 的用户）
+        self.min_value = min_value
+        self._values: Dict[Hashable, int] = {}
+        self._order: List[Tuple[int, Hashable]] = []
+        self.loaded = False
+        # 对账载入期间收到的更新；载入完成后重新应用，避免被较旧的数据库快照覆盖
+        self._pending: Optional[Dict[Hashable, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _qualifies(self, value: int) -> bool:
+        return self.min_value is None or value > self.min_value
+
+    def _discard(self, key: Hashable) -> None:
+        old = self._values.pop(key, None)
+        if old is None:
+            return
+        index = bisect.bisect_left(self._order, (-old, key))
+        if index < len(self._order) and self._order[index] == (-old, key):
+            del self._order[index]
+
+    def update(self, key: Hashable, value: int) -> None:
+        """设置某个键的最新分值。"""
+        if self._pending is not None:
+            self._pending[key] = value
+        if self._values.get(key) == value:
+            return
+        self._discard(key)
+        if self._qualifies(value):
+            self._values[key] = value
+            bisect.insort(self._order, (-value, key))
+
+    def get(self, key: Hashable) -> Optional[int]:
+        return self._values.get(key)
+
+    def rank_of(self, key: Hashable) -> Optional[int]:
+        """返回键的名次（从 1 开始）；不在榜上时返回 None。"""
+        value = self._values.get(key)
+        if value is None:
+            return None
+        return bisect.bisect_left(self._order, (-value, key)) + 1
+
+    def iter_ranked(self) -> Iterator[Tuple[Hashable, int]]:
+        """按名次依次产出 (键, 分值)。"""
+        for neg_value, key in self._order:
+            yield key, -neg_value
+
+    def top(self, n: int) -> List[Tuple[Hashable, int]]:
+        return [(key, -neg_value) for neg_value, key in self._order[:n]]
+
+    def begin_reload(self) -> None:
+        self._pending = {}
+
+    def finish_reload(self, rows: List[Tuple[Hashable, int]]) -> None:
+        """用数据库中的完整数据替换榜单，再应用载入期间收到的更新。"""
+        pending = self._pending or {}
+        self._pending = None
+        self._values = {}
+        order = []
+        for key, value in rows:
+            if self._qualifies(value):
+                self._values[key] = value
+                order.append((-value, key))
+        order.sort()
+        self._order = order
+        for key, value in pending.items():
+            self.update(key, value)
+        self.loaded = True
+
+    def abort_reload(self) -> None:
+        self._pending = None
+
+
+class LeaderboardService:
+    def __init__(self, reconcile_interval: Optional[float] = None):
+        self.reconcile_interval = (
+            reconcile_interval
+            if reconcile_interval is not None
+            else LEADERBOARD_CONFIG["RECONCILE_INTERVAL_SECONDS"]
+        )
+        self.coins = RankedBoard("coins", min_value=0)
+        self.sell_body = RankedBoard("sell_body", min_value=0)
+        # 阵营榜只缓存当前活动的一份
+        self._faction_event_id: Optional[str] = None
+        self._faction_board: Optional[RankedBoard] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # --- 数据库载入 ---
+
+    async def _load_coins(self) -> List[Tuple[int, int]]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(UserCoins.user_id, UserCoins.balance).where(
+                    UserCoins.balance > 0
+                )
+            )
+            return [(int(user_id), balance) for user_id, balance in result.all()]
+
+    async def _load_sell_body(self) -> List[Tuple[int, int]]:
+        query = """
+            SELECT user_id, total_sell_body_count
+            FROM user_work_status
+            WHERE total_sell_body_count > 0
+        """
+        rows = await chat_db_manager._execute(
+            chat_db_manager._db_transaction, query, fetch="all"
+        )
+        return [(int(row["user_id"]), row["total_sell_body_count"]) for row in rows]
+
+    async def _load_faction_points(self, event_id: str) -> List[Tuple[str, int]]:
+        query = """
+            SELECT faction_id, total_points
+            FROM event_faction_points
+            WHERE event_id = ?
+        """
+        rows = await chat_db_manager._execute(
+            chat_db_manager._db_transaction, query, (event_id,), fetch="all"
+        )
+        return [(row["faction_id"], row["total_points"]) for row in rows]
+
+    async def _reload(
+        self, board: RankedBoard, loader: Callable, *args
+    ) -> RankedBoard:
+        board.begin_reload()
+        try:
+            rows = await loader(*args)
+        except Exception:
+            board.abort_reload()
+            raise
+        board.finish_reload(rows)
+        log.debug(f"排行榜 '{board.name}' 已从数据库载入 {len(board)} 条记录。")
+        return board
+
+    # --- 读取 ---
+
+    async def get_coin_board(self) -> RankedBoard:
+        if not self.coins.loaded:
+            async with self._lock:
+                if not self.coins.loaded:
+                    await self._reload(self.coins, self._load_coins)
+        return self.coins
+
+    async def get_sell_body_board(self) -> RankedBoard:
+        if not self.sell_body.loaded:
+            async with self._lock:
+                if not self.sell_body.loaded:
+                    await self._reload(self.sell_body, self._load_sell_body)
+        return self.sell_body
+
+    async def get_faction_board(
+        self, event_id: str, refresh: bool = False
+    ) -> RankedBoard:
+        """获取某个活动的阵营榜；refresh=True 时先从数据库重新载入（用于结算）。"""
+        board = self._faction_board
+        if (
+            not refresh
+            and board is not None
+            and self._faction_event_id == event_id
+            and board.loaded
+        ):
+            return board
+        async with self._lock:
+            if self._faction_event_id != event_id or self._faction_board is None:
+                self._faction_event_id = event_id
+                self._faction_board = RankedBoard(f"faction:{event_id}")
+            board = self._faction_board
+            if refresh or not board.loaded:
+                await self._reload(board, self._load_faction_points, event_id)
+            return board
+
+    # --- 写入事件 ---
+
+    def record_coin_balance(self, user_id: int, balance: int) -> None:
+        self.coins.update(int(user_id), balance)
+
+    def record_sell_body_total(self, user_id: int, total: int) -> None:
+        self.sell_body.update(int(user_id), total)
+
+    def record_faction_points(
+        self, event_id: str, faction_id: str, total_points: int
+    ) -> None:
+        # 其他活动的榜单没有缓存，下次读取时会从数据库载入
+        if self._faction_board is not None and self._faction_event_id == event_id:
+            self._faction_board.update(faction_id, total_points)
+
+    # --- 对账 ---
+
+    async def reconcile(self) -> None:
+        """用数据库中的数据重建所有已载入的榜单。"""
+        async with self._lock:
+            if self.coins.loaded:
+                await self._reload(self.coins, self._load_coins)
+            if self.sell_body.loaded:
+                await self._reload(self.sell_body, self._load_sell_body)
+            if self._faction_board is not None and self._faction_board.loaded:
+                await self._reload(
+                    self._faction_board,
+                    self._load_faction_points,
+                    self._faction_event_id,
+                )
+
+    async def start(self) -> None:
+        if self._task is None and self.reconcile_interval > 0:
+            self._task = asyncio.create_task(self._reconcile_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                log.error(f"排行榜对账失败: {e}", exc_info=True)
+
+
+leaderboard_service = LeaderboardService()
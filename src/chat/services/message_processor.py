@@ -6,17 +6,15 @@ from typing import List, Dict, Any, Optional, Tuple
 import re
 import asyncio
 import aiohttp
-import io
-from PIL import Image
+import time
 
-from src import config
 from src.config import BOT_NAME
 from src.chat.config import chat_config
 from src.chat.utils.database import chat_db_manager
+from src.chat.services.http_client_registry import http_client_registry
+from src.chat.services.image_pipeline import image_pipeline
 
-_ATTACHMENT_IMAGE_MAX_BYTES = 1 * 1024 * 1024
-_ATTACHMENT_COMPRESS_MAX_DIMENSION = 1024
-_ATTACHMENT_COMPRESS_QUALITY = 75
+_ATTACHMENT_IMAGE_MAX_BYTES = chat_config.IMAGE_PIPELINE_CONFIG["ATTACHMENT_MAX_BYTES"]
 
 log = logging.getLogger(__name__)
 
@@ -39,6 +37,14 @@ FAKENITRO_EMOJI_REGEX = re.compile(
 )
 
 
+def _fakenitro_emoji_name(match: "re.Match") -> str:
+    return match.group(1) or f"emoji_{match.group(5)}"
+
+
+def _fakenitro_sticker_name(match: "re.Match") -> str:
+    return match.group(1) or f"sticker_{match.group(5)}"
+
+
 def detect_bot_location(channel: Any) -> Dict[str, Any]:
     """
     通用的bot位置检测函数，用于检测bot当前所在的频道或帖子。
@@ -143,19 +149,19 @@ class MessageProcessor:
         if not matches:
             return content, []
 
-        proxy_url = config.PROXY_URL
-        async with aiohttp.ClientSession() as session:
-            for match in matches:
-                emoji_name, emoji_id = match.groups()
-                extension = "gif" if match.group(0).startswith("<a:") else "png"
-                url = f"https://cdn.discordapp.com/emojis/{emoji_id}.{extension}"
-                tasks.append(
-                    asyncio.create_task(
-                        self._fetch_image_aio(session, url, proxy=proxy_url)
-                    )
+        proxy_url = http_client_registry.proxy_url
+        session = http_client_registry.get_aiohttp_session()
+        for match in matches:
+            emoji_name, emoji_id = match.groups()
+            extension = "gif" if match.group(0).startswith("<a:") else "png"
+            url = f"https://cdn.discordapp.com/emojis/{emoji_id}.{extension}"
+            tasks.append(
+                asyncio.create_task(
+                    self._fetch_image_aio(session, url, proxy=proxy_url)
                 )
+            )
 
-            results = await asyncio.gather(*tasks)
+        results = await asyncio.gather(*tasks)
 
         modified_content = content
         for match, image_bytes in zip(matches, results):
@@ -188,41 +194,41 @@ class MessageProcessor:
         if not message.stickers:
             return "", []
 
-        proxy_url = config.PROXY_URL
-        async with aiohttp.ClientSession() as session:
-            for sticker in message.stickers:
-                # 获取贴纸URL
-                sticker_url = sticker.url
-
-                # 下载贴纸图片
-                image_bytes = await self._fetch_image_aio(
-                    session, sticker_url, proxy=proxy_url
-                )
+        proxy_url = http_client_registry.proxy_url
+        session = http_client_registry.get_aiohttp_session()
+        for sticker in message.stickers:
+            # 获取贴纸URL
+            sticker_url = sticker.url
 
-                if image_bytes:
-                    # 确定MIME类型
-                    if sticker.format == discord.StickerFormatType.gif:
-                        mime_type = "image/gif"
-                    elif sticker.format == discord.StickerFormatType.apng:
-                        mime_type = "image/png"
-                    else:
-                        # lottie 格式无法直接处理为图片，但 Discord 会提供 PNG 预览
-                        mime_type = "image/png"
+            # 下载贴纸图片
+            image_bytes = await self._fetch_image_aio(
+                session, sticker_url, proxy=proxy_url
+            )
 
-                    sticker_images.append(
-                        {
-                            "mime_type": mime_type,
-                            "data": image_bytes,
-                            "source": "sticker",
-                            "name": sticker.name,
-                        }
-                    )
-                    sticker_texts.append(f"[贴纸: {sticker.name}]")
-                    log.debug(f"成功提取贴纸: {sticker.name}")
+            if image_bytes:
+                # 确定MIME类型
+                if sticker.format == discord.StickerFormatType.gif:
+                    mime_type = "image/gif"
+                elif sticker.format == discord.StickerFormatType.apng:
+                    mime_type = "image/png"
                 else:
-                    # 即使下载失败，也添加文本描述
-                    sticker_texts.append(f"[贴纸: {sticker.name}]")
-                    log.warning(f"无法下载贴纸图片: {sticker.name}")
+                    # lottie 格式无法直接处理为图片，但 Discord 会提供 PNG 预览
+                    mime_type = "image/png"
+
+                sticker_images.append(
+                    {
+                        "mime_type": mime_type,
+                        "data": image_bytes,
+                        "source": "sticker",
+                        "name": sticker.name,
+                    }
+                )
+                sticker_texts.append(f"[贴纸: {sticker.name}]")
+                log.debug(f"成功提取贴纸: {sticker.name}")
+            else:
+                # 即使下载失败，也添加文本描述
+                sticker_texts.append(f"[贴纸: {sticker.name}]")
+                log.warning(f"无法下载贴纸图片: {sticker.name}")
 
         return " ".join(sticker_texts), sticker_images
 
@@ -235,52 +241,52 @@ class MessageProcessor:
         if not matches:
             return content, []
 
-        proxy_url = config.PROXY_URL
+        proxy_url = http_client_registry.proxy_url
         modified_content = content
 
-        async with aiohttp.ClientSession() as session:
-            for match in matches:
-                sticker_name = match.group(1) or f"sticker_{match.group(5)}"
-                sticker_url = match.group(2) or match.group(4)
+        session = http_client_registry.get_aiohttp_session()
+        for match in matches:
+            sticker_name = _fakenitro_sticker_name(match)
+            sticker_url = match.group(2) or match.group(4)
 
-                image_bytes = await self._fetch_image_aio(
-                    session, sticker_url, proxy=proxy_url
-                )
+            image_bytes = await self._fetch_image_aio(
+                session, sticker_url, proxy=proxy_url
+            )
 
-                if image_bytes:
-                    mime_type = self._guess_mime_type_from_url(sticker_url)
-                    too_large = False
+            if image_bytes:
+                mime_type = self._guess_mime_type_from_url(sticker_url)
+                too_large = False
 
-                    if mime_type == "image/gif":
-                        max_gif_size_bytes = self._get_gif_size_limit_bytes(
-                            source="generic"
+                if mime_type == "image/gif":
+                    max_gif_size_bytes = self._get_gif_size_limit_bytes(
+                        source="generic"
+                    )
+                    if len(image_bytes) > max_gif_size_bytes:
+                        too_large = True
+                        log.warning(
+                            "FakeNitro sticker GIF skipped, too large: %s (%s bytes > %s bytes)",
+                            sticker_name,
+                            len(image_bytes),
+                            max_gif_size_bytes,
                         )
-                        if len(image_bytes) > max_gif_size_bytes:
-                            too_large = True
-                            log.warning(
-                                "FakeNitro sticker GIF skipped, too large: %s (%s bytes > %s bytes)",
-                                sticker_name,
-                                len(image_bytes),
-                                max_gif_size_bytes,
-                            )
 
-                    if not too_large:
-                        sticker_images.append(
-                            {
-                                "mime_type": mime_type,
-                                "data": image_bytes,
-                                "source": "sticker",
-                                "name": sticker_name,
-                                "origin": "fakenitro",
-                            }
-                        )
-                        log.debug(f"成功提取FakeNitro贴纸: {sticker_name}")
-                else:
-                    log.warning(f"无法下载FakeNitro贴纸图片: {sticker_name}")
+                if not too_large:
+                    sticker_images.append(
+                        {
+                            "mime_type": mime_type,
+                            "data": image_bytes,
+                            "source": "sticker",
+                            "name": sticker_name,
+                            "origin": "fakenitro",
+                        }
+                    )
+                    log.debug(f"成功提取FakeNitro贴纸: {sticker_name}")
+            else:
+                log.warning(f"无法下载FakeNitro贴纸图片: {sticker_name}")
 
-                modified_content = modified_content.replace(
-                    match.group(0), f"[贴纸: {sticker_name}]", 1
-                )
+            modified_content = modified_content.replace(
+                match.group(0), f"[贴纸: {sticker_name}]", 1
+            )
 
         return modified_content, sticker_images
 
@@ -293,83 +299,132 @@ class MessageProcessor:
         if not matches:
             return content, []
 
-        proxy_url = config.PROXY_URL
+        proxy_url = http_client_registry.proxy_url
         modified_content = content
 
-        async with aiohttp.ClientSession() as session:
-            for match in matches:
-                emoji_name = match.group(1) or f"emoji_{match.group(5)}"
-                emoji_url = match.group(2) or match.group(4)
-
-                image_bytes = await self._fetch_image_aio(
-                    session, emoji_url, proxy=proxy_url
-                )
+        session = http_client_registry.get_aiohttp_session()
+        for match in matches:
+            emoji_name = _fakenitro_emoji_name(match)
+            emoji_url = match.group(2) or match.group(4)
 
-                if image_bytes:
-                    mime_type = self._guess_mime_type_from_url(emoji_url)
-                    too_large = False
-
-                    if mime_type == "image/gif":
-                        max_emoji_size = self._get_gif_size_limit_bytes(source="emoji")
-                        if len(image_bytes) > max_emoji_size:
-                            too_large = True
-                            log.warning(
-                                "FakeNitro emoji GIF skipped, too large: %s (%s bytes > %s bytes)",
-                                emoji_name,
-                                len(image_bytes),
-                                max_emoji_size,
-                            )
+            image_bytes = await self._fetch_image_aio(
+                session, emoji_url, proxy=proxy_url
+            )
 
-                    if too_large:
-                        replacement = f"[表情: {emoji_name}]"
-                    else:
-                        emoji_images.append(
-                            {
-                                "mime_type": mime_type,
-                                "data": image_bytes,
-                                "source": "emoji",
-                                "name": emoji_name,
-                                "origin": "fakenitro",
-                            }
+            if image_bytes:
+                mime_type = self._guess_mime_type_from_url(emoji_url)
+                too_large = False
+
+                if mime_type == "image/gif":
+                    max_emoji_size = self._get_gif_size_limit_bytes(source="emoji")
+                    if len(image_bytes) > max_emoji_size:
+                        too_large = True
+                        log.warning(
+                            "FakeNitro emoji GIF skipped, too large: %s (%s bytes > %s bytes)",
+                            emoji_name,
+                            len(image_bytes),
+                            max_emoji_size,
                         )
-                        log.debug(f"成功提取FakeNitro表情: {emoji_name}")
-                        replacement = f"__EMOJI_{emoji_name}__"
-                else:
-                    log.warning(f"无法下载FakeNitro表情图片: {emoji_name}")
-                    replacement = f"[表情: {emoji_name}]"
 
-                modified_content = modified_content.replace(
-                    match.group(0), replacement, 1
-                )
+                if too_large:
+                    replacement = f"[表情: {emoji_name}]"
+                else:
+                    emoji_images.append(
+                        {
+                            "mime_type": mime_type,
+                            "data": image_bytes,
+                            "source": "emoji",
+                            "name": emoji_name,
+                            "origin": "fakenitro",
+                        }
+                    )
+                    log.debug(f"成功提取FakeNitro表情: {emoji_name}")
+                    replacement = f"__EMOJI_{emoji_name}__"
+            else:
+                log.warning(f"无法下载FakeNitro表情图片: {emoji_name}")
+                replacement = f"[表情: {emoji_name}]"
+
+            modified_content = modified_content.replace(
+                match.group(0), replacement, 1
+            )
 
         return modified_content, emoji_images
 
-    async def process_message(
-        self, message: discord.Message, bot: discord.Client
-    ) -> Optional[Dict[str, Any]]:
-        """
-        处理传入的 discord 消息对象。
-        如果消息来自一个不应被触发的频道（如永久面板或置顶帖子），则返回 None。
-        """
+    def _is_ignored_channel_local(self, channel: Any) -> bool:
+        """不需要查询数据库的频道检查：置顶帖子和配置中禁用的频道。"""
         # 检查消息是否来自置顶帖子
+        if isinstance(channel, discord.Thread) and channel.flags.pinned:
+            channel_name = getattr(channel, "name", str(channel.id))
+            log.debug(f"消息来自置顶帖子 {channel_name}，已忽略。")
+            return True
+
+        # 检查消息是否来自配置中禁用的频道
+        if channel.id in chat_config.DISABLED_INTERACTION_CHANNEL_IDS:
+            channel_name = getattr(channel, "name", str(channel.id))
+            log.debug(f"消息来自禁用的频道 {channel_name}，已忽略。")
+            return True
+        return False
+
+    async def is_ignored_channel(self, message: discord.Message) -> bool:
+        """消息是否来自应被忽略的频道（被禁言的频道、置顶帖子或禁用的频道）。"""
+        if self._is_ignored_channel_local(message.channel):
+            return True
+
         # 检查频道是否被禁言
         if await chat_db_manager.is_channel_muted(message.channel.id):
             channel_name = getattr(message.channel, "name", str(message.channel.id))
             log.debug(f"消息来自被禁言的频道 {channel_name}，已忽略。")
-            return None
+            return True
+        return False
 
-        # 检查消息是否来自置顶帖子
-        if isinstance(message.channel, discord.Thread) and message.channel.flags.pinned:
-            channel_name = getattr(message.channel, "name", str(message.channel.id))
-            log.debug(f"消息来自置顶帖子 {channel_name}，已忽略。")
-            return None
+    def extract_text_content(
+        self, message: discord.Message, bot: discord.Client
+    ) -> str:
+        """
+        不做任何 I/O 的文本快速路径，用于不需要 AI 回复的消息（内容过滤等）。
+        表情、FakeNitro 链接和贴纸只替换为占位符而不下载图片；
+        结果与完整路径在图片全部下载成功时的 user_content 相同。
+        """
+        bot_user = message.guild.me if message.guild else bot.user
 
-        # 检查消息是否来自配置中禁用的频道
-        if message.channel.id in chat_config.DISABLED_INTERACTION_CHANNEL_IDS:
-            channel_name = getattr(message.channel, "name", str(message.channel.id))
-            log.debug(f"消息来自禁用的频道 {channel_name}，已忽略。")
+        content = EMOJI_REGEX.sub(
+            lambda match: f"__EMOJI_{match.group(1)}__", message.content
+        )
+        content = FAKENITRO_EMOJI_REGEX.sub(
+            lambda match: f"__EMOJI_{_fakenitro_emoji_name(match)}__", content
+        )
+        content = FAKENITRO_STICKER_REGEX.sub(
+            lambda match: f"[贴纸: {_fakenitro_sticker_name(match)}]", content
+        )
+
+        clean_content = self._clean_message_content(
+            content, message.mentions, bot_user
+        )
+        if message.stickers:
+            sticker_text = " ".join(
+                f"[贴纸: {sticker.name}]" for sticker in message.stickers
+            )
+            clean_content = f"{sticker_text} {clean_content}"
+        return clean_content
+
+    async def process_message(
+        self, message: discord.Message, bot: discord.Client
+    ) -> Optional[Dict[str, Any]]:
+        """
+        处理传入的 discord 消息对象。
+        如果消息来自一个不应被触发的频道（如永久面板或置顶帖子），则返回 None。
+        """
+        if await self.is_ignored_channel(message):
             return None
+        return await self.extract_message_data(message, bot)
 
+    async def extract_message_data(
+        self, message: discord.Message, bot: discord.Client
+    ) -> Dict[str, Any]:
+        """
+        完整路径：下载附件、表情、贴纸和被回复消息中的图片，提取 AI 对话所需的全部数据。
+        只应在消息确定要交给 AI 处理时调用。
+        """
         image_data_list = []
         # 获取bot用户，优先使用 message.guild.me，如果是DM则使用 bot.user
         bot_user = message.guild.me if message.guild else bot.user
@@ -600,52 +655,55 @@ class MessageProcessor:
     async def _extract_images_from_attachments(
         self, attachments: List[discord.Attachment]
     ) -> List[Dict[str, Any]]:
-        """从附件列表中提取图片数据，超过阈值的自动压缩。"""
-        image_data_list = []
-        for attachment in attachments:
-            if attachment.content_type and attachment.content_type.startswith("image/"):
-                try:
-                    image_bytes = await attachment.read()
-                    if not image_bytes:
-                        continue
-
-                    if len(image_bytes) > _ATTACHMENT_IMAGE_MAX_BYTES:
-                        log.info(
-                            f"附件图片 {attachment.filename} 过大 ({len(image_bytes)} bytes)，"
-                            f"开始压缩..."
-                        )
-                        image_bytes, _ = self._compress_image_bytes(image_bytes)
-                        log.info(
-                            f"附件图片压缩完成: {len(image_bytes)} bytes"
-                        )
+        """
+        从附件列表中提取图片数据，超过阈值的自动压缩。
+        各附件并发下载，压缩在 image_pipeline 的线程池中执行，结果保持附件原有顺序。
+        """
+        image_attachments = [
+            a
+            for a in attachments
+            if a.content_type and a.content_type.startswith("image/")
+        ]
+        if not image_attachments:
+            return []
+
+        results = await asyncio.gather(
+            *(self._read_image_attachment(a) for a in image_attachments)
+        )
+        return [r for r in results if r is not None]
 
-                    image_data_list.append(
-                        {
-                            "mime_type": attachment.content_type,
-                            "data": image_bytes,
-                            "source": "attachment",
-                        }
-                    )
-                    log.debug(
-                        f"成功读取图片附件: {attachment.filename}, 大小: {len(image_bytes)} 字节"
-                    )
-                except Exception as e:
-                    log.error(f"读取图片附件 {attachment.filename} 时出错: {e}")
-        return image_data_list
-
-    @staticmethod
-    def _compress_image_bytes(image_bytes: bytes) -> tuple[bytes, str]:
-        buf = io.BytesIO(image_bytes)
-        with Image.open(buf) as img:
-            img.thumbnail(
-                (_ATTACHMENT_COMPRESS_MAX_DIMENSION, _ATTACHMENT_COMPRESS_MAX_DIMENSION),
-                Image.Resampling.LANCZOS,
+    async def _read_image_attachment(
+        self, attachment: discord.Attachment
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            started = time.perf_counter()
+            image_bytes = await attachment.read()
+            image_pipeline.record("download", (time.perf_counter() - started) * 1000)
+            if not image_bytes:
+                return None
+
+            mime_type = attachment.content_type
+            if len(image_bytes) > _ATTACHMENT_IMAGE_MAX_BYTES:
+                log.info(
+                    f"附件图片 {attachment.filename} 过大 ({len(image_bytes)} bytes)，"
+                    f"开始压缩..."
+                )
+                image_bytes, mime_type = await image_pipeline.compress_attachment(
+                    image_bytes
+                )
+                log.info(f"附件图片压缩完成: {len(image_bytes)} bytes")
+
+            log.debug(
+                f"成功读取图片附件: {attachment.filename}, 大小: {len(image_bytes)} 字节"
             )
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            out = io.BytesIO()
-            img.save(out, format="JPEG", quality=_ATTACHMENT_COMPRESS_QUALITY)
-            return out.getvalue(), "image/jpeg"
+            return {
+                "mime_type": mime_type,
+                "data": image_bytes,
+                "source": "attachment",
+            }
+        except Exception as e:
+            log.error(f"读取图片附件 {attachment.filename} 时出错: {e}")
+            return None
 
     def _clean_message_content(
         self,
@@ -6,6 +6,7 @@ import logging
 from typing import Optional, List, Literal
 
 from src.chat.config.chat_config import OLLAMA_CONFIG, QWEN_EMBEDDING_CONFIG
+from src.chat.services.http_client_registry import http_client_registry
 
 log = logging.getLogger(__name__)
 
@@ -75,16 +76,16 @@ class OllamaEmbeddingService:
 
             # 第一次调用需要加载模型到内存，需要更长的超时时间
             timeout = httpx.Timeout(120.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                url = f"{self.base_url}/api/embeddings"
-                log.debug(f"正在请求 Ollama API: {url}, 模型: {self.model}")
-                response = await client.post(
-                    url,
-                    json={"model": self.model, "prompt": prompt},
-                )
-                response.raise_for_status()
-                result = response.json()
-                return result.get("embedding")
+            client = http_client_registry.get_client(timeout=timeout)
+            url = f"{self.base_url}/api/embeddings"
+            log.debug(f"正在请求 Ollama API: {url}, 模型: {self.model}")
+            response = await client.post(
+                url,
+                json={"model": self.model, "prompt": prompt},
+            )
+            response.raise_for_status()
+            result = response.json()
+            return result.get("embedding")
         except httpx.HTTPStatusError as e:
             log.error(
                 f"Ollama API HTTP 错误: {e.response.status_code} - {e.response.text}"
@@ -152,21 +153,21 @@ class OllamaEmbeddingService:
 
             # 使用 Ollama 的批量 API
             timeout = httpx.Timeout(300.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                url = f"{self.base_url}/api/embed"
-                log.debug(
-                    f"正在请求 Ollama 批量 API: {url}, 模型: {self.model}, 文本数: {len(texts)}"
-                )
-                response = await client.post(
-                    url,
-                    json={"model": self.model, "input": prompts},
-                )
-                response.raise_for_status()
-                result = response.json()
-
-                # Ollama 批量 API 返回格式: {"embeddings": [[...], [...], ...]}
-                embeddings = result.get("embeddings", [])
-                return embeddings
+            client = http_client_registry.get_client(timeout=timeout)
+            url = f"{self.base_url}/api/embed"
+            log.debug(
+                f"正在请求 Ollama 批量 API: {url}, 模型: {self.model}, 文本数: {len(texts)}"
+            )
+            response = await client.post(
+                url,
+                json={"model": self.model, "input": prompts},
+            )
+            response.raise_for_status()
+            result = response.json()
+
+            # Ollama 批量 API 返回格式: {"embeddings": [[...], [...], ...]}
+            embeddings = result.get("embeddings", [])
+            return embeddings
         except httpx.HTTPStatusError as e:
             log.error(
                 f"Ollama 批量 API HTTP 错误: {e.response.status_code} - {e.response.text}"
@@ -196,9 +197,9 @@ class OllamaEmbeddingService:
         """
         try:
             timeout = httpx.Timeout(5.0, connect=5.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
+            client = http_client_registry.get_client(timeout=timeout)
+            response = await client.get(f"{self.base_url}/api/tags")
+            return response.status_code == 200
         except Exception as e:
             log.error(f"检查 Ollama 连接失败: {e}")
             return False
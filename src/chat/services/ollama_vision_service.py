@@ -15,9 +15,9 @@ import io
 import logging
 from typing import Optional, Tuple
 
-from PIL import Image
 
 from src.chat.config.chat_config import OLLAMA_VISION_CONFIG
+from src.chat.services.http_client_registry import http_client_registry
 
 log = logging.getLogger(__name__)
 
@@ -58,6 +58,8 @@ class OllamaVisionService:
         Returns:
             (缩放后的图片数据, MIME 类型)
         """
+        from PIL import Image
+
         img = Image.open(io.BytesIO(image_bytes))
         original_size = img.size
 
@@ -140,32 +142,32 @@ class OllamaVisionService:
             # 构建 Ollama API 请求
             # Ollama 的 /api/generate 端点支持图片输入
             timeout = httpx.Timeout(120.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                url = f"{self.base_url}/api/generate"
-                log.debug(f"正在请求 Ollama Vision API: {url}, 模型: {self.model}")
-
-                response = await client.post(
-                    url,
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False,
-                        "images": [image_base64],
-                    },
+            client = http_client_registry.get_client(timeout=timeout)
+            url = f"{self.base_url}/api/generate"
+            log.debug(f"正在请求 Ollama Vision API: {url}, 模型: {self.model}")
+
+            response = await client.post(
+                url,
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": False,
+                    "images": [image_base64],
+                },
+            )
+            response.raise_for_status()
+            result = response.json()
+
+            # 提取响应文本
+            description = result.get("response", "")
+            if description:
+                log.info(
+                    f"Ollama Vision 成功识别图片，描述长度: {len(description)}"
                 )
-                response.raise_for_status()
-                result = response.json()
-
-                # 提取响应文本
-                description = result.get("response", "")
-                if description:
-                    log.info(
-                        f"Ollama Vision 成功识别图片，描述长度: {len(description)}"
-                    )
-                    return description.strip()
+                return description.strip()
 
-                log.warning("Ollama Vision 返回空描述")
-                return None
+            log.warning("Ollama Vision 返回空描述")
+            return None
 
         except httpx.HTTPStatusError as e:
             log.error(
@@ -189,25 +191,25 @@ class OllamaVisionService:
         """
         try:
             timeout = httpx.Timeout(5.0, connect=5.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                if response.status_code == 200:
-                    # 检查是否有可用的视觉模型
-                    models = response.json().get("models", [])
-                    model_names = [m.get("name", "") for m in models]
-                    # 检查配置的模型或任何视觉模型
-                    has_vision_model = any(
-                        self.model in name
-                        or "qwen" in name.lower()
-                        or "llava" in name.lower()
-                        for name in model_names
+            client = http_client_registry.get_client(timeout=timeout)
+            response = await client.get(f"{self.base_url}/api/tags")
+            if response.status_code == 200:
+                # 检查是否有可用的视觉模型
+                models = response.json().get("models", [])
+                model_names = [m.get("name", "") for m in models]
+                # 检查配置的模型或任何视觉模型
+                has_vision_model = any(
+                    self.model in name
+                    or "qwen" in name.lower()
+                    or "llava" in name.lower()
+                    for name in model_names
+                )
+                if not has_vision_model:
+                    log.warning(
+                        f"未找到视觉模型 {self.model}，可用模型: {model_names}"
                     )
-                    if not has_vision_model:
-                        log.warning(
-                            f"未找到视觉模型 {self.model}，可用模型: {model_names}"
-                        )
-                    return True
-                return False
+                return True
+            return False
         except Exception as e:
             log.error(f"检查 Ollama 连接失败: {e}")
             return False
@@ -221,28 +223,28 @@ class OllamaVisionService:
         """
         try:
             timeout = httpx.Timeout(300.0, connect=10.0)
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                # 先检查模型是否已存在
-                response = await client.get(f"{self.base_url}/api/tags")
-                if response.status_code == 200:
-                    models = response.json().get("models", [])
-                    model_names = [m.get("name", "") for m in models]
-                    if any(self.model in name for name in model_names):
-                        log.info(f"视觉模型 {self.model} 已存在")
-                        return True
-
-                # 模型不存在，尝试拉取
-                log.info(f"正在拉取视觉模型 {self.model}...")
-                response = await client.post(
-                    f"{self.base_url}/api/pull",
-                    json={"name": self.model, "stream": False},
-                )
-                if response.status_code == 200:
-                    log.info(f"成功拉取视觉模型 {self.model}")
+            client = http_client_registry.get_client(timeout=timeout)
+            # 先检查模型是否已存在
+            response = await client.get(f"{self.base_url}/api/tags")
+            if response.status_code == 200:
+                models = response.json().get("models", [])
+                model_names = [m.get("name", "") for m in models]
+                if any(self.model in name for name in model_names):
+                    log.info(f"视觉模型 {self.model} 已存在")
                     return True
-                else:
-                    log.error(f"拉取模型失败: {response.text}")
-                    return False
+
+            # 模型不存在，尝试拉取
+            log.info(f"正在拉取视觉模型 {self.model}...")
+            response = await client.post(
+                f"{self.base_url}/api/pull",
+                json={"name": self.model, "stream": False},
+            )
+            if response.status_code == 200:
+                log.info(f"成功拉取视觉模型 {self.model}")
+                return True
+            else:
+                log.error(f"拉取模型失败: {response.text}")
+                return False
 
         except Exception as e:
             log.error(f"确保模型可用失败: {e}")
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+提示词前缀稳定性监控
+
+缓存优化构建（PromptService._build_chat_prompt_cache_optimized）把越狱、人设、帖子首楼、
+用户档案、记忆笔记、好感度等稳定内容放在前面，期望上游的前缀缓存能够命中。
+但是否真的逐字节不变，此前没有任何验证。
+
+这里为每一轮构建出的提示词逐层计算指纹，与同一 (用户, 频道) 上一轮的指纹比较，
+记录第一个发生变化的层（缓存从这一层开始失效），并在拿到模型响应后关联该轮的缓存命中 token。
+report() 汇总每一层作为「首个变化层」的次数、平均缓存命中 token 和命中率，
+用来找出破坏缓存的层。
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from src.chat.config.chat_config import PROMPT_PREFIX_MONITOR_CONFIG
+
+log = logging.getLogger(__name__)
+
+# 上一轮不存在时（首轮或被淘汰）的标记
+FIRST_TURN = "(first_turn)"
+# 所有层都与上一轮一致
+NO_DIVERGENCE = "(none)"
+
+
+def _part_text(part: Any) -> str:
+    if isinstance(part, str):
+        return part
+    if isinstance(part, dict):
+        if "text" in part:
+            return str(part["text"])
+        # 图片只记录来源；图片只出现在每轮都会变化的用户输入中
+        return f"<image:{part.get('source', '')}>"
+    return f"<{type(part).__name__}>"
+
+
+def fingerprint_messages(messages: Sequence[Dict[str, Any]]) -> Tuple[str, int]:
+    """返回一组消息的指纹与文本长度（字符数）。"""
+    digest = hashlib.blake2b(digest_size=8)
+    length = 0
+    for message in messages:
+        digest.update(str(message.get("role", "")).encode("utf-8"))
+        digest.update(b"\x00")
+        parts = message.get("parts")
+        if parts is None:
+            parts = [message.get("content", "")]
+        for part in parts:
+            text = _part_text(part)
+            length += len(text)
+            digest.update(text.encode("utf-8"))
+            digest.update(b"\x01")
+        digest.update(b"\x02")
+    return digest.hexdigest(), length
+
+
+@dataclass
+class PrefixObservation:
+    """一轮提示词与上一轮的比较结果。"""
+
+    layer_names: List[str]
+    fingerprints: List[str]
+    # 第一个变化的层；首轮为 FIRST_TURN，全部一致为 NO_DIVERGENCE
+    divergent_layer: str
+    # 变化层之前（理论上可命中缓存）的文本长度
+    stable_prefix_chars: int
+    total_chars: int
+    cached_tokens: Optional[int] = None
+    input_tokens: Optional[int] = None
+
+
+@dataclass
+class _LayerStats:
+    divergences: int = 0
+    usage_samples: int = 0
+    cached_tokens: int = 0
+    input_tokens: int = 0
+    stable_prefix_chars: int = 0
+
+
+@dataclass
+class _Conversation:
+    observation: PrefixObservation
+    # 尚未关联模型用量的本轮观测
+    awaiting_usage: bool = True
+
+
+class PromptPrefixMonitor:
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**PROMPT_PREFIX_MONITOR_CONFIG, **(config or {})}
+        self._conversations: "OrderedDict[Hashable, _Conversation]" = OrderedDict()
+        self._stats: Dict[str, _LayerStats] = {}
+        self.turns = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.config["ENABLED"]
+
+    def observe(
+        self,
+        user_id: Any,
+        channel_id: Any,
+        layers: Sequence[Tuple[str, Sequence[Dict[str, Any]]]],
+    ) -> Optional[PrefixObservation]:
+        """
+        记录一轮提示词。layers 按顺序给出 (层名, 该层的消息列表)；空层也应传入，
+        保证相邻两轮的层可以按名称对齐。
+        """
+        if not self.enabled:
+            return None
+        key = (user_id, channel_id)
+        names: List[str] = []
+        fingerprints: List[str] = []
+        lengths: List[int] = []
+        for name, messages in layers:
+            fingerprint, length = fingerprint_messages(messages)
+            names.append(name)
+            fingerprints.append(fingerprint)
+            lengths.append(length)
+
+        previous = self._conversations.get(key)
+        divergent_layer = FIRST_TURN
+        stable_chars = 0
+        if previous is not None:
+            divergent_layer = NO_DIVERGENCE
+            prev = previous.observation
+            prev_by_name = dict(zip(prev.layer_names, prev.fingerprints))
+            for name, fingerprint, length in zip(names, fingerprints, lengths):
+                if prev_by_name.get(name) != fingerprint:
+                    divergent_layer = name
+                    break
+                stable_chars += length
+
+        observation = PrefixObservation(
+            layer_names=names,
+            fingerprints=fingerprints,
+            divergent_layer=divergent_layer,
+            stable_prefix_chars=stable_chars,
+            total_chars=sum(lengths),
+        )
+        self._conversations[key] = _Conversation(observation)
+        self._conversations.move_to_end(key)
+        while len(self._conversations) > self.config["MAX_TRACKED_CONVERSATIONS"]:
+            self._conversations.popitem(last=False)
+
+        self.turns += 1
+        stats = self._stats.setdefault(divergent_layer, _LayerStats())
+        stats.divergences += 1
+        stats.stable_prefix_chars += stable_chars
+        return observation
+
+    def record_usage(
+        self,
+        user_id: Any,
+        channel_id: Any,
+        cached_tokens: Optional[int],
+        input_tokens: Optional[int],
+    ) -> None:
+        """把模型响应中的缓存命中 token 关联到该 (用户, 频道) 最近一轮的观测。"""
+        conversation = self._conversations.get((user_id, channel_id))
+        if conversation is None or not conversation.awaiting_usage:
+            return
+        conversation.awaiting_usage = False
+        if cached_tokens is None or not input_tokens:
+            # Provider 没有返回缓存命中数据
+            return
+        observation = conversation.observation
+        observation.cached_tokens = cached_tokens
+        observation.input_tokens = input_tokens
+        stats = self._stats.setdefault(observation.divergent_layer, _LayerStats())
+        stats.usage_samples += 1
+        stats.cached_tokens += cached_tokens
+        stats.input_tokens += input_tokens
+
+    def report(self) -> Dict[str, Any]:
+        """按首个变化层汇总；layers 按出现次数从多到少排列。"""
+        layers = []
+        for name, stats in self._stats.items():
+            layers.append(
+                {
+                    "layer": name,
+                    "divergences": stats.divergences,
+                    "share": stats.divergences / self.turns if self.turns else 0.0,
+                    "avg_stable_prefix_chars": (
+                        stats.stable_prefix_chars // stats.divergences
+                        if stats.divergences
+                        else 0
+                    ),
+                    "usage_samples": stats.usage_samples,
+                    "avg_cached_tokens": (
+                        stats.cached_tokens // stats.usage_samples
+                        if stats.usage_samples
+                        else None
+                    ),
+                    "cache_hit_ratio": (
+                        stats.cached_tokens / stats.input_tokens
+                        if stats.input_tokens
+                        else None
+                    ),
+                }
+            )
+        layers.sort(key=lambda item: item["divergences"], reverse=True)
+        return {"turns": self.turns, "layers": layers}
+
+    def format_report(self) -> str:
+        report = self.report()
+        lines = [f"提示词前缀稳定性（共 {report['turns']} 轮）:"]
+        for item in report["layers"]:
+            ratio = item["cache_hit_ratio"]
+            ratio_text = f"{ratio:.0%}" if ratio is not None else "无数据"
+            lines.append(
+                f"  首个变化层 {item['layer']}: {item['divergences']} 次"
+                f" ({item['share']:.0%})，平均稳定前缀 {item['avg_stable_prefix_chars']} 字符，"
+                f"缓存命中率 {ratio_text}"
+            )
+        return "\n".join(lines)
+
+    def log_summary(self) -> None:
+        if self.turns:
+            log.info(self.format_report())
+
+
+def split_layers(
+    messages: List[Dict[str, Any]], marks: List[Tuple[str, int]]
+) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """按 (层名, 该层结束时的消息数) 标记把消息列表切分为各层。"""
+    layers = []
+    start = 0
+    for name, end in marks:
+        layers.append((name, messages[start:end]))
+        start = end
+    return layers
+
+
+prompt_prefix_monitor = PromptPrefixMonitor()
@@ -8,12 +8,13 @@ from PIL import Image
 import io
 import json
 import re
-import discord
 
 from src.chat.config.prompts import PROMPT_CONFIG, PERSONA_VARIANTS
 from src.chat.config import chat_config
 from src.chat.services.ai.config.models import get_model_config, get_prompt_config
 from src.chat.services.event_service import event_service
+from src.chat.services.prompt_prefix_monitor import prompt_prefix_monitor, split_layers
+from src.chat.services.thread_metadata_cache import thread_metadata_cache
 from src.config import BOT_NAME
 
 log = logging.getLogger(__name__)
@@ -124,6 +125,27 @@ class PromptService:
             return default_variant.get("SYSTEM_PROMPT")
         return None
 
+    async def _build_thread_first_post(self, thread: Any) -> Optional[str]:
+        """构建帖子首楼注入块；首楼没有文字内容或获取失败时返回 None。"""
+        try:
+            metadata = await thread_metadata_cache.get(thread)
+        except Exception as e:
+            log.warning(f"获取帖子首楼内容失败: {e}")
+            return None
+
+        if not metadata.starter_content:
+            return None
+
+        author_name = metadata.owner_name or "未知作者"
+        tags = ", ".join(metadata.tags) if metadata.tags else "无"
+        return f"""<thread_first_post>
+帖子标题: {metadata.title}
+发帖人: {author_name}
+标签: {tags}
+首楼内容:
+{metadata.starter_content}
+</thread_first_post>"""
+
     def _get_model_specific_prompt(
         self, model_name: Optional[str], prompt_name: str
     ) -> Optional[str]:
@@ -256,6 +278,7 @@ class PromptService:
         persona_style: str = "default",
         memory_notes: Optional[str] = None,
         recent_chat_history: Optional[List[Dict[str, Any]]] = None,
+        user_id: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         构建用于AI聊天的分层对话历史。
@@ -291,6 +314,7 @@ class PromptService:
                 persona_style=persona_style,
                 memory_notes=memory_notes,
                 recent_chat_history=recent_chat_history,
+                user_id=user_id,
             )
         else:
             return await self._build_chat_prompt_default(
@@ -414,47 +438,10 @@ class PromptService:
 
             # 检查是否在帖子中（只要在帖子里就注入首楼）
             if location_info["is_thread"] and bot_user_id:
-                try:
-                    thread = channel
-                    # 获取帖子首楼
-                    if thread.starter_message:
-                        first_message = thread.starter_message
-                    else:
-                        first_message = await thread.fetch_message(thread.id)
-
-                    if first_message and first_message.content:
-                        # 获取作者信息
-                        author_name = "未知作者"
-                        if thread.owner:
-                            author_name = thread.owner.display_name
-                        elif thread.owner_id:
-                            try:
-                                owner = await thread.guild.fetch_member(thread.owner_id)
-                                author_name = owner.display_name
-                            except discord.NotFound:
-                                pass
-
-                        # 构建帖子首楼注入
-                        starter_content = first_message.content
-                        thread_title = thread.name
-                        tags = (
-                            ", ".join([tag.name for tag in thread.applied_tags])
-                            if thread.applied_tags
-                            else "无"
-                        )
-
-                        thread_first_post = f"""<thread_first_post>
-帖子标题: {thread_title}
-发帖人: {author_name}
-标签: {tags}
-首楼内容:
-{starter_content}
-</thread_first_post>"""
-
-                        # 保存帖子首楼内容，稍后注入
-                        self._thread_first_post_to_inject = thread_first_post
-                except Exception as e:
-                    log.warning(f"获取帖子首楼内容失败: {e}")
+                thread_first_post = await self._build_thread_first_post(channel)
+                if thread_first_post:
+                    # 保存帖子首楼内容，稍后注入
+                    self._thread_first_post_to_inject = thread_first_post
 
         # --- 新增：根据模型动态注入绕过限制的上下文 ---
         jailbreak_user = self._get_model_specific_prompt(
@@ -844,6 +831,7 @@ class PromptService:
         persona_style: str = "default",
         memory_notes: Optional[str] = None,
         recent_chat_history: Optional[List[Dict[str, Any]]] = None,
+        user_id: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         针对上下文缓存优化的对话历史构建方法。
@@ -862,8 +850,11 @@ class PromptService:
         11. 当前用户输入（每次不同）
 
         这样前7层在同一用户同一等级对话时可以命中缓存。
+        构建时记录每层的边界，完成后交给 prompt_prefix_monitor 与上一轮逐层比较。
         """
         final_conversation = []
+        # (层名, 该层结束时的消息数)
+        layer_marks = []
 
         # --- 帖子首楼注入（提前处理，但稍后注入）---
         thread_first_post = None
@@ -878,41 +869,7 @@ class PromptService:
             )
 
             if location_info["is_thread"] and bot_user_id:
-                try:
-                    thread = channel
-                    if thread.starter_message:
-                        first_message = thread.starter_message
-                    else:
-                        first_message = await thread.fetch_message(thread.id)
-
-                    if first_message and first_message.content:
-                        author_name = "未知作者"
-                        if thread.owner:
-                            author_name = thread.owner.display_name
-                        elif thread.owner_id:
-                            try:
-                                owner = await thread.guild.fetch_member(thread.owner_id)
-                                author_name = owner.display_name
-                            except discord.NotFound:
-                                pass
-
-                        starter_content = first_message.content
-                        thread_title = thread.name
-                        tags = (
-                            ", ".join([tag.name for tag in thread.applied_tags])
-                            if thread.applied_tags
-                            else "无"
-                        )
-
-                        thread_first_post = f"""<thread_first_post>
-帖子标题: {thread_title}
-发帖人: {author_name}
-标签: {tags}
-首楼内容:
-{starter_content}
-</thread_first_post>"""
-                except Exception as e:
-                    log.warning(f"获取帖子首楼内容失败: {e}")
+                thread_first_post = await self._build_thread_first_post(channel)
 
         # --- 时间准备 ---
         beijing_tz = timezone(timedelta(hours=8))
@@ -932,6 +889,7 @@ class PromptService:
         if jailbreak_user and jailbreak_model:
             final_conversation.append({"role": "user", "parts": [jailbreak_user]})
             final_conversation.append({"role": "model", "parts": [jailbreak_model]})
+        layer_marks.append(("jailbreak", len(final_conversation)))
 
         # 2. 核心人设
         core_prompt_template = self.get_prompt("SYSTEM_PROMPT", model_name=model_name)
@@ -940,12 +898,14 @@ class PromptService:
             core_prompt_template = persona_prompt
         final_conversation.append({"role": "user", "parts": [core_prompt_template]})
         final_conversation.append({"role": "model", "parts": ["我在线啦，随时开聊！"]})
+        layer_marks.append(("persona", len(final_conversation)))
 
         # 3. 帖子首楼（如果有）
         if thread_first_post:
             final_conversation.append({"role": "user", "parts": [thread_first_post]})
             final_conversation.append({"role": "model", "parts": ["了解了"]})
             log.info("已将帖子首楼内容注入到人设之后")
+        layer_marks.append(("thread_first_post", len(final_conversation)))
 
         # ============================================
         # 第二层：几乎不变的内容（用户相关）
@@ -999,6 +959,7 @@ class PromptService:
                 }
             )
             final_conversation.append({"role": "model", "parts": ["这事我知道了"]})
+        layer_marks.append(("user_profile", len(final_conversation)))
 
         # 5. 记忆笔记注入（用户画像之后、频道历史之前）
         if memory_notes:
@@ -1011,6 +972,7 @@ class PromptService:
                 }
             )
             final_conversation.append({"role": "model", "parts": ["我记得了"]})
+        layer_marks.append(("memory_notes", len(final_conversation)))
 
         # 6. 好感度注入（记忆笔记之后、频道历史之前）
         affection_prompt = (
@@ -1028,6 +990,7 @@ class PromptService:
                 }
             )
             final_conversation.append({"role": "model", "parts": ["收到"]})
+        layer_marks.append(("affection", len(final_conversation)))
 
         # 7. 最近聊天历史注入（好感度之后、频道历史之前）
         if recent_chat_history:
@@ -1039,6 +1002,7 @@ class PromptService:
                     {"role": "user", "parts": [recent_chat_text]}
                 )
                 final_conversation.append({"role": "model", "parts": ["我记得了"]})
+        layer_marks.append(("recent_history", len(final_conversation)))
 
         # ============================================
         # 第三层：每次都变的内容
@@ -1048,6 +1012,7 @@ class PromptService:
         if channel_context:
             final_conversation.extend(channel_context)
             log.debug(f"已合并频道上下文，长度为: {len(channel_context)}")
+        layer_marks.append(("channel_context", len(final_conversation)))
 
         # 9. 回复上下文
         if replied_message:
@@ -1057,6 +1022,7 @@ class PromptService:
             )
             final_conversation.append({"role": "model", "parts": ["收到"]})
             log.debug("已在频道历史后注入回复消息上下文。")
+        layer_marks.append(("reply_context", len(final_conversation)))
 
         # ============================================
         # 第四层：最终指令 + 用户输入
@@ -1238,6 +1204,15 @@ class PromptService:
             else:
                 final_conversation.append({"role": "user", "parts": cleaned_user_parts})
 
+        # 最终指令与用户输入可能合并进前面的消息，因此在全部构建完成后再切分各层
+        layer_marks.append(("user_input", len(final_conversation)))
+        if user_id is not None and channel is not None:
+            prompt_prefix_monitor.observe(
+                user_id,
+                getattr(channel, "id", None),
+                split_layers(final_conversation, layer_marks),
+            )
+
         if chat_config.DEBUG_CONFIG["LOG_FINAL_CONTEXT"]:
             log.debug(
                 f"发送给AI的最终提示词（缓存优化）: {json.dumps(final_conversation, ensure_ascii=False, indent=2)}"
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+帖子元数据缓存 - 首楼内容、标题、标签与发帖人昵称
+
+帖子内的每一轮回复，两个提示词构建器都会在首楼不在缓存时调用 thread.fetch_message，
+在发帖人不在缓存时调用 guild.fetch_member；论坛索引、暖贴和发帖奖励又会各自再拉一次首楼。
+这里把这些查询合并为一份按帖子 ID 缓存的元数据：
+- 同一帖子只在首次使用（或失效后）访问一次 Discord API，并发请求共用同一次拉取
+- 帖子更新（标题 / 标签变化）、首楼被编辑或删除、帖子被删除时由 ThreadEventHandlerCog 失效
+- 另有 TTL 兜底发帖人改昵称等不会触发上述事件的变化
+拉取不到首楼时（例如刚创建的帖子首楼尚未可见）不缓存，下次使用时重新拉取。
+由普通消息创建的帖子没有帖内首楼，此时记录的是帖子内的第一条消息（通常是别人的回复），
+只有显式传入 allow_first_message=True 的调用方（论坛索引、发帖奖励）才会拿到它，
+提示词构建器与暖贴不会把回复当成楼主的首楼。
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+import discord
+
+from src.chat.config.chat_config import THREAD_METADATA_CACHE_CONFIG
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ThreadMetadata:
+    """一个帖子的元数据快照。"""
+
+    thread_id: int
+    title: str
+    tags: Tuple[str, ...]
+    owner_id: Optional[int]
+    # 发帖人昵称；发帖人已离开服务器等情况下为 None
+    owner_name: Optional[str]
+    # 首楼消息；无法获取时为 None
+    starter_message: Optional[discord.Message]
+    # starter_message 是否只是帖子内的第一条消息（帖子由普通消息创建，首楼不在帖子内）
+    starter_from_history: bool = False
+
+    @property
+    def starter_content(self) -> str:
+        if self.starter_message is None:
+            return ""
+        return self.starter_message.content or ""
+
+    @property
+    def attachment_count(self) -> int:
+        if self.starter_message is None:
+            return 0
+        return len(self.starter_message.attachments or [])
+
+
+async def _fetch_starter_message(
+    thread: discord.Thread,
+) -> Tuple[Optional[discord.Message], bool]:
+    """返回 (首楼消息, 是否退回到了帖子内的第一条消息)。"""
+    # thread.starter_message 可能是缓存中不完整的消息对象，没有内容时重新拉取
+    starter = thread.starter_message
+    if starter is not None and (starter.content or starter.attachments):
+        return starter, False
+    try:
+        # 论坛帖子的首楼 ID 与帖子 ID 相同
+        return await thread.fetch_message(thread.id), False
+    except discord.NotFound:
+        pass
+    except discord.HTTPException as e:
+        # 没有权限或请求失败时不影响回复，只是缺少首楼内容（不会写入缓存）
+        log.debug(f"拉取帖子 {thread.id} 的首楼失败: {e}")
+        return None, False
+    # 由普通消息创建的帖子，起始消息在父频道中，退回到帖子内的第一条消息
+    try:
+        return await anext(thread.history(limit=1, oldest_first=True)), True
+    except StopAsyncIteration:
+        return None, False
+    except discord.HTTPException as e:
+        log.debug(f"拉取帖子 {thread.id} 的第一条消息失败: {e}")
+        return None, False
+
+
+async def _fetch_owner_name(thread: discord.Thread) -> Optional[str]:
+    owner_id = thread.owner_id
+    if not owner_id:
+        return None
+    owner = thread.owner or thread.guild.get_member(owner_id)
+    if owner is None:
+        try:
+            owner = await thread.guild.fetch_member(owner_id)
+        except discord.NotFound:
+            log.debug(f"帖子 {thread.id} 的发帖人 (ID: {owner_id}) 已不在服务器中。")
+            return None
+        except discord.HTTPException as e:
+            log.debug(f"获取帖子 {thread.id} 的发帖人 (ID: {owner_id}) 失败: {e}")
+            return None
+    return owner.display_name
+
+
+class ThreadMetadataCache:
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**THREAD_METADATA_CACHE_CONFIG, **(config or {})}
+        self._entries: "OrderedDict[int, Tuple[float, ThreadMetadata]]" = (
+            OrderedDict()
+        )
+        self._inflight: Dict[int, asyncio.Task] = {}
+        # --- 统计 ---
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def __contains__(self, thread_id: int) -> bool:
+        return thread_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_cached(self, thread_id: int) -> Optional[ThreadMetadata]:
+        entry = self._entries.get(thread_id)
+        if entry is None:
+            return None
+        expires_at, metadata = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[thread_id]
+            return None
+        self._entries.move_to_end(thread_id)
+        return metadata
+
+    def _store(self, metadata: ThreadMetadata) -> None:
+        self._entries[metadata.thread_id] = (
+            time.monotonic() + self.config["TTL_SECONDS"],
+            metadata,
+        )
+        self._entries.move_to_end(metadata.thread_id)
+        while len(self._entries) > self.config["MAX_ENTRIES"]:
+            self._entries.popitem(last=False)
+
+    async def get(
+        self, thread: discord.Thread, allow_first_message: bool = False
+    ) -> ThreadMetadata:
+        """
+        返回帖子的元数据；缓存未命中时拉取，同一帖子的并发请求只拉取一次。
+
+        帖子内没有首楼时，只有 allow_first_message=True 才会把帖子内的第一条消息
+        作为 starter_message 返回，否则 starter_message 为 None。
+        """
+        metadata = await self._get(thread)
+        if metadata.starter_from_history and not allow_first_message:
+            return replace(metadata, starter_message=None, starter_from_history=False)
+        return metadata
+
+    async def _get(self, thread: discord.Thread) -> ThreadMetadata:
+        if not self.config["ENABLED"]:
+            return await self._load(thread)
+
+        metadata = self._get_cached(thread.id)
+        if metadata is not None:
+            self.hits += 1
+            return metadata
+        self.misses += 1
+
+        task = self._inflight.get(thread.id)
+        if task is None:
+            task = asyncio.create_task(self._load_and_store(thread))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._inflight[thread.id] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, thread: discord.Thread) -> ThreadMetadata:
+        (starter, from_history), owner_name = await asyncio.gather(
+            _fetch_starter_message(thread), _fetch_owner_name(thread)
+        )
+        return ThreadMetadata(
+            thread_id=thread.id,
+            title=thread.name,
+            tags=tuple(tag.name for tag in (thread.applied_tags or [])),
+            owner_id=thread.owner_id,
+            owner_name=owner_name,
+            starter_message=starter,
+            starter_from_history=from_history,
+        )
+
+    async def _load_and_store(self, thread: discord.Thread) -> ThreadMetadata:
+        task = asyncio.current_task()
+        try:
+            metadata = await self._load(thread)
+            # 拉取期间帖子被失效时，结果仍返回给等待者，但不写入缓存
+            if (
+                self._inflight.get(thread.id) is task
+                and metadata.starter_message is not None
+            ):
+                self._store(metadata)
+            return metadata
+        finally:
+            if self._inflight.get(thread.id) is task:
+                del self._inflight[thread.id]
+
+    def invalidate(self, thread_id: int) -> None:
+        """丢弃帖子的缓存；正在进行的拉取结果也不会再写入缓存。"""
+        removed = self._entries.pop(thread_id, None) is not None
+        removed = self._inflight.pop(thread_id, None) is not None or removed
+        if removed:
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+    def log_metrics_summary(self) -> None:
+        m = self.metrics()
+        log.info(
+            f"帖子元数据缓存统计: 命中 {m['hits']}，未命中 {m['misses']}，"
+            f"命中率 {m['hit_rate']:.0%}，失效 {m['invalidations']}，缓存 {m['entries']} 个帖子"
+        )
+
+
+thread_metadata_cache = ThreadMetadataCache()
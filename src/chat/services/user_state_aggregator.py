@@ -0,0 +1,420 @@
+# -*- coding: utf-8 -*-
+"""
+每条消息的用户状态写回缓冲（write-behind）
+
+每次 AI 回复后原本要依次执行：好感度查询 + 更新、每日首聊奖励（FOR UPDATE user_coins）、
+对话历史追加（FOR UPDATE 档案）以及 SQLite 中的模型使用计数，一条消息 4~6 个事务。
+这里改为在内存中按用户合并这些变更，定时（或积累到阈值）后：
+- PostgreSQL 部分（好感度、奖励、对话历史）在一个事务中批量写入，行按主键排序加锁
+- SQLite 部分（模型使用计数）按 (模型, Provider, 日期) 合并后写入
+
+崩溃安全：每条变更在进入内存前先追加到 WAL 分段文件（JSON Lines）。写入开始时封存当前分段，
+写入全部成功后才删除已封存的分段；启动时重放残留分段。语义为「至少一次」——
+若在提交之后、删除分段之前崩溃，重放会重复应用：每日奖励按日期判重不受影响，
+好感度受每日上限约束，对话历史与模型计数可能重复一次。
+
+读自己的写：个人记忆服务读取历史时会合并缓冲中的对话，打包对话块或重置历史前会先写入缓冲。
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.chat.config.chat_config import AFFECTION_CONFIG, USER_STATE_AGGREGATOR_CONFIG
+from src.chat.features.affection.service.affection_service import affection_service
+from src.chat.features.chat_settings.services.chat_settings_service import (
+    chat_settings_service,
+)
+from src.chat.features.odysseia_coin.service.coin_service import coin_service
+from src.chat.features.personal_memory.services.personal_memory_service import (
+    personal_memory_service,
+)
+from src.chat.utils.time_utils import BEIJING_TZ
+from src.database.database import AsyncSessionLocal
+
+log = logging.getLogger(__name__)
+
+# WAL 操作类型
+_OP_AFFECTION = "affection"
+_OP_REWARD = "reward"
+_OP_HISTORY = "history"
+_OP_MODEL_USAGE = "model_usage"
+
+
+def _today() -> str:
+    return datetime.now(BEIJING_TZ).date().isoformat()
+
+
+class _PendingState:
+    """一次写入所需的全部合并后变更"""
+
+    __slots__ = ("affection", "rewards", "history", "model_usage")
+
+    def __init__(self):
+        # (user_id, 日期) -> 待增加的好感度
+        self.affection: Dict[Tuple[int, str], int] = {}
+        # user_id -> 日期
+        self.rewards: Dict[int, str] = {}
+        # user_id -> 待追加的对话轮次
+        self.history: Dict[int, List[Dict[str, Any]]] = {}
+        # (模型, Provider, 日期) -> 次数
+        self.model_usage: Dict[Tuple[str, str, str], int] = {}
+
+    def apply(self, op: Dict[str, Any]) -> None:
+        kind = op["op"]
+        if kind == _OP_AFFECTION:
+            key = (op["user_id"], op["date"])
+            self.affection[key] = self.affection.get(key, 0) + op["points"]
+        elif kind == _OP_REWARD:
+            self.rewards[op["user_id"]] = op["date"]
+        elif kind == _OP_HISTORY:
+            self.history.setdefault(op["user_id"], []).extend(op["turns"])
+        elif kind == _OP_MODEL_USAGE:
+            key = (op["model"], op["provider"], op["date"])
+            self.model_usage[key] = self.model_usage.get(key, 0) + op["count"]
+        else:
+            log.warning(f"忽略未知的用户状态变更类型: {kind}")
+
+    def merge_postgres(self, other: "_PendingState") -> None:
+        """把写入失败的 PostgreSQL 部分放回（排在之后产生的变更前面）"""
+        for key, points in other.affection.items():
+            self.affection[key] = self.affection.get(key, 0) + points
+        for user_id, date in other.rewards.items():
+            self.rewards.setdefault(user_id, date)
+        for user_id, turns in other.history.items():
+            self.history[user_id] = turns + self.history.get(user_id, [])
+
+    def merge_model_usage(self, other: "_PendingState") -> None:
+        for key, count in other.model_usage.items():
+            self.model_usage[key] = self.model_usage.get(key, 0) + count
+
+    def has_postgres_changes(self) -> bool:
+        return bool(self.affection or self.rewards or self.history)
+
+    def is_empty(self) -> bool:
+        return not (self.has_postgres_changes() or self.model_usage)
+
+
+class UserStateAggregator:
+    def __init__(
+        self,
+        wal_dir: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        flush_threshold: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        config = USER_STATE_AGGREGATOR_CONFIG
+        self.enabled = config["ENABLED"] if enabled is None else enabled
+        self.wal_dir = wal_dir or config["WAL_DIR"]
+        self.flush_interval = flush_interval or config["FLUSH_INTERVAL_SECONDS"]
+        self.flush_threshold = flush_threshold or config["FLUSH_THRESHOLD"]
+        self.wal_fsync = config["WAL_FSYNC"]
+
+        self._pending = _PendingState()
+        self._pending_ops = 0
+        # 正在写入数据库的快照（读历史时同样需要看到）
+        self._inflight: Optional[_PendingState] = None
+        # 当天已排队过首聊奖励的用户，避免每条消息都写一次 WAL
+        self._reward_seen = set()
+        self._reward_seen_date: Optional[str] = None
+
+        self._wal_file = None
+        self._wal_path: Optional[str] = None
+        self._sealed_segments: List[str] = []
+
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flush_count = 0
+
+    # --- 生命周期 ---
+
+    async def start(self) -> None:
+        """重放残留的 WAL 分段并启动定时写入任务"""
+        if not self.enabled:
+            return
+        replayed = self._replay_wal()
+        if replayed:
+            log.warning(f"从 WAL 重放了 {replayed} 条未确认的用户状态变更，正在写入数据库。")
+            await self.flush()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """停止定时任务并写完缓冲"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        self._close_segment()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error(f"用户状态写回循环出错: {e}", exc_info=True)
+
+    # --- 记录变更 ---
+
+    async def add_chat_affection(self, user_id: int) -> None:
+        """对应 affection_service.increase_affection_on_message"""
+        if not self.enabled:
+            await affection_service.increase_affection_on_message(user_id)
+            return
+        if random.random() > AFFECTION_CONFIG["INCREASE_CHANCE"]:
+            return
+        today = _today()
+        # 单日上限在写入时按数据库中的当日累计截断，这里只避免缓冲无意义地增长
+        if (
+            self._pending.affection.get((user_id, today), 0)
+            >= AFFECTION_CONFIG["DAILY_CHAT_AFFECTION_CAP"]
+        ):
+            return
+        self._record(
+            {
+                "op": _OP_AFFECTION,
+                "user_id": user_id,
+                "date": today,
+                "points": AFFECTION_CONFIG["INCREASE_AMOUNT"],
+            }
+        )
+
+    async def add_daily_message_reward(self, user_id: int) -> None:
+        """对应 coin_service.grant_daily_message_reward（是否真正发放在写入时判定）"""
+        if not self.enabled:
+            if await coin_service.grant_daily_message_reward(user_id):
+                log.info(f"已为用户 {user_id} 发放每日首次对话奖励。")
+            return
+        today = _today()
+        if self._reward_seen_date != today:
+            self._reward_seen.clear()
+            self._reward_seen_date = today
+        if user_id in self._reward_seen:
+            return
+        self._reward_seen.add(user_id)
+        self._record({"op": _OP_REWARD, "user_id": user_id, "date": today})
+
+    async def append_history(
+        self,
+        user_id: int,
+        user_name: str,
+        user_content: str,
+        ai_response: str,
+        current_model: Optional[str] = None,
+    ) -> None:
+        """对应 personal_memory_service.update_and_conditionally_summarize_memory"""
+        if not self.enabled:
+            await personal_memory_service.update_and_conditionally_summarize_memory(
+                user_id=user_id,
+                user_name=user_name,
+                user_content=user_content,
+                ai_response=ai_response,
+                current_model=current_model,
+            )
+            return
+        now = datetime.now().isoformat()
+        turns = [
+            {"role": "user", "parts": [user_content], "timestamp": now},
+            {"role": "model", "parts": [ai_response], "timestamp": now},
+        ]
+        self._record({"op": _OP_HISTORY, "user_id": user_id, "turns": turns})
+
+    async def add_model_usage(self, model_name: str, provider_name: str) -> None:
+        """对应 chat_settings_service.increment_model_usage"""
+        if not self.enabled:
+            await chat_settings_service.increment_model_usage(
+                model_name=model_name, provider_name=provider_name
+            )
+            return
+        if not model_name:
+            return
+        self._record(
+            {
+                "op": _OP_MODEL_USAGE,
+                "model": model_name,
+                "provider": provider_name,
+                "date": _today(),
+                "count": 1,
+            }
+        )
+
+    def _record(self, op: Dict[str, Any]) -> None:
+        self._append_to_wal(op)
+        self._pending.apply(op)
+        self._pending_ops += 1
+        if self._pending_ops >= self.flush_threshold:
+            self._wake.set()
+
+    # --- 读自己的写 ---
+
+    def has_pending_history(self, user_id: int) -> bool:
+        return bool(self.pending_history(user_id))
+
+    def pending_history(self, user_id: int) -> List[Dict[str, Any]]:
+        """尚未提交的对话轮次（包括正在写入的部分），按时间顺序"""
+        turns: List[Dict[str, Any]] = []
+        if self._inflight is not None:
+            turns.extend(self._inflight.history.get(user_id, ()))
+        turns.extend(self._pending.history.get(user_id, ()))
+        return turns
+
+    @property
+    def pending_ops(self) -> int:
+        return self._pending_ops
+
+    # --- 写入数据库 ---
+
+    async def flush(self) -> int:
+        """把缓冲写入数据库，返回本次处理的变更条数（失败的部分放回缓冲，下次重试）"""
+        async with self._flush_lock:
+            snapshot, op_count = self._pending, self._pending_ops
+            self._pending, self._pending_ops = _PendingState(), 0
+            # 封存当前分段：之后的新变更写入新分段
+            self._close_segment()
+            segments = list(self._sealed_segments)
+            if snapshot.is_empty():
+                self._delete_segments(segments)
+                return 0
+
+            self._inflight = snapshot
+            succeeded = True
+            if snapshot.has_postgres_changes():
+                try:
+                    await self._write_postgres(snapshot)
+                except Exception as e:
+                    succeeded = False
+                    self._pending.merge_postgres(snapshot)
+                    log.error(f"写入用户状态（PostgreSQL）失败，稍后重试: {e}", exc_info=True)
+            if snapshot.model_usage:
+                try:
+                    await self._write_model_usage(snapshot)
+                except Exception as e:
+                    succeeded = False
+                    self._pending.merge_model_usage(snapshot)
+                    log.error(f"写入模型使用计数失败，稍后重试: {e}", exc_info=True)
+            self._inflight = None
+
+            if succeeded:
+                self._delete_segments(segments)
+                self.flush_count += 1
+                log.debug(f"已写入 {op_count} 条合并后的用户状态变更。")
+            else:
+                # 放回的变更仍在已封存的分段中，下次成功写入后一并删除
+                self._pending_ops += op_count
+            return op_count
+
+    async def _write_postgres(self, snapshot: _PendingState) -> None:
+        affection_by_date: Dict[str, Dict[int, int]] = {}
+        for (user_id, date), points in snapshot.affection.items():
+            affection_by_date.setdefault(date, {})[user_id] = points
+        rewards_by_date: Dict[str, List[int]] = {}
+        for user_id, date in snapshot.rewards.items():
+            rewards_by_date.setdefault(date, []).append(user_id)
+
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                for date in sorted(affection_by_date):
+                    await affection_service.apply_chat_gains(
+                        session, affection_by_date[date], date
+                    )
+                for date in sorted(rewards_by_date):
+                    await coin_service.grant_daily_message_rewards(
+                        session, rewards_by_date[date], date
+                    )
+                await personal_memory_service.append_history_batch(
+                    session, snapshot.history
+                )
+
+    async def _write_model_usage(self, snapshot: _PendingState) -> None:
+        # 逐项写入并在成功后移除，失败时只放回未写入的部分
+        for key in list(snapshot.model_usage):
+            model_name, provider_name, date = key
+            await chat_settings_service.increment_model_usage(
+                model_name=model_name,
+                provider_name=provider_name,
+                count=snapshot.model_usage[key],
+                usage_date=date,
+            )
+            del snapshot.model_usage[key]
+
+    # --- WAL ---
+
+    def _append_to_wal(self, op: Dict[str, Any]) -> None:
+        try:
+            if self._wal_file is None:
+                os.makedirs(self.wal_dir, exist_ok=True)
+                self._wal_path = os.path.join(
+                    self.wal_dir, f"segment-{time.time_ns():020d}.jsonl"
+                )
+                self._wal_file = open(self._wal_path, "a", encoding="utf-8")
+            self._wal_file.write(json.dumps(op, ensure_ascii=False) + "\n")
+            # flush 到操作系统即可抵御进程崩溃；WAL_FSYNC 进一步抵御断电
+            self._wal_file.flush()
+            if self.wal_fsync:
+                os.fsync(self._wal_file.fileno())
+        except OSError as e:
+            # WAL 不可用时仍保留内存中的变更，只是失去崩溃保护
+            log.error(f"写入用户状态 WAL 失败: {e}")
+
+    def _close_segment(self) -> None:
+        if self._wal_file is None:
+            return
+        try:
+            self._wal_file.close()
+        except OSError as e:
+            log.error(f"关闭用户状态 WAL 分段失败: {e}")
+        self._sealed_segments.append(self._wal_path)
+        self._wal_file = None
+        self._wal_path = None
+
+    def _delete_segments(self, segments: List[str]) -> None:
+        for path in segments:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.error(f"删除已确认的 WAL 分段 {path} 失败: {e}")
+                continue
+            if path in self._sealed_segments:
+                self._sealed_segments.remove(path)
+
+    def _replay_wal(self) -> int:
+        """把残留分段中的变更载入缓冲，返回条数"""
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.wal_dir, "segment-*.jsonl"))):
+            with open(path, "r", encoding="utf-8") as f:
+                for line_no, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # 崩溃时最后一行可能只写了一半
+                        log.warning(f"跳过 WAL 分段 {path} 第 {line_no} 行的损坏记录。")
+                        continue
+                    self._pending.apply(op)
+                    replayed += 1
+            self._sealed_segments.append(path)
+        self._pending_ops += replayed
+        return replayed
+
+
+user_state_aggregator = UserStateAggregator()
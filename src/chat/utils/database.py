@@ -597,20 +597,23 @@ class ChatDatabaseManager:
             )
             current_utc_time = datetime.now(timezone.utc)
 
-            log.info(f"检查用户 {user_id} 在服务器 {guild_id} 的黑名单状态:")
-            log.info(f"  数据库过期时间 (UTC): {db_expires_at}")
-            log.info(f"  当前 UTC 时间: {current_utc_time}")
-
             if db_expires_at > current_utc_time:
-                log.info(f"  用户 {user_id} 仍在黑名单中。")
+                log.info(
+                    "用户 %s 在服务器 %s 仍在黑名单中 (过期时间 UTC: %s)。",
+                    user_id,
+                    guild_id,
+                    db_expires_at,
+                )
                 return True
             else:
-                log.info(
-                    f"  用户 {user_id} 的黑名单已过期，但未被清理 (应在下次检查时清理)。"
+                log.debug(
+                    "用户 %s 的黑名单已过期 (%s)，但未被清理 (应在下次检查时清理)。",
+                    user_id,
+                    db_expires_at,
                 )
                 return False
 
-        log.info(f"用户 {user_id} 不在服务器 {guild_id} 的黑名单中。")
+        log.debug("用户 %s 不在服务器 %s 的黑名单中。", user_id, guild_id)
         return False
 
     # --- 全局黑名单管理 ---
@@ -1033,7 +1036,11 @@ class ChatDatabaseManager:
 
     # --- AI模型使用计数 ---
     async def increment_model_usage(
-        self, model_name: str, provider_name: str = "unknown"
+        self,
+        model_name: str,
+        provider_name: str = "unknown",
+        count: int = 1,
+        usage_date: Optional[str] = None,
     ) -> None:
         """
         为一个模型增加累计和每日使用次数。
@@ -1041,32 +1048,37 @@ class ChatDatabaseManager:
         Args:
             model_name: 模型名称
             provider_name: Provider 名称（如 gemini_official, deepseek 等）
+            count: 增加的次数（写回缓冲合并后可能大于 1）
+            usage_date: 计入的日期，默认为北京时间今天
         """
         # 增加总数
         query_total = """
             INSERT INTO ai_model_usage (model_name, usage_count, provider_name)
-            VALUES (?, 1, ?)
+            VALUES (?, ?, ?)
             ON CONFLICT(model_name) DO UPDATE SET
-                usage_count = usage_count + 1,
+                usage_count = usage_count + excluded.usage_count,
                 provider_name = COALESCE(excluded.provider_name, ai_model_usage.provider_name);
         """
         await self._execute(
-            self._db_transaction, query_total, (model_name, provider_name), commit=True
+            self._db_transaction,
+            query_total,
+            (model_name, count, provider_name),
+            commit=True,
         )
 
         # 增加当日计数
-        today_date_str = get_beijing_today_str()
+        today_date_str = usage_date or get_beijing_today_str()
         query_daily = """
             INSERT INTO daily_model_usage (model_name, usage_date, usage_count, provider_name)
-            VALUES (?, ?, 1, ?)
+            VALUES (?, ?, ?, ?)
             ON CONFLICT(model_name, usage_date) DO UPDATE SET
-                usage_count = usage_count + 1,
+                usage_count = usage_count + excluded.usage_count,
                 provider_name = COALESCE(excluded.provider_name, daily_model_usage.provider_name);
         """
         await self._execute(
             self._db_transaction,
             query_daily,
-            (model_name, today_date_str, provider_name),
+            (model_name, today_date_str, count, provider_name),
             commit=True,
         )
 
@@ -1226,16 +1238,20 @@ class ChatDatabaseManager:
         )
         return result["tarot_reading_count"] if result else 0
 
-    async def increment_forum_search_count(self) -> None:
-        """增加今天的论坛搜索次数。"""
-        today_date_str = get_beijing_today_str()
+    async def increment_forum_search_count(
+        self, stat_date: Optional[str] = None, count: int = 1
+    ) -> None:
+        """增加论坛搜索次数（默认今天、加一；批量写入时传入日期与累计次数）。"""
+        stat_date = stat_date or get_beijing_today_str()
         query = """
             INSERT INTO daily_stats (stat_date, forum_search_count)
-            VALUES (?, 1)
+            VALUES (?, ?)
             ON CONFLICT(stat_date) DO UPDATE SET
-                forum_search_count = forum_search_count + 1;
+                forum_search_count = forum_search_count + excluded.forum_search_count;
         """
-        await self._execute(self._db_transaction, query, (today_date_str,), commit=True)
+        await self._execute(
+            self._db_transaction, query, (stat_date, count), commit=True
+        )
 
     async def get_forum_search_count_today(self) -> int:
         """获取今天的论坛搜索次数。"""
@@ -1,7 +1,8 @@
 import io
 import logging
+import time
 from PIL import Image
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
 log = logging.getLogger(__name__)
 
@@ -14,14 +15,113 @@ MAX_IMAGE_DIMENSION = 4096  # 4096 像素 (最大尺寸)
 HIGH_QUALITY = 95  # 用于10MB以下图片的保存质量
 INITIAL_QUALITY = 85  # 用于10MB以上图片的初始保存质量
 MIN_QUALITY = 50  # 最低可接受质量
-QUALITY_STEP = 10  # 每次迭代降低的质量值
+JPEG_MIN_QUALITY = 40  # 按目标大小压缩 JPEG 时允许的最低质量
+
+
+def _mark(timings: Optional[Dict[str, float]], stage: str, started: float) -> float:
+    """把某个阶段的耗时（毫秒）累加进 timings，返回新的起点"""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + (now - started) * 1000
+    return now
+
+
+def open_downscaled(image_bytes: bytes, max_dimension: int) -> Image.Image:
+    """
+    打开图片并缩放到 max_dimension 以内。
+
+    对 JPEG 先调用 `Image.draft`，让解码器直接以 1/2、1/4、1/8 的比例解码（DCT 缩放），
+    大幅减少需要解码和 LANCZOS 重采样的像素；剩余的缩放再交给 thumbnail 完成。
+    返回的图片已完成加载，与输入缓冲区无关。
+    """
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        if img.width > max_dimension or img.height > max_dimension:
+            img.draft(None, (max_dimension, max_dimension))
+            img.load()
+            img.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        else:
+            img.load()
+        return img.copy()
+
+
+def encode_within_size(
+    img: Image.Image,
+    image_format: str,
+    max_bytes: int,
+    min_quality: int,
+    max_quality: int,
+) -> Tuple[bytes, int, bool]:
+    """
+    在 [min_quality, max_quality] 内二分查找不超过 max_bytes 的最高质量。
+
+    先按 max_quality 编码一次，大多数图片一次即可满足；否则二分（最多约 log2(区间) 次编码）。
+    返回 (编码结果, 使用的质量, 是否满足大小要求)。都不满足时返回最低质量的结果。
+    """
+    encoded: Dict[int, bytes] = {}
+
+    def encode(quality: int) -> bytes:
+        if quality not in encoded:
+            buf = io.BytesIO()
+            img.save(buf, format=image_format, quality=quality)
+            encoded[quality] = buf.getvalue()
+            buf.close()
+        return encoded[quality]
+
+    data = encode(max_quality)
+    if len(data) <= max_bytes:
+        return data, max_quality, True
+
+    best: Optional[Tuple[bytes, int]] = None
+    lo, hi = min_quality, max_quality - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        data = encode(mid)
+        log.debug(f"尝试质量 {mid}，大小为: {len(data) / 1024:.2f} KB。")
+        if len(data) <= max_bytes:
+            best = (data, mid)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    if best is not None:
+        return best[0], best[1], True
+    return encode(min_quality), min_quality, False
+
+
+def compress_to_jpeg(
+    image_bytes: bytes,
+    max_dimension: int,
+    quality: int,
+    max_bytes: Optional[int] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> Tuple[bytes, str]:
+    """
+    缩放并重新编码为 JPEG。指定 max_bytes 时在 [JPEG_MIN_QUALITY, quality] 内寻找满足大小的质量。
+    timings 不为空时会写入 decode / encode 两个阶段的耗时（毫秒）。
+    """
+    started = time.perf_counter()
+    img = open_downscaled(image_bytes, max_dimension)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    started = _mark(timings, "decode", started)
+
+    if max_bytes is None:
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality)
+        data = out.getvalue()
+    else:
+        data, _, _ = encode_within_size(
+            img, "JPEG", max_bytes, min(JPEG_MIN_QUALITY, quality), quality
+        )
+    _mark(timings, "encode", started)
+    return data, "image/jpeg"
 
 
 def sanitize_image(image_bytes: bytes) -> Tuple[bytes, str]:
     """
     对输入的图片字节数据进行智能预处理和压缩。
     - **如果图片 < 10MB**: 只进行必要的尺寸调整和格式统一，以高质量保存。
-    - **如果图片 >= 10MB**: 执行"尽力压缩"策略，尝试将图片压缩至 4MB 以下。
+    - **如果图片 >= 10MB**: 执行"尽力压缩"策略，二分查找满足大小要求的最高质量。
     - **最终检查**: 任何情况下，处理后的图片都不能超过 15MB 的物理上限。
 
     内存优化：确保所有 BytesIO 缓冲区在使用后立即关闭，防止内存泄漏。
@@ -32,92 +132,53 @@ def sanitize_image(image_bytes: bytes) -> Tuple[bytes, str]:
     original_byte_size = len(image_bytes)
     log.info(f"开始处理图片，原始大小: {original_byte_size / 1024:.2f} KB。")
 
-    input_buffer = None
-    output_buffer = None
-
     try:
-        # 使用上下文管理器确保输入缓冲区被正确关闭
-        input_buffer = io.BytesIO(image_bytes)
-
-        with Image.open(input_buffer) as img:
-            # --- 1. 尺寸调整 (对所有图片都执行) ---
-            if img.width > MAX_IMAGE_DIMENSION or img.height > MAX_IMAGE_DIMENSION:
-                log.info(
-                    f"图片尺寸 {img.size} 超过最大限制 {MAX_IMAGE_DIMENSION}px，将进行缩放。"
-                )
-                img.thumbnail(
-                    (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS
-                )
-                log.info(f"图片已缩放至: {img.size}")
-
-            # --- 2. 格式转换 (对所有图片都执行) ---
-            if img.mode != "RGBA":
-                img = img.convert("RGBA")
-
-            processed_bytes = b""
-
-            # --- 3. 根据原始大小选择不同策略 ---
-            if original_byte_size < NO_COMPRESSION_THRESHOLD_BYTES:
-                # --- 策略A: 小于10MB，高质量保存 ---
-                log.info("图片小于10MB，执行高质量保存。")
-                output_buffer = io.BytesIO()
-                img.save(output_buffer, format="WEBP", quality=HIGH_QUALITY)
-                processed_bytes = output_buffer.getvalue()
-                output_buffer.close()
-                output_buffer = None
+        # --- 1. 尺寸调整 (对所有图片都执行，JPEG 走 draft 快速路径) ---
+        img = open_downscaled(image_bytes, MAX_IMAGE_DIMENSION)
+
+        # --- 2. 格式转换 (对所有图片都执行) ---
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+
+        # --- 3. 根据原始大小选择不同策略 ---
+        if original_byte_size < NO_COMPRESSION_THRESHOLD_BYTES:
+            # --- 策略A: 小于10MB，高质量保存 ---
+            log.info("图片小于10MB，执行高质量保存。")
+            output_buffer = io.BytesIO()
+            img.save(output_buffer, format="WEBP", quality=HIGH_QUALITY)
+            processed_bytes = output_buffer.getvalue()
+            output_buffer.close()
+        else:
+            # --- 策略B: 大于等于10MB，按目标大小二分查找质量 ---
+            log.info("图片大于等于10MB，按目标大小搜索压缩质量。")
+            processed_bytes, quality, fitted = encode_within_size(
+                img,
+                "WEBP",
+                NO_COMPRESSION_THRESHOLD_BYTES,
+                MIN_QUALITY,
+                INITIAL_QUALITY,
+            )
+            if fitted:
+                log.info(f"压缩成功，文件大小满足目标要求。最终质量: {quality}。")
             else:
-                # --- 策略B: 大于等于10MB，尽力压缩 ---
-                log.info("图片大于等于10MB，执行迭代压缩。")
-                quality = INITIAL_QUALITY
-                while quality >= MIN_QUALITY:
-                    output_buffer = io.BytesIO()
-                    img.save(output_buffer, format="WEBP", quality=quality)
-                    processed_bytes = output_buffer.getvalue()
-                    output_buffer.close()
-                    output_buffer = None
-
-                    log.debug(
-                        f"尝试使用质量 {quality} 进行压缩，大小为: {len(processed_bytes) / 1024:.2f} KB。"
-                    )
-
-                    if len(processed_bytes) <= NO_COMPRESSION_THRESHOLD_BYTES:
-                        log.info(
-                            f"压缩成功，文件大小满足目标要求。最终质量: {quality}。"
-                        )
-                        break
-
-                    quality -= QUALITY_STEP
-                else:
-                    log.warning(
-                        f"即便使用最低质量 {MIN_QUALITY}，文件大小 ({len(processed_bytes) / 1024:.2f} KB) "
-                        f"仍未达到 {NO_COMPRESSION_THRESHOLD_BYTES / 1024 / 1024:.2f} MB 的目标。"
-                    )
-
-            # --- 4. 最终检查 (对所有图片都执行) ---
-            if len(processed_bytes) > MAX_IMAGE_SIZE_BYTES:
-                raise ValueError(
-                    f"图片经过处理后大小 ({len(processed_bytes) / 1024 / 1024:.2f} MB) "
-                    f"仍然超过了物理上限 {MAX_IMAGE_SIZE_BYTES / 1024 / 1024:.0f} MB。"
+                log.warning(
+                    f"即便使用最低质量 {MIN_QUALITY}，文件大小 ({len(processed_bytes) / 1024:.2f} KB) "
+                    f"仍未达到 {NO_COMPRESSION_THRESHOLD_BYTES / 1024 / 1024:.2f} MB 的目标。"
                 )
 
-            log.info(
-                f"图片处理完成。原始大小: {original_byte_size / 1024:.2f} KB -> "
-                f"处理后大小: {len(processed_bytes) / 1024:.2f} KB."
+        # --- 4. 最终检查 (对所有图片都执行) ---
+        if len(processed_bytes) > MAX_IMAGE_SIZE_BYTES:
+            raise ValueError(
+                f"图片经过处理后大小 ({len(processed_bytes) / 1024 / 1024:.2f} MB) "
+                f"仍然超过了物理上限 {MAX_IMAGE_SIZE_BYTES / 1024 / 1024:.0f} MB。"
             )
 
-            return processed_bytes, "image/webp"
+        log.info(
+            f"图片处理完成。原始大小: {original_byte_size / 1024:.2f} KB -> "
+            f"处理后大小: {len(processed_bytes) / 1024:.2f} KB."
+        )
+
+        return processed_bytes, "image/webp"
     except Exception as e:
         log.error(f"图片处理过程中发生严重错误: {e}", exc_info=True)
         raise
-    finally:
-        # 确保所有缓冲区都被关闭
-        if input_buffer is not None:
-            try:
-                input_buffer.close()
-            except Exception:
-                pass
-        if output_buffer is not None:
-            try:
-                output_buffer.close()
-            except Exception:
-                pass
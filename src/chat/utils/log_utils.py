@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+非阻塞日志管线与热点日志采样
+
+- AsyncLogHandler：挂在根 logger 上的 QueueHandler，事件循环线程只负责把记录放进有界队列，
+  文件 / 控制台写入由 QueueListener 的后台线程完成；队列满时直接丢弃并计数，绝不阻塞调用方，
+  队列恢复后补记一条 WARNING 说明丢弃了多少条，关闭时由 log_metrics_summary() 报告总数
+- LogSampler：按调用位置（logger 名 + 行号）限流，窗口内超过上限的 INFO/DEBUG 日志被抑制，
+  下一条放行的日志会附带被抑制的条数；WARNING 及以上永远放行
+- lazy()：把昂贵的日志参数（完整工具 schema、检索结果等）包装成惰性对象，
+  只有在记录真正被输出时才在后台线程中计算
+"""
+
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+# 被抑制的条数通过这个属性从过滤器传给格式化阶段
+_SUPPRESSED_ATTR = "sampled_suppressed"
+
+_DEFERRABLE_TYPES = (str, int, float, bool, type(None))
+
+
+class Lazy:
+    """惰性日志参数：str() 时才调用 func(*args, **kwargs)"""
+
+    __slots__ = ("func", "args", "kwargs")
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        try:
+            return str(self.func(*self.args, **self.kwargs))
+        except Exception as e:  # 日志参数出错不应影响业务
+            return f"<lazy log arg failed: {e!r}>"
+
+    __repr__ = __str__
+
+
+def lazy(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Lazy:
+    """
+    用法: log.debug("工具列表: %s", lazy(json.dumps, tools, ensure_ascii=False))
+
+    注意传入的对象在输出前不应再被修改（它会在后台线程中被读取）。
+    """
+    return Lazy(func, *args, **kwargs)
+
+
+def truncated(value: Any, limit: int = 500) -> Lazy:
+    """惰性地把 value 转为字符串并截断到 limit 个字符"""
+
+    def _render(v: Any) -> str:
+        text = str(v)
+        return text if len(text) <= limit else f"{text[:limit]}...(共 {len(text)} 字符)"
+
+    return Lazy(_render, value)
+
+
+class LogSampler(logging.Filter):
+    """
+    按调用位置对高频日志限流。
+
+    Args:
+        rules: logger 名前缀 -> (窗口内最多放行条数, 窗口秒数)。
+               前缀匹配，最长前缀优先；未命中的 logger 不做限流。
+    """
+
+    def __init__(self, rules: Mapping[str, Tuple[int, float]]):
+        super().__init__()
+        self._rules = dict(rules)
+        self._rule_cache: Dict[str, Optional[Tuple[int, float]]] = {}
+        # (logger 名, 行号) -> [窗口开始时间, 已放行条数, 已抑制条数]
+        self._windows: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def _rule_for(self, name: str) -> Optional[Tuple[int, float]]:
+        if name in self._rule_cache:
+            return self._rule_cache[name]
+        best = None
+        for prefix in self._rules:
+            if (name == prefix or name.startswith(prefix + ".")) and (
+                best is None or len(prefix) > len(best)
+            ):
+                best = prefix
+        rule = self._rules[best] if best is not None else None
+        self._rule_cache[name] = rule
+        return rule
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rule = self._rule_for(record.name)
+        if rule is None:
+            return True
+
+        limit, window = rule
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= window:
+                suppressed = state[2] if state else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    setattr(record, _SUPPRESSED_ATTR, suppressed)
+                return True
+            if state[1] < limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+    def suppressed_total(self) -> int:
+        with self._lock:
+            return sum(s[2] for s in self._windows.values())
+
+
+class AsyncLogHandler(logging.handlers.QueueHandler):
+    """
+    有界队列的 QueueHandler。
+
+    与标准实现不同，参数全部是简单类型或 Lazy 时不在调用线程里格式化消息，
+    交给后台线程的处理器完成；带异常信息的记录仍按标准流程在当前线程处理
+    （traceback 不能跨线程安全持有）。
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+        # 尚未在日志中报告的丢弃条数
+        self._unreported = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # emit 在处理器锁内调用，计数不需要额外加锁
+        if self._unreported:
+            notice = logging.makeLogRecord(
+                {
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": logging.getLevelName(logging.WARNING),
+                    "msg": f"日志队列已满，丢弃了 {self._unreported} 条日志",
+                }
+            )
+            try:
+                self.queue.put_nowait(notice)
+                self._unreported = 0
+            except queue.Full:
+                pass
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+
+    def log_metrics_summary(self) -> None:
+        if self.dropped:
+            logging.getLogger(__name__).warning(
+                f"日志管线统计: 队列已满时共丢弃 {self.dropped} 条日志"
+            )
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        suppressed = getattr(record, _SUPPRESSED_ATTR, 0)
+        args = record.args
+        deferrable = not record.exc_info and (
+            not args
+            or (
+                isinstance(args, tuple)
+                and all(isinstance(a, _DEFERRABLE_TYPES + (Lazy,)) for a in args)
+            )
+        )
+        if deferrable:
+            if suppressed:
+                record.msg = f"{record.msg} [采样: 此前抑制 {suppressed} 条]"
+            return record
+
+        record = super().prepare(record)
+        if suppressed:
+            record.msg = record.message = (
+                f"{record.msg} [采样: 此前抑制 {suppressed} 条]"
+            )
+        return record
+
+
+class AsyncLogListener(logging.handlers.QueueListener):
+    """可重复 stop 的 QueueListener；停止时即使队列已满也会等待写完剩余日志"""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        super().stop()
+
+
+def start_queue_logging(
+    handlers: Iterable[logging.Handler],
+    sampling_rules: Optional[Mapping[str, Tuple[int, float]]] = None,
+    max_queue_size: int = 10000,
+) -> Tuple[AsyncLogHandler, AsyncLogListener]:
+    """
+    创建队列处理器并启动后台监听线程。
+
+    返回 (挂到 logger 上的处理器, 监听器)；退出前调用 listener.stop() 以写完队列中剩余的日志。
+    各处理器自身的级别和过滤器依旧生效（respect_handler_level=True）。
+    """
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max_queue_size)
+    queue_handler = AsyncLogHandler(log_queue)
+    if sampling_rules:
+        queue_handler.addFilter(LogSampler(sampling_rules))
+
+    listener = AsyncLogListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return queue_handler, listener
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析器
+
+记录机器人启动过程中各阶段的耗时，并在上线后输出一份时间线报告：
+- import: 启动期间导入的 src.* 模块（通过临时安装的 meta_path 钩子计时，
+  给出每个模块扣除子模块后的自身耗时，discord.py 重新执行 cog 模块时同样会被记录）
+- cog: 每个扩展的 load_extension 总耗时（模块执行 + setup）
+- cog_load: 每个 Cog 的 add_cog / cog_load 耗时
+- schema: 工具 schema 生成耗时（命中磁盘缓存的不计入）
+- stage: main() 中的初始化阶段（数据库、AI 服务等）
+"""
+
+import importlib.abc
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class TimingEntry:
+    category: str
+    name: str
+    start: float  # 相对于分析器创建时刻的秒数
+    duration: float
+
+
+class _TimedLoader:
+    """包装真实 loader，只拦截 exec_module 计时，其余属性原样转发"""
+
+    def __init__(self, loader, fullname: str, timer: "_ImportTimer"):
+        self._loader = loader
+        self._fullname = fullname
+        self._timer = timer
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module) -> None:
+        self._timer.enter(self._fullname)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.exit(self._fullname)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class _ImportTimer(importlib.abc.MetaPathFinder):
+    """记录指定前缀模块的导入耗时（自身耗时 = 总耗时 - 子模块导入耗时）"""
+
+    def __init__(self, profiler: "StartupProfiler", prefixes: Tuple[str, ...]):
+        self._profiler = profiler
+        self._prefixes = prefixes
+        self._local = threading.local()
+
+    def _stack(self) -> List[list]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def find_spec(self, fullname, path, target=None):
+        if not fullname.startswith(self._prefixes):
+            return None
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, "find_spec", None)
+            if find_spec is None:
+                continue
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, fullname, self)
+        return spec
+
+    def enter(self, fullname: str) -> None:
+        # [模块名, 开始时间, 子模块累计耗时]
+        self._stack().append([fullname, time.perf_counter(), 0.0])
+
+    def exit(self, fullname: str) -> None:
+        stack = self._stack()
+        name, started, children = stack.pop()
+        total = time.perf_counter() - started
+        if stack:
+            stack[-1][2] += total
+        self._profiler.record("import", name, started, total - children)
+
+
+class StartupProfiler:
+    """启动时间线记录器（线程安全，开销可忽略）"""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._entries: List[TimingEntry] = []
+        self._lock = threading.Lock()
+        self._import_timer: Optional[_ImportTimer] = None
+        self.reported = False
+
+    def record(self, category: str, name: str, started: float, duration: float) -> None:
+        """started 为 time.perf_counter() 的取值"""
+        entry = TimingEntry(category, name, started - self._origin, duration)
+        with self._lock:
+            self._entries.append(entry)
+
+    @contextmanager
+    def measure(self, category: str, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(category, name, started, time.perf_counter() - started)
+
+    def start_import_tracking(self, prefixes: Iterable[str] = ("src.",)) -> None:
+        """安装导入计时钩子（重复调用无副作用）"""
+        if self._import_timer is not None:
+            return
+        self._import_timer = _ImportTimer(self, tuple(prefixes))
+        sys.meta_path.insert(0, self._import_timer)
+
+    def stop_import_tracking(self) -> None:
+        if self._import_timer is None:
+            return
+        try:
+            sys.meta_path.remove(self._import_timer)
+        except ValueError:
+            pass
+        self._import_timer = None
+
+    def preload_in_background(self, module_names: Iterable[str]) -> threading.Thread:
+        """
+        在后台线程中预先导入耗时较长的可选依赖（如 google.genai），
+        让它与数据库初始化、登录等 I/O 重叠；真正用到时主线程只需等待模块锁或直接命中缓存。
+        """
+        names = list(module_names)
+
+        def _run():
+            for module_name in names:
+                with self.measure("preload", module_name):
+                    try:
+                        importlib.import_module(module_name)
+                    except Exception as e:
+                        log.warning(f"后台预加载模块 {module_name} 失败: {e}")
+
+        thread = threading.Thread(target=_run, name="startup-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def entries(self, category: Optional[str] = None) -> List[TimingEntry]:
+        with self._lock:
+            return [e for e in self._entries if category is None or e.category == category]
+
+    def totals(self) -> Dict[str, Tuple[int, float]]:
+        """按类别汇总: 类别 -> (条目数, 总耗时秒)"""
+        result: Dict[str, Tuple[int, float]] = {}
+        for entry in self.entries():
+            count, total = result.get(entry.category, (0, 0.0))
+            result[entry.category] = (count + 1, total + entry.duration)
+        return result
+
+    def format_report(self, top: int = 15) -> str:
+        elapsed = time.perf_counter() - self._origin
+        lines = [f"启动耗时报告 (自进程初始化起 {elapsed:.2f}s)"]
+
+        for category, (count, total) in sorted(
+            self.totals().items(), key=lambda kv: kv[1][1], reverse=True
+        ):
+            lines.append(f"  [{category}] {count} 项，合计 {total * 1000:.0f}ms")
+
+        for category in ("stage", "cog", "cog_load", "import", "schema", "preload"):
+            entries = sorted(self.entries(category), key=lambda e: e.duration, reverse=True)
+            if not entries:
+                continue
+            lines.append(f"  -- 最慢的 {category} --")
+            for e in entries[:top]:
+                lines.append(
+                    f"    +{e.start:7.2f}s  {e.duration * 1000:8.1f}ms  {e.name}"
+                )
+        return "\n".join(lines)
+
+    def log_report(self, top: int = 15) -> None:
+        self.reported = True
+        log.info(self.format_report(top))
+
+
+# 全局单例：在 main.py 最早导入，使时间原点尽量接近进程启动
+startup_profiler = StartupProfiler()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+文本清理的公共实现
+
+频道名、模型输出、用户输入、全文搜索查询和上下文消息的清理原本散落在各个服务里，
+每次调用都用字符串模式调用 re.sub（依赖 re 模块内部的小缓存），
+clean_channel_name 还会在每次调用时重新编译 emoji 正则、重新规范化特殊规则的键。
+这里统一：
+- 所有正则在导入时编译一次
+- 可以交换顺序的逐字符删除合并为一次替换（emoji 与装饰符号）
+- 目标字符不存在时跳过对应的替换，大部分普通消息只做几次 `in` 检查
+- 频道名清理结果按名称缓存（频道名数量有限）
+清理结果与原实现逐字一致，见 tests/test_text_normalization.py。
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Optional
+
+# --- 频道名 ---
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_CHANNEL_NAME_RULES = {
+    "🪓︱预设ᴾʳᵉˢᵉᵗ＆破限ᴶᴮ": "预设",
+    "💟︱教程分享": "教程",
+    "👑｜酒馆美化": "美化",
+    "🔧︱酒馆插件": "插件",
+}
+# 规则的键只需规范化一次
+_CHANNEL_NAME_RULES_NORMALIZED = tuple(
+    (_WHITESPACE_RE.sub(" ", original).strip(), new_name)
+    for original, new_name in _CHANNEL_NAME_RULES.items()
+)
+
+# emoji 区段与常见装饰符号合并为一个字符类（逐字符删除与顺序无关）
+_CHANNEL_NAME_STRIP_RE = re.compile(
+    "["
+    "\U0001f600-\U0001f64f"  # emoticons
+    "\U0001f300-\U0001f5ff"  # symbols & pictographs
+    "\U0001f680-\U0001f6ff"  # transport & map symbols
+    "\U0001f1e0-\U0001f1ff"  # flags (iOS)
+    "\U00002600-\U000027bf"  # Miscellaneous Symbols
+    "\U0001f900-\U0001f9ff"  # Supplemental Symbols
+    "|｜︱🔨🪓👑💟🔧丨"
+    "]+"
+)
+
+
+@lru_cache(maxsize=2048)
+def clean_channel_name(name: str) -> str:
+    """移除频道名中的 emoji 和装饰性符号，并应用特定的重命名规则。"""
+    temp_cleaned_name = _WHITESPACE_RE.sub(" ", name).strip()
+    for cleaned_original, new_name in _CHANNEL_NAME_RULES_NORMALIZED:
+        if cleaned_original in temp_cleaned_name:
+            return new_name
+
+    cleaned_name = _CHANNEL_NAME_STRIP_RE.sub("", name)
+    return _WHITESPACE_RE.sub(" ", cleaned_name).strip()
+
+
+# --- 模型输出 ---
+
+_THINK_TAG_RE = re.compile(
+    r"<(思考|think|thinking|thought|scratchpad|reasoning|rationale)>.*?</\1>\s*",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def clean_ai_output(text: str) -> str:
+    """移除思考过程标签，并把 1011 替换为 [数据删除]。"""
+    if "<" in text:
+        text = _THINK_TAG_RE.sub("", text)
+    if "1011" in text:
+        text = text.replace("1011", "[数据删除]")
+    return text.strip()
+
+
+# --- 用户输入 ---
+
+_PAREN_RE = re.compile(r"[\(（][^)）]*[\)）]:?\s*")
+_BRACKET_RE = re.compile(r"[\[【][^\]】]*[\]】]:?\s*")
+_BRACE_RE = re.compile(r"\{[^\}]*\}")
+# 排除 Discord 的提及（<@...> <@&...> <@!...> 和 <#...>）
+_TAG_RE = re.compile(r"<(?![@#&!])([^>]+)>")
+_CODE_BLOCK_RE = re.compile(r"```.*?```", re.DOTALL)
+_INLINE_CODE_RE = re.compile(r"`[^`]*`")
+_QUOTE_PREFIX_RE = re.compile(r"^\s*>\s*", re.MULTILINE)
+_HEADING_PREFIX_RE = re.compile(r"^\s*#+\s*", re.MULTILINE)
+
+
+def clean_user_input(text: str) -> str:
+    """
+    移除可能用于 Prompt Injection 的括号内容、标签和 Markdown 格式。
+    各步骤的先后顺序会影响结果（前一步删除后可能拼出新的匹配），因此保持原顺序，
+    只在文本中没有相应触发字符时跳过该步。
+    """
+    if "(" in text or "（" in text:
+        text = _PAREN_RE.sub("", text)
+    if "[" in text or "【" in text:
+        text = _BRACKET_RE.sub("", text)
+    if "{" in text:
+        text = _BRACE_RE.sub("", text)
+    if "<" in text:
+        text = _TAG_RE.sub("", text)
+    if "`" in text:
+        text = _CODE_BLOCK_RE.sub("", text)
+        text = _INLINE_CODE_RE.sub("", text)
+    if ">" in text:
+        text = _QUOTE_PREFIX_RE.sub("", text)
+    if "#" in text:
+        text = _HEADING_PREFIX_RE.sub("", text)
+    return text.strip()
+
+
+# --- 全文搜索查询 ---
+
+_FTS_UNSAFE_RE = re.compile(r"[^\w\s\u4e00-\u9fff]")
+
+
+def clean_fts_query(query: str) -> str:
+    """只保留字母、数字、中日韩统一表意文字和空格，避免 paradedb 解析错误。"""
+    return _FTS_UNSAFE_RE.sub("", query)
+
+
+# --- Discord 消息 ---
+
+_CUSTOM_EMOJI_LOOSE_RE = re.compile(r"<a?:[^:]+:\d+>")
+_CUSTOM_EMOJI_RE = re.compile(r"<a?:\w+:\d+>")
+_CDN_URL_RE = re.compile(r"https?://cdn\.discordapp\.com\S+")
+_USER_MENTION_RE = re.compile(r"<@!?(\d+)>")
+
+
+def strip_discord_emojis(text: str) -> str:
+    """移除 <:name:id> / <a:name:id> 自定义表情，并合并多余空白。"""
+    if "<" in text:
+        text = _CUSTOM_EMOJI_LOOSE_RE.sub("", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def clean_discord_message(
+    content: str, resolve_mention: Optional[Callable[[int], str]] = None
+) -> str:
+    """
+    净化上下文中的消息：还原 Markdown 转义、移除 CDN 附件链接和自定义表情；
+    传入 resolve_mention 时把 <@id> 替换为其返回值。
+    """
+    if "\\_" in content:
+        content = content.replace("\\_", "_")
+    if "cdn.discordapp.com" in content:
+        content = _CDN_URL_RE.sub("", content)
+    if "<" in content:
+        if resolve_mention is not None:
+            content = _USER_MENTION_RE.sub(
+                lambda match: resolve_mention(int(match.group(1))), content
+            )
+        content = _CUSTOM_EMOJI_RE.sub("", content)
+    return content.strip()
@@ -85,6 +85,23 @@ LOG_FORMAT = (
     "%(asctime)s - %(levelname)-8s - [%(name)s:%(funcName)s:%(lineno)d] - %(message)s"
 )
 LOG_FILE_PATH = os.path.join(DATA_DIR, "bot_debug.log")  # DEBUG 日志文件路径
+LOG_QUEUE_MAX_SIZE = 10000  # 日志队列上限，写入线程跟不上时丢弃新日志而不是阻塞事件循环
+# 高频日志采样：logger 名前缀 -> (每个调用位置在窗口内最多输出的条数, 窗口秒数)
+# 只作用于 INFO/DEBUG，WARNING 及以上始终输出
+LOG_SAMPLING_RULES = {
+    "src.chat.features.tools.services.tool_service": (5, 60.0),
+    "src.chat.services.context_service_test": (10, 60.0),
+    "src.chat.utils.database": (10, 60.0),
+    "src.chat.features.world_book.services.knowledge_search_service": (10, 60.0),
+}
+
+# --- 启动相关 ---
+# 并发加载各功能模块 (Cogs)；遇到加载顺序问题时可设为 false 退回逐个加载
+STARTUP_CONCURRENT_COG_LOADING = (
+    os.getenv("STARTUP_CONCURRENT_COG_LOADING", "true").lower() == "true"
+)
+# 启动时在后台线程预先导入的耗时依赖，与数据库初始化等 I/O 重叠
+STARTUP_PRELOAD_MODULES = ["google.genai"]
 
 # --- Embed 颜色 ---
 EMBED_COLOR_WELCOME = 0x7289DA  # Discord 官方蓝色
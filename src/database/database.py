@@ -1,5 +1,6 @@
 import os
 import logging
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from dotenv import load_dotenv
 
@@ -34,6 +35,15 @@ if not DATABASE_URL:
     )
 
 engine = create_async_engine(DATABASE_URL, echo=False)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _register_vector_codecs(dbapi_connection, connection_record):
+    # 向量参数按 pgvector 二进制格式收发（见 src/database/vector_codec.py）
+    from src.database.vector_codec import register_vector_codecs
+
+    dbapi_connection.run_async(register_vector_codecs)
+
 AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
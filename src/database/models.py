@@ -4,6 +4,7 @@ from sqlalchemy import (
     Column,
     Integer,
     BigInteger,
+    Boolean,
     String,
     Text,
     DateTime,
@@ -13,7 +14,7 @@ from sqlalchemy import (
     func,
 )
 from sqlalchemy.orm import declarative_base, relationship, Mapped, mapped_column
-from pgvector.sqlalchemy import HALFVEC
+from src.database.vector_codec import BinaryHALFVEC as HALFVEC
 
 # --- 全局配置 ---
 EMBEDDING_DIMENSION = 1024  # bge-m3 和 qwen3-embedding-0.6B 模型都使用 1024 维度
@@ -112,7 +113,7 @@ class KnowledgeChunk(Base):
 
     bge_embedding = Column(
         HALFVEC(EMBEDDING_DIMENSION),
-        nullable=False,
+        nullable=True,  # 迁移 update_embedding_dimension_to_1024 已移除 NOT NULL
         comment="BGE-M3 模型的嵌入向量。",
     )
     qwen_embedding = Column(
@@ -230,7 +231,7 @@ class GeneralKnowledgeChunk(Base):
 
     bge_embedding = Column(
         HALFVEC(EMBEDDING_DIMENSION),
-        nullable=False,
+        nullable=True,  # 迁移 update_embedding_dimension_to_1024 已移除 NOT NULL
         comment="BGE-M3 模型的嵌入向量。",
     )
     qwen_embedding = Column(
@@ -332,7 +333,7 @@ class CommunityMemberChunk(Base):
 
     bge_embedding = Column(
         HALFVEC(EMBEDDING_DIMENSION),
-        nullable=False,
+        nullable=True,  # 迁移 update_embedding_dimension_to_1024 已移除 NOT NULL
         comment="BGE-M3 模型的嵌入向量。",
     )
     qwen_embedding = Column(
@@ -370,6 +371,50 @@ class TokenUsage(Base):
         return f"<TokenUsage(date={self.date}, total_tokens={self.total_tokens})>"
 
 
+class AiCallUsage(Base):
+    """
+    记录每一次 AI 生成调用的 token 用量与耗时。
+    由 usage_recorder 批量写入，用于按模型、按天统计延迟分位数和 token 消耗。
+    """
+
+    __tablename__ = "ai_call_usage"
+    __table_args__ = (Index("idx_ai_call_usage_created_model", "created_at", "model"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, nullable=False, comment="调用开始时间（UTC）"
+    )
+    call_type: Mapped[str] = mapped_column(
+        String(64), nullable=False, comment="调用入口，如 generate / generate_with_tools"
+    )
+    provider: Mapped[str] = mapped_column(
+        String(64), nullable=False, comment="最终完成调用的 Provider"
+    )
+    model: Mapped[str] = mapped_column(
+        String(128), nullable=False, comment="请求的模型名称"
+    )
+    success: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    error_type: Mapped[Optional[str]] = mapped_column(
+        String(128), nullable=True, comment="失败时的异常类型"
+    )
+    input_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    output_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    cached_tokens: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True, comment="命中 Provider 前缀缓存的输入 token"
+    )
+    latency_ms: Mapped[int] = mapped_column(
+        Integer, nullable=False, comment="含重试与故障转移的总耗时"
+    )
+    ttfb_ms: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True, comment="首个响应分片的耗时（仅流式调用）"
+    )
+    retries: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    fallback_hops: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AiCallUsage(id={self.id}, model={self.model}, latency_ms={self.latency_ms})>"
+
+
 # --- 用户设置模型 (PostgreSQL) ---
 
 
@@ -648,6 +693,72 @@ class ForumThread(Base):
         return f"<ForumThread(id={self.id}, thread_id={self.thread_id}, thread_name='{self.thread_name}')>"
 
 
+class ForumThreadDirectory(Base):
+    """
+    论坛帖子目录：记录 Discord 中实际存在的帖子（活跃 + 归档）。
+    由 on_thread_create / on_thread_update / on_raw_thread_delete 事件实时维护，
+    并定期增量对账，避免每次清理或查询缺失帖子都全量翻页 archived_threads。
+    """
+
+    __tablename__ = "thread_directory"
+    __table_args__ = (
+        Index("idx_thread_directory_channel", "channel_id"),
+        {"schema": FORUM_SCHEMA},
+    )
+
+    thread_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False, comment="Discord帖子的唯一ID"
+    )
+    channel_id: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, comment="父频道的Discord ID"
+    )
+    guild_id: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, comment="服务器的Discord ID"
+    )
+    thread_name: Mapped[str] = mapped_column(Text, nullable=False, comment="帖子标题")
+    archived: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, comment="是否已归档"
+    )
+    created_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime, nullable=True, comment="帖子创建时间（Discord时间）"
+    )
+    archive_timestamp: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime, nullable=True, comment="最近一次归档状态变化时间（Discord时间）"
+    )
+    last_seen_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        onupdate=func.now(),
+        comment="最近一次由事件或对账确认存在的时间",
+    )
+
+    def __repr__(self):
+        return f"<ForumThreadDirectory(thread_id={self.thread_id}, channel_id={self.channel_id}, archived={self.archived})>"
+
+
+class ForumThreadDirectorySync(Base):
+    """
+    每个论坛频道的帖子目录对账状态。
+    full_synced_at 为空表示该频道还没有完成过一次全量对账，此时目录不可作为权威数据源。
+    """
+
+    __tablename__ = "thread_directory_sync"
+    __table_args__ = {"schema": FORUM_SCHEMA}
+
+    channel_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False, comment="论坛频道的Discord ID"
+    )
+    full_synced_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime, nullable=True, comment="最近一次全量对账完成时间"
+    )
+    incremental_synced_at: Mapped[Optional[datetime.datetime]] = mapped_column(
+        DateTime, nullable=True, comment="最近一次增量对账完成时间（也是下次增量的水位线）"
+    )
+
+    def __repr__(self):
+        return f"<ForumThreadDirectorySync(channel_id={self.channel_id}, full_synced_at={self.full_synced_at})>"
+
+
 # --- 对话记忆块模型 (ParadeDB) ---
 
 
@@ -683,6 +794,8 @@ class ConversationBlock(Base):
         Index("idx_conv_discord_id", "discord_id"),
         # 开始时间索引用于排序
         Index("idx_conv_start_time", "start_time"),
+        # 管理面板按用户键集分页
+        Index("idx_conv_discord_start_time", "discord_id", "start_time", "id"),
         {"schema": CONVERSATION_SCHEMA},
     )
 
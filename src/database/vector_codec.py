@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+向量参数的二进制编码
+
+此前查询向量以 str(list) 传入（1024 个浮点数约 20 KB 的十进制文本），再由服务端
+CAST(:query_vector AS halfvec) 重新解析；ORM 写入同样经 pgvector 的 HALFVEC 类型转成文本。
+这里在 asyncpg 连接上注册 halfvec / vector 的二进制编解码器（pgvector 的二进制格式，
+halfvec 每维 2 字节，1024 维共 2 KB），查询与写入都以 numpy 数组生成的 HalfVector 传参：
+
+- to_halfvec(): 查询参数与原生 SQL 写入使用，SQL 中的 CAST(:param AS halfvec) 保持不变，
+  服务端据此把参数类型推断为 halfvec，asyncpg 即按二进制格式发送
+- BinaryHALFVEC: 模型列类型，asyncpg 下 ORM 写入直接传 HalfVector 而不是文本
+- 编码器也接受文本形式（"[0.1,0.2,...]"），尚未改用 to_halfvec 的调用方（如调试脚本）不受影响
+
+增量 RAG 的写入原先经 psycopg2（只支持文本参数）拼接向量字面量，现改走 asyncpg。
+序列化开销对比见 scripts/benchmark_vector_codec.py。
+"""
+
+import logging
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+from pgvector import HalfVector, Vector
+from pgvector.sqlalchemy import HALFVEC
+
+log = logging.getLogger(__name__)
+
+VectorLike = Union[Sequence[float], np.ndarray, HalfVector, str]
+
+
+def to_halfvec(value: VectorLike) -> HalfVector:
+    """把 embedding（list / numpy 数组 / 文本）转换为可按二进制发送的 HalfVector。"""
+    if isinstance(value, HalfVector):
+        return value
+    if isinstance(value, str):
+        value = HalfVector._from_text(value)
+    return HalfVector(np.asarray(value, dtype=np.float16))
+
+
+def to_vector(value: Union[Sequence[float], np.ndarray, Vector, str]) -> Vector:
+    if isinstance(value, Vector):
+        return value
+    if isinstance(value, str):
+        value = Vector._from_text(value)
+    return Vector(np.asarray(value, dtype=np.float32))
+
+
+def _encode_halfvec(value: VectorLike) -> bytes:
+    return to_halfvec(value).to_binary()
+
+
+def _encode_vector(value: Any) -> bytes:
+    return to_vector(value).to_binary()
+
+
+async def register_vector_codecs(conn) -> None:
+    """
+    在 asyncpg 连接上注册 halfvec / vector 的二进制编解码器。
+    数据库未安装 vector 扩展时跳过（参数仍按文本发送）。
+    """
+    for type_name, encoder, decoder in (
+        ("halfvec", _encode_halfvec, HalfVector.from_binary),
+        ("vector", _encode_vector, Vector.from_binary),
+    ):
+        try:
+            await conn.set_type_codec(
+                type_name,
+                schema="public",
+                encoder=encoder,
+                decoder=decoder,
+                format="binary",
+            )
+        except ValueError as e:
+            # asyncpg 对不存在的类型抛出 "unknown type: ..."
+            log.warning(f"未注册 {type_name} 的二进制编解码器: {e}")
+
+
+class BinaryHALFVEC(HALFVEC):
+    """
+    asyncpg 下以 HalfVector 传参（由 register_vector_codecs 注册的编码器按二进制发送），
+    其他驱动（如 Alembic 使用的 psycopg2）仍按文本传参。
+    """
+
+    cache_ok = True
+
+    def bind_processor(self, dialect) -> Any:
+        if dialect.driver != "asyncpg":
+            return super().bind_processor(dialect)
+
+        def process(value: Optional[VectorLike]) -> Optional[HalfVector]:
+            return None if value is None else to_halfvec(value)
+
+        return process
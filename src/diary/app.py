@@ -14,14 +14,15 @@ from typing import Optional
 
 import httpx
 from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from src.diary.services.diary_service import get_diary
+from src.diary.services.diary_service import diary_stats_cache
 from src.chat.utils.database import chat_db_manager
+from src.chat.services.http_client_registry import http_client_registry
 
 load_dotenv()
 
@@ -38,9 +39,16 @@ async def startup_event():
         level=logging.INFO, format="%(levelname)s:%(name)s: %(message)s"
     )
     await chat_db_manager.init_async()
+    diary_stats_cache.start()
     log.info("Diary app startup.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await diary_stats_cache.stop()
+    await http_client_registry.aclose()
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     log.info(f"收到请求: {request.method} {request.url.path}")
@@ -70,23 +78,23 @@ async def get_current_user_id(
         return TEST_USER_ID
 
     headers = {"Authorization": f"Bearer {token.credentials}"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                "https://discord.com/api/users/@me", headers=headers
-            )
-            response.raise_for_status()
-            user_data = response.json()
-            user_id = int(user_data["id"])
-            log.info(f"成功识别用户: {user_data.get('username')} ({user_id})")
-            return user_id
-        except httpx.HTTPStatusError:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        except httpx.RequestError:
-            raise HTTPException(
-                status_code=503,
-                detail="Service Unavailable: Cannot connect to Discord API",
-            )
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.get(
+            "https://discord.com/api/users/@me", headers=headers
+        )
+        response.raise_for_status()
+        user_data = response.json()
+        user_id = int(user_data["id"])
+        log.info(f"成功识别用户: {user_data.get('username')} ({user_id})")
+        return user_id
+    except httpx.HTTPStatusError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    except httpx.RequestError:
+        raise HTTPException(
+            status_code=503,
+            detail="Service Unavailable: Cannot connect to Discord API",
+        )
 
 
 from pydantic import BaseModel
@@ -111,17 +119,17 @@ async def exchange_code_for_token(req: CodeIn):
         "code": req.code,
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                "https://discord.com/api/oauth2/token", data=data, headers=headers
-            )
-            response.raise_for_status()
-            return JSONResponse(content=response.json())
-        except httpx.HTTPStatusError:
-            raise HTTPException(status_code=500, detail="Failed to exchange code with Discord")
-        except httpx.RequestError:
-            raise HTTPException(status_code=503, detail="Cannot connect to Discord API")
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.post(
+            "https://discord.com/api/oauth2/token", data=data, headers=headers
+        )
+        response.raise_for_status()
+        return JSONResponse(content=response.json())
+    except httpx.HTTPStatusError:
+        raise HTTPException(status_code=500, detail="Failed to exchange code with Discord")
+    except httpx.RequestError:
+        raise HTTPException(status_code=503, detail="Cannot connect to Discord API")
 
 
 GUILD_ID = os.getenv("GUILD_ID", "0").split(",")[0].strip()
@@ -131,18 +139,18 @@ async def _get_guild_nickname(user_id: int) -> Optional[str]:
     bot_token = os.getenv("DISCORD_TOKEN")
     if not bot_token:
         return None
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"https://discord.com/api/guilds/{GUILD_ID}/members/{user_id}",
-                headers={"Authorization": f"Bot {bot_token}"},
-            )
-            response.raise_for_status()
-            member = response.json()
-            return member.get("nick") or member.get("user", {}).get("global_name") or member.get("user", {}).get("username")
-        except Exception as e:
-            log.warning(f"获取服务器昵称失败: {e}")
-            return None
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.get(
+            f"https://discord.com/api/guilds/{GUILD_ID}/members/{user_id}",
+            headers={"Authorization": f"Bot {bot_token}"},
+        )
+        response.raise_for_status()
+        member = response.json()
+        return member.get("nick") or member.get("user", {}).get("global_name") or member.get("user", {}).get("username")
+    except Exception as e:
+        log.warning(f"获取服务器昵称失败: {e}")
+        return None
 
 
 @app.get("/api/user")
@@ -161,11 +169,25 @@ async def get_user_info(user_id: int = Depends(get_current_user_id)):
 # 日记数据
 # ---------------------------------------------------------------------------
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 按逗号拆分后逐个比较（弱比较，忽略 W/ 前缀）"""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
 @app.get("/api/diary")
-async def api_diary():
+async def api_diary(request: Request):
     try:
-        diary = await get_diary()
-        return JSONResponse(content=diary)
+        snapshot = await diary_stats_cache.get_snapshot()
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request.headers.get("if-none-match", ""), snapshot.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=snapshot.body, media_type="application/json", headers=headers
+        )
     except Exception as e:
         log.error(f"获取日记数据失败: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to build diary")
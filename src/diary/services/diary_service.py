@@ -7,8 +7,14 @@
 """
 
 import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
 from datetime import datetime, date, timezone, timedelta
-from typing import Any, Optional
+from typing import Any, Callable, Awaitable, Dict, Optional
 
 from sqlalchemy import select, func, case
 
@@ -30,6 +36,11 @@ BOT_BIRTH_DATE = date(2025, 9, 14)
 
 BEIJING_TZ = timezone(timedelta(hours=8))
 
+# 物化统计的最长有效期（秒）；过期后后台刷新，期间继续返回旧快照
+STATS_MAX_AGE_SECONDS = int(os.getenv("DIARY_STATS_MAX_AGE_SECONDS", "300"))
+
+log = logging.getLogger(__name__)
+
 
 # ---------------------------------------------------------------------------
 # 辅助函数
@@ -50,8 +61,13 @@ def _safe_int(v: Any, default: int = 0) -> int:
         return default
 
 
+def _today() -> date:
+    """北京时间的今天；日记按北京时间换日"""
+    return datetime.now(BEIJING_TZ).date()
+
+
 def _days_alive() -> int:
-    return (date.today() - BOT_BIRTH_DATE).days
+    return (_today() - BOT_BIRTH_DATE).days
 
 
 # ---------------------------------------------------------------------------
@@ -376,3 +392,141 @@ async def get_diary() -> dict:
     """采集 + 构建一步到位，供 API 调用。"""
     data = await collect_all()
     return build_diary(data)
+
+
+# ---------------------------------------------------------------------------
+# 物化统计层 (供 Web API 使用)
+# 每个维度的采集结果单独缓存、单独过期；刷新只重算过期的维度，
+# 并发的刷新请求合并为同一次 (single-flight)。数据由机器人进程写入，日记服务是
+# 独立进程，收不到写入事件，因此只按 max_age 过期，没有主动失效。构建好的 JSON 与 ETag 一并缓存，
+# 页面访问高峰不会变成对大表的并发聚合。
+# ---------------------------------------------------------------------------
+
+_COLLECTORS: Dict[str, Callable[[], Awaitable[dict]]] = {
+    "namecard": collect_namecard_stats,
+    "interaction": collect_interaction_stats,
+    "forum": collect_forum_stats,
+    "coin": collect_coin_stats,
+    "loan": collect_loan_stats,
+    "affection": collect_affection_stats,
+    "tarot": collect_tarot_stats,
+    "reply": collect_reply_stats,
+}
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+@dataclass(frozen=True)
+class DiarySnapshot:
+    """一次构建好的日记响应"""
+
+    payload: dict
+    body: bytes
+    etag: str
+    built_on: date
+
+
+class DiaryStatsCache:
+    def __init__(
+        self,
+        collectors: Optional[Dict[str, Callable[[], Awaitable[dict]]]] = None,
+        max_age: float = STATS_MAX_AGE_SECONDS,
+    ):
+        self._collectors = collectors or _COLLECTORS
+        self.max_age = max_age
+        self._stats: Dict[str, dict] = {}
+        self._stats_at: Dict[str, float] = {}
+        self._snapshot: Optional[DiarySnapshot] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def _stale_keys(self) -> list[str]:
+        now = time.monotonic()
+        return [
+            k
+            for k in self._collectors
+            if k not in self._stats_at or now - self._stats_at[k] >= self.max_age
+        ]
+
+    async def _refresh(self) -> DiarySnapshot:
+        keys = self._stale_keys()
+        if keys:
+            results = await asyncio.gather(*(self._collectors[k]() for k in keys))
+            now = time.monotonic()
+            for key, result in zip(keys, results):
+                if "error" in result and key in self._stats:
+                    # 采集失败时保留上一次的结果
+                    log.warning(f"日记统计维度 {key} 刷新失败，沿用旧值: {result['error']}")
+                    continue
+                self._stats[key] = result
+                self._stats_at[key] = now
+
+        if keys or self._snapshot is None or self._snapshot.built_on != _today():
+            payload = build_diary(self._stats)
+            body = json.dumps(
+                payload, ensure_ascii=False, separators=(",", ":"), default=_json_default
+            ).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            self._snapshot = DiarySnapshot(payload, body, etag, _today())
+        return self._snapshot
+
+    async def refresh(self) -> DiarySnapshot:
+        """刷新过期维度；并发调用共享同一次刷新"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._refresh())
+        return await asyncio.shield(self._inflight)
+
+    def _refresh_in_background(self) -> None:
+        if self._inflight is not None and not self._inflight.done():
+            return
+        self._inflight = asyncio.create_task(self._refresh())
+        self._inflight.add_done_callback(_log_task_error)
+
+    async def get_snapshot(self) -> DiarySnapshot:
+        """
+        返回当前快照。首次调用会等待刷新；之后若有维度过期，
+        立即返回旧快照并在后台刷新 (stale-while-revalidate)。
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return await self.refresh()
+        if self._stale_keys() or snapshot.built_on != _today():
+            self._refresh_in_background()
+        return snapshot
+
+    async def _refresh_loop(self, interval: float) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                log.error(f"定时刷新日记统计失败: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """启动定时刷新，使统计在访问前就已物化"""
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.create_task(
+                self._refresh_loop(interval or self.max_age)
+            )
+
+    async def stop(self) -> None:
+        for task in (self._loop_task, self._inflight):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._loop_task = None
+
+
+def _log_task_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception():
+        log.error(f"后台刷新日记统计失败: {task.exception()}")
+
+
+diary_stats_cache = DiaryStatsCache()
@@ -8,6 +8,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 import httpx
 from dotenv import load_dotenv
+from src.chat.services.http_client_registry import http_client_registry
 
 load_dotenv(
     os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", "..", ".env")
@@ -28,6 +29,11 @@ async def startup_event():
     log.info("Guidance app startup.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await http_client_registry.aclose()
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     log.info(f"收到请求: {request.method} {request.url.path}")
@@ -53,30 +59,30 @@ async def get_current_user_id(
         return TEST_USER_ID
 
     headers = {"Authorization": f"Bearer {token.credentials}"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                "https://discord.com/api/users/@me", headers=headers
-            )
-            response.raise_for_status()
-            user_data = response.json()
-            user_id = int(user_data["id"])
-            log.info(
-                f"成功识别用户: {user_data.get('username', 'unknown')} ({user_id})"
-            )
-            return user_id
-        except httpx.HTTPStatusError as e:
-            log.error(
-                f"从Discord API获取用户信息失败。状态码: {e.response.status_code}",
-                exc_info=True,
-            )
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        except httpx.RequestError as e:
-            log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=503,
-                detail="Service Unavailable: Cannot connect to Discord API",
-            )
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.get(
+            "https://discord.com/api/users/@me", headers=headers
+        )
+        response.raise_for_status()
+        user_data = response.json()
+        user_id = int(user_data["id"])
+        log.info(
+            f"成功识别用户: {user_data.get('username', 'unknown')} ({user_id})"
+        )
+        return user_id
+    except httpx.HTTPStatusError as e:
+        log.error(
+            f"从Discord API获取用户信息失败。状态码: {e.response.status_code}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    except httpx.RequestError as e:
+        log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=503,
+            detail="Service Unavailable: Cannot connect to Discord API",
+        )
 
 
 class TokenRequest(BaseModel):
@@ -103,28 +109,28 @@ async def exchange_code_for_token(request: TokenRequest):
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                "https://discord.com/api/oauth2/token", data=data, headers=headers
-            )
-            response.raise_for_status()
-            log.info("成功交换代码获取令牌。")
-            return JSONResponse(content=response.json())
-        except httpx.HTTPStatusError as e:
-            log.error(
-                f"与Discord API交换代码失败。状态码: {e.response.status_code}",
-                exc_info=True,
-            )
-            raise HTTPException(
-                status_code=500, detail="Failed to exchange code with Discord"
-            )
-        except httpx.RequestError as e:
-            log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
-            raise HTTPException(
-                status_code=503,
-                detail="Service Unavailable: Cannot connect to Discord API",
-            )
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.post(
+            "https://discord.com/api/oauth2/token", data=data, headers=headers
+        )
+        response.raise_for_status()
+        log.info("成功交换代码获取令牌。")
+        return JSONResponse(content=response.json())
+    except httpx.HTTPStatusError as e:
+        log.error(
+            f"与Discord API交换代码失败。状态码: {e.response.status_code}",
+            exc_info=True,
+        )
+        raise HTTPException(
+            status_code=500, detail="Failed to exchange code with Discord"
+        )
+    except httpx.RequestError as e:
+        log.error(f"请求Discord API时发生网络错误: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=503,
+            detail="Service Unavailable: Cannot connect to Discord API",
+        )
 
 
 GUILD_ID = os.getenv("GUILD_ID", "1234431460159160360")
@@ -134,23 +140,23 @@ async def get_guild_nickname(user_id: int) -> Optional[str]:
     bot_token = os.getenv("DISCORD_TOKEN")
     if not bot_token:
         return None
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"https://discord.com/api/guilds/{GUILD_ID}/members/{user_id}",
-                headers={"Authorization": f"Bot {bot_token}"},
-            )
-            response.raise_for_status()
-            member_data = response.json()
-            nick = member_data.get("nick")
-            if nick:
-                return nick
-            return member_data.get("user", {}).get("global_name") or member_data.get(
-                "user", {}
-            ).get("username")
-        except Exception as e:
-            log.warning(f"获取服务器昵称失败: {e}")
-            return None
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.get(
+            f"https://discord.com/api/guilds/{GUILD_ID}/members/{user_id}",
+            headers={"Authorization": f"Bot {bot_token}"},
+        )
+        response.raise_for_status()
+        member_data = response.json()
+        nick = member_data.get("nick")
+        if nick:
+            return nick
+        return member_data.get("user", {}).get("global_name") or member_data.get(
+            "user", {}
+        ).get("username")
+    except Exception as e:
+        log.warning(f"获取服务器昵称失败: {e}")
+        return None
 
 
 @app.get("/api/user")
@@ -10,6 +10,8 @@ import httpx
 from dotenv import load_dotenv
 from urllib.parse import quote
 
+from src.chat.services.http_client_registry import http_client_registry
+
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", "..", "..", "..", ".env"))
 
 app = FastAPI(title="Odysseia Lobby", version="1.0.0")
@@ -27,6 +29,11 @@ async def startup_event():
     log.info("Lobby app startup.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await http_client_registry.aclose()
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     log.info(f"[Lobby] {request.method} {request.url.path}")
@@ -47,16 +54,16 @@ async def get_current_user_id(
     if token is None:
         return None
     headers = {"Authorization": f"Bearer {token.credentials}"}
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                "https://discord.com/api/users/@me", headers=headers
-            )
-            response.raise_for_status()
-            user_data = response.json()
-            return int(user_data["id"])
-        except Exception:
-            return None
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.get(
+            "https://discord.com/api/users/@me", headers=headers
+        )
+        response.raise_for_status()
+        user_data = response.json()
+        return int(user_data["id"])
+    except Exception:
+        return None
 
 
 class TokenRequest(BaseModel):
@@ -82,19 +89,19 @@ async def exchange_code_for_token(request: TokenRequest):
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                "https://discord.com/api/oauth2/token", data=data, headers=headers
-            )
-            response.raise_for_status()
-            return JSONResponse(content=response.json())
-        except httpx.HTTPStatusError as e:
-            log.error(f"[Lobby] Token exchange failed: {e.response.status_code}")
-            raise HTTPException(status_code=500, detail="Token exchange failed")
-        except httpx.RequestError as e:
-            log.error(f"[Lobby] Network error: {e}")
-            raise HTTPException(status_code=503, detail="Service Unavailable")
+    client = http_client_registry.get_client(use_proxy=True)
+    try:
+        response = await client.post(
+            "https://discord.com/api/oauth2/token", data=data, headers=headers
+        )
+        response.raise_for_status()
+        return JSONResponse(content=response.json())
+    except httpx.HTTPStatusError as e:
+        log.error(f"[Lobby] Token exchange failed: {e.response.status_code}")
+        raise HTTPException(status_code=500, detail="Token exchange failed")
+    except httpx.RequestError as e:
+        log.error(f"[Lobby] Network error: {e}")
+        raise HTTPException(status_code=503, detail="Service Unavailable")
 
 
 @app.get("/api/intent")
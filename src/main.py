@@ -1,5 +1,6 @@
 import os
 import asyncio
+import atexit
 import logging
 import queue
 import sys
@@ -9,7 +10,14 @@ import requests
 from discord.ext import commands
 from dotenv import load_dotenv
 from datetime import datetime, timezone
+from typing import Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+# 尽早安装导入计时钩子，让启动报告覆盖 src.* 的全部模块导入
+from src.chat.utils.startup_profiler import startup_profiler
+
+startup_profiler.start_import_tracking()
+
 from src.backup.backup_manager import backup_databases
 
 # 在所有其他导入之前，尽早加载环境变量
@@ -19,6 +27,11 @@ load_dotenv()
 # 从我们自己的模块中导入
 from src import config
 from src.chat.utils.database import chat_db_manager
+from src.chat.utils.log_utils import (
+    AsyncLogHandler,
+    AsyncLogListener,
+    start_queue_logging,
+)
 from src.chat.features.world_book.database.world_book_db_manager import (
     world_book_db_manager,
 )
@@ -31,6 +44,8 @@ from src.chat.features.world_book.database.world_book_db_manager import (
 
 # 导入全局 ai_service 实例
 from src.chat.services.ai.service import ai_service
+from src.chat.services.http_client_registry import http_client_registry
+from src.chat.services.image_pipeline import image_pipeline
 from src.chat.services.review_service import initialize_review_service
 from src.chat.features.work_game.services.work_db_service import WorkDBService
 from src.chat.utils.command_sync import sync_commands
@@ -100,6 +115,10 @@ if sys.platform != "win32":
         logging.warning("尝试启用 uvloop 失败，将使用默认事件循环")
 
 
+_log_listener: Optional[AsyncLogListener] = None
+_log_handler: Optional[AsyncLogHandler] = None
+
+
 def setup_logging():
     """
     配置日志记录器，实现双通道输出：
@@ -161,10 +180,20 @@ def setup_logging():
     # )  # 这里如果想在WebUI看到仅INFO以上日志，请在这里修改
     # queue_handler.setFormatter(web_log_formatter)
 
-    # 6. 为根 logger 添加所有处理器
-    root_logger.addHandler(stdout_handler)
-    root_logger.addHandler(stderr_handler)
-    root_logger.addHandler(file_handler)
+    # 6. 为根 logger 添加队列处理器
+    #    事件循环线程只负责入队，实际的文件 / 控制台写入在 QueueListener 的后台线程中完成；
+    #    高频调用位置按 LOG_SAMPLING_RULES 采样限流
+    global _log_listener, _log_handler
+    if _log_listener is not None:
+        _log_listener.stop()
+    _log_handler, _log_listener = start_queue_logging(
+        [stdout_handler, stderr_handler, file_handler],
+        sampling_rules=config.LOG_SAMPLING_RULES,
+        max_queue_size=config.LOG_QUEUE_MAX_SIZE,
+    )
+    root_logger.addHandler(_log_handler)
+    # 进程退出时写完队列中剩余的日志
+    atexit.register(_log_listener.stop)
     # root_logger.addHandler(queue_handler) # 禁用未使用的WebUI日志队列处理器，防止内存泄漏
 
     # 5. 调整特定库的日志级别，以减少不必要的输出
@@ -282,11 +311,12 @@ class DiscordBot(commands.Bot):
                     if cogs_dir.is_dir():
                         cog_paths_to_scan.append(cogs_dir)
 
-        # 遍历所有待扫描的目录，加载其中的 cog
+        # 遍历所有待扫描的目录，收集需要加载的 cog 模块
+        module_names = []
         for path in cog_paths_to_scan:
             # 使用相对于项目根目录的路径进行日志记录，更清晰
-            log.info(f"--- 正在从 {path.relative_to(src_root.parent)} 加载 Cogs ---")
-            for file in path.glob("*.py"):
+            log.info(f"--- 正在从 {path.relative_to(src_root.parent)} 收集 Cogs ---")
+            for file in sorted(path.glob("*.py")):
                 if file.name.startswith("__"):
                     continue
 
@@ -298,22 +328,43 @@ class DiscordBot(commands.Bot):
                 # 从文件系统路径构建 Python 模块路径
                 # 例如: E:\...\src\chat\...\feeding_cog.py -> src.chat....feeding_cog
                 relative_path = file.relative_to(src_root.parent)
-                module_name = str(relative_path.with_suffix("")).replace(
-                    os.path.sep, "."
+                module_names.append(
+                    str(relative_path.with_suffix("")).replace(os.path.sep, ".")
                 )
 
-                try:
-                    await self.load_extension(module_name)
-                    log.info(f"成功加载模块: {module_name}")
-                except Exception as e:
-                    log.error(f"加载模块 {module_name} 失败: {e}", exc_info=True)
+        # 各 cog 之间互不依赖（跨 cog 访问都在事件处理时通过 get_cog 进行），
+        # 并发加载可以让各自 cog_load 中的数据库 / 网络等待互相重叠。
+        # 模块本身的执行仍是同步的，由事件循环依次完成。
+        with startup_profiler.measure("stage", "加载全部 Cogs"):
+            if config.STARTUP_CONCURRENT_COG_LOADING:
+                await asyncio.gather(*(self._load_cog(name) for name in module_names))
+            else:
+                for name in module_names:
+                    await self._load_cog(name)
 
         log.info("--- 所有模块加载完毕 ---")
 
+    async def _load_cog(self, module_name: str) -> None:
+        log = logging.getLogger(__name__)
+        try:
+            with startup_profiler.measure("cog", module_name):
+                await self.load_extension(module_name)
+            log.info(f"成功加载模块: {module_name}")
+        except Exception as e:
+            log.error(f"加载模块 {module_name} 失败: {e}", exc_info=True)
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs) -> None:
+        # 记录每个 Cog 的 cog_load 耗时（并发加载时为墙钟时间）
+        with startup_profiler.measure("cog_load", cog.qualified_name):
+            await super().add_cog(cog, **kwargs)
+
     async def on_ready(self):
         """当机器人成功连接到 Discord 时调用"""
         log = logging.getLogger(__name__)
         log.info("--- 机器人已上线 ---")
+        if not startup_profiler.reported:
+            startup_profiler.stop_import_tracking()
+            startup_profiler.log_report()
         if self.user:
             log.info(f"登录用户: {self.user} (ID: {self.user.id})")
 
@@ -421,13 +472,53 @@ async def main():
     # sender_thread.start()
     # log.info("Webui心跳包已启用")
 
+    # 耗时的可选依赖在后台线程导入，与下面的数据库初始化重叠
+    startup_profiler.preload_in_background(config.STARTUP_PRELOAD_MODULES)
+
     # 3. 异步初始化数据库
     log.info("正在异步初始化数据库...")
     log.info("初始化 Chat 数据库...")
-    await chat_db_manager.init_async()
+    with startup_profiler.measure("stage", "初始化 Chat 数据库"):
+        await chat_db_manager.init_async()
 
     log.info("初始化 World Book 数据库...")
-    await world_book_db_manager.init_async()
+    with startup_profiler.measure("stage", "初始化 World Book 数据库"):
+        await world_book_db_manager.init_async()
+
+    # 重放上次未写完的用户状态变更，并启动写回任务
+    from src.chat.services.user_state_aggregator import user_state_aggregator
+
+    with startup_profiler.measure("stage", "启动用户状态写回缓冲"):
+        await user_state_aggregator.start()
+
+    # 排行榜在首次查看时从数据库载入，之后增量更新并定时对账
+    from src.chat.services.leaderboard_service import leaderboard_service
+
+    await leaderboard_service.start()
+
+    # 切换 Embedding 模型后在后台分批回填新模型的向量
+    from src.chat.services.embedding_lifecycle import embedding_lifecycle
+
+    await embedding_lifecycle.start()
+
+    # 搜索计数批量写入，关闭时需要落库
+    from src.chat.features.tools.services.search_executor import search_executor
+
+    # AI 调用用量批量写入，关闭时需要落库
+    from src.chat.services.ai.usage_recorder import usage_recorder
+
+    # AI 回复准入统计、提示词前缀稳定性报告、帖子元数据缓存与知识库检索缓存统计，关闭时写入日志
+    from src.chat.services.admission_controller import admission_controller
+    from src.chat.services.prompt_prefix_monitor import prompt_prefix_monitor
+    from src.chat.services.thread_metadata_cache import thread_metadata_cache
+    from src.chat.features.world_book.services.knowledge_result_cache import (
+        knowledge_result_cache,
+    )
+
+    # 在后台线程预渲染塔罗牌图集（约 78 张原图解码），不阻塞登录
+    from src.chat.features.tarot.services import tarot_service
+
+    tarot_warm_up_task = asyncio.create_task(tarot_service.warm_up())
 
     # 3.5. 初始化商店商品
     # 商品已迁移到PostgreSQL，不再需要从配置文件初始化
@@ -442,6 +533,16 @@ async def main():
     # 启动定时备份任务
     scheduler = AsyncIOScheduler()
     scheduler.add_job(backup_databases, "cron", hour=0, minute=0)
+    scheduler.add_job(
+        http_client_registry.log_metrics_summary,
+        "interval",
+        minutes=chat_config.HTTP_CLIENT_CONFIG["METRICS_LOG_INTERVAL_MINUTES"],
+    )
+    scheduler.add_job(
+        image_pipeline.log_metrics_summary,
+        "interval",
+        minutes=chat_config.HTTP_CLIENT_CONFIG["METRICS_LOG_INTERVAL_MINUTES"],
+    )
     scheduler.start()
     log.info("已启动每日数据库备份任务。")
 
@@ -456,9 +557,10 @@ async def main():
     from src.chat.features.tools.tool_loader import load_tools_from_directory
     from src.chat.features.tools.services.tool_service import ToolService
 
-    available_tools, tool_map = load_tools_from_directory(
-        "src/chat/features/tools/functions"
-    )
+    with startup_profiler.measure("stage", "加载 AI 工具"):
+        available_tools, tool_map = load_tools_from_directory(
+            "src/chat/features/tools/functions"
+        )
     tool_service = ToolService(
         bot=bot, tool_map=tool_map, tool_declarations=available_tools
     )
@@ -466,10 +568,13 @@ async def main():
     log.info(f"已加载 {len(available_tools)} 个工具: {list(tool_map.keys())}")
 
     # 异步初始化 AI Service（从 PG 数据库加载 Provider 和 Model 配置）
-    await ai_service.initialize()
+    with startup_profiler.measure("stage", "初始化 AI Service"):
+        await ai_service.initialize()
 
     from src.chat.services.gpt_image_service import gpt_image_service
-    await gpt_image_service.initialize()
+
+    with startup_profiler.measure("stage", "初始化 GPT Image Service"):
+        await gpt_image_service.initialize()
 
     # 为 context_service_test 注入 bot 实例，使其能够访问缓存
     from src.chat.services.context_service_test import initialize_context_service_test
@@ -492,7 +597,23 @@ async def main():
     except Exception as e:
         log.critical(f"启动机器人时发生未知错误: {e}", exc_info=True)
     finally:
-        # 在机器人关闭时，确保数据库连接被关闭
+        # 在机器人关闭时，确保数据库连接和出站 HTTP 连接被关闭
+        await user_state_aggregator.stop()
+        await leaderboard_service.stop()
+        await embedding_lifecycle.stop()
+        await search_executor.aclose()
+        await usage_recorder.aclose()
+        admission_controller.log_metrics_summary()
+        prompt_prefix_monitor.log_summary()
+        thread_metadata_cache.log_metrics_summary()
+        knowledge_result_cache.log_metrics_summary()
+        http_client_registry.log_metrics_summary()
+        await http_client_registry.aclose()
+        image_pipeline.log_metrics_summary()
+        image_pipeline.shutdown()
+        tarot_warm_up_task.cancel()
+        if _log_handler is not None:
+            _log_handler.log_metrics_summary()
         log.info("机器人已下线。")
 
 
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+AI 回复准入控制测试：全局上限、频道内按序排队、用户队列、帖子优先、丢弃策略、
+排队超时与请求合并（包括发起请求被丢弃时的合并消息）。
+"""
+
+import asyncio
+
+import pytest
+
+from src.chat.services.admission_controller import AdmissionController
+
+
+def _controller(**overrides):
+    config = {
+        "ENABLED": True,
+        "MAX_CONCURRENT_REQUESTS": 2,
+        "PER_CHANNEL_CONCURRENCY": 1,
+        "PER_USER_CONCURRENCY": 1,
+        "PER_USER_MAX_PENDING": 1,
+        "MAX_CHANNEL_QUEUE": 5,
+        "MAX_GLOBAL_QUEUE": 200,
+        "MAX_QUEUE_WAIT_SECONDS": 5.0,
+        "SHED_POLICY": "reject_new",
+        "THREAD_PRIORITY": True,
+        "COALESCE_ENABLED": False,
+        "COALESCE_MAX_BATCH": 5,
+    }
+    config.update(overrides)
+    return AdmissionController(config)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_global_limit_bounds_in_flight_requests():
+    controller = _controller(MAX_CONCURRENT_REQUESTS=2)
+    active = 0
+    peak = 0
+
+    async def request(channel_id, user_id):
+        nonlocal active, peak
+        admission = await controller.acquire(channel_id, user_id)
+        assert admission.admitted
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        admission.release()
+
+    await asyncio.gather(*(request(channel, channel) for channel in range(6)))
+
+    assert peak == 2
+    assert controller.admitted == 6
+    assert controller.metrics()["in_flight"] == 0
+    # 全部处理完后不保留空闲状态
+    assert controller._channels == {}
+    assert not controller._user_pending
+
+
+@pytest.mark.asyncio
+async def test_same_channel_requests_are_served_in_arrival_order():
+    controller = _controller(MAX_CONCURRENT_REQUESTS=10)
+    order = []
+
+    async def request(user_id):
+        admission = await controller.acquire(1, user_id)
+        order.append(user_id)
+        await asyncio.sleep(0.005)
+        admission.release()
+
+    tasks = []
+    for user_id in range(4):
+        tasks.append(asyncio.create_task(request(user_id)))
+        await _settle()
+    await asyncio.gather(*tasks)
+
+    assert order == [0, 1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_thread_requests_jump_the_global_queue():
+    controller = _controller(MAX_CONCURRENT_REQUESTS=1)
+    holder = await controller.acquire(100, 100)
+    order = []
+
+    async def request(channel_id, is_thread):
+        admission = await controller.acquire(channel_id, channel_id, is_thread=is_thread)
+        order.append(channel_id)
+        admission.release()
+
+    channel_task = asyncio.create_task(request(1, False))
+    await _settle()
+    thread_task = asyncio.create_task(request(2, True))
+    await _settle()
+    holder.release()
+    await asyncio.gather(channel_task, thread_task)
+
+    assert order == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_user_with_pending_request_is_shed():
+    controller = _controller()
+    first = await controller.acquire(1, 42)
+    second = await controller.acquire(2, 42)
+
+    assert first.admitted
+    assert not second.admitted
+    assert second.reason == "user_busy"
+    first.release()
+    assert controller.metrics()["shed"] == {"user_busy": 1}
+
+
+@pytest.mark.asyncio
+async def test_full_channel_queue_rejects_new_requests():
+    controller = _controller(MAX_CHANNEL_QUEUE=1)
+    holder = await controller.acquire(1, 1)
+    queued = asyncio.create_task(controller.acquire(1, 2))
+    await _settle()
+
+    rejected = await controller.acquire(1, 3)
+    assert rejected.reason == "channel_queue_full"
+
+    holder.release()
+    admission = await queued
+    assert admission.admitted
+    admission.release()
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_evicts_the_longest_waiting_request():
+    controller = _controller(MAX_CHANNEL_QUEUE=1, SHED_POLICY="drop_oldest")
+    holder = await controller.acquire(1, 1)
+    oldest = asyncio.create_task(controller.acquire(1, 2))
+    await _settle()
+    newest = asyncio.create_task(controller.acquire(1, 3))
+    await _settle()
+
+    evicted = await oldest
+    assert not evicted.admitted
+    assert evicted.reason == "evicted"
+
+    holder.release()
+    admission = await newest
+    assert admission.admitted
+    admission.release()
+    # 被挤出的用户可以重新排队
+    assert 2 not in controller._user_pending
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_timeout_sheds_request_and_frees_channel_slot():
+    controller = _controller(MAX_CONCURRENT_REQUESTS=1, MAX_QUEUE_WAIT_SECONDS=0.02)
+    holder = await controller.acquire(1, 1)
+
+    # 频道 2 拿到了频道名额，但一直等不到全局名额
+    timed_out = await controller.acquire(2, 2)
+    assert timed_out.reason == "timeout"
+    assert 2 not in controller._channels
+
+    holder.release()
+    admission = await controller.acquire(2, 2)
+    assert admission.admitted
+    admission.release()
+
+
+@pytest.mark.asyncio
+async def test_coalescing_merges_queued_requests_into_the_waiting_leader():
+    controller = _controller(COALESCE_ENABLED=True, COALESCE_MAX_BATCH=3)
+    holder = await controller.acquire(1, 1)
+    leader_task = asyncio.create_task(controller.acquire(1, 2, message="m2"))
+    await _settle()
+
+    follower = await controller.acquire(1, 3, message="m3")
+    second_follower = await controller.acquire(1, 4, message="m4")
+    # 批次已满（含发起者共 3 条），之后的请求正常排队
+    overflow = asyncio.create_task(controller.acquire(1, 5, message="m5"))
+    await _settle()
+
+    assert follower.reason == "coalesced"
+    assert second_follower.reason == "coalesced"
+    assert not overflow.done()
+
+    holder.release()
+    leader = await leader_task
+    assert leader.admitted
+    assert leader.batch == ["m3", "m4"]
+    leader.release()
+
+    tail = await overflow
+    assert tail.admitted
+    assert tail.batch == []
+    tail.release()
+    assert controller.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_coalescing_never_delays_an_idle_channel():
+    controller = _controller(COALESCE_ENABLED=True)
+    first = await controller.acquire(1, 1, message="m1")
+    assert first.admitted
+    first.release()
+
+    # 没有排队中的请求时不会形成批次
+    second = await controller.acquire(1, 2, message="m2")
+    assert second.admitted
+    assert second.batch == []
+    second.release()
+
+
+@pytest.mark.asyncio
+async def test_user_requests_queue_behind_their_own_reply():
+    controller = _controller(PER_CHANNEL_CONCURRENCY=4, PER_USER_MAX_PENDING=2)
+    first = await controller.acquire(1, 42)
+    queued = asyncio.create_task(controller.acquire(2, 42))
+    await _settle()
+
+    # 同一用户的第二条请求排队，不影响其他用户
+    assert not queued.done()
+    other = await controller.acquire(1, 7)
+    assert other.admitted
+    assert (await controller.acquire(3, 42)).reason == "user_busy"
+
+    first.release()
+    second = await queued
+    assert second.admitted
+    second.release()
+    other.release()
+    assert not controller._user_pending
+    assert not controller._user_gates
+
+
+@pytest.mark.asyncio
+async def test_shed_leader_returns_its_coalesced_followers():
+    controller = _controller(
+        COALESCE_ENABLED=True,
+        COALESCE_MAX_BATCH=2,
+        MAX_CHANNEL_QUEUE=1,
+        SHED_POLICY="drop_oldest",
+    )
+    holder = await controller.acquire(1, 1)
+    leader_task = asyncio.create_task(controller.acquire(1, 2, message="m2"))
+    await _settle()
+    follower = await controller.acquire(1, 3, message="m3")
+    assert follower.reason == "coalesced"
+
+    # 批次已满，新请求正常排队并挤出了发起请求
+    newest = asyncio.create_task(controller.acquire(1, 4, message="m4"))
+    leader = await leader_task
+    assert leader.reason == "evicted"
+    assert leader.batch == ["m3"]
+    assert controller.metrics()["shed"] == {"evicted": 2}
+
+    holder.release()
+    admission = await newest
+    assert admission.admitted
+    admission.release()
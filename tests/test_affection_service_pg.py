@@ -73,3 +73,21 @@ class TestAffectionService:
         await aff_svc.reset_daily_affection_gain(today)
         status = await aff_svc.get_affection_status(100)
         assert status["daily_gain"] == 0
+
+    async def test_stale_chat_gains_do_not_rewind_daily_gain(
+        self, aff_svc, clean_tables
+    ):
+        from src.database.database import AsyncSessionLocal
+
+        today = datetime.now(BEIJING_TZ).date().isoformat()
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                assert await aff_svc.apply_chat_gains(session, {100: 3}, today) == 1
+                # 回放的旧日期批次不能把 last_update_date 改回去
+                assert (
+                    await aff_svc.apply_chat_gains(session, {100: 2}, "2000-01-01")
+                    == 0
+                )
+        status = await aff_svc.get_affection_status(100)
+        assert status["points"] == 3
+        assert status["daily_gain"] == 3
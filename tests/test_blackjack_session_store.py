@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+21点内存会话存储测试：紧凑牌局状态、写回（write-behind）持久化，
+以及模拟数百张并发牌桌的负载测试（数据库由计数用的假对象代替）。
+"""
+
+import asyncio
+import json
+import random
+import time
+
+import pytest
+
+from src.chat.features.games.services.blackjack_service import (
+    BlackjackGame,
+    BlackjackService,
+)
+
+
+class FakeDBManager:
+    """记录写入次数的假数据库管理器，模拟 chat_db_manager 的调用方式"""
+
+    def __init__(self, latency: float = 0.0):
+        self.rows = {}
+        self.writes = 0
+        self.deletes = 0
+        self.latency = latency
+
+    async def _execute(self, func, *args, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return func(*args, **kwargs)
+
+    def _db_transaction(self, query, params=(), *, fetch="none", commit=False):
+        if query.strip().startswith("REPLACE"):
+            self.writes += 1
+            self.rows[params[0]] = params
+        elif query.startswith("DELETE"):
+            self.deletes += 1
+            self.rows.pop(params[0], None)
+        elif fetch == "all":
+            return [(row[0], row[1]) for row in self.rows.values()]
+        return None
+
+
+def test_game_state_is_compact_and_round_trips_card_names():
+    game = BlackjackGame(1, 10, "player_turn", ["SpadeK", "HeartA"], ["Club10"], ["Diamond5"])
+
+    assert not hasattr(game, "__dict__")
+    assert isinstance(game._deck, bytearray)
+    assert game.deck == ["SpadeK", "HeartA"]
+    assert game.player_score == 10
+
+    game.deal_to_player()
+    assert game.player_hand == ["Club10", "HeartA"]
+    assert game.player_score == 21
+    assert game.to_dict()["dealer_hand"] == ["Diamond5", "Hidden"]
+
+
+@pytest.mark.asyncio
+async def test_actions_are_write_behind_until_flush():
+    db = FakeDBManager()
+    service = BlackjackService(db)
+
+    random.seed(7)
+    game = await service.start_game(42, 100)
+    while game.game_state.startswith("finished"):
+        await service.delete_game(42)
+        game = await service.start_game(42, 100)
+    writes_after_start = db.writes
+
+    await service.player_stand(42)
+    assert db.writes == writes_after_start
+
+    assert await service.flush() == 1
+    stored = db.rows[42]
+    assert json.loads(stored[5]) == game.dealer_hand
+
+    await service.delete_game(42)
+    assert 42 not in db.rows
+    assert await service.get_active_game(42) is None
+
+
+@pytest.mark.asyncio
+async def test_user_lock_entries_are_released():
+    service = BlackjackService(FakeDBManager())
+
+    async with service.user_lock(1):
+        assert 1 in service._locks
+    assert service._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_load_hundreds_of_concurrent_tables():
+    """300 张牌桌同时进行，数据库每次调用有 2ms 延迟；要牌/停牌不应触及数据库"""
+    db = FakeDBManager(latency=0.002)
+    service = BlackjackService(db)
+    tables = 300
+    action_times = []
+
+    async def play(user_id: int):
+        async with service.user_lock(user_id):
+            game = await service.start_game(user_id, 50)
+        while game.game_state == "player_turn":
+            async with service.user_lock(user_id):
+                start = time.perf_counter()
+                if game.player_score < 17:
+                    game = await service.player_hit(user_id)
+                else:
+                    game = await service.player_stand(user_id)
+                action_times.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+        async with service.user_lock(user_id):
+            await service.delete_game(user_id)
+        return game.game_state
+
+    results = await asyncio.gather(*(play(uid) for uid in range(1, tables + 1)))
+
+    assert len(results) == tables
+    assert all(r.startswith("finished") for r in results)
+    # 只有开局写入与结束删除会访问数据库
+    assert db.writes <= tables
+    assert db.deletes == db.writes
+    assert db.rows == {}
+    assert service._sessions == {} and service._locks == {}
+    # 每个动作都是纯 CPU：p95 远低于一次数据库往返
+    action_times.sort()
+    assert action_times[int(len(action_times) * 0.95)] < db.latency
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+日记物化统计缓存测试：single-flight、按维度增量刷新、ETag / 304、按北京时间换日重建。
+采集函数使用假实现，不访问数据库。
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.diary.services import diary_service
+from src.diary.services.diary_service import DiaryStatsCache
+
+
+def _fake_collectors(calls: dict, delay: float = 0.01):
+    def make(key: str, value: dict):
+        async def collect():
+            calls[key] = calls.get(key, 0) + 1
+            await asyncio.sleep(delay)
+            return dict(value)
+
+        return collect
+
+    return {
+        "forum": make("forum", {"thread_count": 42, "first_thread_at": None}),
+        "coin": make("coin", {"total_earned": 1000, "total_spent": 10}),
+    }
+
+
+def _expire(cache: DiaryStatsCache, key: str) -> None:
+    cache._stats_at[key] -= cache.max_age + 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_refresh():
+    calls: dict = {}
+    cache = DiaryStatsCache(_fake_collectors(calls), max_age=60)
+
+    snapshots = await asyncio.gather(*(cache.get_snapshot() for _ in range(50)))
+
+    assert calls == {"forum": 1, "coin": 1}
+    assert len({s.etag for s in snapshots}) == 1
+    assert "42" in snapshots[0].body.decode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_refresh_recollects_only_expired_dimension():
+    calls: dict = {}
+    cache = DiaryStatsCache(_fake_collectors(calls), max_age=60)
+    first = await cache.refresh()
+
+    _expire(cache, "coin")
+    second = await cache.refresh()
+
+    assert calls == {"forum": 1, "coin": 2}
+    # 数据未变，ETag 保持稳定
+    assert second.etag == first.etag
+
+
+@pytest.mark.asyncio
+async def test_failed_collector_keeps_previous_value():
+    calls: dict = {}
+    collectors = _fake_collectors(calls)
+    cache = DiaryStatsCache(collectors, max_age=60)
+    await cache.refresh()
+
+    async def broken():
+        return {"thread_count": 0, "error": "db down"}
+
+    collectors["forum"] = broken
+    _expire(cache, "forum")
+    snapshot = await cache.refresh()
+
+    assert "42" in snapshot.body.decode("utf-8")
+
+
+@pytest.mark.asyncio
+async def test_api_returns_304_for_matching_etag(monkeypatch):
+    from src.diary import app as diary_app
+
+    calls: dict = {}
+    cache = DiaryStatsCache(_fake_collectors(calls), max_age=60)
+    monkeypatch.setattr(diary_app, "diary_stats_cache", cache)
+    monkeypatch.setattr(diary_service, "diary_stats_cache", cache)
+
+    transport = httpx.ASGITransport(app=diary_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/api/diary")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert first.json()["entries"]
+
+        second = await client.get("/api/diary", headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+
+    assert calls == {"forum": 1, "coin": 1}
+
+
+@pytest.mark.asyncio
+async def test_etag_is_compared_per_entry(monkeypatch):
+    from src.diary import app as diary_app
+
+    cache = DiaryStatsCache(_fake_collectors({}), max_age=60)
+    monkeypatch.setattr(diary_app, "diary_stats_cache", cache)
+    etag = (await cache.refresh()).etag
+
+    transport = httpx.ASGITransport(app=diary_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for header, status in (
+            (f'"x", W/{etag}', 304),
+            # 只是包含当前 ETag 的其他值不算匹配
+            (f'"prefix{etag[1:]}', 200),
+            (etag[1:-1], 200),
+        ):
+            response = await client.get(
+                "/api/diary", headers={"If-None-Match": header}
+            )
+            assert response.status_code == status, header
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_rebuilt_when_the_beijing_date_changes(monkeypatch):
+    from datetime import datetime, timedelta
+
+    cache = DiaryStatsCache(_fake_collectors({}), max_age=60)
+    snapshot = await cache.refresh()
+    assert snapshot.built_on == datetime.now(diary_service.BEIJING_TZ).date()
+
+    tomorrow = snapshot.built_on + timedelta(days=1)
+    monkeypatch.setattr(diary_service, "_today", lambda: tomorrow)
+    assert await cache.get_snapshot() is snapshot
+    rebuilt = await cache.refresh()
+    assert rebuilt.built_on == tomorrow
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""
+Embedding 生命周期测试：稳定状态只写当前模型、切换模型后的分批回填与断点续传、
+回填完成后的检索切换与旧索引清理、切回原模型时取消回填，
+以及整批嵌入失败时不推进游标、反复失败的行不会无限期阻止切换。
+"""
+
+import json
+
+import pytest
+
+from src.chat.services import embedding_lifecycle as lifecycle_module
+from src.chat.services.embedding_lifecycle import EmbeddingLifecycleManager
+
+FORUM = "forum.forum_threads"
+CONV = "conversation.conversation_blocks"
+
+
+class _FakeStore:
+    def __init__(self, model="qwen", disabled=None):
+        self.model = model
+        self.disabled = disabled or []
+        self.state = None
+
+    async def get_desired_model(self):
+        return self.model
+
+    async def get_disabled_models(self):
+        return self.disabled
+
+    async def load_state(self):
+        return self.state
+
+    async def save_state(self, value):
+        self.state = value
+
+
+class _FakeRepository:
+    """每张表是 {id: {列名: 向量}}，缺失的键视为 NULL。"""
+
+    def __init__(self, rows):
+        self.tables = rows
+        self.ddl = []
+
+    async def count_missing(self, table, column):
+        return sum(1 for row in self.tables[table].values() if column not in row)
+
+    async def fetch_batch(self, table, column, after_id, limit):
+        ids = sorted(
+            row_id
+            for row_id, row in self.tables[table].items()
+            if column not in row and row_id > after_id
+        )
+        return [(row_id, f"text {row_id}") for row_id in ids[:limit]]
+
+    async def write_batch(self, table, column, rows):
+        for row_id, vector in rows:
+            self.tables[table][row_id][column] = vector
+
+    async def execute_ddl(self, statement):
+        self.ddl.append(statement)
+
+
+class _FakeService:
+    def __init__(self, fail=False, empty_for=(), outage=False):
+        self.fail = fail
+        # 模拟嵌入服务吞掉异常后整批返回 None
+        self.outage = outage
+        # 对这些文本返回空向量（模拟单行嵌入失败）
+        self.empty_for = set(empty_for)
+        self.batches = []
+
+    async def generate_embeddings_batch(self, texts, task_type):
+        if self.fail:
+            raise ConnectionError("ollama down")
+        self.batches.append(list(texts))
+        if self.outage:
+            return [None for _ in texts]
+        return [[] if t in self.empty_for else [0.1, 0.2] for t in texts]
+
+    async def generate_embedding(self, text, task_type, title=None):
+        return [0.3, 0.4]
+
+
+def _rows(count, columns=("qwen_embedding",)):
+    return {i: {column: [0.0] for column in columns} for i in range(1, count + 1)}
+
+
+def _manager(store, repo, services, **config):
+    return EmbeddingLifecycleManager(
+        config={"BATCH_SIZE": 2, **config},
+        store=store,
+        repository=repo,
+        get_service=lambda model: services[model],
+        tables=[FORUM],
+    )
+
+
+@pytest.fixture(autouse=True)
+def _local_mode(monkeypatch):
+    monkeypatch.setattr(lifecycle_module, "VECTOR_MODE", "local")
+
+
+async def _drain(manager, limit=20):
+    for _ in range(limit):
+        if not await manager.step():
+            return
+    raise AssertionError("回填没有结束")
+
+
+@pytest.mark.asyncio
+async def test_first_run_gap_fills_then_writes_only_serving_model():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: {1: {"qwen_embedding": [0.0]}, 2: {}}})
+    services = {"qwen": _FakeService(), "bge": _FakeService()}
+    manager = _manager(store, repo, services)
+
+    await _drain(manager)
+
+    assert repo.tables[FORUM][2]["qwen_embedding"] == [0.1, 0.2]
+    assert services["qwen"].batches == [["text 2"]]
+    assert await manager.write_models(FORUM) == ["qwen"]
+    assert await manager.serving_column(FORUM) == "qwen_embedding"
+    # 不再使用的 bge 列的索引被删除，qwen 列的全精度索引保证存在
+    # 索引以 CONCURRENTLY 方式维护，不阻塞写入
+    assert (
+        "DROP INDEX CONCURRENTLY IF EXISTS forum.idx_forum_bge_embedding_hnsw"
+        in repo.ddl
+    )
+    assert any(
+        "idx_forum_qwen_embedding_hnsw" in ddl
+        and ddl.startswith("CREATE INDEX CONCURRENTLY")
+        for ddl in repo.ddl
+    )
+
+
+@pytest.mark.asyncio
+async def test_switch_backfills_in_batches_before_serving_new_model():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(5)})
+    services = {"qwen": _FakeService(), "bge": _FakeService()}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+
+    store.model = "bge"
+    assert await manager.step() is True
+    # 回填期间检索仍使用旧列，新写入同时生成两种向量
+    assert await manager.serving_model(FORUM) == "qwen"
+    assert await manager.write_models(FORUM) == ["qwen", "bge"]
+    (progress,) = await manager.progress()
+    assert (progress["target"], progress["processed"], progress["total"]) == (
+        "bge",
+        2,
+        5,
+    )
+
+    await _drain(manager)
+    assert services["bge"].batches == [
+        ["text 1", "text 2"],
+        ["text 3", "text 4"],
+        ["text 5"],
+    ]
+    assert all("bge_embedding" in row for row in repo.tables[FORUM].values())
+    assert await manager.serving_column(FORUM) == "bge_embedding"
+    assert await manager.write_models(FORUM) == ["bge"]
+
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_persisted_cursor():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(4)})
+    services = {"qwen": _FakeService(), "bge": _FakeService()}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+    store.model = "bge"
+    await manager.step()
+
+    saved = json.loads(store.state)[FORUM]
+    assert (saved["target"], saved["last_id"]) == ("bge", 2)
+
+    # 模拟重启：新的管理器从保存的状态继续
+    restarted = _manager(store, repo, services)
+    await _drain(restarted)
+    assert services["bge"].batches == [["text 1", "text 2"], ["text 3", "text 4"]]
+    assert await restarted.serving_model(FORUM) == "bge"
+
+
+@pytest.mark.asyncio
+async def test_switching_back_cancels_backfill():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(4)})
+    services = {"qwen": _FakeService(), "bge": _FakeService()}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+
+    store.model = "bge"
+    await manager.step()
+    store.model = "qwen"
+    assert await manager.step() is False
+    assert await manager.write_models(FORUM) == ["qwen"]
+    (progress,) = await manager.progress()
+    assert progress["target"] is None
+
+
+@pytest.mark.asyncio
+async def test_embedding_failure_keeps_cursor_for_retry():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(2)})
+    services = {"qwen": _FakeService(), "bge": _FakeService(fail=True)}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+
+    store.model = "bge"
+    await manager.step()
+    (progress,) = await manager.progress()
+    assert progress["processed"] == 0
+    assert "ollama down" in progress["last_error"]
+
+    services["bge"].fail = False
+    await _drain(manager)
+    assert await manager.serving_model(FORUM) == "bge"
+
+
+@pytest.mark.asyncio
+async def test_disabled_model_is_not_written_unless_it_is_the_only_one():
+    store = _FakeStore("qwen", disabled=["bge"])
+    repo = _FakeRepository({FORUM: _rows(1)})
+    services = {"qwen": _FakeService(), "bge": _FakeService()}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+    store.model = "bge"
+    await manager.step()
+    assert await manager.write_models(FORUM) == ["qwen"]
+
+    store.disabled = ["qwen", "bge"]
+    assert await manager.write_models(FORUM) == ["qwen"]
+
+
+@pytest.mark.asyncio
+async def test_generate_embeddings_returns_vectors_by_column():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({CONV: {}})
+    services = {"qwen": _FakeService(), "bge": _FakeService()}
+    manager = EmbeddingLifecycleManager(
+        store=store,
+        repository=repo,
+        get_service=lambda model: services[model],
+        tables=[CONV],
+    )
+    assert await manager.generate_embeddings(CONV, "hello") == {
+        "qwen_embedding": [0.3, 0.4]
+    }
+
+
+@pytest.mark.asyncio
+async def test_rows_with_failed_embeddings_are_rescanned_before_switching():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(3)})
+    services = {"qwen": _FakeService(), "bge": _FakeService(empty_for={"text 2"})}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+    repo.ddl.clear()
+
+    store.model = "bge"
+    for _ in range(4):
+        await manager.step()
+    # 第 2 行失败：一轮扫描结束后重新扫描，仍在使用旧列
+    assert await manager.serving_model(FORUM) == "qwen"
+    assert "bge_embedding" not in repo.tables[FORUM][2]
+    assert not any("DROP INDEX" in ddl and "qwen" in ddl for ddl in repo.ddl)
+    (progress,) = await manager.progress()
+    assert "1 行嵌入失败" in progress["last_error"]
+
+    services["bge"].empty_for.clear()
+    await _drain(manager)
+    assert repo.tables[FORUM][2]["bge_embedding"] == [0.1, 0.2]
+    assert await manager.serving_model(FORUM) == "bge"
+    assert services["bge"].batches[-1] == ["text 2"]
+
+
+@pytest.mark.asyncio
+async def test_all_none_batch_keeps_cursor_instead_of_skipping_rows():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(4)})
+    services = {"qwen": _FakeService(), "bge": _FakeService(outage=True)}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+
+    store.model = "bge"
+    for _ in range(10):
+        await manager.step()
+    # 整批无向量视为服务故障：一直重试第一批，既不推进游标也不开始新一轮扫描
+    assert services["bge"].batches == [["text 1", "text 2"]] * 10
+    (progress,) = await manager.progress()
+    assert progress["processed"] == 0
+    assert progress["failed"] == 0
+    assert "嵌入服务故障" in progress["last_error"]
+    assert await manager.serving_model(FORUM) == "qwen"
+
+    services["bge"].outage = False
+    await _drain(manager)
+    assert await manager.serving_model(FORUM) == "bge"
+    assert all("bge_embedding" in row for row in repo.tables[FORUM].values())
+    assert (await manager.progress())[0]["unembedded"] == 0
+
+
+@pytest.mark.asyncio
+async def test_row_that_always_fails_stops_blocking_after_max_passes():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(3)})
+    services = {"qwen": _FakeService(), "bge": _FakeService(empty_for={"text 2"})}
+    manager = _manager(store, repo, services, MAX_PASSES=2, MAX_BATCH_RETRIES=1)
+    await _drain(manager)
+
+    store.model = "bge"
+    await _drain(manager)
+
+    # 第 2 行始终失败：两轮扫描后照常切换，该行保持 NULL 并在进度中报告
+    assert await manager.serving_model(FORUM) == "bge"
+    assert "bge_embedding" not in repo.tables[FORUM][2]
+    assert repo.tables[FORUM][3]["bge_embedding"] == [0.1, 0.2]
+    (progress,) = await manager.progress()
+    assert progress["unembedded"] == 1
+    assert "1 行未能生成向量" in await manager.format_progress()
+
+
+@pytest.mark.asyncio
+async def test_state_read_error_is_raised_instead_of_resetting():
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(4)})
+    services = {"qwen": _FakeService(), "bge": _FakeService()}
+    manager = _manager(store, repo, services)
+    await _drain(manager)
+    store.model = "bge"
+    await manager.step()
+    saved = store.state
+
+    async def broken_load():
+        raise ConnectionError("db down")
+
+    restarted = _manager(store, repo, services)
+    store.load_state = broken_load
+    with pytest.raises(ConnectionError):
+        await restarted.serving_model(FORUM)
+    assert store.state == saved
+
+    # 恢复后从断点继续，回填完成前仍使用旧列
+    del store.load_state
+    assert await restarted.serving_model(FORUM) == "qwen"
+    assert json.loads(store.state)[FORUM]["last_id"] == 2
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_keeps_only_serving_column_and_storage_mode(monkeypatch):
+    monkeypatch.setattr(lifecycle_module, "get_storage_mode", lambda: "binary")
+    store = _FakeStore("qwen")
+    repo = _FakeRepository({FORUM: _rows(2)})
+    manager = _manager(store, repo, {"qwen": _FakeService(), "bge": _FakeService()})
+
+    await manager.ensure_indexes()
+
+    created = [ddl for ddl in repo.ddl if ddl.startswith("CREATE INDEX CONCURRENTLY")]
+    assert len(created) == 2
+    assert any("idx_forum_qwen_embedding_hnsw" in ddl for ddl in created)
+    assert any("idx_forum_qwen_embedding_bq_hnsw" in ddl for ddl in created)
+    dropped = [ddl for ddl in repo.ddl if ddl.startswith("DROP INDEX")]
+    # 检索列上其他存储模式的量化索引
+    assert any("idx_forum_qwen_embedding_t" in ddl for ddl in dropped)
+    assert not any("idx_forum_qwen_embedding_hnsw" in ddl for ddl in dropped)
+    assert not any("idx_forum_qwen_embedding_bq_hnsw" in ddl for ddl in dropped)
+    # 不再检索的列上的全部索引
+    assert sum("idx_forum_bge_embedding" in ddl for ddl in dropped) == 3
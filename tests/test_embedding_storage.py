@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+向量存储模式测试：各模式生成的检索 SQL、候选数与 ef_search 设置，
+各搜索场景的 HNSW 参数，以及查询表达式与表达式索引、迁移回滚所删索引的一致性。
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from src.chat.services import embedding_storage
+from src.chat.services.embedding_storage import (
+    build_semantic_search_sql,
+    hnsw_index,
+    hnsw_session_settings,
+    prepare_vector_search,
+    quantized_expr,
+    rescore_candidates,
+)
+
+MIGRATION = (
+    Path(__file__).resolve().parent.parent
+    / "alembic"
+    / "versions"
+    / "add_quantized_embedding_indexes.py"
+)
+
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("quantized_migration", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class _RecordingSession:
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, statement, params=None):
+        self.calls.append((str(statement), params))
+
+
+def test_full_mode_searches_the_full_precision_column():
+    sql = build_semantic_search_sql(
+        columns="ft.id",
+        from_clause="forum.forum_threads ft",
+        column="ft.qwen_embedding",
+        mode="full",
+    )
+    assert "ORDER BY ft.qwen_embedding <=> CAST(:query_vector AS halfvec)" in sql
+    assert "ft.qwen_embedding IS NOT NULL" in sql
+    assert ":ann_candidates" not in sql
+
+
+@pytest.mark.parametrize(
+    "mode, ann_order",
+    [
+        (
+            "binary",
+            "binary_quantize(id_col)::bit(1024) <~> "
+            "binary_quantize(CAST(:query_vector AS halfvec))::bit(1024)",
+        ),
+        (
+            "truncated",
+            "subvector(id_col, 1, 256)::halfvec(256) <=> "
+            "subvector(CAST(:query_vector AS halfvec), 1, 256)::halfvec(256)",
+        ),
+    ],
+)
+def test_quantized_modes_rescore_candidates_with_full_precision(mode, ann_order):
+    sql = build_semantic_search_sql(
+        columns="id",
+        from_clause="conversation.conversation_blocks",
+        column="id_col",
+        where="discord_id = :discord_id",
+        mode=mode,
+    )
+    # 第一阶段按量化距离取候选，第二阶段按全精度距离排序
+    assert f"ORDER BY {ann_order}" in sql
+    assert "LIMIT :ann_candidates" in sql
+    assert "id_col <=> CAST(:query_vector AS halfvec) as vector_distance" in sql
+    assert sql.rstrip().endswith(
+        "ORDER BY candidates.vector_distance\n            LIMIT :top_k_vector"
+    )
+    assert "discord_id = :discord_id" in sql
+
+
+@pytest.mark.asyncio
+async def test_prepare_raises_ef_search_only_for_quantized_modes():
+    session = _RecordingSession()
+    assert await prepare_vector_search(session, 10, mode="full") == {}
+    assert session.calls == []
+
+    params = await prepare_vector_search(session, 20, mode="binary")
+    assert params == {"ann_candidates": rescore_candidates(20)}
+    ((statement, bound),) = session.calls
+    assert "hnsw.ef_search" in statement
+    assert bound == {"ef_search": str(rescore_candidates(20))}
+
+
+def test_candidate_count_has_a_floor():
+    assert rescore_candidates(3) == 40
+    assert rescore_candidates(20) == 80
+
+
+def test_unknown_mode_falls_back_to_full(monkeypatch):
+    monkeypatch.setitem(embedding_storage.EMBEDDING_STORAGE_CONFIG, "MODE", "pq")
+    assert embedding_storage.get_storage_mode() == "full"
+
+
+def test_index_expressions_match_query_expressions():
+    for table, _ in embedding_storage.VECTOR_TABLES:
+        for column in embedding_storage.EMBEDDING_COLUMNS:
+            for mode in ("binary", "truncated"):
+                _, ddl = hnsw_index(table, column, mode)
+                assert f"USING hnsw (({quantized_expr(column, mode)}) " in ddl
+
+
+def test_migration_downgrade_drops_the_indexes_hnsw_index_creates():
+    migration = _load_migration()
+    assert migration.TRUNCATE_DIM == (
+        embedding_storage.EMBEDDING_STORAGE_CONFIG["TRUNCATE_DIM"]
+    )
+    assert [
+        (f"{schema}.{table}", prefix)
+        for schema, table, prefix in migration.VECTOR_TABLES
+    ] == embedding_storage.VECTOR_TABLES
+    assert set(migration._index_names()) == {
+        hnsw_index(table, column, mode)[0]
+        for table, _ in embedding_storage.VECTOR_TABLES
+        for column in embedding_storage.EMBEDDING_COLUMNS
+        for mode in ("binary", "truncated")
+    }
+
+
+def test_full_precision_index_keeps_table_index_name():
+    # 全精度索引沿用建表时的名字（教程表没有前缀）
+    assert hnsw_index("tutorials.knowledge_chunks", "bge_embedding", "full")[0] == (
+        "tutorials.idx_bge_embedding_hnsw"
+    )
+    assert hnsw_index("forum.forum_threads", "qwen_embedding", "full")[0] == (
+        "forum.idx_forum_qwen_embedding_hnsw"
+    )
+
+
+def test_vector_param_renames_the_bound_query_vector():
+    sql = build_semantic_search_sql(
+        columns="id",
+        from_clause="community.member_chunks",
+        column="bge_embedding",
+        mode="binary",
+        vector_param="community_vector",
+    )
+    assert ":query_vector" not in sql
+    assert "binary_quantize(CAST(:community_vector AS halfvec))" in sql
+    assert "bge_embedding <=> CAST(:community_vector AS halfvec)" in sql
+
+
+@pytest.mark.asyncio
+async def test_profile_sets_ef_search_and_iterative_scan_in_one_statement():
+    session = _RecordingSession()
+    params = await prepare_vector_search(
+        session, 10, mode="full", profile="conversation"
+    )
+    assert params == {}
+    ((statement, bound),) = session.calls
+    assert "set_config('hnsw.ef_search', :ef_search, true)" in statement
+    assert "set_config('hnsw.iterative_scan', :iterative_scan, true)" in statement
+    assert bound == {
+        "ef_search": "40",
+        "iterative_scan": "strict_order",
+        "max_scan_tuples": "20000",
+    }
+
+
+def test_profile_ef_search_covers_requested_rows(monkeypatch):
+    monkeypatch.setitem(
+        embedding_storage.VECTOR_SEARCH_PROFILES,
+        "forum",
+        {"EF_SEARCH": 64, "ITERATIVE_SCAN": "relaxed_order"},
+    )
+    assert hnsw_session_settings("forum", 10, "full") == {
+        "hnsw.ef_search": "64",
+        # 全精度模式没有外层重排，relaxed_order 退回 strict_order
+        "hnsw.iterative_scan": "strict_order",
+        "hnsw.max_scan_tuples": "20000",
+    }
+    settings = hnsw_session_settings("forum", 5000, "binary")
+    assert settings["hnsw.ef_search"] == "1000"
+    assert settings["hnsw.iterative_scan"] == "relaxed_order"
+    assert hnsw_session_settings("tutorial", 80, "binary") == {
+        "hnsw.ef_search": "80"
+    }
+
+
+def test_index_parameters_follow_table_profile(monkeypatch):
+    monkeypatch.setitem(
+        embedding_storage.VECTOR_SEARCH_PROFILES,
+        "conversation",
+        {"M": 24, "EF_CONSTRUCTION": 128},
+    )
+    _, ddl = hnsw_index("conversation.conversation_blocks", "qwen_embedding", "full")
+    assert ddl.endswith("WITH (m = 24, ef_construction = 128)")
+    _, ddl = hnsw_index("forum.forum_threads", "qwen_embedding", "full")
+    assert ddl.endswith("WITH (m = 16, ef_construction = 64)")
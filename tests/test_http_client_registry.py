@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+HttpClientRegistry 单元测试（不访问外部网络，使用 httpx.MockTransport 与本地 aiohttp 服务）
+"""
+
+import asyncio
+import importlib.util
+
+import httpcore
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.chat.services import http_client_registry as registry_module
+from src.chat.services.http_client_registry import HttpClientRegistry
+
+
+def _registry_with_mock(handler) -> HttpClientRegistry:
+    registry = HttpClientRegistry()
+    registry._transports[None] = httpx.MockTransport(handler)
+    return registry
+
+
+@pytest.mark.asyncio
+async def test_same_base_url_and_headers_reuse_client():
+    registry = _registry_with_mock(lambda request: httpx.Response(200))
+
+    a = registry.get_client("https://api.example.com/v1", headers={"X": "1"})
+    b = registry.get_client("https://api.example.com/v1/", headers={"X": "1"})
+    c = registry.get_client("https://api.example.com/v1", headers={"X": "2"})
+
+    assert a is b
+    assert a is not c
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_closed_client_is_recreated():
+    registry = _registry_with_mock(lambda request: httpx.Response(200))
+
+    client = registry.get_client("https://api.example.com")
+    await client.aclose()
+
+    assert registry.get_client("https://api.example.com") is not client
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_per_host_metrics_are_recorded():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/boom":
+            raise httpx.ConnectError("boom", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    registry = _registry_with_mock(handler)
+    client = registry.get_client("https://api.example.com")
+
+    response = await client.get("/ok")
+    assert response.json() == {"ok": True}
+    with pytest.raises(httpx.ConnectError):
+        await client.get("/boom")
+
+    metrics = {m["host"]: m for m in registry.get_host_metrics()}
+    stats = metrics["api.example.com"]
+    assert stats["requests"] == 2
+    assert stats["errors"] == 1
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_client_aclose_does_not_close_shared_transport():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        return httpx.Response(200)
+
+    registry = _registry_with_mock(handler)
+    first = registry.get_client("https://a.example.com")
+    second = registry.get_client("https://b.example.com")
+
+    await first.aclose()
+    await second.get("/")
+
+    assert calls == ["b.example.com"]
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_use_proxy_routes_through_proxy_url(monkeypatch):
+    monkeypatch.setattr(registry_module.config, "PROXY_URL", "http://proxy:8080")
+    routes = []
+    registry = HttpClientRegistry()
+    registry._transports[None] = httpx.MockTransport(
+        lambda request: routes.append("direct") or httpx.Response(200)
+    )
+    registry._transports["http://proxy:8080"] = httpx.MockTransport(
+        lambda request: routes.append("proxy") or httpx.Response(200)
+    )
+
+    await registry.get_client(use_proxy=True).get("https://discord.com/api/users/@me")
+    await registry.get_client().get("http://127.0.0.1:11434/api/tags")
+
+    assert routes == ["proxy", "direct"]
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_other_clients_follow_environment_proxies(monkeypatch):
+    monkeypatch.setenv("HTTPS_PROXY", "http://env-proxy:3128")
+    monkeypatch.setenv("NO_PROXY", "internal.example.com,127.0.0.1")
+    for name in ("https_proxy", "no_proxy", "HTTP_PROXY", "http_proxy", "ALL_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+    routes = []
+    registry = HttpClientRegistry()
+    registry._transports[None] = httpx.MockTransport(
+        lambda request: routes.append("direct") or httpx.Response(200)
+    )
+    registry._transports["http://env-proxy:3128"] = httpx.MockTransport(
+        lambda request: routes.append("proxy") or httpx.Response(200)
+    )
+
+    client = registry.get_client()
+    await client.get("https://api.example.com/")
+    await client.get("https://internal.example.com/")
+    await client.get("https://127.0.0.1/")
+
+    assert routes == ["proxy", "direct", "direct"]
+    await registry.aclose()
+
+
+class _FakePool:
+    def __init__(self):
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        return httpcore.Response(200, content=b"ok")
+
+    async def aclose(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_requests_per_host_are_limited(monkeypatch):
+    monkeypatch.setitem(
+        registry_module.HTTP_CLIENT_CONFIG, "MAX_CONNECTIONS_PER_HOST", 1
+    )
+    registry = HttpClientRegistry()
+    transport = registry._transports[None] = registry_module._PoolTransport(
+        registry, None
+    )
+    pool = transport._pool = _FakePool()
+    client = registry.get_client(timeout=httpx.Timeout(5.0, pool=0.05))
+
+    async with client.stream("GET", "https://a.example.com/") as response:
+        # 第一条响应未读完前，同一主机的请求拿不到名额，其他主机不受影响
+        with pytest.raises(httpx.PoolTimeout):
+            await client.get("https://a.example.com/")
+        assert (await client.get("https://b.example.com/")).content == b"ok"
+        await response.aread()
+    assert (await client.get("https://a.example.com/")).content == b"ok"
+    assert pool.requests == 3
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pool_errors_are_raised_as_httpx_errors():
+    class _FailingPool(_FakePool):
+        async def handle_async_request(self, request):
+            raise httpcore.ConnectTimeout("timed out")
+
+    registry = HttpClientRegistry()
+    transport = registry._transports[None] = registry_module._PoolTransport(
+        registry, None
+    )
+    transport._pool = _FailingPool()
+
+    with pytest.raises(httpx.ConnectTimeout):
+        await registry.get_client().get("https://a.example.com/")
+    # 失败的请求释放了主机名额
+    assert not transport._host_slots["a.example.com"].locked()
+    await registry.aclose()
+
+
+@pytest.mark.asyncio
+async def test_aiohttp_ttfb_is_measured_at_response_headers():
+    async def slow_body(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await asyncio.sleep(0.2)
+        await response.write(b"done")
+        return response
+
+    app = web.Application()
+    app.router.add_get("/", slow_body)
+    registry = HttpClientRegistry()
+    async with TestServer(app) as server:
+        session = registry.get_aiohttp_session()
+        async with session.get(server.make_url("/")) as response:
+            assert await response.read() == b"done"
+        await registry.aclose()
+
+    (stats,) = registry.get_host_metrics()
+    assert stats["avg_ttfb_ms"] < 150
+    assert stats["avg_latency_ms"] >= 200
+
+
+@pytest.mark.asyncio
+async def test_proxy_credentials_are_sent_to_the_proxy(monkeypatch):
+    received = []
+
+    async def fake_proxy(reader, writer):
+        received.append(await reader.readuntil(b"\r\n\r\n"))
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(fake_proxy, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    monkeypatch.setattr(
+        registry_module.config, "PROXY_URL", f"http://user:pw@127.0.0.1:{port}"
+    )
+    registry = HttpClientRegistry()
+    async with server:
+        response = await registry.get_client(use_proxy=True).get(
+            "http://discord.example/api"
+        )
+    assert response.content == b"ok"
+    (request,) = received
+    assert request.startswith(b"GET http://discord.example/api HTTP/1.1")
+    # base64("user:pw")
+    assert b"Proxy-Authorization: Basic dXNlcjpwdw==" in request
+    await registry.aclose()
+
+
+def test_socks_proxy_uses_socks_pool():
+    registry = HttpClientRegistry()
+    if importlib.util.find_spec("socksio") is None:
+        with pytest.raises(ImportError):
+            registry_module._PoolTransport(registry, "socks5://127.0.0.1:1080")
+    else:
+        transport = registry_module._PoolTransport(registry, "socks5://127.0.0.1:1080")
+        assert isinstance(transport._pool, httpcore.AsyncSOCKSProxy)
+
+
+@pytest.mark.asyncio
+async def test_rotated_api_key_replaces_the_cached_client():
+    seen = []
+    registry = _registry_with_mock(
+        lambda request: seen.append(request.headers["authorization"])
+        or httpx.Response(200)
+    )
+
+    for key in ("k1", "k2", "k3"):
+        client = registry.get_client(
+            "https://api.example.com", headers={"Authorization": f"Bearer {key}"}
+        )
+        await client.get("/")
+
+    assert seen == ["Bearer k1", "Bearer k2", "Bearer k3"]
+    assert len(registry._clients) == 1
+    await registry.aclose()
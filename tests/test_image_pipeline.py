@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+图片处理流水线测试：draft 快速缩放、按目标大小搜索质量、线程池背压与附件并发读取。
+"""
+
+import asyncio
+import io
+import random
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from src.chat.services.image_pipeline import ImagePipeline
+from src.chat.services.message_processor import MessageProcessor
+from src.chat.utils import image_utils
+
+
+def _noisy_jpeg(width: int, height: int, quality: int = 95) -> bytes:
+    """随机噪声图片几乎不可压缩，便于构造大文件"""
+    rng = random.Random(0)
+    img = Image.frombytes(
+        "RGB", (width, height), bytes(rng.getrandbits(8) for _ in range(width * height * 3))
+    )
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def test_compress_to_jpeg_downscales_and_records_timings():
+    data = _noisy_jpeg(1600, 1200)
+    timings = {}
+
+    out, mime = image_utils.compress_to_jpeg(data, 400, 75, timings=timings)
+
+    assert mime == "image/jpeg"
+    with Image.open(io.BytesIO(out)) as img:
+        assert max(img.size) == 400
+        assert img.size == (400, 300)
+    assert set(timings) == {"decode", "encode"}
+
+
+def test_encode_within_size_finds_highest_fitting_quality():
+    with Image.open(io.BytesIO(_noisy_jpeg(400, 400))) as img:
+        img.load()
+        sizes = {}
+        for q in range(30, 91):
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=q)
+            sizes[q] = len(buf.getvalue())
+        target = sizes[60]
+
+        data, quality, fitted = image_utils.encode_within_size(
+            img, "JPEG", target, 30, 90
+        )
+
+    assert fitted
+    assert len(data) <= target
+    assert quality == max(q for q, size in sizes.items() if size <= target)
+
+
+def test_encode_within_size_reports_unreachable_target():
+    with Image.open(io.BytesIO(_noisy_jpeg(200, 200))) as img:
+        img.load()
+        data, quality, fitted = image_utils.encode_within_size(img, "JPEG", 10, 40, 80)
+
+    assert not fitted
+    assert quality == 40
+    assert len(data) > 10
+
+
+@pytest.mark.asyncio
+async def test_pipeline_limits_pending_work():
+    pipeline = ImagePipeline(max_workers=4, max_pending=2, timeout=5)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work(value, timings):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        timings["work"] = 20.0
+        return value * 2
+
+    try:
+        results = await asyncio.gather(*(pipeline.run(work, i) for i in range(8)))
+    finally:
+        pipeline.shutdown()
+
+    assert results == [i * 2 for i in range(8)]
+    assert peak <= 2
+    assert pipeline.pending == 0
+    metrics = pipeline.get_metrics()["stages"]
+    assert metrics["work"]["count"] == 8
+    assert metrics["queue"]["count"] == 8
+
+
+@pytest.mark.asyncio
+async def test_pipeline_timeout_keeps_slot_until_worker_finishes():
+    pipeline = ImagePipeline(max_workers=1, max_pending=1, timeout=0.01)
+    done = threading.Event()
+
+    def slow(timings):
+        time.sleep(0.1)
+        done.set()
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await pipeline.run(slow)
+        # 超时后工作线程仍在运行，槽位不应提前释放
+        assert pipeline.pending == 1
+        await asyncio.get_running_loop().run_in_executor(None, done.wait)
+        await asyncio.sleep(0.01)
+        assert pipeline.pending == 0
+        assert pipeline.timeouts == 1
+    finally:
+        pipeline.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_attachments_are_read_concurrently_in_order():
+    class FakeAttachment:
+        def __init__(self, name, delay, content_type="image/png"):
+            self.filename = name
+            self.content_type = content_type
+            self._delay = delay
+
+        async def read(self):
+            await asyncio.sleep(self._delay)
+            return self.filename.encode()
+
+    attachments = [
+        FakeAttachment("a", 0.05),
+        FakeAttachment("doc", 0.0, content_type="text/plain"),
+        FakeAttachment("b", 0.01),
+        FakeAttachment("c", 0.03),
+    ]
+
+    started = time.perf_counter()
+    result = await MessageProcessor()._extract_images_from_attachments(attachments)
+    elapsed = time.perf_counter() - started
+
+    assert [r["data"] for r in result] == [b"a", b"b", b"c"]
+    assert all(r["source"] == "attachment" for r in result)
+    assert elapsed < 0.08
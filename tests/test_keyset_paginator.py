@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+KeysetPaginator 单元测试（使用内存 SQLite，不依赖 ParadeDB）
+"""
+
+import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.chat.features.admin_panel.services import keyset_paginator
+from src.chat.features.admin_panel.services.keyset_paginator import KeysetPaginator
+
+BASE_TIME = datetime.datetime(2025, 1, 1)
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "CREATE TABLE blocks (id INTEGER PRIMARY KEY, discord_id TEXT, "
+                "start_time TIMESTAMP, embedding BLOB)"
+            )
+        )
+        # 23 行，其中若干行 start_time 相同，用于验证 id 作为并列排序键
+        for i in range(1, 24):
+            await conn.execute(
+                text(
+                    "INSERT INTO blocks (id, discord_id, start_time, embedding) "
+                    "VALUES (:id, :uid, :ts, :emb)"
+                ),
+                {
+                    "id": i,
+                    "uid": "1" if i % 2 else "2",
+                    "ts": BASE_TIME + datetime.timedelta(hours=i // 3),
+                    "emb": b"\x00" * 2048,
+                },
+            )
+    keyset_paginator.invalidate_aggregates()
+    yield async_sessionmaker(engine)
+    await engine.dispose()
+
+
+def _paginator(factory, **kwargs):
+    return KeysetPaginator(
+        "blocks",
+        columns=["id", "discord_id", "start_time", "embedding IS NOT NULL AS has_emb"],
+        order_by=["start_time", "id"],
+        page_size=5,
+        session_factory=factory,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_sequential_pages_cover_all_rows_in_order(session_factory):
+    paginator = _paginator(session_factory)
+    assert await paginator.count() == 23
+    assert paginator.total_pages == 5
+
+    seen = []
+    for page in range(paginator.total_pages):
+        rows = await paginator.get_page(page)
+        assert "embedding" not in rows[0]
+        seen.extend(r["id"] for r in rows)
+
+    assert seen == sorted(range(1, 24), key=lambda i: (i // 3, i), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_jump_matches_sequential_and_filter_applies(session_factory):
+    sequential = _paginator(session_factory, where="discord_id = :uid", params={"uid": "1"})
+    expected = [await sequential.get_page(p) for p in range(3)]
+
+    jumper = _paginator(session_factory, where="discord_id = :uid", params={"uid": "1"})
+    assert await jumper.get_page(2) == expected[2]
+    assert await jumper.get_page(1) == expected[1]
+    assert await jumper.get_page(9) == []
+    assert await jumper.count() == 12
+
+
+@pytest.mark.asyncio
+async def test_count_is_cached_until_invalidated(session_factory):
+    paginator = _paginator(session_factory)
+    assert await paginator.count() == 23
+
+    async with session_factory() as session:
+        await session.execute(text("DELETE FROM blocks WHERE id = 1"))
+        await session.commit()
+
+    assert await paginator.count() == 23
+    paginator.invalidate()
+    assert await paginator.count() == 22
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+知识库检索缓存测试：相同查询与只差虚词的相近查询命中、相似度不足、
+区分性检索词（如成员名字）不同或模型不同不命中、
+失效（包括检索期间失效）与统计，knowledge_search_service.search 接入缓存后的行为，
+以及增量 RAG 删除条目时的失效。
+"""
+
+import pytest
+
+from src.chat.features.world_book.services import (
+    knowledge_search_service as search_module,
+)
+from src.chat.features.world_book.services.knowledge_result_cache import (
+    KnowledgeResultCache,
+)
+
+KEY = ("qwen_embedding", "qwen_embedding")
+RESULTS = [{"id": 1, "content": "成员资料", "distance": 0.98, "metadata": {}}]
+
+
+def _cache(**config):
+    return KnowledgeResultCache(
+        {
+            "ENABLED": True,
+            "SIMILARITY_THRESHOLD": 0.95,
+            "TTL_SECONDS": 60,
+            "MAX_ENTRIES": 10,
+            **config,
+        }
+    )
+
+
+def _put(cache, query, vector, results=RESULTS, key=KEY):
+    cache.put(key, query, [vector, vector], results, cache.generation, 30.0, 70.0)
+
+
+def test_exact_query_hits_without_embedding():
+    cache = _cache()
+    _put(cache, "小明是谁", [1.0, 0.0, 0.0])
+
+    assert cache.get_exact(KEY, "小明是谁") == RESULTS
+    assert cache.get_exact(KEY, "小红是谁") is None
+    assert cache.metrics()["exact_hits"] == 1
+    assert cache.saved_ms == pytest.approx(100.0)
+
+
+def test_similar_query_hits_above_threshold_only():
+    cache = _cache()
+    _put(cache, "小明是谁", [1.0, 0.0, 0.0])
+
+    # 余弦相似度约 0.995
+    close = [1.0, 0.1, 0.0]
+    assert cache.get_similar(KEY, "是谁 小明", [close, close]) == RESULTS
+    # 余弦相似度约 0.707
+    far = [1.0, 1.0, 0.0]
+    assert cache.get_similar(KEY, "是谁 小明", [far, far]) is None
+
+    m = cache.metrics()
+    assert (m["semantic_hits"], m["misses"]) == (1, 1)
+    assert m["hit_rate"] == pytest.approx(0.5)
+
+
+def test_every_table_vector_must_be_similar():
+    cache = _cache()
+    cache.put(
+        KEY, "小明是谁", [[1.0, 0.0], [0.0, 1.0]], RESULTS, cache.generation, 0, 0
+    )
+    assert cache.get_similar(KEY, "小明是谁", [[1.0, 0.0], [1.0, 0.0]]) is None
+    assert cache.get_similar(KEY, "小明是谁", [[1.0, 0.0], [0.0, 1.0]]) == RESULTS
+
+
+def test_semantic_hit_requires_the_same_discriminating_terms():
+    cache = _cache()
+    _put(cache, "小明喜欢什么游戏", [1.0, 0.0])
+    _put(cache, "Who is Alice", [0.0, 1.0])
+
+    # 只差一个名字的问题，向量几乎相同也不能命中
+    assert cache.get_similar(KEY, "小红喜欢什么游戏", [[1.0, 0.0]] * 2) is None
+    assert cache.get_similar(KEY, "Who is Bob", [[0.0, 1.0]] * 2) is None
+    assert cache.get_similar(KEY, "谁是 小明", [[1.0, 0.0]] * 2) is None
+
+
+def test_paraphrase_differing_only_in_particles_hits_by_similarity():
+    cache = _cache()
+    _put(cache, "小明是谁", [1.0, 0.0, 0.0])
+
+    close = [1.0, 0.1, 0.0]
+    assert cache.get_similar(KEY, "小明是谁啊", [close, close]) == RESULTS
+    assert cache.get_similar(KEY, "介绍一下小明吧", [close, close]) == RESULTS
+    # 虚词不同时仍以余弦相似度为准
+    far = [1.0, 1.0, 0.0]
+    assert cache.get_similar(KEY, "请问小明是谁呢", [far, far]) is None
+    assert cache.get_similar(KEY, "小红是谁", [close, close]) is None
+
+
+def test_entries_are_grouped_by_embedding_columns():
+    cache = _cache()
+    _put(cache, "小明是谁", [1.0, 0.0], key=("bge_embedding", "bge_embedding"))
+
+    assert cache.get_exact(KEY, "小明是谁") is None
+    assert cache.get_similar(KEY, "小明是谁", [[1.0, 0.0], [1.0, 0.0]]) is None
+
+
+def test_returned_results_are_copies():
+    cache = _cache()
+    _put(cache, "小明是谁", [1.0, 0.0])
+
+    cache.get_exact(KEY, "小明是谁")[0]["metadata"]["source_table"] = "改过"
+    assert cache.get_exact(KEY, "小明是谁") == RESULTS
+
+
+def test_invalidate_drops_entries_and_inflight_results():
+    cache = _cache()
+    _put(cache, "小明是谁", [1.0, 0.0])
+    generation = cache.generation
+
+    cache.invalidate("写入条目 1")
+    assert cache.get_exact(KEY, "小明是谁") is None
+
+    # 失效前开始的检索，结果不写入缓存
+    cache.put(KEY, "小明是谁", [[1.0, 0.0]] * 2, RESULTS, generation, 0, 0)
+    assert len(cache) == 0
+    assert cache.metrics()["invalidations"] == 1
+
+
+def test_lru_and_ttl_bounds(monkeypatch):
+    cache = _cache(MAX_ENTRIES=2, TTL_SECONDS=10)
+    _put(cache, "a", [1.0, 0.0])
+    _put(cache, "b", [0.0, 1.0])
+    cache.get_exact(KEY, "a")
+    _put(cache, "c", [1.0, 1.0])
+    assert cache.get_exact(KEY, "b") is None
+    assert cache.get_exact(KEY, "a") == RESULTS
+
+    from src.chat.features.world_book.services import knowledge_result_cache as mod
+
+    now = mod.time.monotonic()
+    monkeypatch.setattr(mod.time, "monotonic", lambda: now + 11)
+    assert cache.get_exact(KEY, "a") is None
+    assert len(cache) == 0
+
+
+class _FakeEmbeddingService:
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = 0
+
+    async def generate_embedding(self, text, task_type):
+        self.calls += 1
+        return self.vectors[text]
+
+
+class _FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def search(monkeypatch):
+    cache = _cache()
+    embedding = _FakeEmbeddingService(
+        {
+            "小明是谁": [1.0, 0.0, 0.0],
+            "谁是小明": [1.0, 0.05, 0.0],
+            "介绍一下小明吧": [1.0, 0.08, 0.0],
+            "小红是谁": [1.0, 0.02, 0.0],
+            "服务器规则": [0.0, 1.0, 0.0],
+        }
+    )
+    calls = []
+
+    async def fake_column(table=None):
+        return "qwen_embedding"
+
+    async def fake_service(mode=None, table=None):
+        return embedding
+
+    async def fake_hybrid(self, session, query_text, query_vectors):
+        calls.append(query_text)
+        return [
+            {
+                "document_id": 7,
+                "source_table": "community",
+                "chunk_text": f"结果 {query_text}",
+                "rrf_score": 0.03,
+            }
+        ]
+
+    monkeypatch.setattr(search_module, "knowledge_result_cache", cache)
+    monkeypatch.setattr(search_module, "is_vector_enabled", lambda: True)
+    monkeypatch.setattr(search_module, "get_embedding_column", fake_column)
+    monkeypatch.setattr(search_module, "get_embedding_service", fake_service)
+    monkeypatch.setattr(search_module, "AsyncSessionLocal", _FakeSession)
+    monkeypatch.setattr(
+        search_module.KnowledgeSearchService, "_hybrid_search_chunks", fake_hybrid
+    )
+    return search_module.KnowledgeSearchService(), cache, embedding, calls
+
+
+@pytest.mark.asyncio
+async def test_search_answers_repeat_and_similar_queries_from_cache(search):
+    service, cache, embedding, calls = search
+
+    first = await service.search("小明是谁")
+    assert await service.search("小明是谁") == first
+    # 清理后相同的查询按相同查询处理
+    assert await service.search("小明是谁？") == first
+    assert await service.search("谁是小明") == first
+    assert await service.search("介绍一下小明吧") == first
+    assert len(calls) == 1
+    # 相同查询连查询向量也不生成
+    assert embedding.calls == 3
+
+    await service.search("服务器规则")
+    assert len(calls) == 2
+
+    m = cache.metrics()
+    assert (m["exact_hits"], m["semantic_hits"], m["misses"]) == (2, 2, 2)
+
+
+@pytest.mark.asyncio
+async def test_queries_differing_only_in_member_name_are_searched_separately(
+    search,
+):
+    service, cache, _, calls = search
+
+    first = await service.search("小明是谁")
+    second = await service.search("小红是谁")
+    assert calls == ["小明是谁", "小红是谁"]
+    assert second != first
+    assert cache.metrics()["semantic_hits"] == 0
+
+
+class _FakeCursor:
+    def execute(self, sql, params):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def cursor(self):
+        return _FakeCursor()
+
+    def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_incremental_rag_delete_invalidates_search_cache(search, monkeypatch):
+    from src.chat.features.world_book.services import incremental_rag_service as rag
+
+    service, cache, _, calls = search
+    monkeypatch.setattr(rag, "knowledge_result_cache", cache)
+    monkeypatch.setattr(
+        rag.incremental_rag_service, "_get_parade_connection", _FakeConnection
+    )
+
+    await service.search("小明是谁")
+    assert await rag.incremental_rag_service._delete_entry_from_parade("7", "community")
+    await service.search("小明是谁")
+    assert len(calls) == 2
+    assert cache.metrics()["invalidations"] == 1
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+排行榜内存物化视图测试（不连接数据库）：增量更新、名次查询与对账，
+以及排行榜界面中与列表一致的个人名次。
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from src.chat.services.leaderboard_service import LeaderboardService, RankedBoard
+
+
+def _expected(values, min_value=0):
+    rows = [(k, v) for k, v in values.items() if v > min_value]
+    return sorted(rows, key=lambda kv: (-kv[1], kv[0]))
+
+
+def test_incremental_updates_match_full_sort():
+    rng = random.Random(7)
+    board = RankedBoard("coins", min_value=0)
+    values = {}
+    for _ in range(2000):
+        key = rng.randrange(200)
+        value = rng.randrange(-5, 1000)
+        board.update(key, value)
+        values[key] = value
+
+    expected = _expected(values)
+    assert list(board.iter_ranked()) == expected
+    assert board.top(5) == expected[:5]
+    for rank, (key, _) in enumerate(expected, start=1):
+        assert board.rank_of(key) == rank
+
+
+def test_non_qualifying_value_leaves_board():
+    board = RankedBoard("coins", min_value=0)
+    board.update(1, 50)
+    board.update(2, 50)
+    assert board.rank_of(2) == 2
+
+    board.update(1, 0)
+    assert board.rank_of(1) is None
+    assert board.rank_of(2) == 1
+    assert len(board) == 1
+
+
+def test_updates_during_reload_survive_stale_snapshot():
+    board = RankedBoard("coins", min_value=0)
+    board.begin_reload()
+    board.update(1, 300)
+    # 数据库快照在更新之前读取，仍是旧值
+    board.finish_reload([(1, 100), (2, 200)])
+
+    assert board.top(2) == [(1, 300), (2, 200)]
+    assert board.loaded
+
+
+class _FakeService(LeaderboardService):
+    def __init__(self):
+        super().__init__(reconcile_interval=0)
+        self.coin_rows = [(1, 10), (2, 20)]
+        self.faction_rows = {"e1": [("red", 5), ("blue", 9)]}
+        self.loads = 0
+
+    async def _load_coins(self):
+        self.loads += 1
+        await asyncio.sleep(0)
+        return list(self.coin_rows)
+
+    async def _load_faction_points(self, event_id):
+        await asyncio.sleep(0)
+        return list(self.faction_rows.get(event_id, []))
+
+
+@pytest.mark.asyncio
+async def test_board_loads_once_and_reconcile_fixes_drift():
+    service = _FakeService()
+    boards = await asyncio.gather(*(service.get_coin_board() for _ in range(5)))
+    assert all(board is service.coins for board in boards)
+    assert service.loads == 1
+
+    service.record_coin_balance(1, 50)
+    assert service.coins.rank_of(1) == 1
+
+    # 未挂钩的写入路径改变了数据库，对账后以数据库为准
+    service.coin_rows = [(1, 50), (2, 20), (3, 99)]
+    await service.reconcile()
+    assert service.coins.top(3) == [(3, 99), (1, 50), (2, 20)]
+
+
+@pytest.mark.asyncio
+async def test_faction_board_is_per_event():
+    service = _FakeService()
+    board = await service.get_faction_board("e1")
+    assert board.top(2) == [("blue", 9), ("red", 5)]
+
+    service.record_faction_points("e1", "red", 15)
+    service.record_faction_points("e2", "red", 999)
+    assert (await service.get_faction_board("e1")).top(1) == [("red", 15)]
+
+    assert len(await service.get_faction_board("e2")) == 0
+
+
+@pytest.mark.asyncio
+async def test_footer_rank_skips_users_missing_from_the_listing(monkeypatch):
+    from types import SimpleNamespace
+
+    from src.chat.features.odysseia_coin.ui import leaderboard_ui
+
+    board = RankedBoard("coins", min_value=0)
+    for key, value in ((1, 100), (2, 90), (3, 80), (4, 70)):
+        board.update(key, value)
+
+    async def get_coin_board():
+        return board
+
+    monkeypatch.setattr(
+        leaderboard_ui.leaderboard_service, "get_coin_board", get_coin_board
+    )
+    # 用户 2 已无法解析，列表中不显示
+    users = {k: SimpleNamespace(display_name=f"user{k}") for k in (1, 3, 4)}
+    bot = SimpleNamespace(get_user=users.get)
+    view = leaderboard_ui.LeaderboardView(bot, SimpleNamespace(id=3), None)
+
+    embed = await view.create_leaderboard_embed()
+    assert [e["rank"] for e in view.leaderboard_data] == [1, 2, 3]
+    assert embed.footer.text.endswith("你的排名: 第 2 名")
+
+    # 翻页沿用刷新时算好的名次，不再遍历榜单
+    resolved = []
+    bot.get_user = lambda k: resolved.append(k) or users.get(k)
+    view.current_page = 1
+    embed = await view.create_leaderboard_embed()
+    assert embed.footer.text.endswith("你的排名: 第 2 名")
+    assert resolved == []
+
+    # 列表之外的名次同样跳过无法解析的用户
+    view.leaderboard_data = view.leaderboard_data[:1]
+    assert view._resolved_rank_of(board, 4) == 3
+    assert view._resolved_rank_of(board, 5) is None
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+非阻塞日志管线测试：调用位置采样、惰性参数、后台线程格式化与队列满时的丢弃及其报告。
+"""
+
+import logging
+import queue
+import threading
+
+import pytest
+
+from src.chat.utils.log_utils import (
+    AsyncLogHandler,
+    LogSampler,
+    lazy,
+    start_queue_logging,
+    truncated,
+)
+
+
+class _CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.messages = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.current_thread().name)
+        self.messages.append(self.format(record))
+
+
+@pytest.fixture
+def pipeline():
+    target = _CollectingHandler()
+    handler, listener = start_queue_logging(
+        [target], sampling_rules={"hot": (2, 60.0)}
+    )
+    # 独立的 Logger 实例，不挂到全局层级上，避免 pytest 的日志捕获处理器介入
+    logger = logging.Logger("hot.path", logging.DEBUG)
+    logger.addHandler(handler)
+    yield logger, target, listener
+    listener.stop()
+
+
+def test_sampler_limits_each_call_site(pipeline):
+    logger, target, listener = pipeline
+    evaluated = []
+
+    def expensive():
+        evaluated.append(1)
+        return "payload"
+
+    for _ in range(10):
+        logger.info("热点日志 %s", lazy(expensive))
+    for _ in range(3):
+        logger.warning("警告不采样")
+    listener.stop()
+
+    assert target.messages.count("热点日志 payload") == 2
+    assert target.messages.count("警告不采样") == 3
+    # 被抑制的记录不会计算惰性参数
+    assert len(evaluated) == 2
+
+
+def test_formatting_happens_on_listener_thread(pipeline):
+    logger, target, listener = pipeline
+    formatted_on = []
+
+    def payload():
+        formatted_on.append(threading.current_thread())
+        return "x"
+
+    logger.debug("%s", lazy(payload))
+    listener.stop()
+
+    assert target.messages == ["x"]
+    assert formatted_on and formatted_on[0] is not threading.current_thread()
+
+
+def test_suppressed_count_is_reported_in_next_window():
+    sampler = LogSampler({"hot": (1, 60.0)})
+
+    def record():
+        return logging.LogRecord("hot", logging.INFO, __file__, 1, "msg", None, None)
+
+    assert sampler.filter(record())
+    assert not sampler.filter(record())
+    assert not sampler.filter(record())
+    assert sampler.suppressed_total() == 2
+
+    # 窗口过期后放行，并带上此前被抑制的条数
+    sampler._windows[("hot", 1)][0] -= 120
+    rec = record()
+    assert sampler.filter(rec)
+    assert rec.sampled_suppressed == 2
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = AsyncLogHandler(queue.Queue(maxsize=1))
+    logger = logging.Logger("drop.test")
+    logger.addHandler(handler)
+    for _ in range(5):
+        logger.warning("x")
+
+    assert handler.dropped == 4
+
+
+def test_dropped_count_is_reported_once_the_queue_drains(caplog):
+    log_queue = queue.Queue(maxsize=2)
+    handler = AsyncLogHandler(log_queue)
+    logger = logging.Logger("drop.report")
+    logger.addHandler(handler)
+    for i in range(4):
+        logger.warning("x%d", i)
+    while not log_queue.empty():
+        log_queue.get_nowait()
+
+    logger.warning("after")
+    notice, record = log_queue.get_nowait(), log_queue.get_nowait()
+    assert notice.levelno == logging.WARNING
+    assert notice.getMessage() == "日志队列已满，丢弃了 2 条日志"
+    assert record.getMessage() == "after"
+
+    # 已报告的条数不再重复报告，关闭时汇总总数
+    logger.warning("again")
+    assert log_queue.get_nowait().getMessage() == "again"
+    assert log_queue.empty()
+    with caplog.at_level(logging.WARNING):
+        handler.log_metrics_summary()
+    assert "共丢弃 2 条日志" in caplog.text
+
+
+def test_truncated_limits_length():
+    assert str(truncated("a" * 10, 4)).startswith("aaaa...")
+    assert str(truncated("abc", 4)) == "abc"
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+消息预过滤测试：未 @ 机器人的消息只走零 I/O 的文本快速路径，
+快速路径的文本与完整路径（图片下载成功时）的 user_content 一致。
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from src.chat.cogs import ai_chat_cog
+from src.chat.services import message_processor as processor_module
+from src.chat.services.message_processor import MessageProcessor
+
+BOT_ID = 42
+
+
+def _message(content, mentions=(), stickers=()):
+    bot_member = SimpleNamespace(id=BOT_ID, display_name="类脑娘")
+    return SimpleNamespace(
+        content=content,
+        mentions=list(mentions),
+        stickers=list(stickers),
+        attachments=[],
+        reference=None,
+        author=SimpleNamespace(id=7, bot=False),
+        guild=SimpleNamespace(me=bot_member),
+        channel=SimpleNamespace(id=1000, name="闲聊"),
+    )
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    processor = MessageProcessor()
+    fetched = []
+
+    async def fake_fetch(session, url, proxy=None):
+        fetched.append(url)
+        return b"image"
+
+    monkeypatch.setattr(processor, "_fetch_image_aio", fake_fetch)
+    monkeypatch.setattr(
+        processor_module.http_client_registry, "get_aiohttp_session", lambda: None
+    )
+    processor.fetched = fetched
+    return processor
+
+
+@pytest.mark.asyncio
+async def test_fast_path_matches_full_path_without_io(processor):
+    sticker = SimpleNamespace(
+        name="wave", url="https://media.discordapp.net/stickers/1.png",
+        format=discord.StickerFormatType.png,
+    )
+    message = _message(
+        "<@42> 你好 <:blob:123> <a:dance:456> "
+        "[smile](https://cdn.discordapp.com/emojis/789.webp?size=48) "
+        "https://media.discordapp.net/stickers/555.png?size=160 file\\_name",
+        mentions=[SimpleNamespace(id=BOT_ID)],
+        stickers=[sticker],
+    )
+    bot = SimpleNamespace(user=SimpleNamespace(id=BOT_ID))
+
+    fast = processor.extract_text_content(message, bot)
+    assert processor.fetched == []
+
+    full = await processor.extract_message_data(message, bot)
+    assert len(processor.fetched) == 5
+    assert fast == full["user_content"]
+    assert fast.startswith("[贴纸: wave] @类脑娘 你好 __EMOJI_blob__")
+
+
+class _Cog(ai_chat_cog.AIChatCog):
+    def __init__(self):
+        self.bot = SimpleNamespace(user=SimpleNamespace(id=BOT_ID))
+
+
+@pytest.fixture
+def cog_env(monkeypatch):
+    calls = {"full": 0, "ignored_checks": 0, "alerts": 0}
+
+    async def fake_full(message, bot):
+        calls["full"] += 1
+        return {"user_content": "", "replied_content": "", "image_data_list": []}
+
+    async def fake_ignored(message):
+        calls["ignored_checks"] += 1
+        return False
+
+    async def fake_alert(*args):
+        calls["alerts"] += 1
+
+    async def keywords():
+        return ["违禁词"]
+
+    mp = ai_chat_cog.message_processor
+    monkeypatch.setattr(ai_chat_cog, "CHAT_ENABLED", True)
+    monkeypatch.setattr(mp, "extract_message_data", fake_full)
+    monkeypatch.setattr(mp, "is_ignored_channel", fake_ignored)
+    monkeypatch.setattr(ai_chat_cog, "get_all_keywords", keywords)
+    monkeypatch.setattr(ai_chat_cog, "send_developer_alert", fake_alert)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_plain_message_does_no_media_or_db_work(cog_env):
+    await _Cog().on_message(_message("今天天气不错 <:blob:123>"))
+
+    assert cog_env == {"full": 0, "ignored_checks": 0, "alerts": 0}
+
+
+@pytest.mark.asyncio
+async def test_flagged_message_checks_channel_then_alerts(cog_env):
+    await _Cog().on_message(_message("这里有违禁词"))
+    await asyncio.sleep(0)
+
+    assert cog_env == {"full": 0, "ignored_checks": 1, "alerts": 1}
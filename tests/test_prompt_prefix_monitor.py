@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+提示词前缀稳定性监控测试：逐层指纹比较、首个变化层统计、缓存命中 token 关联，
+以及缓存优化构建器按层上报。
+"""
+
+from datetime import datetime as real_datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.chat.services import context_service_test
+from src.chat.services import prompt_service as prompt_service_module
+from src.chat.services.prompt_prefix_monitor import (
+    FIRST_TURN,
+    NO_DIVERGENCE,
+    PromptPrefixMonitor,
+    fingerprint_messages,
+    split_layers,
+)
+
+
+def _msg(role, text):
+    return {"role": role, "parts": [text]}
+
+
+def _layers(persona="人设", memory="记忆", user_input="你好"):
+    return [
+        ("persona", [_msg("user", persona), _msg("model", "在线")]),
+        ("memory_notes", [_msg("user", memory), _msg("model", "记得")]),
+        ("user_input", [_msg("user", user_input)]),
+    ]
+
+
+def _monitor(**config):
+    return PromptPrefixMonitor(
+        {"ENABLED": True, "MAX_TRACKED_CONVERSATIONS": 100, **config}
+    )
+
+
+def test_fingerprint_distinguishes_role_and_part_boundaries():
+    a, length = fingerprint_messages([_msg("user", "ab")])
+    assert length == 2
+    assert a == fingerprint_messages([_msg("user", "ab")])[0]
+    assert a != fingerprint_messages([_msg("model", "ab")])[0]
+    assert a != fingerprint_messages([{"role": "user", "parts": ["a", "b"]}])[0]
+    # OpenAI 格式的 content 字段同样参与指纹
+    assert fingerprint_messages([{"role": "user", "content": "ab"}])[0] == a
+
+
+def test_first_divergent_layer_is_recorded_per_conversation():
+    monitor = _monitor()
+    first = monitor.observe(1, 10, _layers())
+    assert first.divergent_layer == FIRST_TURN
+
+    second = monitor.observe(1, 10, _layers(user_input="第二句"))
+    assert second.divergent_layer == "user_input"
+    assert second.stable_prefix_chars == len("人设在线记忆记得")
+
+    third = monitor.observe(1, 10, _layers(memory="新的记忆", user_input="第三句"))
+    assert third.divergent_layer == "memory_notes"
+
+    # 不同频道各自比较
+    assert monitor.observe(1, 11, _layers()).divergent_layer == FIRST_TURN
+    assert monitor.observe(1, 11, _layers()).divergent_layer == NO_DIVERGENCE
+
+
+def test_usage_is_joined_once_to_the_latest_turn():
+    monitor = _monitor()
+    monitor.observe(1, 10, _layers())
+    monitor.observe(1, 10, _layers(user_input="再来"))
+    monitor.record_usage(1, 10, cached_tokens=800, input_tokens=1000)
+    # 同一轮的重复上报被忽略
+    monitor.record_usage(1, 10, cached_tokens=0, input_tokens=1000)
+    # Provider 未返回缓存数据时不计入命中率
+    monitor.observe(1, 10, _layers(persona="换了人设"))
+    monitor.record_usage(1, 10, cached_tokens=None, input_tokens=1000)
+
+    report = {item["layer"]: item for item in monitor.report()["layers"]}
+    assert monitor.report()["turns"] == 3
+    assert report["user_input"]["cache_hit_ratio"] == pytest.approx(0.8)
+    assert report["user_input"]["avg_cached_tokens"] == 800
+    assert report["persona"]["divergences"] == 1
+    assert report["persona"]["cache_hit_ratio"] is None
+    assert "user_input" in monitor.format_report()
+
+
+def test_tracked_conversations_are_bounded():
+    monitor = _monitor(MAX_TRACKED_CONVERSATIONS=2)
+    for channel_id in range(3):
+        monitor.observe(1, channel_id, _layers())
+    # 最早的会话已被淘汰，再次出现时视为首轮
+    assert monitor.observe(1, 0, _layers()).divergent_layer == FIRST_TURN
+
+
+def test_split_layers_uses_end_marks():
+    messages = [_msg("user", str(i)) for i in range(4)]
+    layers = split_layers(messages, [("a", 2), ("b", 2), ("c", 4)])
+    assert [(name, len(part)) for name, part in layers] == [
+        ("a", 2),
+        ("b", 0),
+        ("c", 2),
+    ]
+
+
+class _FixedDatetime(real_datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return real_datetime(2026, 1, 1, 12, 0, tzinfo=tz)
+
+
+@pytest.mark.asyncio
+async def test_cache_optimized_builder_reports_layers(monkeypatch):
+    monitor = _monitor()
+    monkeypatch.setattr(prompt_service_module, "prompt_prefix_monitor", monitor)
+    monkeypatch.setattr(prompt_service_module, "datetime", _FixedDatetime)
+    cleaner = SimpleNamespace(clean_message_content=lambda text, guild: text)
+    monkeypatch.setattr(context_service_test, "get_context_service", lambda: cleaner)
+
+    service = prompt_service_module.PromptService()
+    channel = SimpleNamespace(id=42, guild=None)
+
+    async def build(message, history):
+        return await service._build_chat_prompt_cache_optimized(
+            user_name="小明",
+            message=message,
+            replied_message=None,
+            images=None,
+            channel_context=None,
+            world_book_entries=None,
+            affection_status={"prompt": "友好"},
+            guild_name="服务器",
+            location_name="频道",
+            channel=channel,
+            memory_notes="喜欢猫",
+            recent_chat_history=history,
+            user_id=7,
+        )
+
+    await build("第一句", None)
+    await build("第二句", None)
+    await build("第三句", [{"role": "user", "parts": ["第二句"]}])
+
+    report = {item["layer"]: item for item in monitor.report()["layers"]}
+    assert report[FIRST_TURN]["divergences"] == 1
+    assert report["user_input"]["divergences"] == 1
+    # 最终指令合并在最后一条 model 消息里：新增最近聊天历史后，
+    # 最终指令从好感度层移到了历史层，因此好感度层首先发生变化
+    assert report["affection"]["divergences"] == 1
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+搜索执行器测试：Discord 搜索限流、结果缓存与请求合并、计数批量写入、部分结果超时。
+"""
+
+import asyncio
+
+import discord
+import pytest
+
+from src.chat.features.tools.services.search_executor import (
+    BatchedCounter,
+    DiscordSearchLimiter,
+    SearchResultCache,
+    freeze,
+    gather_with_partial_timeout,
+    normalize_query,
+)
+
+
+class _FakeHTTP:
+    def __init__(self, responses=None, delay=0.01):
+        self.responses = list(responses or [])
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def request(self, route, params=None):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.responses:
+                response = self.responses.pop(0)
+                if isinstance(response, Exception):
+                    raise response
+                return response
+            return {"messages": []}
+        finally:
+            self.active -= 1
+
+
+class _FakeBot:
+    def __init__(self, http):
+        self.http = http
+
+
+def test_normalized_keys_ignore_spacing_case_and_order():
+    assert normalize_query("  Hello   World ") == normalize_query("hello world")
+    assert freeze({"b": [2, 1], "a": 1}) == freeze({"a": 1, "b": [1, 2]})
+
+
+@pytest.mark.asyncio
+async def test_limiter_bounds_concurrency():
+    http = _FakeHTTP()
+    limiter = DiscordSearchLimiter(max_concurrency=2)
+    await asyncio.gather(
+        *(limiter.request(_FakeBot(http), None, {}) for _ in range(6))
+    )
+    assert http.calls == 6
+    assert http.max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_limiter_retries_after_rate_limit_and_index_not_ready():
+    http = _FakeHTTP(
+        [discord.RateLimited(0.01), {"retry_after": 0.01}, {"messages": [[1]]}]
+    )
+    limiter = DiscordSearchLimiter(max_concurrency=1, max_retries=2)
+
+    assert await limiter.request(_FakeBot(http), None, {}) == {"messages": [[1]]}
+    assert http.calls == 3
+    assert limiter.rate_limited == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_coalesces_concurrent_misses_and_skips_errors():
+    cache = SearchResultCache(ttl_seconds=60, max_entries=2)
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["result"]
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute("k", factory) for _ in range(5))
+    )
+    assert results == [["result"]] * 5
+    assert len(calls) == 1
+    assert await cache.get_or_compute("k", factory) == ["result"]
+    assert cache.hits == 1
+
+    async def failing():
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_compute("bad", failing)
+    assert cache.get("bad") == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_still_fills_cache():
+    cache = SearchResultCache(ttl_seconds=60)
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "late"
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(cache.get_or_compute("k", slow), timeout=0.01)
+    await asyncio.sleep(0.08)
+    assert cache.get("k") == (True, "late")
+
+
+@pytest.mark.asyncio
+async def test_partial_timeout_returns_ready_results():
+    async def fast():
+        return "fast"
+
+    async def failing():
+        raise ValueError("boom")
+
+    async def stalled():
+        await asyncio.sleep(10)
+
+    results, timed_out = await gather_with_partial_timeout(
+        {"a": fast(), "b": failing(), "c": stalled()}, timeout=0.05
+    )
+    assert results["a"] == "fast"
+    assert isinstance(results["b"], ValueError)
+    assert timed_out == ["c"]
+
+
+@pytest.mark.asyncio
+async def test_counter_batches_writes():
+    writes = []
+
+    async def write(date_str, count):
+        writes.append(count)
+
+    counter = BatchedCounter(write, flush_interval=0.02)
+    for _ in range(5):
+        counter.increment()
+    assert writes == []
+
+    await asyncio.sleep(0.05)
+    assert writes == [5]
+
+    counter.increment()
+    await counter.aclose()
+    assert writes == [5, 1]
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+商店目录内存快照与公告缓存测试（不连接数据库）。
+"""
+
+import asyncio
+import os
+
+import pytest
+
+from src.chat.features.odysseia_coin.service import shop_service as shop_service_module
+from src.chat.features.odysseia_coin.service.shop_catalog import ShopCatalog
+from src.chat.features.odysseia_coin.service.shop_service import ShopService
+
+
+def _row(item_id, category, price, available=1):
+    return {
+        "item_id": item_id,
+        "name": f"item-{item_id}",
+        "description": "",
+        "price": price,
+        "category": category,
+        "target": "self",
+        "effect_id": None,
+        "cg_url": None,
+        "is_available": available,
+    }
+
+
+class _FakeCatalog(ShopCatalog):
+    def __init__(self, rows, **kwargs):
+        super().__init__(**kwargs)
+        self.rows = rows
+
+    async def _load_rows(self):
+        await asyncio.sleep(0)
+        return [dict(row) for row in self.rows]
+
+
+@pytest.mark.asyncio
+async def test_indexes_match_original_queries():
+    catalog = _FakeCatalog(
+        [_row(1, "食物", 30), _row(2, "礼物", 10), _row(3, "食物", 5), _row(4, "食物", 1, 0)]
+    )
+
+    assert [i["item_id"] for i in await catalog.get_all_items()] == [2, 3, 1]
+    assert [i["item_id"] for i in await catalog.get_items_by_category("食物")] == [3, 1]
+    assert await catalog.get_items_by_category("不存在") == []
+    # 下架商品仍可按 ID 查到
+    assert (await catalog.get_item_by_id(4))["is_available"] == 0
+    assert await catalog.get_item_by_id(99) is None
+    assert catalog.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_returned_items_are_copies():
+    catalog = _FakeCatalog([_row(1, "食物", 30)])
+    items = await catalog.get_all_items()
+    items[0]["price"] = 10
+
+    assert (await catalog.get_item_by_id(1))["price"] == 30
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_load_once_and_invalidate_reloads():
+    catalog = _FakeCatalog([_row(1, "食物", 30)])
+    await asyncio.gather(*(catalog.get_all_items() for _ in range(10)))
+    assert catalog.loads == 1
+
+    catalog.rows.append(_row(2, "食物", 40))
+    catalog.invalidate()
+    assert len(await catalog.get_all_items()) == 2
+    assert catalog.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_ttl_expires_snapshot():
+    catalog = _FakeCatalog([_row(1, "食物", 30)], ttl_seconds=0)
+    await catalog.get_all_items()
+    await catalog.get_all_items()
+    assert catalog.loads == 2
+
+
+@pytest.mark.asyncio
+async def test_announcement_cached_by_mtime(tmp_path, monkeypatch):
+    path = tmp_path / "announcement.md"
+    path.write_text("公告 {guidance_url}", encoding="utf-8")
+    monkeypatch.setattr(shop_service_module, "SHOP_ANNOUNCEMENT_PATH", str(path))
+
+    lookups = []
+
+    async def fake_setting(key):
+        lookups.append(key)
+        return "https://example.invalid/guide"
+
+    monkeypatch.setattr(
+        shop_service_module.chat_db_manager, "get_global_setting", fake_setting
+    )
+    service = ShopService()
+
+    assert await service._get_shop_announcement() == "公告 https://example.invalid/guide"
+    assert await service._get_shop_announcement() == "公告 https://example.invalid/guide"
+    assert lookups == ["guidance_url"]
+
+    path.write_text("新的公告内容", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert await service._get_shop_announcement() == "新的公告内容"
+
+    path.unlink()
+    assert await service._get_shop_announcement() is None
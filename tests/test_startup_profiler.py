@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析器与工具 schema 磁盘缓存测试。
+"""
+
+import importlib
+import sys
+import types
+
+import pytest
+
+from src.chat.features.tools.schema_cache import ToolSchemaCache, module_source_hash
+from src.chat.utils.startup_profiler import StartupProfiler
+
+
+@pytest.fixture
+def tmp_package(tmp_path, monkeypatch):
+    pkg = tmp_path / "profpkg"
+    pkg.mkdir()
+    (pkg / "__init__.py").write_text("from profpkg import child\n", encoding="utf-8")
+    (pkg / "child.py").write_text("import time\ntime.sleep(0.02)\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield pkg
+    for name in [n for n in sys.modules if n.startswith("profpkg")]:
+        del sys.modules[name]
+
+
+def test_import_timer_records_self_time(tmp_package):
+    profiler = StartupProfiler()
+    profiler.start_import_tracking(prefixes=("profpkg",))
+    try:
+        importlib.import_module("profpkg")
+    finally:
+        profiler.stop_import_tracking()
+
+    imports = {e.name: e for e in profiler.entries("import")}
+    assert set(imports) == {"profpkg", "profpkg.child"}
+    assert imports["profpkg.child"].duration >= 0.02
+    # 父包的自身耗时扣除了子模块
+    assert imports["profpkg"].duration < imports["profpkg.child"].duration
+    assert profiler._import_timer is None
+
+
+def test_measure_and_report():
+    profiler = StartupProfiler()
+    with profiler.measure("stage", "数据库初始化"):
+        pass
+    with pytest.raises(RuntimeError):
+        with profiler.measure("cog", "src.chat.cogs.broken"):
+            raise RuntimeError("boom")
+
+    assert profiler.totals()["cog"][0] == 1
+    report = profiler.format_report()
+    assert "数据库初始化" in report
+    assert "src.chat.cogs.broken" in report
+
+
+def _fake_module(tmp_path, source):
+    path = tmp_path / "tool_mod.py"
+    path.write_text(source, encoding="utf-8")
+    module = types.ModuleType("tool_mod")
+    module.__file__ = str(path)
+    return module
+
+
+def test_schema_cache_hit_and_invalidation(tmp_path):
+    cache_path = str(tmp_path / "cache.json")
+    module = _fake_module(tmp_path, "def tool(): pass\n")
+    schema = {"name": "tool", "parameters": {"type": "object", "properties": {}}}
+
+    cache = ToolSchemaCache(cache_path).load()
+    source_hash = module_source_hash(module)
+    assert cache.get("tool_mod", source_hash, "tool") is None
+    cache.put("tool_mod", source_hash, "tool", schema)
+    cache.save()
+
+    reloaded = ToolSchemaCache(cache_path).load()
+    assert reloaded.get("tool_mod", source_hash, "tool") == schema
+    assert (reloaded.hits, reloaded.misses) == (1, 0)
+
+    # 修改源码后哈希变化，缓存失效
+    module = _fake_module(tmp_path, "def tool(x: int): pass\n")
+    assert reloaded.get("tool_mod", module_source_hash(module), "tool") is None
+
+    reloaded.retain([])
+    reloaded.save()
+    assert ToolSchemaCache(cache_path).load().get("tool_mod", source_hash, "tool") is None
+
+
+def test_schema_cache_skips_non_json_schema(tmp_path):
+    cache = ToolSchemaCache(str(tmp_path / "cache.json"))
+    cache.put("m", "h", "tool", {"default": (1, 2)})
+    cache.put("m", "h", "other", {"default": object()})
+
+    assert cache.get("m", "h", "tool") is None
+    assert cache.get("m", "h", "other") is None
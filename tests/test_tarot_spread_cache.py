@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+塔罗牌预渲染图集与牌阵 LRU 缓存测试（使用临时目录中的小尺寸假卡牌）。
+"""
+
+import io
+from collections import OrderedDict
+
+import pytest
+from PIL import Image
+
+from src.chat.config.chat_config import TAROT_CONFIG
+from src.chat.features.tarot.services.tarot_service import TarotService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    colors = {"a.png": (255, 0, 0), "b.png": (0, 0, 255)}
+    for name, color in colors.items():
+        img = Image.new("RGB", (40, 60), color)
+        # 上半部分涂白，便于检查倒置
+        img.paste((255, 255, 255), (0, 0, 40, 30))
+        img.save(tmp_path / name)
+
+    monkeypatch.setitem(TAROT_CONFIG, "CARDS_PATH", str(tmp_path))
+    monkeypatch.setitem(TAROT_CONFIG, "CARD_SIZE", (20, 30))
+    monkeypatch.setitem(TAROT_CONFIG, "SPREAD_CACHE_SIZE", 2)
+    monkeypatch.setitem(TAROT_CONFIG, "SPREAD_IMAGE_FORMAT", "PNG")
+    monkeypatch.setattr(TarotService, "_atlas", {})
+    monkeypatch.setattr(TarotService, "_spread_cache", OrderedDict())
+
+    svc = TarotService()
+    monkeypatch.setattr(
+        svc, "_cards", [{"image_file": "a.png"}, {"image_file": "b.png"}]
+    )
+    return svc
+
+
+def _card(name, orientation):
+    return {"image_file": name, "orientation": orientation}
+
+
+def test_atlas_holds_both_orientations_at_target_size(service):
+    assert service.build_atlas() == 4
+
+    upright = service._atlas[("a.png", "upright")]
+    reversed_ = service._atlas[("a.png", "reversed")]
+    assert upright.size == (20, 30)
+    assert upright.getpixel((10, 2)) == (255, 255, 255)
+    assert reversed_.getpixel((10, 2)) != (255, 255, 255)
+
+
+def test_spread_is_composed_from_atlas_and_cached(service, monkeypatch):
+    cards = [_card("a.png", "upright"), _card("b.png", "reversed")]
+    data = service._generate_spread_image_sync(cards)
+
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.size == (20 * 2 + 25 * 3, 30 + 25 * 2)
+        assert img.getpixel((25 + 10, 25 + 28))[:3] == (255, 0, 0)
+
+    # 缓存命中时不再访问图集
+    monkeypatch.setattr(TarotService, "_atlas", {})
+    assert service._generate_spread_image_sync(cards) is data
+
+
+def test_spread_cache_evicts_least_recently_used(service):
+    first = [_card("a.png", "upright")]
+    second = [_card("b.png", "upright")]
+    third = [_card("a.png", "reversed")]
+
+    service._generate_spread_image_sync(first)
+    service._generate_spread_image_sync(second)
+    service._generate_spread_image_sync(first)
+    service._generate_spread_image_sync(third)
+
+    keys = list(service._spread_cache)
+    assert keys == [(("a.png", "upright"),), (("a.png", "reversed"),)]
+
+
+def test_draw_cards_does_not_mutate_deck(service):
+    drawn = service.draw_cards(2)
+
+    assert all("orientation" in card for card in drawn)
+    assert all("orientation" not in card for card in service._cards)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+文本清理测试：预编译实现与旧实现（scripts/benchmark_text_normalization.py 中保留的版本）逐字一致。
+"""
+
+import pytest
+
+from scripts.benchmark_text_normalization import (
+    CHANNEL_NAMES,
+    CURRENT,
+    LEGACY,
+    build_corpus,
+)
+from src.chat.services.regex_service import regex_service
+from src.chat.utils import text_normalization
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "`(a)` 和 （旁白）：后文",
+    "> # 引用里的标题\n  ## 二级标题",
+    "<@123> <@!456> <#789> <@&1> <b>粗体</b>",
+    "<think>a</think><THINKING>b</thinking>正文 1011",
+    "<:a:b:1> <:ok_hand:12> <a:x:34>  多余   空白",
+    "前缀 https://cdn.discordapp.com/a.png 后缀 \\_下划线",
+    "```未闭合的代码块",
+    "混合 emoji 🍎 与 符号 ☀ ｜ 丨",
+]
+
+
+def _resolve(user_id):
+    return f"@用户{user_id % 10}"
+
+
+@pytest.mark.parametrize("name", sorted(LEGACY))
+def test_matches_legacy_on_corpus(name):
+    legacy, current = LEGACY[name], CURRENT[name]
+    inputs = build_corpus(3000, seed=1) + EDGE_CASES
+    if name == "clean_channel_name":
+        inputs = CHANNEL_NAMES + EDGE_CASES + [" 🌸 ︱  男性向  "]
+    for text in inputs:
+        args = (text, _resolve) if name == "clean_discord_message" else (text,)
+        assert current(*args) == legacy(*args), text
+
+
+def test_discord_message_without_resolver_keeps_mentions():
+    text = "<@123> 你好 <:wave:1>"
+    assert text_normalization.clean_discord_message(text) == "<@123> 你好"
+
+
+def test_channel_name_is_memoized():
+    text_normalization.clean_channel_name.cache_clear()
+    for _ in range(3):
+        assert regex_service.clean_channel_name("💟︱教程分享") == "教程"
+    assert text_normalization.clean_channel_name.cache_info().hits == 2
+
+
+def test_regex_service_keeps_non_string_handling():
+    assert regex_service.clean_channel_name(None) is None
+    assert regex_service.clean_user_input(None) == ""
+    assert regex_service.clean_ai_output(123) == ""
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+ThreadDirectoryService 对账逻辑单元测试（数据库读写通过 monkeypatch 替换）
+"""
+
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from src.chat.features.forum_search.services.thread_directory_service import (
+    ThreadDirectoryService,
+)
+
+UTC = datetime.timezone.utc
+NOW = datetime.datetime.now(UTC)
+
+
+def _thread(thread_id: int, archived_minutes_ago: int):
+    return SimpleNamespace(
+        id=thread_id,
+        archive_timestamp=NOW - datetime.timedelta(minutes=archived_minutes_ago),
+    )
+
+
+class _FakeChannel:
+    def __init__(self, active, archived):
+        self.id = 1
+        self.name = "forum"
+        self.threads = active
+        self._archived = archived
+        self.pages_read = 0
+
+    async def archived_threads(self, limit=None):
+        for thread in self._archived:
+            self.pages_read += 1
+            yield thread
+
+
+def _service(monkeypatch, state, directory_ids=()):
+    service = ThreadDirectoryService()
+    calls = {"upserted": [], "removed": [], "saved": None}
+    # 目录：帖子 ID -> last_seen_at；时钟每次写入前进一格
+    directory = {thread_id: 0 for thread_id in directory_ids}
+    clock = {"now": 1}
+
+    async def fake_state(channel_id):
+        return state
+
+    async def fake_upsert(threads):
+        threads = list(threads)
+        clock["now"] += 1
+        for t in threads:
+            directory[t.id] = clock["now"]
+        calls["upserted"].extend(t.id for t in threads)
+        return len(threads)
+
+    async def fake_now():
+        clock["now"] += 1
+        return clock["now"]
+
+    async def fake_prune(channel_id, seen, before):
+        removed = sorted(
+            i
+            for i, last_seen in directory.items()
+            if last_seen < before and i not in seen
+        )
+        for i in removed:
+            del directory[i]
+        calls["removed"].extend(removed)
+        return len(removed)
+
+    async def fake_save(channel_id, started_at, full):
+        calls["saved"] = full
+
+    monkeypatch.setattr(service, "_get_sync_state", fake_state)
+    monkeypatch.setattr(service, "upsert_threads", fake_upsert)
+    monkeypatch.setattr(service, "_database_now", fake_now)
+    monkeypatch.setattr(service, "_prune_unseen", fake_prune)
+    monkeypatch.setattr(service, "_save_sync_state", fake_save)
+    calls["directory"] = directory
+    return service, calls
+
+
+@pytest.mark.asyncio
+async def test_incremental_stops_at_watermark(monkeypatch):
+    last_sync = (NOW - datetime.timedelta(minutes=60)).replace(tzinfo=None)
+    state = SimpleNamespace(full_synced_at=last_sync, incremental_synced_at=last_sync)
+    service, calls = _service(monkeypatch, state, directory_ids={99})
+
+    channel = _FakeChannel(
+        active=[_thread(1, 0)],
+        archived=[_thread(2, 5), _thread(3, 65), _thread(4, 500), _thread(5, 900)],
+    )
+    await service.reconcile_channel(channel)
+
+    # 水位线 = 上次对账 - 10 分钟重叠，早于它的归档帖子不再翻页
+    assert calls["upserted"] == [1, 2, 3]
+    assert channel.pages_read == 3
+    assert calls["removed"] == []
+    assert calls["saved"] is False
+
+
+@pytest.mark.asyncio
+async def test_first_sync_is_full_and_prunes_missing(monkeypatch):
+    service, calls = _service(monkeypatch, None, directory_ids={1, 2, 42})
+
+    channel = _FakeChannel(active=[_thread(1, 0)], archived=[_thread(2, 5000)])
+    await service.reconcile_channel(channel)
+
+    assert calls["upserted"] == [1, 2]
+    assert calls["removed"] == [42]
+    assert calls["saved"] is True
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_aborts_full_sync_without_pruning(monkeypatch):
+    service, calls = _service(monkeypatch, None, directory_ids={1, 2, 42})
+
+    async def failing_upsert(threads):
+        threads = list(threads)
+        if any(t.id == 2 for t in threads):
+            raise RuntimeError("db down")
+        calls["upserted"].extend(t.id for t in threads)
+        return len(threads)
+
+    monkeypatch.setattr(service, "upsert_threads", failing_upsert)
+    channel = _FakeChannel(active=[_thread(1, 0)], archived=[_thread(2, 5000)])
+    with pytest.raises(RuntimeError):
+        await service.reconcile_channel(channel)
+
+    assert calls["removed"] == []
+    assert calls["saved"] is None
+
+
+@pytest.mark.asyncio
+async def test_failed_event_write_marks_directory_stale(monkeypatch):
+    recent = (NOW - datetime.timedelta(hours=1)).replace(tzinfo=None)
+    state = SimpleNamespace(full_synced_at=recent, incremental_synced_at=recent)
+    service, calls = _service(monkeypatch, state)
+
+    async def fake_last_full(channel_id):
+        return state.full_synced_at
+
+    monkeypatch.setattr(service, "get_last_full_sync", fake_last_full)
+    assert await service.is_full_sync_fresh(1)
+
+    async def failing_upsert(threads):
+        raise RuntimeError("db down")
+
+    real_upsert = service.upsert_threads
+    monkeypatch.setattr(service, "upsert_threads", failing_upsert)
+    await service.upsert_thread(SimpleNamespace(id=7, parent_id=1))
+    assert not await service.is_full_sync_fresh(1)
+
+    # 下一次对账升级为全量，成功后恢复
+    monkeypatch.setattr(service, "upsert_threads", real_upsert)
+    await service.reconcile_channel(_FakeChannel(active=[], archived=[]))
+    assert calls["saved"] is True
+    assert await service.is_full_sync_fresh(1)
+
+
+@pytest.mark.asyncio
+async def test_old_full_sync_is_not_fresh(monkeypatch):
+    service = ThreadDirectoryService()
+    old = (NOW - datetime.timedelta(days=30)).replace(tzinfo=None)
+
+    async def fake_last_full(channel_id):
+        return old
+
+    monkeypatch.setattr(service, "get_last_full_sync", fake_last_full)
+    assert not await service.is_full_sync_fresh(1)
+
+
+@pytest.mark.asyncio
+async def test_thread_created_during_full_sync_is_not_pruned(monkeypatch):
+    service, calls = _service(monkeypatch, None, directory_ids={1, 42})
+
+    class _ChannelWithNewThread(_FakeChannel):
+        async def archived_threads(self, limit=None):
+            async for thread in super().archived_threads(limit):
+                # 翻页期间 on_thread_create 写入了新帖子
+                await service.upsert_thread(SimpleNamespace(id=77, parent_id=1))
+                yield thread
+
+    channel = _ChannelWithNewThread(
+        active=[_thread(1, 0)], archived=[_thread(2, 5000)]
+    )
+    await service.reconcile_channel(channel)
+
+    assert calls["removed"] == [42]
+    assert set(calls["directory"]) == {1, 2, 77}
+    assert calls["saved"] is True
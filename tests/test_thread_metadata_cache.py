@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+帖子元数据缓存测试：重复使用不再访问 API、并发请求合并、失效与拉取期间失效、
+首楼缺失或 API 报错时不缓存，帖子内第一条回复只交给显式要求的调用方，
+以及提示词构建器使用缓存构建首楼注入。
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+from src.chat.services import prompt_service as prompt_service_module
+from src.chat.services.thread_metadata_cache import ThreadMetadataCache
+
+
+class _NotFound(discord.NotFound):
+    def __init__(self):
+        Exception.__init__(self, "not found")
+
+
+class _Forbidden(discord.Forbidden):
+    def __init__(self):
+        Exception.__init__(self, "missing access")
+
+
+class _FakeThread:
+    def __init__(self, thread_id=100, starter_content="首楼内容", owner_name="楼主"):
+        self.id = thread_id
+        self.name = "帖子标题"
+        self.applied_tags = [SimpleNamespace(name="求助"), SimpleNamespace(name="闲聊")]
+        self.owner_id = 7
+        self.owner = None
+        self.starter_message = None
+        self.starter_content = starter_content
+        self.message_fetches = 0
+        self.member_fetches = 0
+        self.fetch_gate = None
+        self.history_messages = []
+        owner = SimpleNamespace(display_name=owner_name)
+
+        async def fetch_member(member_id):
+            self.member_fetches += 1
+            return owner
+
+        self.guild = SimpleNamespace(
+            get_member=lambda member_id: None, fetch_member=fetch_member
+        )
+
+    async def fetch_message(self, message_id):
+        self.message_fetches += 1
+        if self.fetch_gate is not None:
+            await self.fetch_gate.wait()
+        if self.starter_content is None:
+            raise _NotFound()
+        return SimpleNamespace(content=self.starter_content, attachments=[])
+
+    async def history(self, limit=None, oldest_first=None):
+        for message in self.history_messages[:limit]:
+            yield message
+
+
+def _cache(**config):
+    return ThreadMetadataCache(
+        {"ENABLED": True, "TTL_SECONDS": 60, "MAX_ENTRIES": 10, **config}
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeat_lookups_do_not_hit_the_api():
+    cache = _cache()
+    thread = _FakeThread()
+
+    first = await cache.get(thread)
+    second = await cache.get(thread)
+
+    assert first is second
+    assert first.title == "帖子标题"
+    assert first.tags == ("求助", "闲聊")
+    assert first.owner_name == "楼主"
+    assert first.starter_content == "首楼内容"
+    assert (thread.message_fetches, thread.member_fetches) == (1, 1)
+    assert cache.metrics()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_share_one_fetch():
+    cache = _cache()
+    thread = _FakeThread()
+    thread.fetch_gate = asyncio.Event()
+
+    tasks = [asyncio.create_task(cache.get(thread)) for _ in range(3)]
+    await asyncio.sleep(0)
+    thread.fetch_gate.set()
+    results = await asyncio.gather(*tasks)
+
+    assert thread.message_fetches == 1
+    assert results[0] is results[1] is results[2]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_forces_a_refetch():
+    cache = _cache()
+    thread = _FakeThread()
+    await cache.get(thread)
+
+    thread.starter_content = "编辑后的首楼"
+    cache.invalidate(thread.id)
+    metadata = await cache.get(thread)
+
+    assert metadata.starter_content == "编辑后的首楼"
+    assert thread.message_fetches == 2
+    assert cache.invalidations == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_fetch_is_not_overwritten():
+    cache = _cache()
+    thread = _FakeThread()
+    thread.fetch_gate = asyncio.Event()
+
+    pending = asyncio.create_task(cache.get(thread))
+    await asyncio.sleep(0)
+    cache.invalidate(thread.id)
+    thread.fetch_gate.set()
+    await pending
+
+    # 旧的拉取结果仍返回给等待者，但不会写入缓存
+    assert thread.id not in cache
+
+
+@pytest.mark.asyncio
+async def test_missing_starter_is_not_cached():
+    cache = _cache()
+    thread = _FakeThread(starter_content=None)
+
+    metadata = await cache.get(thread)
+    assert metadata.starter_message is None
+    assert thread.id not in cache
+
+    thread.starter_content = "首楼终于可见"
+    assert (await cache.get(thread)).starter_content == "首楼终于可见"
+
+
+@pytest.mark.asyncio
+async def test_first_reply_is_only_returned_when_allowed(monkeypatch):
+    cache = _cache()
+    monkeypatch.setattr(prompt_service_module, "thread_metadata_cache", cache)
+    # 由普通消息创建的帖子：帖子内没有首楼，第一条消息是别人的回复
+    thread = _FakeThread(starter_content=None)
+    thread.history_messages = [SimpleNamespace(content="路人的回复", attachments=[])]
+
+    assert (await cache.get(thread)).starter_message is None
+    indexed = await cache.get(thread, allow_first_message=True)
+    assert indexed.starter_content == "路人的回复"
+
+    # 提示词不会把回复当成楼主的首楼注入
+    service = prompt_service_module.PromptService()
+    assert await service._build_thread_first_post(thread) is None
+
+
+@pytest.mark.asyncio
+async def test_api_errors_leave_fields_empty_instead_of_raising():
+    cache = _cache()
+    thread = _FakeThread()
+
+    async def forbidden(*args, **kwargs):
+        raise _Forbidden()
+
+    thread.fetch_message = forbidden
+    thread.guild.fetch_member = forbidden
+
+    metadata = await cache.get(thread)
+    assert metadata.starter_message is None
+    assert metadata.owner_name is None
+    assert thread.id not in cache
+
+
+@pytest.mark.asyncio
+async def test_cached_owner_and_starter_skip_the_api():
+    cache = _cache()
+    thread = _FakeThread()
+    thread.owner = SimpleNamespace(display_name="缓存中的楼主")
+    thread.starter_message = SimpleNamespace(content="缓存中的首楼", attachments=[])
+
+    metadata = await cache.get(thread)
+
+    assert metadata.owner_name == "缓存中的楼主"
+    assert metadata.starter_content == "缓存中的首楼"
+    assert (thread.message_fetches, thread.member_fetches) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_prompt_builder_uses_the_shared_cache(monkeypatch):
+    cache = _cache()
+    monkeypatch.setattr(prompt_service_module, "thread_metadata_cache", cache)
+    service = prompt_service_module.PromptService()
+    thread = _FakeThread()
+
+    block = await service._build_thread_first_post(thread)
+    again = await service._build_thread_first_post(thread)
+
+    assert block == again
+    assert "帖子标题: 帖子标题" in block
+    assert "发帖人: 楼主" in block
+    assert "标签: 求助, 闲聊" in block
+    assert thread.message_fetches == 1
+
+    empty = _FakeThread(thread_id=101, starter_content="")
+    assert await service._build_thread_first_post(empty) is None
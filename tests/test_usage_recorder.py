@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+AI 调用用量记录测试：缓冲与批量写入、写入失败后的重试、缓冲上限，
+以及 AIService 在重试和故障转移时记录的 Provider、token 与跳数。
+"""
+
+import asyncio
+import datetime
+
+import pytest
+
+from src.chat.services.ai import service as service_module
+from src.chat.services.ai.providers.base import BaseProvider, GenerationResult
+from src.chat.services.ai.service import AIService
+from src.chat.services.ai.usage_recorder import CallTrace, UsageRecord, UsageRecorder
+
+
+def _record(**overrides):
+    fields = {
+        "created_at": datetime.datetime(2026, 1, 1),
+        "call_type": "generate",
+        "provider": "deepseek",
+        "model": "deepseek-chat",
+        "success": True,
+        "latency_ms": 100,
+    }
+    fields.update(overrides)
+    return UsageRecord(**fields)
+
+
+class _Sink:
+    def __init__(self):
+        self.batches = []
+        self.fail = 0
+
+    async def write(self, records):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("db down")
+        self.batches.append(list(records))
+
+
+def _recorder(sink, **config):
+    defaults = {
+        "ENABLED": True,
+        "FLUSH_INTERVAL_SECONDS": 60.0,
+        "FLUSH_THRESHOLD": 100,
+        "MAX_BUFFERED_RECORDS": 1000,
+    }
+    defaults.update(config)
+    return UsageRecorder(write=sink.write, config=defaults)
+
+
+@pytest.mark.asyncio
+async def test_records_are_written_in_one_batch():
+    sink = _Sink()
+    recorder = _recorder(sink)
+    for i in range(5):
+        recorder.record(_record(latency_ms=i))
+    await asyncio.sleep(0)
+    assert sink.batches == []
+
+    await recorder.aclose()
+    assert len(sink.batches) == 1
+    assert [r.latency_ms for r in sink.batches[0]] == [0, 1, 2, 3, 4]
+    assert recorder.written == 5
+    assert recorder.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_threshold_triggers_an_early_flush():
+    sink = _Sink()
+    recorder = _recorder(sink, FLUSH_THRESHOLD=3)
+    for _ in range(3):
+        recorder.record(_record())
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert len(sink.batches) == 1
+    assert len(sink.batches[0]) == 3
+    await recorder.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_write_keeps_records_for_the_next_flush():
+    sink = _Sink()
+    sink.fail = 1
+    recorder = _recorder(sink)
+    recorder.record(_record(latency_ms=1))
+
+    assert await recorder.flush() == 0
+    assert recorder.pending == 1
+
+    recorder.record(_record(latency_ms=2))
+    await recorder.aclose()
+    assert [r.latency_ms for r in sink.batches[0]] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_buffer_is_bounded_while_database_is_down():
+    sink = _Sink()
+    sink.fail = 10
+    recorder = _recorder(sink, MAX_BUFFERED_RECORDS=3)
+    for i in range(5):
+        recorder.record(_record(latency_ms=i))
+    await recorder.flush()
+
+    assert recorder.dropped == 2
+    assert recorder.pending == 3
+    sink.fail = 0
+    await recorder.aclose()
+    assert [r.latency_ms for r in sink.batches[0]] == [2, 3, 4]
+
+
+def test_trace_converts_result_into_record():
+    trace = CallTrace("generate", "gemini_official", "gemini-2.5-pro")
+    trace.retries = 2
+    result = GenerationResult(
+        content="hi",
+        model_used="gemini-2.5-pro",
+        input_tokens=120,
+        output_tokens=30,
+        cached_tokens=100,
+        first_byte_seconds=0.25,
+    )
+    record = trace.to_record(result=result)
+
+    assert record.success
+    assert (record.input_tokens, record.output_tokens, record.cached_tokens) == (
+        120,
+        30,
+        100,
+    )
+    assert record.ttfb_ms == 250
+    assert record.retries == 2
+
+    failed = CallTrace("generate", "gemini_official", "gemini-2.5-pro").to_record(
+        error=TimeoutError()
+    )
+    assert not failed.success
+    assert failed.error_type == "TimeoutError"
+
+
+class _FakeProvider(BaseProvider):
+    provider_type = "fake"
+
+    def __init__(self, models, failures=0, tokens=(10, 5)):
+        self.supported_models = models
+        self.failures = failures
+        self.tokens = tokens
+
+    async def generate(self, messages, config=None, tools=None, model=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("upstream error")
+        return GenerationResult(
+            content="ok",
+            model_used=model,
+            input_tokens=self.tokens[0],
+            output_tokens=self.tokens[1],
+        )
+
+    async def generate_with_tools(self, messages, config=None, tools=None, **kwargs):
+        return await self.generate(messages, config, tools, **kwargs)
+
+    async def is_available(self):
+        return True
+
+    def get_client(self):
+        return None
+
+    async def generate_embedding(self, text, **kwargs):
+        return None
+
+
+@pytest.fixture
+def captured(monkeypatch):
+    records = []
+
+    class _Capture:
+        def record(self, record):
+            records.append(record)
+
+    monkeypatch.setattr(service_module, "usage_recorder", _Capture())
+    monkeypatch.setitem(service_module.PROVIDER_RETRY_CONFIG, "MAX_RETRIES", 2)
+    monkeypatch.setitem(service_module.PROVIDER_RETRY_CONFIG, "RETRY_DELAY_SECONDS", 0)
+    return records
+
+
+@pytest.mark.asyncio
+async def test_service_records_retries(captured):
+    service = AIService()
+    service.register_provider("primary", _FakeProvider(["model-a"], failures=2))
+
+    result = await service.generate(
+        [{"role": "user", "content": "hi"}], model="primary:model-a"
+    )
+
+    assert result.content == "ok"
+    (record,) = captured
+    assert record.call_type == "generate"
+    assert record.provider == "primary"
+    assert record.retries == 2
+    assert record.fallback_hops == 0
+    assert (record.input_tokens, record.output_tokens) == (10, 5)
+
+
+@pytest.mark.asyncio
+async def test_service_records_fallback_provider(captured, monkeypatch):
+    monkeypatch.setattr(
+        service_module, "get_fallback_providers", lambda provider_type: ["backup"]
+    )
+    service = AIService()
+    service.register_provider("primary", _FakeProvider(["model-a"], failures=10))
+    service.register_provider("backup", _FakeProvider(["model-b"], tokens=(7, 3)))
+
+    await service.generate_with_tools(
+        [{"role": "user", "content": "hi"}],
+        model="primary:model-a",
+        tool_executor=None,
+        usage_label="two_stage_tools",
+    )
+
+    (record,) = captured
+    assert record.call_type == "two_stage_tools"
+    assert record.provider == "backup"
+    assert record.model == "model-b"
+    assert record.retries == 2
+    assert record.fallback_hops == 1
+    assert record.success
+
+
+@pytest.mark.asyncio
+async def test_service_records_failed_calls(captured, monkeypatch):
+    monkeypatch.setattr(
+        service_module, "get_fallback_providers", lambda provider_type: []
+    )
+    service = AIService()
+    service.register_provider("primary", _FakeProvider(["model-a"], failures=10))
+
+    with pytest.raises(service_module.GenerationError):
+        await service.generate(
+            [{"role": "user", "content": "hi"}], model="primary:model-a"
+        )
+
+    (record,) = captured
+    assert not record.success
+    assert record.error_type == "GenerationError"
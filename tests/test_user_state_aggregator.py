@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+用户状态写回缓冲测试：合并、WAL 崩溃重放、写入失败后的重试以及读自己的写。
+"""
+
+import asyncio
+import glob
+import os
+
+import pytest
+
+from src.chat.services import user_state_aggregator as aggregator_module
+from src.chat.services.user_state_aggregator import UserStateAggregator
+
+
+class _Recorder:
+    def __init__(self):
+        self.postgres = []
+        self.model_usage = {}
+        self.fail_postgres = 0
+
+
+@pytest.fixture
+def recorder():
+    return _Recorder()
+
+
+def _make(tmp_path, recorder, monkeypatch, **kwargs):
+    agg = UserStateAggregator(
+        wal_dir=str(tmp_path / "wal"), flush_interval=60, enabled=True, **kwargs
+    )
+
+    async def write_postgres(snapshot):
+        if recorder.fail_postgres:
+            recorder.fail_postgres -= 1
+            raise RuntimeError("db down")
+        recorder.postgres.append(
+            (dict(snapshot.affection), dict(snapshot.rewards), dict(snapshot.history))
+        )
+
+    async def write_model_usage(snapshot):
+        for key, count in snapshot.model_usage.items():
+            recorder.model_usage[key] = recorder.model_usage.get(key, 0) + count
+        snapshot.model_usage.clear()
+
+    monkeypatch.setattr(agg, "_write_postgres", write_postgres)
+    monkeypatch.setattr(agg, "_write_model_usage", write_model_usage)
+    return agg
+
+
+def _segments(tmp_path):
+    return glob.glob(os.path.join(tmp_path, "wal", "segment-*.jsonl"))
+
+
+@pytest.mark.asyncio
+async def test_changes_are_coalesced_into_one_write(tmp_path, recorder, monkeypatch):
+    monkeypatch.setattr(aggregator_module.random, "random", lambda: 0.0)
+    agg = _make(tmp_path, recorder, monkeypatch)
+
+    for _ in range(3):
+        await agg.add_chat_affection(1)
+        await agg.add_daily_message_reward(1)
+        await agg.add_model_usage("gemini", "official")
+    await agg.append_history(1, "u", "你好", "你好呀")
+
+    assert await agg.flush() == 3 + 1 + 3 + 1
+    assert len(recorder.postgres) == 1
+    affection, rewards, history = recorder.postgres[0]
+    assert list(affection.values()) == [3]
+    assert list(rewards) == [1]
+    assert [turn["role"] for turn in history[1]] == ["user", "model"]
+    assert list(recorder.model_usage.values()) == [3]
+    assert _segments(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_wal_is_replayed_after_crash(tmp_path, recorder, monkeypatch):
+    crashed = _make(tmp_path, recorder, monkeypatch)
+    await crashed.add_model_usage("gemini", "official")
+    await crashed.append_history(7, "u", "问题", "回答")
+    # 模拟崩溃：未写入数据库，WAL 末尾还有半行
+    crashed._wal_file.write('{"op": "model_us')
+    crashed._wal_file.flush()
+
+    restarted = _make(tmp_path, recorder, monkeypatch)
+    await restarted.start()
+    await restarted.stop()
+
+    assert list(recorder.model_usage.values()) == [1]
+    assert len(recorder.postgres[0][2][7]) == 2
+    assert _segments(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried(tmp_path, recorder, monkeypatch):
+    agg = _make(tmp_path, recorder, monkeypatch)
+    recorder.fail_postgres = 1
+
+    await agg.append_history(1, "u", "第一条", "回复一")
+    await agg.flush()
+    assert recorder.postgres == []
+    assert len(_segments(tmp_path)) == 1
+    # 失败期间的变更仍可读到，且顺序在之后的对话之前
+    await agg.append_history(1, "u", "第二条", "回复二")
+    assert [t["parts"][0] for t in agg.pending_history(1)][::2] == ["第一条", "第二条"]
+
+    await agg.flush()
+    assert len(recorder.postgres[0][2][1]) == 4
+    assert _segments(tmp_path) == []
+    assert not agg.has_pending_history(1)
+
+
+@pytest.mark.asyncio
+async def test_inflight_history_stays_visible(tmp_path, recorder, monkeypatch):
+    agg = _make(tmp_path, recorder, monkeypatch)
+    release = asyncio.Event()
+
+    async def slow_write(snapshot):
+        await release.wait()
+
+    monkeypatch.setattr(agg, "_write_postgres", slow_write)
+    await agg.append_history(1, "u", "问题", "回答")
+    flush = asyncio.create_task(agg.flush())
+    await asyncio.sleep(0)
+
+    assert agg.has_pending_history(1)
+    release.set()
+    await flush
+    assert not agg.has_pending_history(1)
+
+
+@pytest.mark.asyncio
+async def test_daily_reward_is_queued_once_per_day(tmp_path, recorder, monkeypatch):
+    agg = _make(tmp_path, recorder, monkeypatch)
+    for _ in range(5):
+        await agg.add_daily_message_reward(42)
+    assert agg.pending_ops == 1
+
+    monkeypatch.setattr(aggregator_module, "_today", lambda: "2999-01-01")
+    await agg.add_daily_message_reward(42)
+    assert agg.pending_ops == 2
+
+
+@pytest.mark.asyncio
+async def test_threshold_wakes_flush_loop(tmp_path, recorder, monkeypatch):
+    agg = _make(tmp_path, recorder, monkeypatch, flush_threshold=3)
+    await agg.start()
+    try:
+        for _ in range(3):
+            await agg.add_model_usage("gemini", "official")
+        for _ in range(50):
+            if recorder.model_usage:
+                break
+            await asyncio.sleep(0.01)
+        assert list(recorder.model_usage.values()) == [3]
+    finally:
+        await agg.stop()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+向量参数编码测试：HalfVector 转换与二进制格式、asyncpg 编解码器注册，
+以及 ORM 列类型在 asyncpg / psycopg2 下的传参形式。
+"""
+
+import struct
+
+import numpy as np
+import pytest
+from pgvector import HalfVector
+from sqlalchemy.dialects.postgresql import asyncpg as pg_asyncpg
+from sqlalchemy.dialects.postgresql import psycopg2 as pg_psycopg2
+
+from src.database.vector_codec import (
+    BinaryHALFVEC,
+    register_vector_codecs,
+    to_halfvec,
+)
+
+
+def test_to_halfvec_accepts_list_array_and_text():
+    expected = [0.5, -0.25, 1.0]
+    for value in (expected, np.array(expected), "[0.5,-0.25,1]"):
+        assert to_halfvec(value).to_list() == expected
+
+    halfvec = to_halfvec(expected)
+    assert to_halfvec(halfvec) is halfvec
+
+
+def test_binary_payload_is_two_bytes_per_dimension():
+    payload = to_halfvec([0.1] * 1024).to_binary()
+    assert len(payload) == 4 + 2 * 1024
+    assert struct.unpack_from(">HH", payload) == (1024, 0)
+    assert HalfVector.from_binary(payload).dimensions() == 1024
+
+
+def test_column_type_binds_halfvec_only_for_asyncpg():
+    column_type = BinaryHALFVEC(3)
+    asyncpg_bind = column_type.bind_processor(pg_asyncpg.dialect())
+    assert isinstance(asyncpg_bind([0.5, 0.25, 1.0]), HalfVector)
+    assert asyncpg_bind(None) is None
+
+    psycopg2_bind = column_type.bind_processor(pg_psycopg2.dialect())
+    assert psycopg2_bind([0.5, 0.25, 1.0]) == "[0.5,0.25,1.0]"
+
+
+class _FakeConnection:
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.codecs = {}
+
+    async def set_type_codec(self, name, schema, encoder, decoder, format):
+        if name in self.missing:
+            raise ValueError(f"unknown type: {schema}.{name}")
+        self.codecs[name] = (encoder, decoder, format)
+
+
+@pytest.mark.asyncio
+async def test_registered_codec_encodes_binary_and_accepts_text():
+    conn = _FakeConnection()
+    await register_vector_codecs(conn)
+
+    encoder, decoder, fmt = conn.codecs["halfvec"]
+    assert fmt == "binary"
+    payload = encoder([0.5, 0.25])
+    assert payload == to_halfvec([0.5, 0.25]).to_binary()
+    # 尚未改用 to_halfvec 的调用方仍可传文本
+    assert encoder("[0.5,0.25]") == payload
+    assert decoder(payload).to_list() == [0.5, 0.25]
+
+
+@pytest.mark.asyncio
+async def test_missing_extension_types_are_skipped():
+    conn = _FakeConnection(missing={"halfvec", "vector"})
+    await register_vector_codecs(conn)
+    assert conn.codecs == {}
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+打工状态原子 UPSERT 测试（临时 SQLite 数据库）：每日计数重置、连续天数与全勤奖、并发不丢计数。
+"""
+
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.chat.features.work_game.config.work_config import WorkConfig
+from src.chat.features.work_game.services.work_db_service import WorkDBService
+from src.chat.utils.database import ChatDatabaseManager
+
+
+@pytest.fixture
+def work_db(tmp_path, monkeypatch):
+    manager = ChatDatabaseManager(str(tmp_path / "chat.db"))
+    manager._init_database_logic()
+    monkeypatch.setattr(
+        "src.chat.features.work_game.services.work_db_service.chat_db_manager", manager
+    )
+    return WorkDBService(), manager.db_path
+
+
+def _set_status(db_path, user_id, **values):
+    columns = ", ".join(f"{k} = ?" for k in values)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            f"UPDATE user_work_status SET {columns} WHERE user_id = ?",
+            (*values.values(), user_id),
+        )
+
+
+def _days_ago(days):
+    return (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
+
+
+@pytest.mark.asyncio
+async def test_first_work_creates_record(work_db):
+    service, _ = work_db
+    assert await service.update_work_record_and_check_streak(1) == (False, 1)
+
+    status = await service.get_user_work_status(1)
+    assert status["work_count_today"] == 1
+    assert status["last_count_date"] == _days_ago(0)
+
+
+@pytest.mark.asyncio
+async def test_streak_continues_resets_and_pays_out(work_db):
+    service, db_path = work_db
+    await service.update_work_record_and_check_streak(1)
+
+    # 同一天再次打工不改变连续天数
+    assert await service.update_work_record_and_check_streak(1) == (False, 1)
+
+    # 昨天打过工：连续天数加一；达到 STREAK_DAYS 时发奖并归零
+    _set_status(
+        db_path,
+        1,
+        last_streak_date=_days_ago(1),
+        consecutive_work_days=WorkConfig.STREAK_DAYS - 1,
+        last_count_date=_days_ago(1),
+    )
+    assert await service.update_work_record_and_check_streak(1) == (True, 0)
+    assert await service.update_work_record_and_check_streak(1) == (False, 0)
+
+    # 中断后重置为 1
+    _set_status(db_path, 1, last_streak_date=_days_ago(3), last_count_date=_days_ago(3))
+    assert await service.update_work_record_and_check_streak(1) == (False, 1)
+    status = await service.get_user_work_status(1)
+    assert status["work_count_today"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sell_body_resets_daily_counts_in_sql(work_db):
+    service, db_path = work_db
+    await service.update_work_record_and_check_streak(1)
+    await service.increment_sell_body_count(1)
+    _set_status(db_path, 1, last_count_date=_days_ago(1))
+
+    counts = await service.increment_sell_body_count(1)
+    assert counts == {"sell_body_count_today": 1, "total_sell_body_count": 2}
+    status = await service.get_user_work_status(1)
+    assert status["work_count_today"] == 0
+    assert status["consecutive_work_days"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_do_not_lose_counts(work_db):
+    service, _ = work_db
+    await asyncio.gather(*(service.increment_sell_body_count(7) for _ in range(10)))
+
+    status = await service.get_user_work_status(7)
+    assert status["sell_body_count_today"] == 10
+    assert status["total_sell_body_count"] == 10